@@ -0,0 +1,77 @@
+"""Benchmark the per-value and vectorized rowwise type converters.
+
+Times ``convert_value_by_type`` on synthetic float and date columns with the
+default per-value backend and with the NumPy backend (list output), checks that
+both return the same Python values, and times ``convert_column`` alone for
+callers that can consume the typed arrays directly.
+
+Example usage:
+    uv run benchmarks/bench_conversion.py --rows 1000000
+"""
+
+import argparse
+import random
+import time
+
+from DataBUS.neotomaHelpers import vectorized
+from DataBUS.neotomaHelpers.utils import convert_value_by_type
+
+
+def _columns(rows, seed=0):
+    rng = random.Random(seed)
+    floats = [f"{rng.uniform(0, 500):.3f}" if rng.random() > 0.05 else None for _ in range(rows)]
+    dates = [
+        f"{rng.randint(1950, 2024)}/{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}"
+        for _ in range(rows)
+    ]
+    return {"float": floats, "date": dates}
+
+
+def _cold(meta, column):
+    vectorized.parse_date.cache_clear()
+    return convert_value_by_type(meta, column)
+
+
+def _typed(type_spec, column):
+    vectorized.parse_date.cache_clear()
+    return vectorized.convert_column(column, type_spec)
+
+
+def _time(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000, help="Values per column")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best kept)")
+    args = parser.parse_args()
+
+    for type_spec, column in _columns(args.rows).items():
+        meta = {"type": type_spec, "rowwise": True}
+        if type_spec == "date":
+            # The per-value path cannot parse missing dates.
+            column = [v for v in column if v is not None]
+        vectorized.use_vectorized(False)
+        python_s, expected = _time(
+            lambda m=meta, c=column: convert_value_by_type(m, c), args.repeat
+        )
+        vectorized.use_vectorized(True, min_rows=0)
+        numpy_s, result = _time(lambda m=meta, c=column: _cold(m, c), args.repeat)
+        vectorized.use_vectorized(False)
+        typed_s, _ = _time(lambda t=type_spec, c=column: _typed(t, c), args.repeat)
+        assert result == expected, f"{type_spec}: backends disagree"
+        print(
+            f"{type_spec:>6}  rows={len(column):>9,}  python={python_s:7.3f}s  "
+            f"numpy-list={numpy_s:7.3f}s ({python_s / numpy_s:4.1f}x)  "
+            f"numpy-typed={typed_s:7.3f}s ({python_s / typed_s:4.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark the per-row and bulk insert paths for ``ndb.data``.
+
+Inserts the same synthetic values with one ``ts.insertdata`` call per datum and
+with ``Datum.insert_many`` (``insert`` and ``copy`` methods), checks that every
+path returns one dataid per value, and rolls every run back. Needs a Neotoma
+database holding at least one sample and one variable; connection settings are
+read from ``PGDB_TANK`` as in ``databus_example.py``.
+
+Example usage:
+    uv run benchmarks/bench_data_insert.py --rows 50000
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+
+import psycopg2
+from dotenv import load_dotenv
+
+from DataBUS import Datum
+
+
+def _data(cur, rows, seed=0):
+    cur.execute("SELECT sampleid FROM ndb.samples LIMIT 1;")
+    sampleid = cur.fetchone()[0]
+    cur.execute("SELECT variableid FROM ndb.variables LIMIT 1;")
+    variableid = cur.fetchone()[0]
+    rng = random.Random(seed)
+    return [
+        Datum(sampleid=sampleid, variableid=variableid, value=round(rng.uniform(0, 500), 3))
+        for _ in range(rows)
+    ]
+
+
+def _per_row(cur, data):
+    return [d.insert_to_db(cur) for d in data]
+
+
+def _time(conn, fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        with conn.cursor() as cur:
+            start = time.perf_counter()
+            ids = fn(cur)
+            best = min(best, time.perf_counter() - start)
+        conn.rollback()
+    return best, ids
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000, help="Data values to insert")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best kept)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    conn = psycopg2.connect(**json.loads(os.getenv("PGDB_TANK")), connect_timeout=5)
+    try:
+        with conn.cursor() as cur:
+            data = _data(cur, args.rows)
+        row_s, ids = _time(conn, lambda cur: _per_row(cur, data), args.repeat)
+        assert len(ids) == len(data)
+        results = [("per-row", row_s)]
+        for method in ("insert", "copy"):
+            bulk_s, ids = _time(
+                conn, lambda cur, m=method: Datum.insert_many(cur, data, method=m), args.repeat
+            )
+            assert len(ids) == len(data), f"{method}: expected one dataid per value"
+            results.append((method, bulk_s))
+        for name, seconds in results:
+            print(
+                f"{name:>8}  rows={len(data):>9,}  {seconds:7.3f}s  "
+                f"({len(data) / seconds:10,.0f} rows/s, {row_s / seconds:5.1f}x)"
+            )
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
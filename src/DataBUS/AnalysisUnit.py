@@ -1,3 +1,5 @@
+from .neotomaHelpers.prepared_statements import execute_prepared
+
 ANALYSIS_UNIT_PARAMS = [
     "analysisunitname",
     "depth",
@@ -96,6 +98,6 @@ class AnalysisUnit:
             "igsn": self.igsn,
             "notes": self.notes,
         }
-        cur.execute(au_query, inputs)
+        execute_prepared(cur, au_query, inputs)
         self.analysisunitid = cur.fetchone()[0]
         return self.analysisunitid
@@ -1,3 +1,4 @@
+from .neotomaHelpers.prepared_statements import execute_prepared
 from .neotomaHelpers.utils import validate_int_values
 
 CCONTROL_PARAMS = [
@@ -100,6 +101,18 @@ class ChronControl:
             "agelimitolder": self.agelimitolder,
             "notes": self.notes,
         }
+        self.check_age_limits()
+        execute_prepared(cur, chroncon_query, inputs)
+        self.chroncontrolid = cur.fetchone()[0]
+        return self.chroncontrolid
+
+    def check_age_limits(self):
+        """Check that the younger age limit is not greater than the older one.
+
+        Raises:
+            ValueError: If ``agelimityounger`` > ``agelimitolder`` (except for
+                calendar years, ``agetypeid`` 1).
+        """
         if (
             self.agelimityounger is not None
             and self.agelimitolder is not None
@@ -108,10 +121,6 @@ class ChronControl:
         ):
             raise ValueError("Younger age limit cannot be greater than older age limit.")
 
-        cur.execute(chroncon_query, inputs)
-        self.chroncontrolid = cur.fetchone()[0]
-        return self.chroncontrolid
-
     def __str__(self):
         """Return string representation of the ChronControl object.
 
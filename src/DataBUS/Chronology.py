@@ -1,3 +1,4 @@
+from .neotomaHelpers.prepared_statements import execute_prepared
 from .neotomaHelpers.utils import validate_date_values, validate_int_values
 
 CHRONOLOGY_PARAMS = [
@@ -130,7 +131,7 @@ class Chronology:
             "isdefault": self.isdefault,
             "notes": self.notes,
         }
-        cur.execute(chron_query, inputs)
+        execute_prepared(cur, chron_query, inputs)
         self.chronologyid = cur.fetchone()[0]
         return self.chronologyid
 
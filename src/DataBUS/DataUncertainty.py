@@ -1,13 +1,7 @@
-import importlib.resources
-
+from .neotomaHelpers.sql_functions import require_sql_function
 from .neotomaHelpers.utils import validate_int_values
 
 DATAUNCERTAINTY_PARAMS = ["uncertaintyvalue", "uncertaintyunitid", "notes"]
-insert_data_uncertainty = (
-    importlib.resources.files("DataBUS.sqlHelpers")
-    .joinpath("insert_data_uncertainty.sql")
-    .read_text(encoding="UTF-8")
-)
 
 
 class DataUncertainty:
@@ -46,7 +40,7 @@ class DataUncertainty:
         Returns:
             None
         """
-        cur.execute(insert_data_uncertainty)
+        require_sql_function(cur, "insert_data_uncertainty")
         dat_un_q = """
                  SELECT insert_data_uncertainty(_dataid := %(dataid)s,
                                                    _uncertaintyvalue := %(uncertaintyvalue)s,
@@ -1,5 +1,29 @@
+import io
+
+from .neotomaHelpers.id_allocator import savepoint
+from .neotomaHelpers.prepared_statements import execute_prepared
 from .neotomaHelpers.utils import validate_int_values
 
+BULK_METHODS = ("insert", "copy")
+
+# Assigns dataids in input order from the ndb.data sequence, inserts the rows
+# and returns the ids ordered like the input, whatever order the INSERT uses.
+_BULK_INSERT_Q = """
+    WITH staged AS MATERIALIZED (
+        SELECT ord, nextval(pg_get_serial_sequence('ndb.data', 'dataid')) AS dataid,
+               sampleid, variableid, value
+        FROM {source}
+        ORDER BY ord
+    ), inserted AS (
+        INSERT INTO ndb.data (dataid, sampleid, variableid, value)
+        SELECT dataid, sampleid, variableid, value FROM staged
+    )
+    SELECT dataid FROM staged ORDER BY ord;
+"""
+_UNNEST_SOURCE = """unnest(%(sampleid)s::int[], %(variableid)s::int[], %(value)s::float8[])
+             WITH ORDINALITY AS t(sampleid, variableid, value, ord)"""
+_STAGING_TABLE = "databus_data_staging"
+
 
 class Datum:
     """A data point measurement in the Neotoma database.
@@ -46,10 +70,77 @@ class Datum:
             "variableid": self.variableid,
             "value": self.value,
         }
-        cur.execute(datum_q, inputs)
+        execute_prepared(cur, datum_q, inputs)
         self.datumid = cur.fetchone()[0]
         return self.datumid
 
+    @staticmethod
+    def insert_many(cur, data, method="insert"):
+        """Insert several data records with one statement.
+
+        Rows are written directly to ``ndb.data`` (what ``ts.insertdata`` does
+        for one row) and their ``dataid`` values are returned in input order.
+
+        * ``"insert"``: a single ``INSERT ... SELECT`` over ``unnest`` of the
+          sampleid, variableid and value arrays.
+        * ``"copy"``: ``COPY`` into a session-local staging table, then one
+          ``INSERT ... SELECT`` from it. Faster for very large batches;
+          requires a psycopg2 cursor.
+
+        The statements run in a savepoint that is rolled back when they fail,
+        so the transaction stays usable, e.g. to insert the records one at a
+        time and find the bad ones.
+
+        Args:
+            cur (psycopg2.cursor): Database cursor for executing queries.
+            data (list[Datum]): Records to insert.
+            method (str): ``"insert"`` or ``"copy"``. Defaults to ``"insert"``.
+
+        Returns:
+            list[int]: The dataids assigned by the database, in input order.
+
+        Raises:
+            ValueError: If ``method`` is unknown or the database does not
+                return one id per record.
+        """
+        if method not in BULK_METHODS:
+            raise ValueError(f"Unknown bulk insert method {method!r}; use one of {BULK_METHODS}.")
+        if not data:
+            return []
+        with savepoint(cur):
+            ids = Datum._insert_many(cur, data, method)
+            if len(ids) != len(data):
+                raise ValueError(f"Expected {len(data)} dataids from the database, got {len(ids)}.")
+        for datum, dataid in zip(data, ids, strict=True):
+            datum.datumid = dataid
+        return ids
+
+    @staticmethod
+    def _insert_many(cur, data, method):
+        if method == "copy":
+            cur.execute(
+                f"""CREATE TEMPORARY TABLE IF NOT EXISTS {_STAGING_TABLE}
+                    (ord bigint, sampleid integer, variableid integer, value double precision);
+                    TRUNCATE {_STAGING_TABLE};"""
+            )
+            buffer = io.StringIO()
+            for ord_, datum in enumerate(data, start=1):
+                row = (ord_, datum.sampleid, datum.variableid, datum.value)
+                buffer.write("\t".join("\\N" if v is None else str(v) for v in row) + "\n")
+            buffer.seek(0)
+            cur.copy_expert(
+                f"COPY {_STAGING_TABLE} (ord, sampleid, variableid, value) FROM STDIN", buffer
+            )
+            cur.execute(_BULK_INSERT_Q.format(source=_STAGING_TABLE))
+        else:
+            inputs = {
+                "sampleid": [d.sampleid for d in data],
+                "variableid": [d.variableid for d in data],
+                "value": [d.value for d in data],
+            }
+            cur.execute(_BULK_INSERT_Q.format(source=_UNNEST_SOURCE), inputs)
+        return [row[0] for row in cur.fetchall() or []]
+
     def __str__(self):
         """Return string representation of the Datum object.
 
@@ -1,3 +1,4 @@
+from .neotomaHelpers.prepared_statements import execute_prepared
 from .neotomaHelpers.utils import validate_int_values
 
 GECHRON_PARAMS = [
@@ -127,7 +128,7 @@ class Geochron:
             "materialdated": self.materialdated,
             "notes": self.notes,
         }
-        cur.execute(geochron_query, inputs)
+        execute_prepared(cur, geochron_query, inputs)
         self.geochronid = cur.fetchone()[0]
         return self.geochronid
 
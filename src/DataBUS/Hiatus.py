@@ -1,18 +1,6 @@
-import importlib.resources
-
+from .neotomaHelpers.sql_functions import require_sql_function
 from .neotomaHelpers.utils import validate_int_values
 
-insert_hiatus = (
-    importlib.resources.files("DataBUS.sqlHelpers")
-    .joinpath("insert_hiatus.sql")
-    .read_text(encoding="UTF-8")
-)
-
-insert_hiatuschronology = (
-    importlib.resources.files("DataBUS.sqlHelpers")
-    .joinpath("insert_hiatuschronology.sql")
-    .read_text(encoding="UTF-8")
-)
 HIATUS_PARAMS = ["hiatus", "notes"]
 
 
@@ -81,7 +69,7 @@ class Hiatus:
         Returns:
             int: The hiatusid assigned by the database.
         """
-        cur.execute(insert_hiatus)
+        require_sql_function(cur, "insert_hiatus")
         hiatus_query = """SELECT insert_hiatus(_analysisunitstart := %(analysisunitstart)s,
                                                _analysisunitend := %(analysisunitend)s,
                                                _notes := %(notes)s)"""
@@ -107,7 +95,7 @@ class Hiatus:
         Returns:
             None
         """
-        cur.execute(insert_hiatuschronology)
+        require_sql_function(cur, "insert_hiatuschronology")
         hiatus_query = """SELECT insert_hiatuschronology(_hiatusid := %(hiatusid)s,
                                                _chronologyid := %(chronologyid)s,
                                                _hiatuslength := %(hiatuslength)s,
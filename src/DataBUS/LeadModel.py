@@ -1,15 +1,8 @@
-import importlib.resources
-
+from .neotomaHelpers.sql_functions import require_sql_function
 from .neotomaHelpers.utils import validate_int_values
 
 LEAD_MODEL_PARAMS = ["pbbasisid", "cumulativeinventory", "datinghorizon"]
 
-insert_pb_model = (
-    importlib.resources.files("DataBUS.sqlHelpers")
-    .joinpath("insert_pb_model.sql")
-    .read_text(encoding="UTF-8")
-)
-
 
 class LeadModel:
     """A Lead-210 geochronological model in Neotoma.
@@ -46,7 +39,7 @@ class LeadModel:
         Returns:
             None
         """
-        cur.execute(insert_pb_model)
+        require_sql_function(cur, "insert_lead_model")
         lead_q = """SELECT insert_lead_model(_pbbasisid := %(pbbasisid)s,
                                               _analysisunitid := %(analysisunitid)s,
                                               _cumulativeinventory := %(cumulativeinventory)s)"""
@@ -1,3 +1,111 @@
+class Validity:
+    """Pass/fail record of the checks made by a validator.
+
+    Validators append one boolean per check, several per row for the larger
+    tables. Instead of keeping every value, ``Validity`` counts passes and
+    failures and remembers the positions of the first ``max_failures``
+    failures, so its size does not grow with the file and ``all`` is answered
+    from the counts. In detailed mode it also keeps every value, for debugging.
+
+    It behaves like the list of booleans it replaces for ``append``,
+    ``extend``, ``len``, truth testing, ``True in`` / ``False in`` and
+    comparison. Iterating rebuilds the values from the failure positions, which
+    is exact unless more than ``max_failures`` checks failed outside detailed
+    mode.
+
+    Examples:
+        >>> valid = Validity()
+        >>> valid.extend([True, True, False])
+        >>> valid.passed, valid.failed, valid.failures
+        (2, 1, [2])
+        >>> valid.all()
+        False
+
+    Args:
+        values (iterable, optional): Initial check results.
+        detailed (bool): Keep every value. Defaults to False.
+        max_failures (int): Number of failure positions kept. Defaults to 100.
+
+    Attributes:
+        passed (int): Number of checks that passed.
+        failed (int): Number of checks that failed.
+        failures (list[int]): Positions of the first ``max_failures`` failures.
+        detailed (bool): Whether every value is kept.
+    """
+
+    def __init__(self, values=(), detailed=False, max_failures=100):
+        self.passed = 0
+        self.failed = 0
+        self.failures = []
+        self.detailed = detailed
+        self.max_failures = max_failures
+        self._values = [] if detailed else None
+        self.extend(values)
+
+    def append(self, value):
+        """Record the result of one check."""
+        if value:
+            self.passed += 1
+        else:
+            if len(self.failures) < self.max_failures:
+                self.failures.append(self.passed + self.failed)
+            self.failed += 1
+        if self._values is not None:
+            self._values.append(value)
+
+    def extend(self, values):
+        """Record the results of several checks."""
+        for value in values:
+            self.append(value)
+
+    def all(self):
+        """True if at least one check was made and none failed."""
+        return self.failed == 0 and self.passed > 0
+
+    @property
+    def exact(self):
+        """True if iterating gives back the values that were appended."""
+        return self._values is not None or self.failed <= len(self.failures)
+
+    def __len__(self):
+        return self.passed + self.failed
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __contains__(self, value):
+        if self._values is not None:
+            return value in self._values
+        return self.passed > 0 if value else self.failed > 0
+
+    def __iter__(self):
+        if self._values is not None:
+            return iter(self._values)
+        if not self.exact:
+            raise ValueError(
+                f"Only the first {self.max_failures} of {self.failed} failures were kept; "
+                "use detailed mode to iterate over every check."
+            )
+        failures = set(self.failures)
+        return (i not in failures for i in range(len(self)))
+
+    def __eq__(self, other):
+        if isinstance(other, Validity):
+            return (self.passed, self.failed, self.failures) == (
+                other.passed,
+                other.failed,
+                other.failures,
+            )
+        if isinstance(other, list | tuple):
+            return self.exact and list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Validity(passed={self.passed}, failed={self.failed}, failures={self.failures})"
+
+
 class Response:
     """Base response class for handling validation and messaging.
 
@@ -13,12 +121,22 @@ class Response:
         >>> len(response.valid)
         3
 
+    ``valid`` is a ``Validity``: it counts passed and failed checks rather
+    than keeping a list of booleans, so ``validAll`` is constant-time and
+    memory stays flat however many rows are checked. Set ``Response.detailed``
+    to True to keep every value while debugging.
+
+    Messages added with ``add_message`` are de-duplicated: a repeated message
+    is counted instead of appended again, and printed once with its count,
+    e.g. ``✔ Sample Age is valid. (×120)``. ``message`` stays a plain list, so
+    messages appended to it directly are kept as they are.
+
     Args:
         valid (list | None): List of validation boolean values.
         message (list | None): List of message strings.
 
     Attributes:
-        valid (list): Validation status values.
+        valid (Validity): Validation status values; assigning a list converts it.
         message (list): Message strings.
         validAll (bool | None): Overall validation status.
         id_int (int | None): Associated ID.
@@ -26,8 +144,15 @@ class Response:
         id_dict (dict): Mapping of data identifiers.
         name (dict): Name mapping dictionary.
         indices (list): List of indices.
+        detailed (bool): Class-wide switch for keeping every ``valid`` value.
+            Defaults to False.
+        max_failures (int): Class-wide number of failure positions kept by
+            ``valid``. Defaults to 100.
     """
 
+    detailed = False
+    max_failures = 100
+
     def __init__(self):
         """
         Initialize a Response object.
@@ -41,15 +166,87 @@ class Response:
         self.indices = []
         self.counter = 0
 
+    @property
+    def valid(self):
+        """Validity: Results of the checks made by the validator."""
+        return self._valid
+
+    @valid.setter
+    def valid(self, values):
+        self._valid = Validity(values, detailed=self.detailed, max_failures=self.max_failures)
+
+    @property
+    def message(self):
+        """list: Message strings, each message added with ``add_message`` once."""
+        return self._message
+
+    @message.setter
+    def message(self, value):
+        self._message = value
+        self._seen = set()
+        self._indexed = 0
+        self._repeats = {}
+
+    def add_message(self, template, **params):
+        """Add a message unless it is already there, counting repeats.
+
+        The check is a set lookup, so validators can report per row without
+        scanning the messages collected so far.
+
+        Examples:
+            >>> response = Response()
+            >>> response.add_message("✗  Datum cannot be created: {e}", e="bad date")
+            True
+            >>> response.add_message("✗  Datum cannot be created: {e}", e="bad date")
+            False
+            >>> response.message
+            ['✗  Datum cannot be created: bad date']
+            >>> response.message_count('✗  Datum cannot be created: bad date')
+            2
+
+        Args:
+            template (str): Message text, or a ``str.format`` template when
+                ``params`` are given.
+            **params: Values substituted into ``template``.
+
+        Returns:
+            bool: True if the message was new and appended to ``message``.
+        """
+        text = template.format(**params) if params else template
+        seen = self._index_messages()
+        if text in seen:
+            self._repeats[text] = self._repeats.get(text, 0) + 1
+            return False
+        self._message.append(text)
+        seen.add(text)
+        self._indexed += 1
+        return True
+
+    def message_count(self, message):
+        """Return how many times ``message`` was reported (0 if never)."""
+        if message not in self._index_messages():
+            return 0
+        return self._message.count(message) + self._repeats.get(message, 0)
+
+    def _index_messages(self):
+        """Return the set of messages, indexing those appended to ``message`` directly."""
+        if len(self._message) < self._indexed:
+            # The list was shortened in place; index it again.
+            self._seen = set()
+            self._indexed = 0
+        for text in self._message[self._indexed :]:
+            if isinstance(text, str):
+                self._seen.add(text)
+        self._indexed = len(self._message)
+        return self._seen
+
     @property
     def validAll(self):
         """
         True if valid is a non-empty list of booleans and all are True.
         False otherwise.
         """
-        if not self.valid:
-            return False
-        return all(self.valid)
+        return self._valid.all()
 
     def __str__(self):
         """Return string representation of the Response object.
@@ -57,8 +254,34 @@ class Response:
         Returns:
             str: Formatted string showing validity and messages.
         """
-        new_msg = "\n".join(str(m) for m in self.message)
-        if not self.validAll:
-            return f"Valid: {str(self.validAll).upper()} \nMessage: \n{new_msg}"
+        return self.format_text(self.validAll, self.message_counts())
+
+    def message_counts(self):
+        """Return the messages in order with the number of times each was reported.
+
+        Returns:
+            list[tuple[str, int]]: ``(message, count)`` pairs; a repeated
+            message added with ``add_message`` appears once.
+        """
+        counts = []
+        shown = set()
+        for m in self._message:
+            repeats = self._repeats.get(m, 0) if isinstance(m, str) and m not in shown else 0
+            if repeats:
+                shown.add(m)
+                counts.append((m, self._message.count(m) + repeats))
+            else:
+                counts.append((str(m), 1))
+        return counts
+
+    @staticmethod
+    def format_text(valid_all, message_counts):
+        """Render a validity flag and ``message_counts`` pairs as printed by ``str``.
+
+        Repeated messages are followed by ``(×N)``.
+        """
+        new_msg = "\n".join(m if n == 1 else f"{m} (×{n})" for m, n in message_counts)
+        if not valid_all:
+            return f"Valid: {str(valid_all).upper()} \nMessage: \n{new_msg}"
         else:
-            return f"Valid: {self.validAll} \nMessage: \n{new_msg}"
+            return f"Valid: {valid_all} \nMessage: \n{new_msg}"
@@ -1,3 +1,4 @@
+from .neotomaHelpers.prepared_statements import execute_prepared
 from .neotomaHelpers.utils import validate_int_values
 
 SAMPLE_PARAMS = [
@@ -93,7 +94,7 @@ class Sample:
             "notes": self.notes,
         }
 
-        cur.execute(sample_q, inputs)
+        execute_prepared(cur, sample_q, inputs)
         self.sampleid = cur.fetchone()[0]
         return self.sampleid
 
@@ -1,3 +1,4 @@
+from .neotomaHelpers.prepared_statements import execute_prepared
 from .neotomaHelpers.utils import validate_int_values
 
 SAMPLE_AGE_PARAMS = ["age", "ageyounger", "ageolder", "agemodel"]
@@ -57,7 +58,7 @@ class SampleAge:
             "ageolder": self.ageolder,
         }
 
-        cur.execute(sample_q, inputs)
+        execute_prepared(cur, sample_q, inputs)
         self.sampleage = cur.fetchone()[0]
         return self.sampleage
 
@@ -1,26 +1,6 @@
-import importlib.resources
-
+from .neotomaHelpers.sql_functions import require_sql_function
 from .neotomaHelpers.utils import validate_int_values
 
-_sql = importlib.resources.files("DataBUS.sqlHelpers")
-insert_speleothem = _sql.joinpath("insert_speleothem.sql").read_text(encoding="UTF-8")
-insert_entitygeology = _sql.joinpath("insert_entitygeology.sql").read_text(encoding="UTF-8")
-insert_entityrelationship = _sql.joinpath("insert_entityrelationship.sql").read_text(
-    encoding="UTF-8"
-)
-insert_entitydripheight = _sql.joinpath("insert_entitydripheight.sql").read_text(encoding="UTF-8")
-insert_entitycovers = _sql.joinpath("insert_entitycovers.sql").read_text(encoding="UTF-8")
-insert_entitylandusecover = _sql.joinpath("insert_entitylandusecover.sql").read_text(
-    encoding="UTF-8"
-)
-insert_entityvegetationcover = _sql.joinpath("insert_entityvegetationcover.sql").read_text(
-    encoding="UTF-8"
-)
-insert_externalspeleothem = _sql.joinpath("insert_externalspeleothem.sql").read_text(
-    encoding="UTF-8"
-)
-insert_entitysamples = _sql.joinpath("insert_entitysamples.sql").read_text(encoding="UTF-8")
-
 EX_SP_PARAMS = ["externalid", "externaldescription", "extdatabaseid"]
 SPELEOTHEM_PARAMS = [
     "entityid",
@@ -122,7 +102,7 @@ class Speleothem:
         Returns:
             int: The speleothem ID assigned.
         """
-        cur.execute(insert_speleothem)
+        require_sql_function(cur, "insert_speleothem")
         query = """
         SELECT insert_speleothem(_siteid := %(siteid)s,
                                 _entityname := %(entityname)s,
@@ -157,7 +137,7 @@ class Speleothem:
         Returns:
             None
         """
-        cur.execute(insert_entitygeology)
+        require_sql_function(cur, "insert_entitygeology")
         query = """
                 SELECT insert_entitygeology(_entityid := %(entityid)s,
                                             _speleothemgeologyid := %(speleothemgeologyid)s,
@@ -182,7 +162,7 @@ class Speleothem:
         Returns:
             None
         """
-        cur.execute(insert_entitydripheight)
+        require_sql_function(cur, "insert_entitydripheight")
         query = """
                 SELECT insert_entitydripheight(_entityid := %(entityid)s,
                                                _speleothemdriptypeid := %(speleothemdriptypeid)s,
@@ -213,7 +193,7 @@ class Speleothem:
         Returns:
             None
         """
-        cur.execute(insert_entitycovers)
+        require_sql_function(cur, "insert_entitycovers")
         query = """
                 SELECT insert_entitycovers(_entityid := %(entityid)s,
                                            _entitycoverid := %(entitycoverid)s,
@@ -244,7 +224,7 @@ class Speleothem:
         Returns:
             None
         """
-        cur.execute(insert_entitylandusecover)
+        require_sql_function(cur, "insert_entitylandusecover")
         query = """
                 SELECT insert_entitylandusecover(_entityid := %(entityid)s,
                                                  _landusecovertypeid := %(landusecovertypeid)s,
@@ -275,7 +255,7 @@ class Speleothem:
         Returns:
             None
         """
-        cur.execute(insert_entityvegetationcover)
+        require_sql_function(cur, "insert_entityvegetationcover")
         query = """
                 SELECT insert_entityvegetationcover(_entityid := %(entityid)s,
                                                     _vegetationcovertypeid := %(vegetationcovertypeid)s,
@@ -319,7 +299,7 @@ class Speleothem:
         Returns:
             None
         """
-        cur.execute(insert_entitysamples)
+        require_sql_function(cur, "insert_entitysamples")
 
         def to_bool(x):
             if isinstance(x, str):
@@ -396,7 +376,7 @@ class ExternalSpeleothem:
         Returns:
             None
         """
-        cur.execute(insert_externalspeleothem)
+        require_sql_function(cur, "insert_externalspeleothem")
         query = """
                 SELECT insert_externalspeleothem(_entityid := %(entityid)s,
                                                     _externalid := %(externalid)s,
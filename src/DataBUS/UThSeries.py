@@ -1,17 +1,6 @@
-import importlib.resources
-
+from .neotomaHelpers.sql_functions import require_sql_function
 from .neotomaHelpers.utils import validate_int_values
 
-insert_uthseries = (
-    importlib.resources.files("DataBUS.sqlHelpers")
-    .joinpath("insert_uthseries.sql")
-    .read_text(encoding="UTF-8")
-)
-insert_uraniumseriesquery = (
-    importlib.resources.files("DataBUS.sqlHelpers")
-    .joinpath("insert_uraniumseriesdata.sql")
-    .read_text(encoding="UTF-8")
-)
 UTH_PARAMS = [
     "geochronid",
     "decayconstantid",
@@ -87,7 +76,7 @@ class UThSeries:
         Returns:
             None
         """
-        cur.execute(insert_uthseries)
+        require_sql_function(cur, "insert_uthseries")
         uths_query = """SELECT insert_uthseries(_geochronid := %(geochronid)s,
                                                     _decayconstantid := %(decayconstantid)s,
                                                     _ratio230th232th := %(ratio230th232th)s,
@@ -133,7 +122,7 @@ def insert_uraniumseriesdata(cur, dataid, geochronid):
     Returns:
         None
     """
-    cur.execute(insert_uraniumseriesquery)
+    require_sql_function(cur, "insert_uraniumseriesdata")
     uths_query = """SELECT insert_uraniumseriesdata(_geochronid := %(geochronid)s,
                                                     _dataid := %(dataid)s)"""
     inputs = {"geochronid": geochronid, "dataid": dataid}
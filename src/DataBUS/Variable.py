@@ -1,3 +1,4 @@
+from .neotomaHelpers.prepared_statements import execute_prepared
 from .neotomaHelpers.utils import validate_int_values
 
 
@@ -56,7 +57,7 @@ class Variable:
             "variableunitsid": self.variableunitsid,
             "variablecontextid": self.variablecontextid,
         }
-        cur.execute(variable_q, inputs)
+        execute_prepared(cur, variable_q, inputs)
         self.variableid = cur.fetchone()[0]
         return self.variableid
 
@@ -83,10 +84,61 @@ class Variable:
             "variableelementid": self.variableelementid,
             "variablecontextid": self.variablecontextid,
         }
-        cur.execute(variable_q, inputs)
+        execute_prepared(cur, variable_q, inputs)
         self.varid = cur.fetchone()
         return self.varid
 
+    @property
+    def key(self):
+        """tuple: ``(taxonid, variableunitsid, variableelementid, variablecontextid)``."""
+        return (
+            self.taxonid,
+            self.variableunitsid,
+            self.variableelementid,
+            self.variablecontextid,
+        )
+
+    @staticmethod
+    def get_ids_from_db(cur, variables):
+        """Retrieve the variable IDs of several variables with one query.
+
+        Matches the same way as ``get_id_from_db``, for all distinct variables
+        at once.
+
+        Args:
+            cur (psycopg2.cursor): Database cursor for executing queries.
+            variables (iterable): ``Variable`` objects to look up.
+
+        Returns:
+            dict: ``Variable.key`` → variableid, for the variables that exist.
+        """
+        keys = sorted({v.key for v in variables}, key=str)
+        if not keys:
+            return {}
+        variable_q = """
+                 SELECT k.taxonid, k.variableunitsid, k.variableelementid,
+                        k.variablecontextid, v.variableid
+                 FROM unnest(%(taxonid)s::int[], %(variableunitsid)s::int[],
+                             %(variableelementid)s::int[], %(variablecontextid)s::int[])
+                      AS k(taxonid, variableunitsid, variableelementid, variablecontextid)
+                 JOIN ndb.variables AS v
+                    ON v.taxonid = k.taxonid
+                    AND v.variableunitsid IS NOT DISTINCT FROM k.variableunitsid
+                    AND v.variableelementid IS NOT DISTINCT FROM k.variableelementid
+                    AND v.variablecontextid IS NOT DISTINCT FROM k.variablecontextid;
+                """
+        inputs = {
+            "taxonid": [k[0] for k in keys],
+            "variableunitsid": [k[1] for k in keys],
+            "variableelementid": [k[2] for k in keys],
+            "variablecontextid": [k[3] for k in keys],
+        }
+        cur.execute(variable_q, inputs)
+        found = {}
+        for *key, variableid in cur.fetchall() or []:
+            found.setdefault(tuple(key), variableid)
+        return found
+
     def __str__(self):
         """Return string representation of the Variable object.
 
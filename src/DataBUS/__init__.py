@@ -30,7 +30,7 @@ from .GeochronControl import GeochronControl
 from .Geog import Geog, WrongCoordinates
 from .Hiatus import Hiatus
 from .LeadModel import LeadModel
-from .Response import Response
+from .Response import Response, Validity
 from .Sample import Sample
 from .SampleAge import SampleAge
 from .Site import Site
@@ -10,13 +10,68 @@ Attributes:
 __version__ = "2.0.0"
 
 from .check_file import check_file
+from .chunked_reader import ChunkedReader
+from .column_table import ColumnTable, SheetTables
+from .compiled_template import CompiledTemplate
+from .extraction_cache import (
+    ExtractionCache,
+    get_extraction_cache,
+    invalidate_extraction_cache,
+)
+from .extraction_plan import ExtractionPlan, compile_plan
+from .file_hasher import FileHasher, get_file_hasher, hash_directory, hash_stream
 from .get_contacts import get_contacts
 from .hash_file import hash_file
+from .id_allocator import (
+    IdAllocator,
+    get_id_allocator,
+    insert_each,
+    insert_records,
+    insert_staged,
+    savepoint,
+)
+from .log_sink import LogSink, render_valid_log
+from .offline import (
+    OfflineConnection,
+    OfflineCursor,
+    OfflineError,
+    export_snapshot,
+    snapshot_info,
+)
 from .parse_arguments import parse_arguments
-from .pull_params import pull_params
+from .prepared_statements import (
+    PreparedStatements,
+    execute_prepared,
+    get_prepared_statements,
+    use_prepared_statements,
+)
+from .pull_params import pull_params, pull_params_blocks
 from .pull_required import pull_required
-from .read_csv import read_csv, read_xlsx
+from .query_stats import (
+    InstrumentedConnection,
+    InstrumentedCursor,
+    QueryStats,
+    fingerprint,
+    query_step,
+)
+from .read_csv import iter_csv_chunks, iter_xlsx_chunks, read_csv, read_xlsx
 from .safe_step import safe_step
+from .sql_functions import (
+    FunctionRegistry,
+    get_function_registry,
+    install_sql_functions,
+    require_sql_function,
+)
+from .template_cache import clear_template_cache
 from .template_to_dict import template_to_dict
 from .utils import convert_to_bp, retrieve_dict
+from .validate_only import PlaceholderCursor, ValidateOnlyCursor
+from .validation_store import ValidationStore, get_validation_store
+from .vocabulary_cache import (
+    VocabularyCache,
+    get_vocabulary_cache,
+    lookup_vocabulary,
+    lookup_vocabulary_many,
+    use_vocabulary_cache,
+)
 from .write_csv import write_csv
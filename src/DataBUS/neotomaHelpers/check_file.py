@@ -1,14 +1,20 @@
 import os
 import re
 
+from .validation_store import get_validation_store
 
-def check_file(filename, strict=False, validation_files="data/logs/"):
+
+def check_file(filename, strict=False, validation_files="data/logs/", store=None):
     """Checks validation log file for errors from prior validation runs.
 
     Examines validation log files to determine if a CSV file has been successfully
     validated. Checks both validated and not_validated directories. Counts errors
     and warnings, removing log file if strict mode passes.
 
+    When the directory has a ``ValidationStore`` with a record of the file, the
+    answer comes from the error counts of its latest validation instead, with
+    one indexed lookup.
+
     Examples:
         >>> check_file("pollen_data.csv", strict=False)  # doctest: +SKIP
         {'pass': True, 'match': 0, 'message': ['No errors found in the last validation.']}
@@ -19,11 +25,24 @@ def check_file(filename, strict=False, validation_files="data/logs/"):
         filename (str): File path or relative path for a template CSV file.
         strict (bool): If True, also count "Valid: FALSE" lines as errors. Defaults to False.
         validation_files (str): Path to validation logs directory. Defaults to "data/validation_logs/".
+        store (ValidationStore | str | bool | None): Validation store to answer
+            from. None uses the store of ``validation_files`` if there is one;
+            False always reads the logs.
 
     Returns:
         dict: Dictionary with 'pass' (bool), 'match' (int error count), and 'message' (list).
     """
     response = {"pass": False, "match": 0, "message": []}
+    store = get_validation_store(store, validation_files)
+    record = store.latest(filename) if store is not None else None
+    if record is not None:
+        response["match"] = record["strict_errors"] if strict else record["errors"]
+        if response["match"] == 0:
+            response["pass"] = True
+            response["message"].append("No errors found in the last validation.")
+        else:
+            response["message"].append("Errors found in the prior validation.")
+        return response
     modified_filename = os.path.basename(filename)
     logfile = f"{validation_files}{modified_filename}" + ".valid.log"
     not_val_logfile = f"{validation_files}not_validated/{modified_filename}" + ".valid.log"
@@ -0,0 +1,208 @@
+from .column_table import _MISSING, ColumnTable, SheetTables
+from .read_csv import iter_csv_chunks, iter_xlsx_chunks
+
+
+class ChunkedReader:
+    """Re-iterable, block-wise view of a CSV or XLSX data file.
+
+    Passing a ``ChunkedReader`` as ``csv_file`` keeps peak memory bounded by
+    the block size instead of the file size:
+
+    * The rowwise validators (``valid_analysisunit``, ``valid_sample``,
+      ``valid_data``, ``valid_datauncertainty``) iterate over
+      ``pull_params_blocks`` and insert one block at a time.
+    * Every other ``pull_params`` call is answered from a projection of the
+      file that only holds the columns the template asks for.
+
+    Each pass re-reads the file from disk. Non-rowwise columns are resolved
+    over the whole file (``resolve``) and pinned on every block, so they give
+    the same value, or raise the same "multiple values" error, as when the
+    file is read at once.
+
+    Examples:
+        >>> reader = ChunkedReader('aedna_export.csv', chunk_size=5000)  # doctest: +SKIP
+        >>> [rows for rows, _ in reader.chunks()]  # doctest: +SKIP
+        [slice(0, 5000, None), slice(5000, 10000, None), slice(10000, 11234, None)]
+
+    Args:
+        filename (str): Path to the .csv or .xlsx file.
+        chunk_size (int): Maximum number of rows per block. Defaults to 10000.
+        num_headers (int): Number of header rows declared in the template
+            (XLSX only). Defaults to 1.
+
+    Attributes:
+        filename (str): Path to the data file.
+        chunk_size (int): Maximum number of rows per block.
+        is_xlsx (bool): True for Excel workbooks, whose blocks are ``SheetTables``.
+        n_rows (int | None): Rows in the file (longest sheet for XLSX), known
+            after the first full pass.
+    """
+
+    def __init__(self, filename, chunk_size=10000, num_headers=1):
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be a positive integer.")
+        self.filename = filename
+        self.chunk_size = chunk_size
+        self.num_headers = num_headers
+        self.is_xlsx = str(filename).endswith(".xlsx")
+        self.n_rows = None
+        self._projection = {}
+        self._resolved = {}
+        self._filled = {}
+
+    def __repr__(self):
+        return f"ChunkedReader({self.filename!r}, chunk_size={self.chunk_size})"
+
+    def chunks(self):
+        """Yield ``(rows, block)`` pairs over the whole file.
+
+        ``rows`` is the ``slice`` of file rows held by the block. ``block`` is
+        a ``ColumnTable`` for CSV files and a ``SheetTables`` for XLSX
+        workbooks. A file without data rows yields one empty block.
+        """
+        offset = 0
+        for block in self._blocks(self.chunk_size):
+            end = offset + _block_rows(block)
+            yield slice(offset, end), block
+            offset = end
+        self.n_rows = offset
+
+    def _blocks(self, chunk_size):
+        if self.is_xlsx:
+            return iter_xlsx_chunks(self.filename, chunk_size, self.num_headers)
+        return iter_csv_chunks(self.filename, chunk_size)
+
+    def project(self, columns):
+        """Return the file restricted to ``columns``, loading missing ones in one pass.
+
+        Loaded columns are kept, so later calls for the same columns do not
+        read the file again.
+
+        Args:
+            columns (iterable): ``(sheet, column)`` pairs. ``sheet`` is
+                ignored for CSV files.
+
+        Returns:
+            ColumnTable | SheetTables: Table(s) holding only the requested
+                columns that exist in the file.
+        """
+        wanted = self._by_sheet(columns)
+        loaded = {sheet: set(table.headers) for sheet, table in self._projection.items()}
+        if not self._projection or any(
+            not names <= loaded.get(sheet, set()) for sheet, names in wanted.items()
+        ):
+            for sheet, names in loaded.items():
+                wanted.setdefault(sheet, set()).update(names)
+            self._projection = self._load(wanted)
+        if self.is_xlsx:
+            return SheetTables(self._projection)
+        return self._projection.get(None, ColumnTable([]))
+
+    def _load(self, wanted):
+        """Read the file once, keeping only the ``wanted`` columns of each sheet."""
+        tables = {}
+        for block in self._blocks(self.chunk_size):
+            sheets = block.items() if self.is_xlsx else [(None, block)]
+            for sheet, table in sheets:
+                keep = wanted.get(sheet, set())
+                if sheet not in tables:
+                    tables[sheet] = ColumnTable.from_rows(
+                        [h for h in table.header_index if h in keep], []
+                    )
+                positions = [table.header_index[h] for h in tables[sheet].headers]
+                for i in range(table.n_rows):
+                    tables[sheet].append([table.columns[p][i] for p in positions])
+        return tables
+
+    def resolve(self, columns):
+        """Collect the distinct values of non-rowwise ``columns`` over the whole file.
+
+        Args:
+            columns (iterable): ``(sheet, column)`` pairs.
+
+        Returns:
+            dict: ``(sheet, column)`` → set of distinct values, or None when
+                some row is too short to hold the column. Columns missing from
+                the header are left out.
+        """
+        keys = {self._key(sheet, column) for sheet, column in columns}
+        missing = keys - self._resolved.keys()
+        if missing:
+            found = {}
+            for block in self._blocks(self.chunk_size):
+                for key in missing:
+                    table = _sheet(block, key[0])
+                    if table is None or key[1] not in table.header_index:
+                        continue
+                    try:
+                        values = table.column(key[1])
+                    except KeyError:
+                        found[key] = None
+                        continue
+                    if found.get(key, set()) is not None:
+                        found.setdefault(key, set()).update(values)
+            for key in missing:
+                self._resolved[key] = found.get(key, _ABSENT)
+        return {key: self._resolved[key] for key in keys if self._resolved[key] is not _ABSENT}
+
+    def filled(self, columns):
+        """Return the ``(sheet, column)`` pairs holding at least one value in the file.
+
+        Cells that are None, ``NA``, empty or ``None`` do not count as values.
+        """
+        keys = {self._key(sheet, column) for sheet, column in columns}
+        missing = keys - self._filled.keys()
+        if missing:
+            found = set()
+            for block in self._blocks(self.chunk_size):
+                for key in missing - found:
+                    table = _sheet(block, key[0])
+                    if table is None or key[1] not in table.header_index:
+                        continue
+                    values = table.columns[table.header_index[key[1]]]
+                    if any(not _is_empty(v) for v in values):
+                        found.add(key)
+            for key in missing:
+                self._filled[key] = key in found
+        return {key for key in keys if self._filled[key]}
+
+    def pin(self, block, resolved):
+        """Pin the whole-file distinct values from ``resolve`` on a block."""
+        for (sheet, column), unique in resolved.items():
+            table = _sheet(block, sheet)
+            if table is not None and column in table.header_index:
+                table.pin_unique(column, unique)
+
+    def _key(self, sheet, column):
+        return (sheet if self.is_xlsx else None, column)
+
+    def _by_sheet(self, columns):
+        wanted = {}
+        for sheet, column in columns:
+            sheet, column = self._key(sheet, column)
+            wanted.setdefault(sheet, set()).add(column)
+        return wanted
+
+
+_ABSENT = object()
+
+
+def _sheet(block, sheet):
+    """Return the table of ``sheet`` in a block (the block itself for CSV)."""
+    if isinstance(block, SheetTables):
+        return block.get(sheet)
+    return block
+
+
+def _is_empty(value):
+    return (
+        value is None
+        or value is _MISSING
+        or (isinstance(value, str) and value.strip() in ("NA", "", "None"))
+    )
+
+
+def _block_rows(block):
+    if isinstance(block, SheetTables):
+        return max((table.n_rows for table in block.values()), default=0)
+    return block.n_rows
@@ -0,0 +1,194 @@
+import hashlib
+from collections.abc import Sequence
+
+_MISSING = object()
+_EMPTY = ("NA", "", "None")
+
+
+class ColumnTable(Sequence):
+    """Column-oriented in-memory table for parsed CSV/XLSX input.
+
+    Stores one list per column instead of one dictionary per row, so wide
+    files (aeDNA, pollen) do not pay a dict allocation per row, and each
+    column requested by the template is reached in O(1). Per-column unique
+    and lowercase-unique sets are computed on first use and cached.
+
+    The table is also a read-only sequence of row dictionaries, so code that
+    iterates ``for row in csv_file`` or indexes ``csv_file[0]["column"]``
+    keeps working unchanged.
+
+    Rows shorter than the header keep the ``read_csv`` semantics: the missing
+    cells are absent from the row view, and requesting such a column raises
+    ``KeyError``.
+
+    Examples:
+        >>> table = ColumnTable(["depth", "taxon"])
+        >>> table.append(["2.5", "Quercus"])
+        >>> table.append(["5.0", "quercus"])
+        >>> table.column("depth")
+        ['2.5', '5.0']
+        >>> sorted(table.unique_lower("taxon"))
+        ['quercus']
+        >>> table[1]
+        {'depth': '5.0', 'taxon': 'quercus'}
+
+    Args:
+        headers (list[str]): Column names, in file order.
+
+    Attributes:
+        headers (list[str]): Column names, in file order.
+        header_index (dict): Column name → position in ``columns``. Duplicate
+            headers resolve to the last occurrence, as ``dict(zip(...))`` does.
+        columns (list[list]): One list of cell values per header.
+        n_rows (int): Number of data rows.
+        pinned (dict): Column name → whole-file distinct values set with
+            ``pin_unique``.
+    """
+
+    def __init__(self, headers):
+        self.headers = [str(h) for h in headers]
+        self.header_index = {name: i for i, name in enumerate(self.headers)}
+        self.columns = [[] for _ in self.headers]
+        self.n_rows = 0
+        self._ragged = False
+        self._unique = {}
+        self._unique_lower = {}
+        self.pinned = {}
+
+    @classmethod
+    def from_rows(cls, headers, rows):
+        """Build a table from a header list and an iterable of row sequences."""
+        table = cls(headers)
+        for row in rows:
+            table.append(row)
+        return table
+
+    @classmethod
+    def from_records(cls, records):
+        """Build a table from a list of row dictionaries (the ``read_csv`` output)."""
+        headers = list(dict.fromkeys(key for record in records for key in record))
+        table = cls(headers)
+        for record in records:
+            table.append([record.get(h, _MISSING) for h in headers])
+        return table
+
+    def append(self, row):
+        """Append one data row given as a sequence aligned with ``headers``."""
+        width = len(self.columns)
+        values = list(row[:width])
+        if len(values) < width:
+            values.extend([_MISSING] * (width - len(values)))
+        for column, value in zip(self.columns, values, strict=True):
+            if value is _MISSING:
+                self._ragged = True
+            column.append(value)
+        self.n_rows += 1
+        self._unique.clear()
+        self._unique_lower.clear()
+
+    def __len__(self):
+        return self.n_rows
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._row(i) for i in range(*index.indices(self.n_rows))]
+        if index < 0:
+            index += self.n_rows
+        if not 0 <= index < self.n_rows:
+            raise IndexError("ColumnTable row index out of range")
+        return self._row(index)
+
+    def __iter__(self):
+        for i in range(self.n_rows):
+            yield self._row(i)
+
+    def __repr__(self):
+        return f"ColumnTable(rows={self.n_rows}, columns={len(self.header_index)})"
+
+    def _row(self, index):
+        row = {}
+        for name, position in self.header_index.items():
+            value = self.columns[position][index]
+            if value is not _MISSING:
+                row[name] = value
+        return row
+
+    def rows(self):
+        """Return the table as a list of row dictionaries."""
+        return list(self)
+
+    def column(self, name):
+        """Return the list of values stored for column ``name``.
+
+        The list is the table's own storage and must not be modified.
+
+        Raises:
+            KeyError: If the column is not in the header, or if any row is
+                too short to hold a value for it.
+        """
+        values = self.columns[self.header_index[name]]
+        if self._ragged and any(v is _MISSING for v in values):
+            raise KeyError(name)
+        return values
+
+    def digest(self, name):
+        """Return a hex digest of the values of column ``name``, missing cells included.
+
+        Two tables give the same digest for a column only if it holds the same
+        values in the same rows; used to tell whether a step's inputs changed.
+
+        Raises:
+            KeyError: If the column is not in the header.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for value in self.columns[self.header_index[name]]:
+            digest.update(b"\x00" if value is _MISSING else repr(value).encode())
+            digest.update(b"\x1f")
+        return digest.hexdigest()
+
+    def pin_unique(self, name, unique):
+        """Answer ``unique(name)`` with a set computed elsewhere.
+
+        Used for blocks of a ``ChunkedReader``: a non-rowwise column must
+        resolve to the same value in every block, so its distinct values are
+        collected over the whole file once and pinned on each block.
+
+        Args:
+            name (str): Column name.
+            unique (set | None): Distinct values of the column across the file,
+                or None if the column is missing from some rows.
+        """
+        self.pinned[name] = unique
+        self._unique_lower.pop(name, None)
+
+    def unique(self, name):
+        """Return the cached set of distinct values in column ``name``."""
+        if name in self.pinned:
+            if self.pinned[name] is None:
+                raise KeyError(name)
+            return self.pinned[name]
+        if name not in self._unique:
+            self._unique[name] = set(self.column(name))
+        return self._unique[name]
+
+    def unique_lower(self, name):
+        """Return the cached set of distinct values in ``name``, lowercasing strings."""
+        if name not in self._unique_lower:
+            self._unique_lower[name] = {
+                v.lower() if isinstance(v, str) else v for v in self.unique(name)
+            }
+        return self._unique_lower[name]
+
+    def cleaned(self, name):
+        """Return column ``name`` with ``NA``, empty and ``None`` strings as ``None``."""
+        return [
+            None if isinstance(v, str) and v.strip() in _EMPTY else v for v in self.column(name)
+        ]
+
+
+class SheetTables(dict):
+    """Mapping of sheet name to ``ColumnTable`` returned by ``read_xlsx(columnar=True)``.
+
+    A plain ``dict`` subclass; it exists so a parsed workbook can carry
+    per-file state such as its ``ExtractionCache``.
+    """
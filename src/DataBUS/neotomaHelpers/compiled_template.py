@@ -0,0 +1,125 @@
+import re
+from collections.abc import Mapping
+
+_WORD = re.compile(r"\w+")
+_LITERAL_COLUMN = re.compile(r"^\w(?:[\w.]*\w)?$")
+
+
+class CompiledTemplate(Mapping):
+    """Read-only, indexed view over a parsed YAML template.
+
+    Wraps the dictionary returned by ``template_to_dict`` and builds three
+    indexes over ``metadata`` once, so that the helpers used by every validator
+    (``retrieve_dict``, ``prepare_parameters``, ``pull_params``,
+    ``pull_required`` and ``pull_overwrite``) no longer scan and regex-match
+    the whole template for each parameter:
+
+    * ``by_path``: exact ``neotoma`` value → entries.
+    * ``by_prefix``: every dot-terminated prefix of ``neotoma``
+      (``ndb.sites.``, ``ndb.sites.geog.``) → entries.
+    * ``by_word``: every word-boundary aligned span of ``neotoma``
+      (``sites.siteid``, ``ndb.sites``, ``siteid``...) → entries. This
+      reproduces the ``\\b{sql_column}\\b`` search of ``retrieve_dict``.
+
+    The object behaves like the original dictionary (``template["metadata"]``,
+    ``template.get("kind")``), so it can be passed anywhere a ``yml_dict`` is
+    expected.
+
+    Examples:
+        >>> yml = {'metadata': [{'neotoma': 'ndb.sites.siteid', 'type': 'int'}]}
+        >>> template = CompiledTemplate(yml)
+        >>> template.retrieve('sites.siteid')
+        [{'neotoma': 'ndb.sites.siteid', 'type': 'int'}]
+        >>> template['metadata'] is yml['metadata']
+        True
+
+    Args:
+        yml_dict (dict): Template dictionary containing a ``metadata`` list.
+
+    Attributes:
+        by_path (dict): Entry indices keyed by full ``neotoma`` path.
+        by_prefix (dict): Entry indices keyed by dot-terminated prefix.
+        by_word (dict): Entry indices keyed by word-boundary aligned span.
+        plans (dict): ``ExtractionPlan`` objects built by ``compile_plan``,
+            keyed by (table, params).
+    """
+
+    def __init__(self, yml_dict):
+        if isinstance(yml_dict, CompiledTemplate):
+            yml_dict = yml_dict._data
+        if not isinstance(yml_dict, dict):
+            raise TypeError("A CompiledTemplate must be built from a template dictionary.")
+        self._data = yml_dict
+        self.metadata = yml_dict.get("metadata") or []
+        self.by_path = {}
+        self.by_prefix = {}
+        self.by_word = {}
+        self.plans = {}
+        for index, entry in enumerate(self.metadata):
+            neotoma = entry.get("neotoma") if isinstance(entry, dict) else None
+            if not isinstance(neotoma, str):
+                continue
+            self.by_path.setdefault(neotoma, []).append(index)
+            for position, char in enumerate(neotoma):
+                if char == ".":
+                    _add_index(self.by_prefix, neotoma[: position + 1], index)
+            words = [match.span() for match in _WORD.finditer(neotoma)]
+            for i, (start, _) in enumerate(words):
+                for _, end in words[i:]:
+                    _add_index(self.by_word, neotoma[start:end], index)
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def source(self):
+        """The template dictionary this index was built from."""
+        return self._data
+
+    def __repr__(self):
+        return f"CompiledTemplate(entries={len(self.metadata)}, kind={self._data.get('kind')!r})"
+
+    def lookup(self, neotoma):
+        """Return the entries whose ``neotoma`` value is exactly ``neotoma``."""
+        return [self.metadata[i] for i in self.by_path.get(neotoma, [])]
+
+    def startswith(self, prefix):
+        """Return the entries whose ``neotoma`` value starts with a dot-terminated ``prefix``."""
+        if not prefix.endswith("."):
+            return [m for m in self.metadata if str(m.get("neotoma", "")).startswith(prefix)]
+        return [self.metadata[i] for i in self.by_prefix.get(prefix, [])]
+
+    def retrieve(self, sql_column):
+        """Return the entries matching ``sql_column`` on word boundaries.
+
+        Equivalent to ``retrieve_dict`` on the raw template, answered from the
+        ``by_word`` index. Columns that are not plain dotted identifiers fall
+        back to the regular expression scan.
+
+        Args:
+            sql_column (str): Table/column to match, e.g. ``ndb.sites.sitename``.
+
+        Returns:
+            list: Matching metadata entries in template order.
+        """
+        if not _LITERAL_COLUMN.match(sql_column):
+            return [
+                m
+                for m in self.metadata
+                if isinstance(m.get("neotoma"), str)
+                and re.search(rf"\b{sql_column}\b", m["neotoma"])
+            ]
+        return [self.metadata[i] for i in self.by_word.get(sql_column, [])]
+
+
+def _add_index(index, key, position):
+    """Append ``position`` to ``index[key]`` once, keeping template order."""
+    positions = index.setdefault(key, [])
+    if not positions or positions[-1] != position:
+        positions.append(position)
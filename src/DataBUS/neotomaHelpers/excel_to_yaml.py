@@ -3,6 +3,8 @@ import ast
 import openpyxl
 import yaml
 
+from .template_cache import cached_build
+
 
 class InlineList:
     """Custom class to represent inline lists in YAML output.
@@ -41,11 +43,13 @@ def represent_inline_list(dumper, data):
 yaml.add_representer(InlineList, represent_inline_list)
 
 
-def excel_to_yaml(temp_file, file_name):
+def excel_to_yaml(temp_file, file_name, cache_dir=None):
     """Convert Excel template file to YAML format.
 
     Reads data mapping and metadata from Excel sheets, processes column definitions
     including units and uncertainty information, and writes formatted YAML output.
+    The converted template is cached on disk by the workbook's content hash (see
+    ``template_to_dict``), so an unchanged workbook is not read again.
 
     Examples:
         >>> excel_to_yaml('template.xlsx', 'template')  # doctest: +SKIP
@@ -55,10 +59,23 @@ def excel_to_yaml(temp_file, file_name):
         temp_file (str): Path to the Excel template file (.xls or .xlsx).
         file_name (str): Base filename for output YAML (without extension).
                         Output file will be named file_name.yml
+        cache_dir (str | bool | None): Template cache directory. None uses the
+            default cache; False disables it.
 
     Returns:
         None: Writes YAML file to disk with name file_name.yml
     """
+    final_dict = cached_build(temp_file, "xlsx", lambda: _excel_to_dict(temp_file), cache_dir)
+
+    file_name = file_name + ".yml"
+    with open(file_name, "w") as f:
+        yaml.dump(final_dict, f)
+
+    return None
+
+
+def _excel_to_dict(temp_file):
+    """Read the Excel template sheets into the template dictionary."""
     # SUGGESTION: Extract sheet reading and data cleaning into separate functions
     wb = openpyxl.load_workbook(temp_file, data_only=True)
 
@@ -171,15 +188,9 @@ def excel_to_yaml(temp_file, file_name):
     data_list = sorted(data_list, key=lambda x: x["column"])
     data_list = metadata + data_list
 
-    final_dict = {
+    return {
         "apiVersion": "neotoma v2.0",
         "headers": 2,
         "kind": "Development",
         "metadata": data_list,
     }
-
-    file_name = file_name + ".yml"
-    with open(file_name, "w") as f:
-        yaml.dump(final_dict, f)
-
-    return None
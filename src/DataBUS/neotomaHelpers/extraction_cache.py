@@ -0,0 +1,159 @@
+import weakref
+
+_CACHES = {}
+_MISSING_COLUMN = object()
+
+
+class ExtractionCache:
+    """Per-file memo of ``pull_params`` results and converted columns.
+
+    One cache is attached to each parsed input file (a ``ColumnTable`` or the
+    ``SheetTables`` returned by ``read_xlsx(columnar=True)``) the first time
+    ``pull_params`` sees it, so every validator working on the same file shares
+    it. Two levels are memoised:
+
+    * ``pull_params`` results, keyed by (template identity, table, params).
+    * Cleaned and type-converted columns, keyed by (sheet, column, rowwise,
+      type), so a column read by several tables is converted once.
+
+    Results are handed out as fresh copies of their dicts and lists, because
+    validators update the returned inputs in place.
+
+    Examples:
+        >>> table = read_csv('pollen_data.csv', columnar=True)  # doctest: +SKIP
+        >>> pull_params(SITE_PARAMS, yml_dict, table, 'ndb.sites')  # doctest: +SKIP
+        >>> get_extraction_cache(table).stats()  # doctest: +SKIP
+        {'hits': 0, 'misses': 1, 'column_hits': 0, 'column_misses': 6, 'entries': 1, 'columns': 6}
+
+    Attributes:
+        hits (int): ``pull_params`` calls answered from the cache.
+        misses (int): ``pull_params`` calls that had to be computed.
+        column_hits (int): Column conversions answered from the cache.
+        column_misses (int): Column conversions that had to be computed.
+    """
+
+    def __init__(self):
+        self._params = {}
+        self._columns = {}
+        self.hits = 0
+        self.misses = 0
+        self.column_hits = 0
+        self.column_misses = 0
+
+    def get(self, yml_dict, table, params):
+        """Return a copy of the cached ``pull_params`` result, or None on a miss."""
+        template = _template_identity(yml_dict)
+        entry = self._params.get((id(template), table, tuple(params)))
+        if entry is None or entry[0] is not template:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return copy_result(entry[1])
+
+    def put(self, yml_dict, table, params, result):
+        """Store a ``pull_params`` result and return a copy safe to hand out."""
+        template = _template_identity(yml_dict)
+        self._params[(id(template), table, tuple(params))] = (template, result)
+        return copy_result(result)
+
+    def column(self, key, compute):
+        """Return the converted column for ``key``, computing it once with ``compute()``.
+
+        ``compute`` may raise ``KeyError`` for a column missing from the file;
+        that outcome is cached and re-raised on later lookups.
+        """
+        if key in self._columns:
+            self.column_hits += 1
+            value = self._columns[key]
+        else:
+            self.column_misses += 1
+            try:
+                value = compute()
+            except KeyError:
+                value = _MISSING_COLUMN
+            self._columns[key] = value
+        if value is _MISSING_COLUMN:
+            raise KeyError(key[1])
+        return copy_result(value)
+
+    def columns(self):
+        """Return the converted columns, keyed by (sheet, column, rowwise, type)."""
+        return {k: v for k, v in self._columns.items() if v is not _MISSING_COLUMN}
+
+    def preload(self, columns):
+        """Add converted columns computed earlier, e.g. by a validation run (``columns``)."""
+        self._columns.update(columns)
+
+    def invalidate(self, table=None):
+        """Drop cached entries.
+
+        Args:
+            table (str, optional): Only drop ``pull_params`` results for this
+                table (with or without the trailing dot). When omitted, every
+                result and converted column is dropped.
+        """
+        if table is None:
+            self._params.clear()
+            self._columns.clear()
+            return
+        table = table if table.endswith(".") else table + "."
+        for key in [k for k in self._params if k[1] == table]:
+            del self._params[key]
+
+    def stats(self):
+        """Return the hit/miss counters and current cache sizes."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "column_hits": self.column_hits,
+            "column_misses": self.column_misses,
+            "entries": len(self._params),
+            "columns": len(self._columns),
+        }
+
+
+def get_extraction_cache(csv_file, create=True):
+    """Return the ``ExtractionCache`` attached to a parsed input file.
+
+    Only columnar inputs (``ColumnTable``, ``SheetTables``) carry a cache; a
+    plain list of row dicts returns None and is always extracted afresh.
+
+    Args:
+        csv_file: Parsed input file as passed to ``pull_params``.
+        create (bool): Attach a new cache if none exists yet. Defaults to True.
+
+    Returns:
+        ExtractionCache | None: The cache for this file.
+    """
+    key = id(csv_file)
+    cache = _CACHES.get(key)
+    if cache is None and create:
+        try:
+            weakref.finalize(csv_file, _CACHES.pop, key, None)
+        except TypeError:
+            return None
+        cache = _CACHES[key] = ExtractionCache()
+    return cache
+
+
+def invalidate_extraction_cache(csv_file, table=None):
+    """Drop the cached extractions for ``csv_file`` (optionally for one table only)."""
+    cache = get_extraction_cache(csv_file, create=False)
+    if cache is not None:
+        cache.invalidate(table)
+
+
+def copy_result(value):
+    """Copy the dicts and lists of an extraction result; leaf values are shared."""
+    if isinstance(value, dict):
+        return {k: copy_result(v) for k, v in value.items()}
+    if isinstance(value, list):
+        if any(isinstance(v, (dict, list)) for v in value):
+            return [copy_result(v) for v in value]
+        return list(value)
+    return value
+
+
+def _template_identity(yml_dict):
+    """Return the raw template dict behind ``yml_dict`` (unwrapping ``CompiledTemplate``)."""
+    return getattr(yml_dict, "source", yml_dict)
@@ -0,0 +1,209 @@
+from . import utils as ut
+from .compiled_template import CompiledTemplate
+
+# Accumulator actions, in the order ``pull_params`` has always tested them.
+ABSENT = "absent"
+NOTE = "note"
+CHRONOLOGY = "chronology"
+TAXON = "taxon"
+CONTACT = "contactname"
+VALUE = "value"
+
+
+class ExtractionStep:
+    """One column read of an ``ExtractionPlan``.
+
+    Attributes:
+        param (str): Expanded parameter name the value is stored under.
+        entry (dict | None): Template metadata entry read by the step, None for
+            parameters the template does not map (``ABSENT``).
+        action (str): How the converted value is accumulated: ``absent``,
+            ``note``, ``chronology``, ``taxon``, ``contactname`` or ``value``.
+        sheet (str | None): Sheet the column is read from (XLSX templates).
+        column (str | None): Input column name.
+        key (tuple | None): ``(sheet, column, rowwise, type)``, the key of the
+            converted column in the file's ``ExtractionCache``.
+    """
+
+    __slots__ = ("param", "entry", "action", "sheet", "column", "key")
+
+    def __init__(self, param, entry, action):
+        self.param = param
+        self.entry = entry
+        self.action = action
+        entry = entry or {}
+        self.sheet = entry.get("sheet")
+        self.column = entry.get("column")
+        self.key = (
+            None
+            if action == ABSENT
+            else (self.sheet, self.column, bool(entry.get("rowwise")), entry.get("type"))
+        )
+
+    def __repr__(self):
+        return f"ExtractionStep({self.param!r}, column={self.column!r}, action={self.action!r})"
+
+
+class ExtractionPlan:
+    """Pre-resolved recipe for pulling one table's parameters out of a data file.
+
+    ``pull_params`` used to rediscover, for every file and every validator,
+    which template entries a parameter expands to, which sheet and column each
+    one reads, and which special case (notes, chronologies/sampleages, taxa,
+    contact names) accumulates the value. A plan records those decisions once
+    as an ordered tuple of ``ExtractionStep``; ``execute`` then only reads,
+    converts and accumulates.
+
+    Plans are built with ``compile_plan``, which keeps them on the
+    ``CompiledTemplate`` so a batch of files sharing one template plans each
+    table once.
+
+    Examples:
+        >>> plan = compile_plan(['sitename', 'geog'], template, 'ndb.sites')  # doctest: +SKIP
+        >>> plan.steps  # doctest: +SKIP
+        (ExtractionStep('sitename', column='Site.name', action='value'),
+         ExtractionStep('geog', column='Coordinates', action='value'))
+        >>> plan.execute(read_csv('site.csv', columnar=True))  # doctest: +SKIP
+        {'sitename': 'Lake Tulane', 'geog': [27.58, -81.5]}
+
+    Args:
+        table (str): Table name with its trailing dot, e.g. ``ndb.sites.``.
+        steps (iterable): ``ExtractionStep`` objects in execution order.
+
+    Attributes:
+        table (str): Table name with its trailing dot.
+        steps (tuple): Steps in execution order.
+        columns (tuple): ``(sheet, column)`` pairs read by the plan.
+    """
+
+    def __init__(self, table, steps):
+        self.table = table
+        self.steps = tuple(steps)
+        self.columns = tuple((s.sheet, s.column) for s in self.steps if s.action != ABSENT)
+
+    def __repr__(self):
+        return f"ExtractionPlan({self.table!r}, steps={len(self.steps)})"
+
+    def entries(self, rowwise=None):
+        """Return the template entries read by the plan.
+
+        Args:
+            rowwise (bool, optional): Only return rowwise (True) or non-rowwise
+                (False) entries. Defaults to all.
+        """
+        return [
+            s.entry
+            for s in self.steps
+            if s.action != ABSENT and (rowwise is None or bool(s.entry.get("rowwise")) == rowwise)
+        ]
+
+    def execute(self, csv_template, cache=None):
+        """Run the plan against one parsed input file.
+
+        Args:
+            csv_template (list | ColumnTable | SheetTables): Parsed input file.
+            cache (ExtractionCache, optional): Per-file cache for converted columns.
+
+        Returns:
+            dict: Cleaned parameters, as returned by ``pull_params``.
+        """
+        add_unit_inputs = {}
+        for step in self.steps:
+            if step.action == ABSENT:
+                add_unit_inputs[step.param] = None
+                continue
+            if step.sheet is not None and isinstance(csv_template, dict):
+                template_rows = csv_template.get(step.sheet, [])
+            else:
+                template_rows = csv_template
+            try:
+                if cache is None:
+                    clean_valor = clean_and_convert(step.entry, template_rows)
+                else:
+                    clean_valor = cache.column(
+                        step.key, lambda s=step, t=template_rows: clean_and_convert(s.entry, t)
+                    )
+            except KeyError:
+                continue
+            if not clean_valor:
+                if "taxonname" not in step.entry:
+                    add_unit_inputs[step.param] = None
+                continue
+            _accumulate(step, clean_valor, self.table, add_unit_inputs)
+        return ut.finalize_output(add_unit_inputs)
+
+
+def compile_plan(params, yml_dict, table):
+    """Return the ``ExtractionPlan`` for ``params`` of ``table``.
+
+    Plans for a ``CompiledTemplate`` are built once and reused for every later
+    call with the same table and parameters; a raw template dictionary is
+    planned on each call.
+
+    Args:
+        params (list): Parameter names, as passed to ``pull_params``.
+        yml_dict (dict | CompiledTemplate): Template dictionary containing 'metadata' key.
+        table (str): Table name with its trailing dot.
+
+    Returns:
+        ExtractionPlan: The plan for this table and parameter list.
+    """
+    if not isinstance(yml_dict, CompiledTemplate):
+        return _build_plan(params, yml_dict, table)
+    key = (table, tuple(params))
+    plan = yml_dict.plans.get(key)
+    if plan is None:
+        plan = yml_dict.plans[key] = _build_plan(params, yml_dict, table)
+    return plan
+
+
+def clean_and_convert(val_entry, template_rows):
+    """Clean one template column and convert it to the entry's declared type."""
+    clean_valor = ut.clean_column(
+        val_entry.get("column"), template_rows, clean=not val_entry.get("rowwise")
+    )
+    if not clean_valor:
+        return clean_valor
+    return ut.convert_value_by_type(val_entry, clean_valor)
+
+
+def _build_plan(params, yml_dict, table):
+    steps = []
+    is_chronology = any(k in table for k in ("chronologies", "sampleages"))
+    for param in ut.prepare_parameters(params, yml_dict, table):
+        valor = ut.retrieve_dict(yml_dict, table + param)
+        if not valor:
+            steps.append(ExtractionStep(param, None, ABSENT))
+            continue
+        for entry in valor:
+            if param == "notes":
+                action = NOTE
+            elif is_chronology:
+                action = CHRONOLOGY
+            elif "taxonname" in entry:
+                action = TAXON
+            elif param == "contactname":
+                action = CONTACT
+            else:
+                action = VALUE
+            steps.append(ExtractionStep(param, entry, action))
+    return ExtractionPlan(table, steps)
+
+
+def _accumulate(step, clean_valor, table, add_unit_inputs):
+    """Store a converted value in the accumulator according to the step's action."""
+    if step.action == NOTE:
+        ut.add_note_entry(add_unit_inputs, clean_valor)
+    elif step.action == CHRONOLOGY:
+        ut.add_chronology_entry(add_unit_inputs, step.entry, clean_valor, table, step.param)
+    elif step.action == TAXON:
+        ut.add_taxon_entry(add_unit_inputs, step.entry, clean_valor)
+    elif step.action == CONTACT:
+        if isinstance(clean_valor, str):
+            add_unit_inputs[step.param] = [v.strip() for v in clean_valor.split("|") if v.strip()]
+        else:
+            add_unit_inputs[step.param] = [
+                value.strip() for item in clean_valor for value in item.split("|") if value.strip()
+            ]
+    else:
+        add_unit_inputs[step.param] = clean_valor
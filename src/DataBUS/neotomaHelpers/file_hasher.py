@@ -0,0 +1,230 @@
+import glob
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .template_cache import default_cache_dir
+
+# Bytes read per update; hashlib releases the GIL on blocks this large.
+CHUNK_SIZE = 1 << 20
+
+# A file modified this recently (in seconds) may still change within the same
+# mtime tick, so its digest is not cached.
+_RACY_SECONDS = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS digests (
+    path TEXT NOT NULL,
+    algorithm TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (path, algorithm)
+);
+"""
+
+_LOOKUP_Q = "SELECT size, mtime_ns, inode, digest FROM digests WHERE path = ? AND algorithm = ?"
+
+_STORE_Q = """
+INSERT OR REPLACE INTO digests (path, algorithm, size, mtime_ns, inode, digest)
+VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+
+def hash_stream(path, algorithm="md5", chunk_size=CHUNK_SIZE):
+    """Return the hex digest of a file, read in fixed-size chunks.
+
+    Args:
+        path (str): File to hash.
+        algorithm (str): ``hashlib`` algorithm, e.g. ``"md5"`` or ``"blake2b"``.
+        chunk_size (int): Bytes read at a time.
+
+    Returns:
+        str: Hex digest of the file's contents.
+    """
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class FileHasher:
+    """Chunked file hashing with a persistent stat-keyed digest cache.
+
+    Files are hashed in blocks of ``chunk_size`` bytes, so memory use does not
+    depend on the file size. Digests are cached on disk against the file's
+    path, size, ``mtime_ns`` and inode: a file whose metadata has not changed
+    since it was last hashed is not read again, in this run or a later one.
+    Files modified in the last two seconds are only remembered for the
+    current process, since a further write within the same timestamp tick
+    would go unnoticed by later runs.
+
+    ``digest_many`` hashes the uncached files on a thread pool; reading and
+    hashing release the GIL, so large files are processed in parallel.
+
+    Examples:
+        >>> hasher = FileHasher('blake2b')
+        >>> hasher.digest('data/lake.csv')  # doctest: +SKIP
+        '3f9c0b...'
+        >>> hasher.stats()  # doctest: +SKIP
+        {'hits': 0, 'misses': 1}
+
+    Args:
+        algorithm (str): ``hashlib`` algorithm. Defaults to ``"md5"``, the
+            digest written at the top of the validation logs.
+        cache_path (str | bool | None): SQLite file of the digest cache. None
+            uses ``file_hashes.sqlite3`` in ``default_cache_dir()``; False
+            disables the cache.
+        chunk_size (int): Bytes read at a time.
+
+    Raises:
+        ValueError: If ``algorithm`` is not available in ``hashlib``.
+
+    Attributes:
+        hits (int): Digests served from the cache.
+        misses (int): Files read and hashed.
+    """
+
+    def __init__(self, algorithm="md5", cache_path=None, chunk_size=CHUNK_SIZE):
+        hashlib.new(algorithm)
+        self.algorithm = algorithm
+        self.cache_path = cache_path
+        self.chunk_size = chunk_size
+        self.hits = 0
+        self.misses = 0
+        self._memo = {}
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"FileHasher({self.algorithm!r})"
+
+    def digest(self, path):
+        """Return the hex digest of ``path``, from the cache when it is unchanged."""
+        return self.digest_many([path], workers=1)[path]
+
+    def digest_many(self, paths, workers=None):
+        """Return ``{path: digest}`` for ``paths``, hashing uncached files concurrently.
+
+        Args:
+            paths (iterable[str]): Files to hash.
+            workers (int, optional): Hashing threads. Defaults to the
+                ``ThreadPoolExecutor`` default.
+
+        Returns:
+            dict: Hex digest of each path, in input order.
+        """
+        paths = list(dict.fromkeys(paths))
+        entries = {path: _stat_key(path) for path in paths}
+        digests = {}
+        with self._lock:
+            cache = self._connect()
+            for path, key in entries.items():
+                if key in self._memo:
+                    digests[path] = self._memo[key]
+                    continue
+                row = (
+                    cache.execute(_LOOKUP_Q, (key[0], self.algorithm)).fetchone() if cache else None
+                )
+                if row is not None and tuple(row[:3]) == key[1:]:
+                    digests[path] = row[3]
+        self.hits += len(digests)
+        missing = [path for path in paths if path not in digests]
+        if len(missing) <= 1 or workers == 1:
+            hashed = [hash_stream(path, self.algorithm, self.chunk_size) for path in missing]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                hashed = list(
+                    pool.map(
+                        lambda path: hash_stream(path, self.algorithm, self.chunk_size), missing
+                    )
+                )
+        self.misses += len(missing)
+        digests.update(zip(missing, hashed, strict=True))
+        self._memo.update((entries[path], digests[path]) for path in missing)
+        self._remember(
+            [
+                (entries[path], digests[path])
+                for path in missing
+                if entries[path][2] < time.time_ns() - _RACY_SECONDS * 10**9
+            ]
+        )
+        return {path: digests[path] for path in paths}
+
+    def stats(self):
+        """Return the number of cache hits and of files hashed."""
+        return {"hits": self.hits, "misses": self.misses}
+
+    def _remember(self, entries):
+        if not entries:
+            return
+        with self._lock:
+            cache = self._connect()
+            if cache is None:
+                return
+            with cache:
+                cache.executemany(
+                    _STORE_Q,
+                    [(key[0], self.algorithm, *key[1:], digest) for key, digest in entries],
+                )
+
+    def _connect(self):
+        """Return this process's connection to the digest cache (None when disabled)."""
+        if self.cache_path is False:
+            return None
+        if self._conn is None or self._pid != os.getpid():
+            path = self.cache_path or os.path.join(default_cache_dir(), "file_hashes.sqlite3")
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+            except (OSError, sqlite3.Error):
+                # An unwritable cache only disables caching.
+                self.cache_path = False
+                return None
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+
+def _stat_key(path):
+    """Return (absolute path, size, mtime_ns, inode) identifying a file version."""
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_size, st.st_mtime_ns, st.st_ino)
+
+
+_HASHERS = {}
+
+
+def get_file_hasher(algorithm="md5"):
+    """Return the process-wide ``FileHasher`` for ``algorithm``."""
+    hasher = _HASHERS.get(algorithm)
+    if hasher is None:
+        hasher = _HASHERS[algorithm] = FileHasher(algorithm)
+    return hasher
+
+
+def hash_directory(directory, patterns=("*.csv", "*.xlsx"), algorithm="md5", workers=None):
+    """Hash every data file of a directory concurrently.
+
+    Examples:
+        >>> hash_directory('data/', algorithm='blake2b', workers=8)  # doctest: +SKIP
+        {'data/lake.csv': '3f9c0b...', 'data/bog.xlsx': 'a81d44...'}
+
+    Args:
+        directory (str): Directory to scan (not recursively).
+        patterns (tuple[str]): Glob patterns of the files to hash.
+        algorithm (str): ``hashlib`` algorithm. Defaults to ``"md5"``.
+        workers (int, optional): Hashing threads.
+
+    Returns:
+        dict: Hex digest of each matching file, sorted by path.
+    """
+    paths = sorted({p for pattern in patterns for p in glob.glob(os.path.join(directory, pattern))})
+    return get_file_hasher(algorithm).digest_many(paths, workers=workers)
@@ -1,12 +1,19 @@
-import hashlib
 import os
 
+from .file_hasher import get_file_hasher
+from .validation_store import get_validation_store
 
-def hash_file(filename, validation_files="data/validation_logs/"):
+
+def hash_file(filename, validation_files="data/validation_logs/", store=None, algorithm="md5"):
     """Calculate MD5 hash of a file and compare against validation logs.
 
     Computes the MD5 hash of a file and compares it with previously stored hashes
     in validation log files to determine if the file has been validated or modified.
+    The file is read in chunks, and an unchanged file (same size, mtime and
+    inode) is not read again: its digest comes from the ``FileHasher`` cache.
+    When the directory has a ``ValidationStore`` with a record of the file, the
+    hash is compared with that of its latest validation instead of reading the
+    first line of its log.
 
     Examples:
         >>> hash_file('pollen_data.csv')  # doctest: +SKIP
@@ -18,21 +25,36 @@ def hash_file(filename, validation_files="data/validation_logs/"):
         filename (str): Path to the file to hash.
         validation_files (str, optional): Path to the validation logs directory.
                                           Defaults to 'data/validation_logs/'.
+        store (ValidationStore | str | bool | None, optional): Validation store
+            to compare against. None uses the store of ``validation_files`` if
+            there is one; False always reads the logs.
+        algorithm (str, optional): ``hashlib`` algorithm, e.g. ``"blake2b"``.
+            Defaults to ``"md5"``; logs and store records written with another
+            algorithm do not match.
 
     Returns:
         dict: Dictionary with keys:
               'pass' (bool): True if file matches validation log hash.
-              'hash' (str): MD5 hash of the file in hexadecimal.
+              'hash' (str): Hash of the file in hexadecimal.
               'message' (list): List of status messages about validation result.
     """
     response = {"pass": False, "hash": None, "message": []}
     modified_filename = os.path.basename(filename)
     logfile = f"{validation_files}{modified_filename}" + ".valid.log"
     not_val_logfile = f"{validation_files}not_validated/{modified_filename}" + ".valid.log"
-    with open(filename, "rb") as fh:
-        response["hash"] = hashlib.md5(fh.read()).hexdigest()
+    response["hash"] = get_file_hasher(algorithm).digest(filename)
     response["message"].append(response["hash"])
-    if os.path.exists(logfile):
+    store = get_validation_store(store, validation_files)
+    record = store.latest(filename) if store is not None else None
+    if record is not None:
+        if record["file_hash"] != response["hash"]:
+            response["message"].append(f"File has changed, validating {filename}.")
+        elif record["errors"] == 0:
+            response["pass"] = True
+            response["message"].append("Hashes match, file hasn't changed.")
+        else:
+            response["message"].append("Hashes match, file hasn't been corrected.")
+    elif os.path.exists(logfile):
         with open(logfile) as f:
             hashline = f.readline().strip("\n")
         if hashline == response["hash"]:
@@ -0,0 +1,349 @@
+import contextlib
+import threading
+
+# Tables whose rows can be written set-based with IDs reserved up front:
+# table -> (ID column, model attribute holding the ID,
+#           {column: (model attribute, array type)}).
+# The columns are those the matching ``ts.insert...`` call receives.
+ALLOCATED_TABLES = {
+    "analysisunits": (
+        "analysisunitid",
+        "analysisunitid",
+        {
+            "collectionunitid": ("collectionunitid", "int"),
+            "depth": ("depth", "float8"),
+            "thickness": ("thickness", "float8"),
+            "faciesid": ("faciesid", "int"),
+            "mixed": ("mixed", "boolean"),
+            "igsn": ("igsn", "text"),
+            "notes": ("notes", "text"),
+        },
+    ),
+    "samples": (
+        "sampleid",
+        "sampleid",
+        {
+            "analysisunitid": ("analysisunitid", "int"),
+            "datasetid": ("datasetid", "int"),
+            "samplename": ("samplename", "text"),
+            "sampledate": ("sampledate", "date"),
+            "analysisdate": ("analysisdate", "date"),
+            "taxonid": ("taxonid", "int"),
+            "labnumber": ("labnumber", "text"),
+            "preparationmethod": ("prepmethod", "text"),
+            "notes": ("notes", "text"),
+        },
+    ),
+    "data": (
+        "dataid",
+        "datumid",
+        {
+            "sampleid": ("sampleid", "int"),
+            "variableid": ("variableid", "int"),
+            "value": ("value", "float8"),
+        },
+    ),
+    "chroncontrols": (
+        "chroncontrolid",
+        "chroncontrolid",
+        {
+            "chronologyid": ("chronologyid", "int"),
+            "chroncontroltypeid": ("chroncontroltypeid", "int"),
+            "analysisunitid": ("analysisunitid", "int"),
+            "depth": ("depth", "float8"),
+            "thickness": ("thickness", "float8"),
+            "agetypeid": ("agetypeid", "int"),
+            "age": ("age", "float8"),
+            "agelimityounger": ("agelimityounger", "float8"),
+            "agelimitolder": ("agelimitolder", "float8"),
+            "notes": ("notes", "text"),
+        },
+    ),
+    "sampleages": (
+        "sampleageid",
+        "sampleage",
+        {
+            "sampleid": ("sampleid", "int"),
+            "chronologyid": ("chronologyid", "int"),
+            "age": ("age", "float8"),
+            "ageyounger": ("ageyounger", "float8"),
+            "ageolder": ("ageolder", "float8"),
+        },
+    ),
+}
+
+_RESERVE_Q = """SELECT nextval(pg_get_serial_sequence(%(table)s, %(column)s))
+                FROM generate_series(1, %(n)s);"""
+_SAVEPOINT = "databus_ids"
+
+
+class IdAllocator:
+    """Reserves blocks of IDs from Neotoma's sequences, for set-based inserts.
+
+    The validators insert parents and children one row at a time because each
+    child needs the ID its parent got back from ``ts.insert...``: analysis
+    units, then samples, then data; chronologies, then chron controls and
+    sample ages. ``reserve`` takes the IDs of a whole block of rows from the
+    table's sequence in one ``nextval`` over ``generate_series``, so the rows
+    can be given their IDs in memory and ``insert_many`` writes them with one
+    ``INSERT ... SELECT FROM unnest(...)`` per table, foreign keys included.
+
+    When a sequence cannot be used (no ``USAGE`` privilege, no serial column)
+    the table is marked unavailable and ``insert_records`` falls back on the
+    model's ``insert_to_db``. On a ``PlaceholderCursor`` (validate-only and
+    offline runs) the IDs are placeholders and no sequence is touched.
+
+    Sequences are not transactional, so reserved IDs that never reach a
+    committed row leave gaps: rows of a failed insert, and every row of a
+    file that is rolled back. ``settle`` is called after each commit or
+    rollback to account for them; ``ts.insert...`` leaves the same gaps.
+
+    Examples:
+        >>> allocator = IdAllocator()
+        >>> allocator.insert_many(cur, "samples", samples)  # doctest: +SKIP
+        [5021, 5022, 5023]
+        >>> allocator.settle(committed=True)
+        >>> allocator.stats()  # doctest: +SKIP
+        {'samples': {'reserved': 3, 'committed': 3, 'gaps': 0, 'fallbacks': 0}}
+
+    Attributes:
+        unavailable (set): Tables whose sequence could not be used.
+    """
+
+    def __init__(self):
+        self.unavailable = set()
+        self._counts = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, cur, table, n):
+        """Return ``n`` new IDs for ``table``, or None if its sequence cannot be used.
+
+        Args:
+            cur (psycopg2.cursor): Database cursor.
+            table (str): Key of ``ALLOCATED_TABLES``, e.g. ``"samples"``.
+            n (int): Number of IDs.
+
+        Returns:
+            list[int] | None: The IDs, in the order the sequence gave them.
+
+        Raises:
+            KeyError: If ``table`` is not a key of ``ALLOCATED_TABLES``.
+        """
+        column = ALLOCATED_TABLES[table][0]
+        placeholders = getattr(cur, "placeholder_ids", None)
+        if callable(placeholders):
+            return placeholders(n)
+        if table in self.unavailable:
+            return None
+        try:
+            with savepoint(cur):
+                cur.execute(_RESERVE_Q, {"table": f"ndb.{table}", "column": column, "n": n})
+                ids = [row[0] for row in cur.fetchall() or []]
+                if len(ids) != n or None in ids:
+                    raise ValueError(f"ndb.{table}.{column} has no sequence.")
+        except Exception:
+            self.unavailable.add(table)
+            return None
+        self._count(table, "reserved", n)
+        return ids
+
+    def insert_many(self, cur, table, records):
+        """Write ``records`` to ``table`` with one statement, using reserved IDs.
+
+        The IDs are known before the statement runs, so no row has to come
+        back from the database; each record then gets its ID set (e.g.
+        ``Sample.sampleid``), as ``insert_to_db`` does.
+
+        Args:
+            cur (psycopg2.cursor): Database cursor.
+            table (str): Key of ``ALLOCATED_TABLES``.
+            records (list): Model objects with an attribute per column.
+
+        Returns:
+            list[int] | None: The IDs, in the order of ``records``, or None
+                when IDs cannot be reserved for ``table``.
+
+        Raises:
+            Exception: If the insert fails. It runs in a savepoint that is
+                rolled back, so the transaction stays usable; the reserved
+                IDs count as gaps.
+        """
+        if not records:
+            return []
+        ids = self.reserve(cur, table, len(records))
+        if ids is None:
+            self._count(table, "fallbacks", len(records))
+            return None
+        column, attribute, columns = ALLOCATED_TABLES[table]
+        inputs = {column: ids}
+        inputs.update(
+            {name: [getattr(r, attr, None) for r in records] for name, (attr, _) in columns.items()}
+        )
+        try:
+            with savepoint(cur):
+                cur.execute(insert_query(table), inputs)
+        except Exception:
+            self._count(table, "gaps", len(ids))
+            raise
+        for record, id_ in zip(records, ids, strict=True):
+            setattr(record, attribute, id_)
+        if not callable(getattr(cur, "placeholder_ids", None)):
+            with self._lock:
+                self._pending[table] = self._pending.get(table, 0) + len(ids)
+        return ids
+
+    def settle(self, committed):
+        """Account for the IDs written since the last commit or rollback.
+
+        Args:
+            committed (bool): Whether the transaction was committed. When
+                False its IDs are gaps.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for table, n in pending.items():
+            self._count(table, "committed" if committed else "gaps", n)
+
+    def stats(self):
+        """Return ``{table: {"reserved", "committed", "gaps", "fallbacks"}}`` for the tables used."""
+        keys = ("reserved", "committed", "gaps", "fallbacks")
+        return {t: {k: c.get(k, 0) for k in keys} for t, c in self._counts.items()}
+
+    def _count(self, table, key, n):
+        with self._lock:
+            counts = self._counts.setdefault(table, {})
+            counts[key] = counts.get(key, 0) + n
+
+
+@contextlib.contextmanager
+def savepoint(cur, name=_SAVEPOINT):
+    """Run the statements of a ``with`` block in a savepoint, rolled back if they fail.
+
+    On PostgreSQL a failed statement aborts the transaction, and every later
+    statement fails until it is rolled back; rolling back to the savepoint
+    keeps it usable for the statements that follow. The error is re-raised.
+    ``PlaceholderCursor``s write nothing and get no savepoint.
+
+    Examples:
+        >>> with savepoint(cur):  # doctest: +SKIP
+        ...     sample.insert_to_db(cur)
+
+    Args:
+        cur (psycopg2.cursor): Database cursor.
+        name (str, optional): Savepoint name. Defaults to ``"databus_ids"``.
+    """
+    if callable(getattr(cur, "placeholder_ids", None)):
+        yield
+        return
+    cur.execute(f"SAVEPOINT {name}")
+    try:
+        yield
+    except Exception:
+        cur.execute(f"ROLLBACK TO SAVEPOINT {name}")
+        raise
+    cur.execute(f"RELEASE SAVEPOINT {name}")
+
+
+def insert_query(table):
+    """Return the ``INSERT ... SELECT FROM unnest(...)`` of ``table``.
+
+    Its parameters are named after the table's columns, each an array with
+    one value per row.
+    """
+    column, _, columns = ALLOCATED_TABLES[table]
+    types = {column: "int", **{name: kind for name, (_, kind) in columns.items()}}
+    arrays = ", ".join(f"%({name})s::{kind}[]" for name, kind in types.items())
+    return f"INSERT INTO ndb.{table} ({', '.join(types)}) SELECT * FROM unnest({arrays});"
+
+
+_ALLOCATOR = IdAllocator()
+
+
+def get_id_allocator():
+    """Return the process-wide ``IdAllocator`` used by the validators."""
+    return _ALLOCATOR
+
+
+def insert_records(cur, table, records, bulk=None):
+    """Insert model records set-based with reserved IDs, or one ``insert_to_db`` each.
+
+    When the set-based insert fails, e.g. on one bad row, its savepoint is
+    rolled back and the records are inserted one at a time, each in its own
+    savepoint (``insert_each``), so only the bad rows fail.
+
+    Args:
+        cur (psycopg2.cursor): Database cursor.
+        table (str): Key of ``ALLOCATED_TABLES``.
+        records (list): Model objects of that table.
+        bulk (callable, optional): Inserts the records set-based when their IDs
+            cannot be reserved and returns the IDs, e.g. ``Datum.insert_many``;
+            it must roll back what it wrote when it fails. Defaults to None,
+            one ``insert_to_db`` each.
+
+    Returns:
+        list[int | Exception]: The ID of each record, in order, or the error
+            its ``insert_to_db`` raised when falling back.
+    """
+    try:
+        ids = _ALLOCATOR.insert_many(cur, table, records)
+    except Exception:
+        _ALLOCATOR._count(table, "fallbacks", len(records))
+        return insert_each(cur, records)
+    if ids is None and bulk is not None:
+        try:
+            ids = bulk(records)
+        except Exception:
+            ids = None
+    if ids is not None:
+        return ids
+    return insert_each(cur, records)
+
+
+def insert_each(cur, records):
+    """Insert model records one ``insert_to_db`` at a time, each in its own savepoint.
+
+    A record that fails is rolled back on its own, so the records after it
+    are still inserted.
+
+    Args:
+        cur (psycopg2.cursor): Database cursor.
+        records (list): Model objects with an ``insert_to_db`` method.
+
+    Returns:
+        list[int | Exception]: The ID of each record, in order, or the error
+            its ``insert_to_db`` raised.
+    """
+    results = []
+    for record in records:
+        try:
+            with savepoint(cur):
+                results.append(record.insert_to_db(cur))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def insert_staged(cur, table, records):
+    """Insert the records a validator staged, split into inserted IDs and errors.
+
+    The validators of the pre-allocated tables share this, and only format
+    their own messages.
+
+    Examples:
+        >>> ids, errors = insert_staged(cur, "samples", staged)  # doctest: +SKIP
+        >>> response.id_list.extend(ids)  # doctest: +SKIP
+
+    Args:
+        cur (psycopg2.cursor): Database cursor.
+        table (str): Key of ``ALLOCATED_TABLES``.
+        records (list): Model objects of that table.
+
+    Returns:
+        tuple[list[int], list[Exception]]: The IDs of the inserted records, in
+            order, and the error of each record that could not be inserted.
+    """
+    ids, errors = [], []
+    for result in insert_records(cur, table, records):
+        (errors if isinstance(result, Exception) else ids).append(result)
+    return ids, errors
@@ -0,0 +1,207 @@
+import json
+import time
+from datetime import datetime
+
+from DataBUS.Response import Response
+
+# Default write buffer of the log files, in bytes.
+BUFFER_SIZE = 64 * 1024
+
+_LEVELS = (("✗", "error"), ("✔", "ok"), ("?", "warning"))
+
+
+class LogSink:
+    """Streams the log of one data file as it is produced.
+
+    Every entry becomes a structured record: the step it belongs to, a level
+    (``error``, ``ok``, ``warning`` or ``info``, from the ``✗``/``✔``/``?``
+    markers the validators use), the message, and for step results the pass and
+    fail counts and the step's duration. Records are written as JSON Lines to
+    ``jsonl_path`` and rendered to the usual human-readable ``.valid.log`` at
+    ``path`` as they arrive, through buffered files flushed at the end of each
+    step (``end_step``). Nothing needs to be held in memory, and a run that crashes leaves the
+    log of every completed step behind. ``render_valid_log`` rebuilds the
+    ``.valid.log`` from the JSON Lines file.
+
+    The sink takes the place of the ``logfile`` list: ``append``/``extend``
+    add plain lines, ``logging_response`` and ``safe_step`` accept it, and with
+    ``keep=True`` the rendered lines are also collected in ``lines``. Files are
+    opened on the first record, so a prior log at the same path can still be
+    read (``check_file``, ``hash_file``) after the sink is created.
+
+    Examples:
+        >>> with LogSink('lake.csv.valid.log', 'lake.csv.valid.jsonl') as log:  # doctest: +SKIP
+        ...     log.start_step('sites', 'Sites')
+        ...     log.write_response(nv.valid_site(cur, yml_dict, csv_file))
+
+    Args:
+        path (str, optional): Path of the human-readable log.
+        jsonl_path (str, optional): Path of the JSON Lines log.
+        keep (bool): Also keep the rendered lines in ``lines``. Defaults to False.
+        buffer_size (int): Write buffer of each file, in bytes.
+
+    Attributes:
+        lines (list[str]): Rendered log entries, when ``keep`` is set.
+        step (str | None): Step the following records belong to.
+        step_records (list[dict]): Records written since the last
+            ``start_step``, header excluded, for ``replay``.
+        errors (int): Lines of the ``.valid.log`` starting with ``✗``.
+        invalid (int): Lines of the ``.valid.log`` starting with ``Valid: FALSE``.
+    """
+
+    def __init__(self, path=None, jsonl_path=None, keep=False, buffer_size=BUFFER_SIZE):
+        self.path = path
+        self.jsonl_path = jsonl_path
+        self.keep = keep
+        self.buffer_size = buffer_size
+        self.lines = []
+        self.step = None
+        self.step_records = []
+        self.errors = 0
+        self.invalid = 0
+        self._started = None
+        self._text = None
+        self._jsonl = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def append(self, line, level=None):
+        """Write one plain log entry for the current step."""
+        text = str(line)
+        self.write({"kind": "line", "level": level or _level(text), "message": text})
+
+    def extend(self, lines):
+        """Write several plain log entries."""
+        for line in lines:
+            self.append(line)
+
+    def start_step(self, name, title):
+        """Start the records of a step, with its ``=== title ===`` header."""
+        self.step = name
+        self._started = time.perf_counter()
+        self.write({"kind": "step", "level": "info", "title": title})
+        self.step_records = []
+
+    def end_step(self):
+        """Close the records of the current step and flush them to disk."""
+        self.step = None
+        self._started = None
+        self.flush()
+
+    def write_response(self, response):
+        """Write the ``Response`` of the current step, with its counts and duration."""
+        valid = response.valid
+        elapsed = time.perf_counter() - self._started if self._started is not None else None
+        self.write(
+            {
+                "kind": "response",
+                "level": "ok" if response.validAll else "error",
+                "valid": response.validAll,
+                "counts": {"passed": valid.passed, "failed": valid.failed},
+                "messages": [[m, n] for m, n in response.message_counts()],
+                "elapsed": round(elapsed, 6) if elapsed is not None else None,
+            }
+        )
+
+    def replay(self, records):
+        """Write records captured from an earlier run (``step_records``) again."""
+        for record in records:
+            self.write({k: v for k, v in record.items() if k not in ("time", "step")})
+
+    def write(self, record):
+        """Complete ``record`` with the time and step, then write it to both logs."""
+        record = {
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "step": self.step,
+            **record,
+        }
+        if self.step is not None:
+            self.step_records.append(record)
+        if self._jsonl is None and self.jsonl_path:
+            self._jsonl = _open(self.jsonl_path, self.buffer_size)
+        if self._text is None and self.path:
+            self._text = _open(self.path, self.buffer_size)
+        if self._jsonl is not None:
+            self._jsonl.write(json.dumps(record, ensure_ascii=False, default=str))
+            self._jsonl.write("\n")
+        text = render_record(record)
+        for line in text.split("\n"):
+            if line.startswith("✗"):
+                self.errors += 1
+            elif line.startswith("Valid: FALSE"):
+                self.invalid += 1
+        if self._text is not None:
+            self._text.write(text)
+            self._text.write("\n")
+        if self.keep:
+            self.lines.append(text)
+
+    def flush(self):
+        """Push buffered records to disk."""
+        for f in (self._jsonl, self._text):
+            if f is not None:
+                f.flush()
+
+    def close(self):
+        """Flush and close the log files."""
+        for f in (self._jsonl, self._text):
+            if f is not None:
+                f.close()
+        self._jsonl = self._text = None
+
+
+def render_record(record):
+    """Render one log record as it appears in the ``.valid.log``.
+
+    Args:
+        record (dict): Record written by ``LogSink``.
+
+    Returns:
+        str: The log entry; response records span several lines.
+    """
+    if record["kind"] == "step":
+        return f"=== {record['title']} ==="
+    if record["kind"] == "response":
+        return Response.format_text(record["valid"], record["messages"])
+    return record["message"]
+
+
+def render_valid_log(jsonl_path, path=None):
+    """Rebuild the human-readable log from a JSON Lines log.
+
+    Examples:
+        >>> render_valid_log('lake.csv.valid.jsonl', 'lake.csv.valid.log')  # doctest: +SKIP
+
+    Args:
+        jsonl_path (str): JSON Lines log written by ``LogSink``.
+        path (str, optional): Where to write the rendered log.
+
+    Returns:
+        list[str] | None: The rendered entries when ``path`` is not given.
+    """
+    with open(jsonl_path, encoding="utf-8") as records:
+        if path is None:
+            return [render_record(json.loads(line)) for line in records if line.strip()]
+        with open(path, "w", encoding="utf-8", buffering=BUFFER_SIZE) as out:
+            for line in records:
+                if line.strip():
+                    out.write(render_record(json.loads(line)))
+                    out.write("\n")
+    return None
+
+
+def _open(path, buffer_size):
+    """Open a log for writing; ``LogSink.close`` closes it."""
+    return open(path, "w", encoding="utf-8", buffering=buffer_size)
+
+
+def _level(text):
+    stripped = text.lstrip()
+    for marker, level in _LEVELS:
+        if stripped.startswith(marker):
+            return level
+    return "info"
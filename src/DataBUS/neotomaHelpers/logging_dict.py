@@ -1,11 +1,13 @@
 from DataBUS import Response
 
+from .log_sink import LogSink
+
 
 def logging_response(response, logfile):
     """Append Response object string representation to logfile.
 
     Validates that response is a Response object, then appends its string representation
-    to the logfile.
+    to the logfile. A ``LogSink`` records it as a structured step result instead.
 
     Examples:
         >>> logfile = []
@@ -17,14 +19,17 @@ def logging_response(response, logfile):
 
     Args:
         response (Response): Response object from DataBUS module.
-        logfile (list): List to append the response to.
+        logfile (list | LogSink): List or log sink to append the response to.
 
     Returns:
-        list: The updated logfile list with response appended.
+        list | LogSink: The updated logfile with response appended.
 
     Raises:
         AssertionError: If response is not an instance of Response class.
     """
     assert isinstance(response, Response), "response needs to be a Response"
+    if isinstance(logfile, LogSink):
+        logfile.write_response(response)
+        return logfile
     logfile.append(f"{response}")
     return logfile
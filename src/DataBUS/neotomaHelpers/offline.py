@@ -0,0 +1,437 @@
+import datetime
+import decimal
+import json
+import math
+import os
+import re
+import sqlite3
+import tempfile
+import urllib.request
+
+import DataBUS
+
+from .validate_only import CONTROL, PlaceholderCursor
+from .vocabulary_cache import VOCABULARIES
+
+# Lookup tables read by the validators: table -> (export query, indexed
+# expressions). A None query exports ``SELECT * FROM ndb.<table>``. Sites are
+# exported with their bounding box in place of the PostGIS ``geog`` column,
+# which is what the nearby-site checks compare against.
+SNAPSHOT_TABLES = {
+    "sites": (
+        """SELECT siteid, sitename, altitude, area, sitedescription, notes,
+                  ST_YMax(geog::geometry) AS latitudenorth,
+                  ST_XMax(geog::geometry) AS longitudeeast,
+                  ST_YMin(geog::geometry) AS latitudesouth,
+                  ST_XMin(geog::geometry) AS longitudewest
+           FROM ndb.sites""",
+        ("siteid",),
+    ),
+    "collectionunits": (None, ("collectionunitid", "siteid", "LOWER(handle)")),
+    "taxa": (None, ("taxonid", "LOWER(taxonname)")),
+    "variables": (None, ("variableid", "taxonid")),
+    "contacts": (None, ("contactid", "LOWER(contactname)", "LOWER(familyname)")),
+    "publications": (None, ("publicationid", "LOWER(doi)", "LOWER(citation)")),
+    "geopoliticalunits": (None, ("geopoliticalid", "LOWER(geopoliticalname)")),
+    "datasettypes": (None, ()),
+    "constituentdatabases": (None, ()),
+    "externaldatabases": (None, ()),
+    "taxagrouptypes": (None, ()),
+    "leadmodelbasis": (None, ()),
+    "keywords": (None, ()),
+    "grants": (None, ()),
+    "projects": (None, ()),
+    "entityrelationship": (None, ()),
+    "entitycovertypes": (None, ()),
+    "landusetypes": (None, ()),
+    "relativeages": (None, ()),
+    "speleothemdriptypes": (None, ()),
+    "speleothementitystatuses": (None, ()),
+    "speleothemtypes": (None, ()),
+    "vegetationcovertypes": (None, ()),
+    **{
+        table.split(".", 1)[1]: (None, (f"LOWER({term_column})",))
+        for table, _, term_column in VOCABULARIES.values()
+    },
+}
+
+# Rows fetched from PostgreSQL and written to the snapshot at a time.
+_BATCH = 5000
+
+# SQLite column types for the PostgreSQL type OIDs of ``cursor.description``,
+# so that lookups compare values the way PostgreSQL does (``siteid = '12'``).
+_AFFINITIES = {
+    16: "INTEGER",  # boolean
+    20: "INTEGER",  # bigint
+    21: "INTEGER",  # smallint
+    23: "INTEGER",  # integer
+    26: "INTEGER",  # oid
+    700: "REAL",
+    701: "REAL",
+    1700: "NUMERIC",
+    19: "TEXT",  # name
+    25: "TEXT",
+    1042: "TEXT",  # char(n)
+    1043: "TEXT",  # varchar
+    1082: "TEXT",  # date
+    1114: "TEXT",  # timestamp
+    1184: "TEXT",  # timestamptz
+}
+
+# pg_trgm's default ``similarity_threshold``.
+_TRIGRAM_THRESHOLD = 0.3
+
+# Mean Earth radius, in meters.
+_EARTH_RADIUS = 6371008.8
+
+_METADATA_Q = "SELECT key, value FROM snapshot_info"
+
+_CATALOG = re.compile(r"\bpg_(proc|catalog|class|namespace|attribute)\b", re.IGNORECASE)
+
+_PARAM = r"%\(\w+\)s|%s"
+_DISTANCE = re.compile(
+    r"ST_SetSRID\(\s*(ST_Centroid\()?(\w+)\.geog::geometry\)?\s*,\s*4326\)::geography\s*<->\s*"
+    rf"ST_SetSRID\(ST_Point\(({_PARAM}),\s*({_PARAM})\),\s*4326\)::geography",
+    re.IGNORECASE,
+)
+_TRIGRAM = re.compile(rf"((?:\w+\()?[\w.]+\)?)\s*%%\s*({_PARAM})")
+_CAST = re.compile(r"::\s*\w+(?:\s*\[\])?")
+_UNNEST = re.compile(
+    rf"unnest\(\s*((?:{_PARAM}|[^()])*?)\s*\)\s*(WITH\s+ORDINALITY\s+)?AS\s+(\w+)\s*\(([^)]*)\)",
+    re.IGNORECASE,
+)
+_ANY = re.compile(rf"=\s*ANY\s*\(\s*({_PARAM})\s*\)", re.IGNORECASE)
+_PLACEHOLDER = re.compile(r"%\((\w+)\)s|%s|%%")
+_MISSING_TABLE = re.compile(r"no such table: (\S+)")
+
+
+class OfflineError(Exception):
+    """Raised when a query cannot be answered from an offline snapshot."""
+
+    pass
+
+
+def export_snapshot(conn, path, tables=None):
+    """Dump the lookup tables DataBUS reads into a local SQLite snapshot.
+
+    Each table of ``tables`` is copied from the ``ndb`` schema into a table of
+    the same name, with SQLite column types matching the PostgreSQL ones and
+    indexes on the expressions the validators look rows up by
+    (``LOWER(taxonname)``, ...). The snapshot is written to a temporary file
+    and moved into place once complete, so an interrupted export leaves the
+    previous snapshot intact. ``OfflineConnection`` validates against it.
+
+    Examples:
+        >>> export_snapshot(psycopg2.connect(**connection), 'neotoma.sqlite3')  # doctest: +SKIP
+        {'sites': 17862, 'collectionunits': 19433, 'taxa': 51342, ...}
+
+    Args:
+        conn (psycopg2.connection): Connection to the Neotoma database.
+        path (str): Where to write the snapshot.
+        tables (dict, optional): Table → (export query or None, indexed
+            expressions). Defaults to ``SNAPSHOT_TABLES``.
+
+    Returns:
+        dict: Number of rows exported per table.
+    """
+    tables = SNAPSHOT_TABLES if tables is None else tables
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    counts = {}
+    try:
+        snapshot = _connect(tmp)
+        try:
+            cur = conn.cursor()
+            for table, (query, indexes) in tables.items():
+                cur.execute(query or f"SELECT * FROM ndb.{table};")
+                rows = cur.fetchmany(_BATCH)
+                columns = [
+                    f'"{d[0]}" {_affinity(d[1], [row[i] for row in rows])}'.rstrip()
+                    for i, d in enumerate(cur.description)
+                ]
+                snapshot.execute(f"CREATE TABLE {table} ({', '.join(columns)})")
+                insert = f"INSERT INTO {table} VALUES ({', '.join('?' * len(columns))})"
+                counts[table] = 0
+                while rows:
+                    snapshot.executemany(insert, ([_sqlite_value(v) for v in r] for r in rows))
+                    counts[table] += len(rows)
+                    rows = cur.fetchmany(_BATCH)
+                for n, expression in enumerate(indexes, start=1):
+                    snapshot.execute(f"CREATE INDEX {table}_{n} ON {table} ({expression})")
+            snapshot.execute("CREATE TABLE snapshot_info (key TEXT PRIMARY KEY, value TEXT)")
+            snapshot.executemany(
+                "INSERT INTO snapshot_info VALUES (?, ?)",
+                [
+                    ("created_at", datetime.datetime.now().isoformat(timespec="seconds")),
+                    ("databus_version", DataBUS.__version__),
+                    ("tables", json.dumps(counts)),
+                ],
+            )
+            snapshot.commit()
+        finally:
+            snapshot.close()
+        conn.rollback()
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return counts
+
+
+def snapshot_info(path):
+    """Return when and by which DataBUS version a snapshot was exported.
+
+    Returns:
+        dict: ``created_at``, ``databus_version`` and ``tables`` (rows per table).
+    """
+    snapshot = _connect(path, readonly=True)
+    try:
+        info = dict(snapshot.execute(_METADATA_Q).fetchall())
+    finally:
+        snapshot.close()
+    info["tables"] = json.loads(info.get("tables", "{}"))
+    return info
+
+
+class OfflineConnection:
+    """A psycopg2-compatible connection that validates against a snapshot.
+
+    Lookups run against the SQLite snapshot written by ``export_snapshot``,
+    attached as the ``ndb`` schema, after translating the few PostgreSQL
+    constructs the validators use (``= ANY(...)``, ``unnest``, ``IS NOT
+    DISTINCT FROM``, ``ILIKE``, trigram ``%`` matches, casts and the PostGIS
+    distance of the nearby-site checks, measured to the bounding box of each
+    site). Nothing is ever written: inserts (``INSERT``, ``ts.insert...()``
+    and the ``sqlHelpers`` functions) return placeholder IDs counting down
+    from -1, one per row (see ``PlaceholderCursor``), so every ``valid_*``
+    function runs to completion and the steps downstream get IDs to
+    reference. Transaction control,
+    ``PREPARE``/``EXECUTE`` and the ``sqlHelpers`` installation are accepted
+    as in PostgreSQL.
+
+    A query on a table missing from the snapshot raises ``OfflineError``
+    naming the table, which ``safe_step`` reports as a failure of the step.
+
+    Examples:
+        >>> conn = OfflineConnection('neotoma.sqlite3')
+        >>> cur = conn.cursor()
+        >>> cur.execute("SELECT taxonid FROM ndb.taxa WHERE LOWER(taxonname) = %(name)s;",
+        ...             {"name": "pinus"})  # doctest: +SKIP
+        >>> cur.fetchone()  # doctest: +SKIP
+        (7,)
+
+    Args:
+        path (str): Snapshot written by ``export_snapshot``.
+
+    Raises:
+        FileNotFoundError: If ``path`` does not exist.
+
+    Attributes:
+        path (str): Path of the snapshot.
+        created_at (str | None): When the snapshot was exported.
+        closed (int): 0 while open, as ``psycopg2.connection.closed``.
+    """
+
+    def __init__(self, path):
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"No offline snapshot at {path}.")
+        self.path = path
+        self.created_at = snapshot_info(path).get("created_at")
+        self.closed = 0
+        self._db = _connect(":memory:")
+        self._db.execute("ATTACH DATABASE ? AS ndb", (_uri(path, readonly=True),))
+
+    def __repr__(self):
+        return f"OfflineConnection({self.path!r})"
+
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+    def cursor(self):
+        """Return a new ``OfflineCursor``."""
+        return OfflineCursor(self)
+
+    def commit(self):
+        """Do nothing: an offline connection never writes."""
+
+    def rollback(self):
+        """Do nothing: an offline connection never writes."""
+
+    def close(self):
+        """Close the snapshot."""
+        if not self.closed:
+            self._db.close()
+            self.closed = 1
+
+
+class OfflineCursor(PlaceholderCursor):
+    """Cursor of an ``OfflineConnection``; see there for what it supports.
+
+    Attributes:
+        connection (OfflineConnection): The connection.
+        description (tuple | None): Result columns of the last query, as
+            7-tuples starting with the column name.
+        rowcount (int): Rows returned by the last query, -1 when none.
+    """
+
+    def _keeps(self, text):
+        return True
+
+    def _run(self, query, params):
+        """Run a read against the snapshot; transaction control and DDL do nothing."""
+        if CONTROL.match(query):
+            return
+        if _CATALOG.search(query):
+            self._result([], [("result",)])
+            return
+        sql, values = _translate(query, params)
+        try:
+            cur = self.connection._db.execute(sql, values)
+        except sqlite3.Error as e:
+            missing = _MISSING_TABLE.search(str(e))
+            if missing:
+                raise OfflineError(
+                    f"Table {missing.group(1)} is not in the offline snapshot "
+                    f"{self.connection.path}."
+                ) from e
+            raise OfflineError(f"Query not supported offline ({e}): {query.strip()}") from e
+        self._result(cur.fetchall(), cur.description or [])
+
+
+def _translate(query, params):
+    """Rewrite a psycopg2 query and its parameters for SQLite."""
+    query = _DISTANCE.sub(
+        lambda m: (
+            f"site_distance({m.group(2)}.latitudenorth, {m.group(2)}.longitudeeast, "
+            f"{m.group(2)}.latitudesouth, {m.group(2)}.longitudewest, "
+            f"{m.group(4)}, {m.group(3)}, {1 if m.group(1) else 0})"
+        ),
+        query,
+    )
+    query = _TRIGRAM.sub(rf"similarity(\1, \2) >= {_TRIGRAM_THRESHOLD}", query)
+    query = _CAST.sub("", query)
+    query = _UNNEST.sub(_unnest, query)
+    query = _ANY.sub(r"IN (SELECT value FROM json_each(\1))", query)
+    query = re.sub(r"\bIS\s+NOT\s+DISTINCT\s+FROM\b", "IS", query, flags=re.IGNORECASE)
+    query = re.sub(r"\bIS\s+DISTINCT\s+FROM\b", "IS NOT", query, flags=re.IGNORECASE)
+    query = re.sub(r"\bILIKE\b", "LIKE", query, flags=re.IGNORECASE)
+    if params is None:
+        return query, ()
+    query = _PLACEHOLDER.sub(
+        lambda m: "%" if m.group(0) == "%%" else "?" if m.group(1) is None else f":{m.group(1)}",
+        query,
+    )
+    if isinstance(params, dict):
+        return query, {k: _sqlite_value(v) for k, v in params.items()}
+    return query, [_sqlite_value(v) for v in params]
+
+
+def _unnest(match):
+    """Rewrite ``unnest(a, b) [WITH ORDINALITY] AS k(x, y[, ord])`` over JSON arrays."""
+    arrays = [a.strip() for a in match.group(1).split(",")]
+    names = [n.strip() for n in match.group(4).split(",")]
+    columns = [
+        f"json_extract({array}, '$[' || j.key || ']') AS {name}"
+        for array, name in zip(arrays, names, strict=False)
+    ]
+    if match.group(2):
+        columns.append(f"j.key + 1 AS {names[len(arrays)]}")
+    return f"(SELECT {', '.join(columns)} FROM json_each({arrays[0]}) AS j) AS {match.group(3)}"
+
+
+def _affinity(type_code, values):
+    """SQLite column type for a PostgreSQL type OID, or from the values when unknown."""
+    if type_code in _AFFINITIES:
+        return _AFFINITIES[type_code]
+    value = next((v for v in values if v is not None), None)
+    if isinstance(value, bool | int):
+        return "INTEGER"
+    if isinstance(value, float | decimal.Decimal):
+        return "REAL"
+    if isinstance(value, str):
+        return "TEXT"
+    return ""
+
+
+def _sqlite_value(value):
+    """Convert a value to one SQLite stores and compares like PostgreSQL would."""
+    if value is None or isinstance(value, int | float | str | bytes):
+        return value
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, datetime.date | datetime.datetime | datetime.time):
+        return value.isoformat()
+    if isinstance(value, memoryview):
+        return value.tobytes()
+    if isinstance(value, list | tuple | dict):
+        return json.dumps(value, default=_json_default)
+    return str(value)
+
+
+def _json_default(value):
+    converted = _sqlite_value(value)
+    return converted if not isinstance(converted, bytes) else converted.hex()
+
+
+def _connect(path, readonly=False):
+    """Open a SQLite database with the functions the snapshots rely on.
+
+    ``lower`` replaces SQLite's ASCII-only version with Python's, matching
+    PostgreSQL on accented names; snapshot indexes are built on it.
+    """
+    db = sqlite3.connect(_uri(path, readonly), uri=True, check_same_thread=False)
+    db.create_function("lower", 1, _lower, deterministic=True)
+    db.create_function("similarity", 2, _similarity, deterministic=True)
+    db.create_function("site_distance", 7, _site_distance, deterministic=True)
+    return db
+
+
+def _uri(path, readonly=False):
+    if path == ":memory:":
+        return path
+    uri = "file:" + urllib.request.pathname2url(os.path.abspath(path))
+    return uri + "?mode=ro" if readonly else uri
+
+
+def _lower(value):
+    return value.lower() if isinstance(value, str) else value
+
+
+def _trigrams(text):
+    """Trigrams of ``text`` as pg_trgm extracts them: per word, padded with blanks."""
+    grams = set()
+    for word in re.findall(r"[^\W_]+", text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _similarity(a, b):
+    """pg_trgm ``similarity``: shared trigrams over all distinct trigrams."""
+    if a is None or b is None:
+        return None
+    left, right = _trigrams(str(a)), _trigrams(str(b))
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+def _site_distance(north, east, south, west, lat, long, centroid):
+    """Distance in meters from a point to a site's bounding box (or its centre)."""
+    if None in (north, east, south, west, lat, long):
+        return None
+    if centroid:
+        north = south = (north + south) / 2
+        east = west = (east + west) / 2
+    nearest_lat = min(max(lat, south), north)
+    nearest_long = min(max(long, west), east)
+    phi1, phi2 = math.radians(lat), math.radians(nearest_lat)
+    dphi = phi2 - phi1
+    dlambda = math.radians(nearest_long - long)
+    h = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * _EARTH_RADIUS * math.asin(min(1.0, math.sqrt(h)))
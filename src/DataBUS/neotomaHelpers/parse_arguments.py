@@ -24,6 +24,20 @@ def parse_arguments():
               'template': Path to the YAML/XLSX template file (str)
               'logs': Path to validation logs folder (str)
               'overwrite': Boolean flag for overwriting option (bool)
+              'chunk_size': Rows per block for chunked reading (int), only
+              present when ``--chunk-size`` is given
+              'bulk_data': Bulk insert method for data values ("insert" or
+              "copy"), only present when ``--bulk-data`` is given
+              'jobs': Number of files processed in parallel (int)
+              'incremental': Only re-run the steps whose inputs changed (bool)
+              'validate_only': Validate without running the inserts (bool)
+              'snapshot': Offline snapshot to validate against instead of
+              the database (str), only present when ``--snapshot`` is given
+              'bundle': Save a validation bundle of each valid file and
+              upload from it (bool)
+              'preallocate_ids': Insert analysis units, samples, data, chron
+              controls and sample ages set-based with reserved IDs (bool)
+              'profile': Time and count the queries of every step (bool)
 
     Raises:
         FileNotFoundError: If data directory or template file does not exist.
@@ -63,13 +77,95 @@ def parse_arguments():
         help="Set to True if data should be uploaded to the database after validation.",
     )
 
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=None,
+        help="Read data files in blocks of this many rows to bound memory use. "
+        "By default each file is read at once.",
+    )
+
+    parser.add_argument(
+        "--bulk-data",
+        choices=["insert", "copy"],
+        default=None,
+        help="Insert data values in bulk, with one multi-row INSERT or a COPY per block, "
+        "instead of one ts.insertdata call per value.",
+    )
+
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes, each with its own database connection, "
+        "validating or uploading files in parallel. Defaults to 1.",
+    )
+
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="When validating, only re-run the steps whose template entries, columns or "
+        "upstream steps changed since the previous validation of each file.",
+    )
+
+    parser.add_argument(
+        "--validate-only",
+        action="store_true",
+        help="Validate without writing to the database: lookups still run, but inserts "
+        "return placeholder IDs instead of being executed and rolled back.",
+    )
+
+    parser.add_argument(
+        "--snapshot",
+        type=str,
+        default=None,
+        help="Validate against this offline snapshot of the Neotoma lookup tables "
+        "(see export_snapshot) instead of the database. Inserts get placeholder IDs.",
+    )
+
+    parser.add_argument(
+        "--bundle",
+        action="store_true",
+        help="Save what validating each file worked out next to it (<file>.bundle), and "
+        "upload from it when the file and template are unchanged. Use on both runs.",
+    )
+
+    parser.add_argument(
+        "--preallocate-ids",
+        action="store_true",
+        help="Reserve the IDs of analysis units, samples, data, chron controls and sample "
+        "ages from their sequences and insert each table set-based, falling back on the "
+        "ts.insert functions when a sequence cannot be used.",
+    )
+
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Time and count the queries each step sends; the summary ends each file's log "
+        "and the run's totals are written to query_stats.json in the validation logs folder.",
+    )
+
     args = parser.parse_args()
 
+    if args.jobs < 1:
+        parser.error("--jobs must be a positive integer.")
+
     if not os.path.exists(args.data):
         raise FileNotFoundError(
             f"The path '{args.data}' could not be found within the current path."
         )
 
+    if args.validate_only and args.upload:
+        parser.error("--upload cannot be used with --validate-only.")
+
+    if args.snapshot is not None:
+        if args.upload:
+            parser.error("--upload cannot be used with --snapshot.")
+        if not os.path.isfile(args.snapshot):
+            raise FileNotFoundError(
+                f"The snapshot '{args.snapshot}' could not be found within the current path."
+            )
+
     if not os.path.isfile(args.template):
         raise FileNotFoundError(
             f"The file '{args.template}' could not be found within the current path."
@@ -0,0 +1,248 @@
+import datetime
+import decimal
+import re
+import threading
+import weakref
+
+_NAMED = re.compile(r"%\((\w+)\)s|%s|%%")
+_LABEL = re.compile(r"\b([a-z_]+\.[a-z_]+)\b", re.IGNORECASE)
+
+# psycopg2 codes for a statement that no longer exists in the session or whose
+# cached plan was invalidated by a schema change.
+_STALE_CODES = ("26000", "0A000")
+
+
+class Statement:
+    """One parametrised query, rewritten for ``PREPARE``.
+
+    Attributes:
+        query (str): Query as written for ``cursor.execute``.
+        label (str): Name reported by ``PreparedStatements.stats``.
+        text (str): The query with ``$1..$n`` placeholders.
+        params (tuple | int): Names of the ``%(name)s`` parameters in ``$n``
+            order, or the number of positional ``%s`` parameters.
+    """
+
+    def __init__(self, query, label):
+        self.query = query
+        self.label = label
+        names = []
+        positional = 0
+
+        def placeholder(match):
+            nonlocal positional
+            if match.group(0) == "%%":
+                return "%"
+            if match.group(1) is None:
+                positional += 1
+                return f"${positional}"
+            if match.group(1) not in names:
+                names.append(match.group(1))
+            return f"${names.index(match.group(1)) + 1}"
+
+        self.text = _NAMED.sub(placeholder, query).strip().rstrip(";")
+        if names and positional:
+            raise ValueError("Cannot prepare a query mixing %s and %(name)s placeholders.")
+        self.params = tuple(names) if names else positional
+
+    def values(self, params):
+        """Return the parameter values in ``$n`` order."""
+        if isinstance(self.params, tuple):
+            return [params[name] for name in self.params]
+        return list(params or ())
+
+
+class PreparedStatements:
+    """Connection-scoped registry of server-side prepared statements.
+
+    The model classes send the same ``SELECT ts.insert...(...)`` text for every
+    row, and PostgreSQL parses and plans it every time. When enabled,
+    ``execute`` issues ``PREPARE`` the first time a query is run on a
+    connection and ``EXECUTE`` afterwards, so each row only pays for binding
+    its values.
+
+    A statement is prepared separately for each combination of value types it
+    is called with (integer, numeric, boolean, date, ..., or untyped for
+    strings and None), mirroring how psycopg2 would have typed the literals;
+    an integer column that later receives a float gets its own statement
+    instead of being rounded to the declared type.
+
+    Prepared statements last for the database session and survive rollbacks.
+    The registry notices a new session through the backend PID, and when a
+    statement turns out to be missing or its plan invalid (e.g. after
+    ``DISCARD ALL`` or a schema change) it forgets the session's statements, so
+    they are prepared again once the caller has rolled back.
+
+    Examples:
+        >>> statements = PreparedStatements()
+        >>> statements.execute(cur, "SELECT ts.insertdata(%(sampleid)s, ...)", inputs)  # doctest: +SKIP
+        >>> statements.stats()  # doctest: +SKIP
+        {'ts.insertdata': {'calls': 1200, 'prepares': 1}}
+
+    Args:
+        enabled (bool): Prepare statements. When False ``execute`` is a plain
+            ``cursor.execute``. Defaults to True.
+
+    Attributes:
+        enabled (bool): Whether statements are prepared.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._statements = {}
+        self._names = {}
+        self._sessions = weakref.WeakKeyDictionary()
+        self._calls = {}
+        self._prepares = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def execute(self, cur, query, params=None):
+        """Run ``query`` with ``params`` on ``cur``, through a prepared statement.
+
+        Args:
+            cur (psycopg2.cursor): Database cursor; results are fetched from it
+                as after ``cur.execute``.
+            query (str): Query with ``%(name)s`` or ``%s`` placeholders.
+            params (dict | sequence, optional): Parameter values.
+        """
+        statement = self.statement(query)
+        self._calls[statement.label] = self._calls.get(statement.label, 0) + 1
+        if not self.enabled:
+            cur.execute(query, params)
+            return
+        values = statement.values(params)
+        types = tuple(_pg_type(v) for v in values)
+        conn, prepared = self._session(cur)
+        name = self._name(statement, types)
+        if name not in prepared:
+            declared = f" ({', '.join(types)})" if types else ""
+            cur.execute(f"PREPARE {name}{declared} AS {statement.text}")
+            prepared.add(name)
+            self._prepares[statement.label] = self._prepares.get(statement.label, 0) + 1
+        arguments = f" ({', '.join(['%s'] * len(values))})" if values else ""
+        try:
+            cur.execute(f"EXECUTE {name}{arguments}", values)
+        except Exception as e:
+            if getattr(e, "pgcode", None) in _STALE_CODES:
+                self.invalidate(conn)
+            raise
+
+    def statement(self, query):
+        """Return the ``Statement`` for ``query``, parsing it once."""
+        statement = self._statements.get(query)
+        if statement is None:
+            with self._lock:
+                statement = self._statements.get(query)
+                if statement is None:
+                    statement = Statement(query, self._label(query))
+                    self._statements[query] = statement
+        return statement
+
+    def invalidate(self, conn=None):
+        """Forget the statements prepared on one connection, or on all of them.
+
+        Later calls prepare them again under new names, so names left behind
+        in a still-open session never collide.
+        """
+        with self._lock:
+            self._generation += 1
+            self._names.clear()
+            if conn is None:
+                self._sessions.clear()
+            else:
+                self._sessions.pop(conn, None)
+
+    def stats(self):
+        """Return ``{label: {"calls": n, "prepares": m}}`` for every statement run."""
+        return {
+            label: {"calls": calls, "prepares": self._prepares.get(label, 0)}
+            for label, calls in self._calls.items()
+        }
+
+    def reset_stats(self):
+        """Zero the per-statement counters."""
+        self._calls.clear()
+        self._prepares.clear()
+
+    def _session(self, cur):
+        """Return the connection of ``cur`` and the statement names prepared on it."""
+        conn = getattr(cur, "connection", None) or cur
+        pid = _backend_pid(conn)
+        session = self._sessions.get(conn)
+        if session is None or session[0] != pid:
+            session = self._sessions[conn] = (pid, set())
+        return conn, session[1]
+
+    def _name(self, statement, types):
+        key = (statement.query, types)
+        name = self._names.get(key)
+        if name is None:
+            with self._lock:
+                name = self._names.setdefault(
+                    key, f"databus_{self._generation}_{len(self._names) + 1}"
+                )
+        return name
+
+    def _label(self, query):
+        match = _LABEL.search(query)
+        label = match.group(1).lower() if match else "statement"
+        taken = {s.label for s in self._statements.values()}
+        if label in taken:
+            n = 2
+            while f"{label}#{n}" in taken:
+                n += 1
+            label = f"{label}#{n}"
+        return label
+
+
+def _backend_pid(conn):
+    info = getattr(conn, "info", None)
+    return getattr(info, "backend_pid", None)
+
+
+def _pg_type(value):
+    """Return the type psycopg2 gives ``value`` as a literal ("unknown" when untyped)."""
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, int):
+        return "integer" if -(2**31) <= value < 2**31 else "bigint"
+    if isinstance(value, float | decimal.Decimal):
+        return "numeric"
+    if isinstance(value, datetime.datetime):
+        return "timestamp"
+    if isinstance(value, datetime.date):
+        return "date"
+    return "unknown"
+
+
+_PREPARED = PreparedStatements(enabled=False)
+
+
+def get_prepared_statements():
+    """Return the process-wide ``PreparedStatements`` used by the model classes."""
+    return _PREPARED
+
+
+def use_prepared_statements(enabled=True):
+    """Turn server-side prepared statements on or off for the model classes.
+
+    Disabled by default, so every insert sends its full SQL text. Turning it
+    off also forgets every prepared statement.
+
+    Args:
+        enabled (bool): Whether model inserts go through ``PREPARE``/``EXECUTE``.
+            Defaults to True.
+
+    Returns:
+        PreparedStatements: The process-wide registry.
+    """
+    _PREPARED.enabled = bool(enabled)
+    if not enabled:
+        _PREPARED.invalidate()
+    return _PREPARED
+
+
+def execute_prepared(cur, query, params=None):
+    """Run ``query`` through the process-wide prepared-statement registry."""
+    _PREPARED.execute(cur, query, params)
@@ -18,7 +18,7 @@ def pull_overwrite(params, yml_dict, table=None):
 
     Args:
         params (list): A list of strings for the columns needed to generate the insert statement.
-        yml_dict (dict): A dict returned by the YAML template.
+        yml_dict (dict | CompiledTemplate): A dict returned by the YAML template.
         table (str or list, optional): The name of the table(s) the parameters are being drawn for.
                                       If a list, returns results for each table.
 
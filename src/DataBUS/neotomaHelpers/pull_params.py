@@ -1,6 +1,9 @@
 import re
 
-from . import utils as ut
+from .chunked_reader import ChunkedReader
+from .compiled_template import CompiledTemplate
+from .extraction_cache import get_extraction_cache
+from .extraction_plan import compile_plan
 
 
 def pull_params(params, yml_dict, csv_template, table=None):
@@ -10,9 +13,21 @@ def pull_params(params, yml_dict, csv_template, table=None):
     (date, int, float, coordinates, string), handles special cases like notes and
     chronologies, and returns cleaned data ready for insertion.
 
+    For columnar inputs (``read_csv(..., columnar=True)``) results and converted
+    columns are memoised per file in an ``ExtractionCache``, so repeated calls
+    from different validators do not re-clean the same columns. A
+    ``ChunkedReader`` is answered from a projection holding only the columns
+    this call needs; use ``pull_params_blocks`` to process it block by block.
+
+    The template is turned into an ``ExtractionPlan`` for the table (see
+    ``compile_plan``) and the plan is executed against ``csv_template``. With a
+    ``CompiledTemplate`` the plan is built on the first call and reused for
+    every later file.
+
     Args:
         params (list): List of strings for columns needed to generate insert statement.
-        yml_dict (dict): Dictionary returned by YAML template containing 'metadata' key.
+        yml_dict (dict | CompiledTemplate): Dictionary returned by YAML template
+            containing 'metadata' key.
         csv_template (dict): CSV data as list of dictionaries with column data to upload.
         table (str or list, optional): Name of the table(s) parameters are drawn for.
                                       If list, returns results for each table.
@@ -25,61 +40,87 @@ def pull_params(params, yml_dict, csv_template, table=None):
                       Returns hierarchical dicts for special tables like chronologies/sampleages.
     """
     if isinstance(table, list):
+        if not isinstance(yml_dict, CompiledTemplate):
+            yml_dict = CompiledTemplate(yml_dict)
         return [pull_params(params, yml_dict, csv_template, item) for item in table]
 
-    add_unit_inputs = {}
     if re.match(r".*\.$", table) is None:
         table = table + "."
-    params = ut.prepare_parameters(params, yml_dict, table)
-    for i in params:
-        _process_parameter(i, table, yml_dict, csv_template, add_unit_inputs)
-    return ut.finalize_output(add_unit_inputs)
+    cache = get_extraction_cache(csv_template)
+    if cache is not None:
+        cached = cache.get(yml_dict, table, params)
+        if cached is not None:
+            return cached
+    plan = compile_plan(params, yml_dict, table)
+    if isinstance(csv_template, ChunkedReader):
+        csv_template = csv_template.project(plan.columns)
+    result = plan.execute(csv_template, cache)
+    if cache is not None:
+        return cache.put(yml_dict, table, params, result)
+    return result
 
 
-def _process_parameter(param_name, table, yml_dict, csv_template, add_unit_inputs):
-    """Process a single parameter, handling all special cases."""
-    valor = ut.retrieve_dict(yml_dict, table + param_name)
-    if not valor:
-        add_unit_inputs[param_name] = None
-        return
-    for val in valor:
-        _process_value_entry(param_name, val, csv_template, table, add_unit_inputs)
-
-
-def _process_value_entry(param_name, val_entry, csv_template, table, add_unit_inputs):
-    """Process a single value entry with type conversion and special case handling."""
-    sheet = val_entry.get("sheet")
-    if sheet is not None and isinstance(csv_template, dict):
-        template_rows = csv_template.get(sheet, [])
-    else:
-        template_rows = csv_template
-    try:
-        clean_valor = ut.clean_column(
-            val_entry.get("column"), template_rows, clean=not val_entry.get("rowwise")
-        )
-    except KeyError:
-        return
-    if not clean_valor:
-        if "taxonname" not in val_entry:
-            add_unit_inputs[param_name] = None
+def pull_params_blocks(params, yml_dict, csv_template, table):
+    """Yield ``pull_params`` results block by block.
+
+    For a ``ChunkedReader`` the file is read one block at a time and
+    ``pull_params`` is run on each block, so rowwise values only cover the
+    rows of that block. Non-rowwise values are resolved over the whole file
+    first and are identical in every block. Taxon columns that have values
+    somewhere in the file are kept (as None) in blocks where they are empty,
+    as they are when the whole file is read. Any other input yields a single
+    block holding the ``pull_params`` result for the whole file.
+
+    Examples:
+        >>> reader = ChunkedReader('aedna_export.csv', chunk_size=5000)  # doctest: +SKIP
+        >>> for rows, inputs in pull_params_blocks(['depth'], yml_dict, reader,
+        ...                                        'ndb.analysisunits'):  # doctest: +SKIP
+        ...     rows, len(inputs['depth'])
+        (slice(0, 5000, None), 5000)
+        (slice(5000, 6234, None), 1234)
+
+    Args:
+        params (list): List of strings for columns needed to generate insert statement.
+        yml_dict (dict | CompiledTemplate): Template dictionary containing 'metadata' key.
+        csv_template (list | ColumnTable | SheetTables | ChunkedReader): Parsed input file.
+        table (str): Name of the table the parameters are drawn for.
+
+    Yields:
+        tuple[slice, dict]: The rows of the file covered by the block, usable
+            to slice row-aligned ID lists (``slice(0, None)`` for the whole
+            file), and the cleaned parameters for the block.
+    """
+    if not isinstance(csv_template, ChunkedReader):
+        yield slice(0, None), pull_params(params, yml_dict, csv_template, table)
         return
-    clean_valor = ut.convert_value_by_type(val_entry, clean_valor)
-    if not clean_valor:
-        if "taxonname" not in val_entry:
-            add_unit_inputs[param_name] = None
+    if re.match(r".*\.$", table) is None:
+        table = table + "."
+    if not isinstance(yml_dict, CompiledTemplate):
+        yml_dict = CompiledTemplate(yml_dict)
+    plan = compile_plan(params, yml_dict, table)
+    resolved = csv_template.resolve(
+        (e.get("sheet"), e.get("column")) for e in plan.entries(rowwise=False)
+    )
+    taxa = [e for e in plan.entries(rowwise=True) if "taxonname" in e]
+    filled = csv_template.filled((e.get("sheet"), e.get("column")) for e in taxa)
+    for rows, block in csv_template.chunks():
+        csv_template.pin(block, resolved)
+        result = pull_params(params, yml_dict, block, table)
+        for entry in taxa:
+            sheet = entry.get("sheet") if csv_template.is_xlsx else None
+            if (sheet, entry.get("column")) in filled:
+                sheet_rows = block.get(sheet, ()) if csv_template.is_xlsx else block
+                _restore_empty_taxon(result, entry, len(sheet_rows))
+        yield rows, result
+
+
+def _restore_empty_taxon(add_unit_inputs, value_meta, n_rows):
+    """Re-add a taxon column that ``add_taxon_entry`` dropped as empty in this block."""
+    asv = value_meta.get("asv")
+    entry_key = f"{value_meta['taxonname']}::{asv}" if asv else value_meta["taxonname"]
+    key = value_meta["neotoma"].split(".")[-1]
+    if key in add_unit_inputs.get(entry_key, {}):
         return
-    if param_name == "notes":
-        ut.add_note_entry(add_unit_inputs, clean_valor)
-    elif any(k in table for k in ("chronologies", "sampleages")):
-        ut.add_chronology_entry(add_unit_inputs, val_entry, clean_valor, table, param_name)
-    elif "taxonname" in val_entry:
-        ut.add_taxon_entry(add_unit_inputs, val_entry, clean_valor)
-    elif param_name == "contactname":
-        if isinstance(clean_valor, str):
-            add_unit_inputs[param_name] = [v.strip() for v in clean_valor.split("|") if v.strip()]
-        else:
-            add_unit_inputs[param_name] = [
-                value.strip() for item in clean_valor for value in item.split("|") if value.strip()
-            ]
-    else:
-        add_unit_inputs[param_name] = clean_valor
+    add_unit_inputs.setdefault(entry_key, {})[key] = [None] * n_rows
+    if "uncertaintybasisid" in value_meta:
+        add_unit_inputs[entry_key]["uncertaintybasisid"] = value_meta["uncertaintybasisid"]
@@ -0,0 +1,315 @@
+import contextlib
+import json
+import math
+import re
+import time
+
+# Step the queries sent outside ``safe_step`` are counted under.
+FILE_STEP = "(file)"
+
+_LITERAL = re.compile(
+    r"'(?:[^']|'')*'|%\(\w+\)s|%s|\$\d+|\bdatabus_\d+_\d+\b|(?<![\w.])-?\d+(?:\.\d+)?\b"
+)
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+# Latency histogram buckets per doubling of the duration; a percentile is
+# reported as the upper bound of its bucket, within 19% of the true value.
+_BUCKETS_PER_OCTAVE = 4
+
+
+def fingerprint(query):
+    """Return ``query`` with its literals and placeholders replaced by ``?``.
+
+    Queries that differ only in their values share a fingerprint, e.g. every
+    ``SELECT ts.insertdata(...)`` of a file, whatever its parameters.
+
+    Examples:
+        >>> fingerprint("SELECT * FROM ndb.taxa WHERE taxonid IN (1, 2, 3) AND x = 'a'")
+        'SELECT * FROM ndb.taxa WHERE taxonid IN (?...) AND x = ?'
+
+    Args:
+        query (str): SQL text, with or without psycopg2 placeholders.
+
+    Returns:
+        str: The normalized text on one line.
+    """
+    text = _LITERAL.sub(lambda m: "databus_?" if m.group(0).startswith("databus_") else "?", query)
+    text = _LIST.sub("(?...)", text)
+    return _SPACE.sub(" ", text).strip().rstrip(";").rstrip()
+
+
+class QueryStats:
+    """Query counts and latencies of one file or run, by step and statement.
+
+    ``InstrumentedCursor`` records every statement it sends (``record``) and
+    the rows fetched back (``fetched``) under the current step, which
+    ``safe_step`` sets with ``step`` for the duration of each validator.
+    Each step keeps its number of queries, total time, rows fetched and a
+    latency histogram for percentiles; each statement fingerprint keeps its
+    calls, time and rows. Stats of several files merge with ``merge``.
+
+    Examples:
+        >>> stats = QueryStats()
+        >>> with stats.step('sites'):
+        ...     stats.record("SELECT 1 FROM ndb.sites WHERE siteid = %s", 0.002)
+        >>> stats.summary()[0]['queries']
+        1
+
+    Attributes:
+        steps (dict): Step → ``{"queries", "seconds", "rows", "histogram"}``.
+        statements (dict): ``(step, fingerprint)`` → ``{"calls", "seconds", "rows"}``.
+        current (str): Step the next statements are counted under.
+    """
+
+    def __init__(self):
+        self.steps = {}
+        self.statements = {}
+        self.current = FILE_STEP
+        self._last = None
+
+    @contextlib.contextmanager
+    def step(self, name):
+        """Count the statements sent inside the ``with`` block under ``name``."""
+        previous, self.current = self.current, name
+        try:
+            yield self
+        finally:
+            self.current = previous
+
+    def record(self, query, seconds):
+        """Count one statement of the current step that took ``seconds``."""
+        step = self._step(self.current)
+        step["queries"] += 1
+        step["seconds"] += seconds
+        bucket = _bucket(seconds)
+        step["histogram"][bucket] = step["histogram"].get(bucket, 0) + 1
+        key = (self.current, fingerprint(query))
+        statement = self.statements.get(key)
+        if statement is None:
+            statement = self.statements[key] = {"calls": 0, "seconds": 0.0, "rows": 0}
+        statement["calls"] += 1
+        statement["seconds"] += seconds
+        self._last = key
+
+    def fetched(self, rows):
+        """Count ``rows`` fetched from the last statement."""
+        if self._last is None or not rows:
+            return
+        self._step(self._last[0])["rows"] += rows
+        self.statements[self._last]["rows"] += rows
+
+    def merge(self, other):
+        """Add the counts of ``other`` to these."""
+        for name, theirs in other.steps.items():
+            ours = self._step(name)
+            for key in ("queries", "seconds", "rows"):
+                ours[key] += theirs[key]
+            for bucket, n in theirs["histogram"].items():
+                ours["histogram"][bucket] = ours["histogram"].get(bucket, 0) + n
+        for key, theirs in other.statements.items():
+            ours = self.statements.setdefault(key, {"calls": 0, "seconds": 0.0, "rows": 0})
+            for k in ("calls", "seconds", "rows"):
+                ours[k] += theirs[k]
+        return self
+
+    @classmethod
+    def merged(cls, stats):
+        """Return the sum of several ``QueryStats``; None entries are skipped."""
+        total = cls()
+        for s in stats:
+            if s is not None:
+                total.merge(s)
+        return total
+
+    def summary(self):
+        """Return one dict per step, most time first.
+
+        Returns:
+            list[dict]: ``step``, ``queries``, ``seconds``, ``rows`` and the
+                ``p50``/``p95``/``p99`` latencies in seconds.
+        """
+        rows = []
+        for name, step in self.steps.items():
+            row = {"step": name, "queries": step["queries"], "seconds": step["seconds"]}
+            row["rows"] = step["rows"]
+            for p in (50, 95, 99):
+                row[f"p{p}"] = _percentile(step["histogram"], step["queries"], p)
+            rows.append(row)
+        return sorted(rows, key=lambda r: r["seconds"], reverse=True)
+
+    def top(self, n=10):
+        """Return the ``n`` statements that took the most time, as dicts."""
+        rows = [
+            {"step": step, "statement": text, **counts}
+            for (step, text), counts in self.statements.items()
+        ]
+        return sorted(rows, key=lambda r: r["seconds"], reverse=True)[:n]
+
+    def report(self, top=5):
+        """Return the summary as log lines: totals, each step, the slowest statements."""
+        steps = self.summary()
+        queries = sum(s["queries"] for s in steps)
+        seconds = sum(s["seconds"] for s in steps)
+        lines = [f"Queries: {queries} in {seconds:.3f} s"]
+        for s in steps:
+            lines.append(
+                f"  {s['step']}: {s['queries']} queries, {s['seconds']:.3f} s "
+                f"(p50 {_ms(s['p50'])}, p95 {_ms(s['p95'])}, p99 {_ms(s['p99'])}), "
+                f"{s['rows']} rows"
+            )
+        for s in self.top(top):
+            text = s["statement"] if len(s["statement"]) <= 120 else s["statement"][:117] + "..."
+            lines.append(f"  [{s['step']}] {s['calls']} x {s['seconds']:.3f} s: {text}")
+        return lines
+
+    def to_dict(self):
+        """Return the summary and every statement, for JSON."""
+        return {"steps": self.summary(), "statements": self.top(len(self.statements))}
+
+    def write(self, path):
+        """Write ``to_dict`` to ``path`` as JSON."""
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(self.to_dict(), fh, indent=2)
+
+    def _step(self, name):
+        step = self.steps.get(name)
+        if step is None:
+            step = self.steps[name] = {"queries": 0, "seconds": 0.0, "rows": 0, "histogram": {}}
+        return step
+
+
+class InstrumentedCursor:
+    """Cursor wrapper that times each statement and counts the rows fetched.
+
+    Args:
+        cursor (psycopg2.cursor): Cursor the statements run on.
+        stats (QueryStats): Where they are recorded.
+
+    Attributes:
+        cursor (psycopg2.cursor): The wrapped cursor.
+        stats (QueryStats): The stats recorded to.
+    """
+
+    def __init__(self, cursor, stats):
+        self.cursor = cursor
+        self.stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cursor.close()
+
+    def __iter__(self):
+        for row in self.cursor:
+            self.stats.fetched(1)
+            yield row
+
+    def execute(self, query, params=None):
+        start = time.perf_counter()
+        try:
+            return self.cursor.execute(query, params)
+        finally:
+            self.stats.record(query, time.perf_counter() - start)
+
+    def executemany(self, query, params_seq):
+        start = time.perf_counter()
+        try:
+            return self.cursor.executemany(query, params_seq)
+        finally:
+            self.stats.record(query, time.perf_counter() - start)
+
+    def copy_expert(self, sql, file, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self.cursor.copy_expert(sql, file, *args, **kwargs)
+        finally:
+            self.stats.record(sql, time.perf_counter() - start)
+
+    def fetchone(self):
+        row = self.cursor.fetchone()
+        self.stats.fetched(0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=1):
+        rows = self.cursor.fetchmany(size)
+        self.stats.fetched(len(rows or ()))
+        return rows
+
+    def fetchall(self):
+        rows = self.cursor.fetchall()
+        self.stats.fetched(len(rows or ()))
+        return rows
+
+
+class InstrumentedConnection:
+    """Connection wrapper whose cursors record their queries in ``query_stats``.
+
+    ``safe_step`` counts the queries of each step under the step's name, and
+    ``run_file`` starts new stats for every file and logs their summary
+    (``QueryStats.report``). Everything but ``cursor`` goes to the wrapped
+    connection.
+
+    Examples:
+        >>> conn = InstrumentedConnection(psycopg2.connect(**connection))  # doctest: +SKIP
+        >>> result = run_file(conn, 'data/lake.csv', yml_dict)  # doctest: +SKIP
+        >>> result.query_stats.summary()[0]  # doctest: +SKIP
+        {'step': 'data', 'queries': 1204, 'seconds': 3.1, 'rows': 1180, 'p50': 0.0021, ...}
+
+    Args:
+        connection (psycopg2.connection): Connection to wrap.
+        stats (QueryStats, optional): Stats to record to. Defaults to new ones.
+
+    Attributes:
+        wrapped (psycopg2.connection): The wrapped connection.
+        query_stats (QueryStats): The stats the cursors record to.
+    """
+
+    def __init__(self, connection, stats=None):
+        self.wrapped = connection
+        self.query_stats = stats if stats is not None else QueryStats()
+
+    def __getattr__(self, name):
+        return getattr(self.wrapped, name)
+
+    def cursor(self, *args, **kwargs):
+        """Return an ``InstrumentedCursor`` over a new cursor of the connection."""
+        return InstrumentedCursor(self.wrapped.cursor(*args, **kwargs), self.query_stats)
+
+
+def query_step(conn, name):
+    """Count the queries sent on ``conn`` inside a ``with`` block under step ``name``.
+
+    A no-op for connections that are not instrumented.
+    """
+    stats = getattr(conn, "query_stats", None)
+    if isinstance(stats, QueryStats):
+        return stats.step(name)
+    return contextlib.nullcontext()
+
+
+def _bucket(seconds):
+    if seconds <= 1e-6:
+        return 0
+    return max(0, math.ceil(math.log2(seconds * 1e6) * _BUCKETS_PER_OCTAVE))
+
+
+def _percentile(histogram, total, p):
+    """Return the upper bound, in seconds, of the bucket holding the ``p``-th percentile."""
+    if not total:
+        return 0.0
+    rank = math.ceil(total * p / 100)
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen >= rank:
+            return 2 ** (bucket / _BUCKETS_PER_OCTAVE) / 1e6
+    return 0.0
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:.1f} ms"
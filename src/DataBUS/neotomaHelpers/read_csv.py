@@ -1,10 +1,13 @@
 import csv
+import itertools
 import logging
 
 import openpyxl
 
+from .column_table import ColumnTable, SheetTables
 
-def read_xlsx(filename, num_headers=1):
+
+def read_xlsx(filename, num_headers=1, columnar=False):
     """Read an Excel file and return a dict mapping sheet names to rows.
 
     Each sheet is parsed into a list of dictionaries using the header row(s)
@@ -15,6 +18,9 @@ def read_xlsx(filename, num_headers=1):
     Sheets where the second row has no ``None`` values are assumed to have
     a single header row (the second row is treated as data).
 
+    With ``columnar=True`` each sheet is returned as a ``ColumnTable`` built
+    directly from the worksheet row iterator.
+
     Examples:
         >>> read_xlsx('data.xlsx')  # doctest: +SKIP
         {'Site': [{'site_name': 'Lake X', 'lat': '45.0'}], 'Samples': [...]}
@@ -24,9 +30,12 @@ def read_xlsx(filename, num_headers=1):
         num_headers (int): Number of header rows declared in the template.
             When >= 2, multi-row header combining is attempted per sheet.
             Defaults to 1.
+        columnar (bool): Return a ``ColumnTable`` per sheet instead of a list
+            of row dicts. Defaults to False.
 
     Returns:
-        dict: Mapping of sheet name (str) to list of row dicts.
+        dict: Mapping of sheet name (str) to list of row dicts, or a
+            ``SheetTables`` mapping to ``ColumnTable`` when ``columnar`` is True.
     """
     try:
         wb = openpyxl.load_workbook(filename, read_only=True, data_only=True)
@@ -37,28 +46,79 @@ def read_xlsx(filename, num_headers=1):
         logging.error(f"Error opening Excel file {filename}: {e}")
         return {}
 
-    result = {}
+    result = SheetTables() if columnar else {}
     for sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-        rows = list(ws.iter_rows(values_only=True))
-        if not rows:
-            result[sheet_name] = []
-            continue
-        if num_headers >= 2 and len(rows) >= 2 and any(v is None for v in rows[1]):
-            headers = _combine_header_rows(rows[0], rows[1])
-            data_start = num_headers
+        headers, data = _sheet_rows(wb[sheet_name], num_headers)
+        if columnar:
+            result[sheet_name] = ColumnTable.from_rows(headers, data)
         else:
-            headers = [str(h) if h is not None else f"col_{i}" for i, h in enumerate(rows[0])]
-            data_start = 1
-        result[sheet_name] = [
-            dict(zip(headers, row, strict=False))
-            for row in rows[data_start:]
-            if any(v is not None for v in row)
-        ]
+            result[sheet_name] = [dict(zip(headers, row, strict=False)) for row in data]
     wb.close()
     return result
 
 
+def iter_xlsx_chunks(filename, chunk_size=10000, num_headers=1):
+    """Read an Excel file in blocks of at most ``chunk_size`` rows per sheet.
+
+    Every sheet is streamed in lockstep: block ``i`` holds rows
+    ``[i * chunk_size, (i + 1) * chunk_size)`` of each sheet, so only one
+    block per sheet is held in memory. Sheets that run out of rows yield empty
+    tables until the longest sheet is exhausted. Headers are handled as in
+    ``read_xlsx``.
+
+    Examples:
+        >>> for block in iter_xlsx_chunks('data.xlsx', chunk_size=5000):  # doctest: +SKIP
+        ...     block['Samples'].n_rows
+        5000
+
+    Args:
+        filename (str): Path to the .xlsx file to read.
+        chunk_size (int): Maximum number of data rows per sheet in a block.
+            Defaults to 10000.
+        num_headers (int): Number of header rows declared in the template.
+            Defaults to 1.
+
+    Yields:
+        SheetTables: Mapping of sheet name to the ``ColumnTable`` for the block.
+    """
+    try:
+        wb = openpyxl.load_workbook(filename, read_only=True, data_only=True)
+    except FileNotFoundError:
+        logging.error(f"Excel file not found: {filename}")
+        return
+    except Exception as e:
+        logging.error(f"Error opening Excel file {filename}: {e}")
+        return
+    try:
+        sheets = {name: _sheet_rows(wb[name], num_headers) for name in wb.sheetnames}
+        first = True
+        while True:
+            block = SheetTables()
+            for name, (headers, data) in sheets.items():
+                block[name] = ColumnTable.from_rows(headers, itertools.islice(data, chunk_size))
+            if not first and not any(table.n_rows for table in block.values()):
+                return
+            first = False
+            yield block
+    finally:
+        wb.close()
+
+
+def _sheet_rows(ws, num_headers):
+    """Return the headers and a lazy iterator over the non-empty data rows of ``ws``."""
+    rows = ws.iter_rows(values_only=True)
+    head = list(itertools.islice(rows, 2))
+    if not head:
+        return [], iter(())
+    if num_headers >= 2 and len(head) >= 2 and any(v is None for v in head[1]):
+        headers = _combine_header_rows(head[0], head[1])
+        data = itertools.islice(rows, max(num_headers - 2, 0), None)
+    else:
+        headers = [str(h) if h is not None else f"col_{i}" for i, h in enumerate(head[0])]
+        data = itertools.chain(head[1:], rows)
+    return headers, (row for row in data if any(v is not None for v in row))
+
+
 def _combine_header_rows(row0, row1):
     """Combine two header rows into a single list of column names.
 
@@ -83,11 +143,12 @@ def _combine_header_rows(row0, row1):
     return headers
 
 
-def read_csv(filename):
+def read_csv(filename, columnar=False):
     """Read CSV file and return a structured list of dictionaries.
 
     Parses a CSV file and converts each row into a dictionary with column headers
-    as keys.
+    as keys. With ``columnar=True`` the rows are stored column-wise in a
+    ``ColumnTable`` instead, which still iterates as row dictionaries.
 
     Examples:
         >>> read_csv('pollen_data.csv')  # doctest: +SKIP
@@ -95,10 +156,12 @@ def read_csv(filename):
 
     Args:
         filename (str): Path to the CSV file to read.
+        columnar (bool): Return a ``ColumnTable`` instead of a list of dicts.
+            Defaults to False.
 
     Returns:
-        list: List of dictionaries where each dictionary represents a row,
-              with column headers as keys.
+        list | ColumnTable: List of dictionaries where each dictionary represents a row,
+              with column headers as keys, or the equivalent ``ColumnTable``.
     """
     with open(filename) as f:
         try:
@@ -115,7 +178,45 @@ def read_csv(filename):
             return []
 
         try:
+            if columnar:
+                return ColumnTable.from_rows(headers, file_data)
             return [dict(zip(headers, row, strict=False)) for row in file_data]
         except Exception as e:
             logging.error(f"Error parsing CSV rows from {filename}: {e}")
             return []
+
+
+def iter_csv_chunks(filename, chunk_size=10000):
+    """Read a CSV file in blocks of at most ``chunk_size`` rows.
+
+    Only one block is held in memory at a time. A file with a header and no
+    data rows yields a single empty block, so callers always see the headers.
+
+    Examples:
+        >>> [block.n_rows for block in iter_csv_chunks('pollen_data.csv', 2)]  # doctest: +SKIP
+        [2, 2, 1]
+
+    Args:
+        filename (str): Path to the CSV file to read.
+        chunk_size (int): Maximum number of data rows per block. Defaults to 10000.
+
+    Yields:
+        ColumnTable: The rows of the next block.
+    """
+    with open(filename) as f:
+        try:
+            file_data = csv.reader(f)
+            headers = next(file_data)
+        except StopIteration:
+            logging.error(f"CSV file is empty: {filename}")
+            return
+        except Exception as e:
+            logging.error(f"Error reading CSV file {filename}: {e}")
+            return
+        first = True
+        while True:
+            block = ColumnTable.from_rows(headers, itertools.islice(file_data, chunk_size))
+            if not first and not block.n_rows:
+                return
+            first = False
+            yield block
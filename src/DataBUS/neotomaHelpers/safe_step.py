@@ -1,5 +1,7 @@
 from DataBUS.Response import Response
 
+from .query_stats import query_step
+
 
 def safe_step(name, fn, logfile, conn):
     """Run a single validation step inside a savepoint.
@@ -9,6 +11,9 @@ def safe_step(name, fn, logfile, conn):
     Response (never None) so that downstream steps can inspect messages
     rather than receiving a bare None.
 
+    On an ``InstrumentedConnection`` the queries of the step, savepoints
+    included, are counted under ``name`` (``query_step``).
+
     Args:
         name (str): Human-readable step name (for log messages).
         fn (callable): Zero-argument callable that executes the step and
@@ -20,6 +25,11 @@ def safe_step(name, fn, logfile, conn):
         Response: the fn() result on success, or a failed Response whose
             message contains the error detail on failure.
     """
+    with query_step(conn, name):
+        return _safe_step(name, fn, logfile, conn)
+
+
+def _safe_step(name, fn, logfile, conn):
     sp = f"sp_{name.replace(' ', '_').lower()}"
     sp_cur = conn.cursor()
     try:
@@ -0,0 +1,206 @@
+import hashlib
+import importlib.resources
+import re
+import threading
+import weakref
+
+# Helper functions created from the ``DataBUS.sqlHelpers`` scripts by the
+# model classes: function name -> script.
+SQL_FUNCTIONS = {
+    "insert_data_uncertainty": "insert_data_uncertainty.sql",
+    "insert_entitycovers": "insert_entitycovers.sql",
+    "insert_entitydripheight": "insert_entitydripheight.sql",
+    "insert_entitygeology": "insert_entitygeology.sql",
+    "insert_entitylandusecover": "insert_entitylandusecover.sql",
+    "insert_entitysamples": "insert_entitysamples.sql",
+    "insert_entityvegetationcover": "insert_entityvegetationcover.sql",
+    "insert_externalspeleothem": "insert_externalspeleothem.sql",
+    "insert_hiatus": "insert_hiatus.sql",
+    "insert_hiatuschronology": "insert_hiatuschronology.sql",
+    "insert_lead_model": "insert_pb_model.sql",
+    "insert_speleothem": "insert_speleothem.sql",
+    "insert_uraniumseriesdata": "insert_uraniumseriesdata.sql",
+    "insert_uthseries": "insert_uthseries.sql",
+}
+
+_BODY = re.compile(r"AS\s+(\$\w*\$)(.*?)\1", re.DOTALL | re.IGNORECASE)
+
+_VERSIONS_Q = """SELECT proname, md5(prosrc) FROM pg_proc
+                 WHERE proname = ANY(%(names)s) AND pg_function_is_visible(oid);"""
+
+
+class SqlFunction:
+    """One ``CREATE OR REPLACE FUNCTION`` script of ``DataBUS.sqlHelpers``.
+
+    Attributes:
+        name (str): Function name.
+        definition (str): Full text of the script.
+        version (str): MD5 hex digest of the function body, the text between
+            the dollar quotes. PostgreSQL stores the same text in
+            ``pg_proc.prosrc``, so ``md5(prosrc)`` identifies the installed
+            version.
+    """
+
+    def __init__(self, name, definition):
+        self.name = name
+        self.definition = definition
+        body = _BODY.search(definition)
+        if body is None:
+            raise ValueError(f"No dollar-quoted body found in the definition of {name}.")
+        self.version = hashlib.md5(body.group(2).encode("utf-8")).hexdigest()
+
+    def __repr__(self):
+        return f"SqlFunction({self.name!r}, version={self.version[:8]!r})"
+
+    @classmethod
+    def load(cls, name):
+        """Read the script of ``name`` from the ``DataBUS.sqlHelpers`` package."""
+        script = importlib.resources.files("DataBUS.sqlHelpers").joinpath(SQL_FUNCTIONS[name])
+        return cls(name, script.read_text(encoding="UTF-8"))
+
+
+class FunctionRegistry:
+    """Installs the ``sqlHelpers`` functions at most once per database session.
+
+    The model classes used to run the whole ``CREATE OR REPLACE FUNCTION``
+    script before every insert, rewriting the catalog and recompiling the
+    function each time. ``require`` replaces that: it compares the body of the
+    installed function (``md5(pg_proc.prosrc)``) with the packaged script and
+    only creates the function when it is missing or outdated.
+
+    ``install`` checks and creates all functions in one go and commits, after
+    which ``require`` issues no query at all for that connection. Without it,
+    ``require`` still checks on each call, and only remembers functions it
+    found already installed: a function it had to create itself lives in the
+    caller's transaction and disappears if that transaction is rolled back.
+
+    Examples:
+        >>> registry = FunctionRegistry()
+        >>> registry.install(conn)  # doctest: +SKIP
+        ['insert_hiatus', 'insert_speleothem']
+        >>> registry.require(cur, 'insert_hiatus')  # doctest: +SKIP
+        >>> registry.stats()  # doctest: +SKIP
+        {'hits': 1, 'checks': 1, 'installs': 2}
+
+    Attributes:
+        hits (int): ``require`` calls answered without a query.
+        checks (int): Version queries issued.
+        installs (int): Functions created or replaced.
+    """
+
+    def __init__(self):
+        self._functions = {}
+        self._installed = weakref.WeakKeyDictionary()
+        self._created = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.checks = 0
+        self.installs = 0
+
+    def function(self, name):
+        """Return the ``SqlFunction`` for ``name``, reading its script once.
+
+        Raises:
+            KeyError: If ``name`` is not one of ``SQL_FUNCTIONS``.
+        """
+        function = self._functions.get(name)
+        if function is None:
+            function = self._functions[name] = SqlFunction.load(name)
+        return function
+
+    def require(self, cur, name):
+        """Make sure the function ``name`` is installed before it is called.
+
+        Args:
+            cur (psycopg2.cursor): Database cursor the function will be called with.
+            name (str): Key of ``SQL_FUNCTIONS``.
+        """
+        session = _session(cur)
+        installed = self._installed.setdefault(session, set())
+        if name in installed:
+            self.hits += 1
+            return
+        if self._outdated(cur, [name]):
+            self._create(cur, self.function(name))
+            self._created.setdefault(session, set()).add(name)
+        elif name not in self._created.get(session, ()):
+            installed.add(name)
+
+    def install(self, conn, names=None, force=False):
+        """Create the missing or outdated functions and commit.
+
+        Args:
+            conn (psycopg2.connection): Database connection. Its current
+                transaction is committed.
+            names (iterable, optional): Keys of ``SQL_FUNCTIONS``. Defaults to all.
+            force (bool): Recreate every function, even when up to date.
+
+        Returns:
+            list[str]: The functions that were created or replaced.
+        """
+        names = sorted(names or SQL_FUNCTIONS)
+        cur = conn.cursor()
+        with self._lock:
+            stale = names if force else self._outdated(cur, names)
+            for name in stale:
+                self._create(cur, self.function(name))
+            conn.commit()
+            self._installed.setdefault(conn, set()).update(names)
+            self._created.pop(conn, None)
+        return stale
+
+    def reset(self, conn=None):
+        """Forget which functions are installed, for one connection or all."""
+        if conn is None:
+            self._installed.clear()
+            self._created.clear()
+        else:
+            self._installed.pop(conn, None)
+            self._created.pop(conn, None)
+
+    def stats(self):
+        """Return the ``require`` hits and the number of checks and installs."""
+        return {"hits": self.hits, "checks": self.checks, "installs": self.installs}
+
+    def _outdated(self, cur, names):
+        """Return the ``names`` whose installed body differs from the script, or is missing."""
+        self.checks += 1
+        cur.execute(_VERSIONS_Q, {"names": list(names)})
+        versions = {}
+        for row in cur.fetchall() or []:
+            versions.setdefault(row[0], set()).add(row[1])
+        return [name for name in names if self.function(name).version not in versions.get(name, ())]
+
+    def _create(self, cur, function):
+        self.installs += 1
+        cur.execute(function.definition)
+
+
+def _session(cur):
+    """Return the connection a cursor belongs to (the cursor itself for test doubles)."""
+    return getattr(cur, "connection", None) or cur
+
+
+_REGISTRY = FunctionRegistry()
+
+
+def get_function_registry():
+    """Return the process-wide ``FunctionRegistry`` used by the model classes."""
+    return _REGISTRY
+
+
+def install_sql_functions(conn, names=None, force=False):
+    """Install the ``sqlHelpers`` functions once for ``conn`` and commit.
+
+    Call it before validating or uploading so the model classes call the
+    functions without checking or recreating them.
+
+    Returns:
+        list[str]: The functions that were created or replaced.
+    """
+    return _REGISTRY.install(conn, names=names, force=force)
+
+
+def require_sql_function(cur, name):
+    """Make sure the ``sqlHelpers`` function ``name`` exists before calling it."""
+    _REGISTRY.require(cur, name)
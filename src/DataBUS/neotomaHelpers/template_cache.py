@@ -0,0 +1,89 @@
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+
+import yaml
+
+# libyaml-backed loader when PyYAML was built with it, several times faster.
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+CACHE_VERSION = 2
+
+
+def default_cache_dir():
+    """Return the directory used to cache parsed templates.
+
+    ``$DATABUS_CACHE_DIR`` when set, otherwise ``databus/templates`` under
+    ``$XDG_CACHE_HOME`` (``~/.cache`` by default).
+    """
+    path = os.environ.get("DATABUS_CACHE_DIR")
+    if path:
+        return path
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "databus", "templates")
+
+
+def file_digest(path):
+    """Return the SHA-256 hex digest of the contents of ``path``."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cached_build(path, kind, build, cache_dir=None):
+    """Return ``build()`` for the template at ``path``, memoised on disk.
+
+    Entries are pickles named after ``kind`` and the SHA-256 of the file's
+    contents, so an edited template is parsed again while an unchanged one is
+    loaded from the cache in any later run or worker process. Entries are
+    written to a temporary file and renamed into place, so concurrent workers
+    never read a partial entry. An unreadable entry is rebuilt; a cache
+    directory that cannot be written only disables the cache.
+
+    Args:
+        path (str): Template file the value is derived from.
+        kind (str): Name of the derived value, e.g. ``"yaml"`` or ``"xlsx"``.
+        build (callable): Computes the value when it is not cached.
+        cache_dir (str | bool | None): Cache directory. None uses
+            ``default_cache_dir()``; False disables caching.
+
+    Returns:
+        The cached or freshly built value.
+    """
+    if cache_dir is False:
+        return build()
+    cache_dir = cache_dir or default_cache_dir()
+    entry = os.path.join(cache_dir, f"{kind}-{file_digest(path)}-v{CACHE_VERSION}.pickle")
+    try:
+        with open(entry, "rb") as fh:
+            return pickle.load(fh)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable template cache entry {entry}: {e}")
+    value = build()
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=cache_dir, suffix=".tmp", delete=False) as fh:
+            pickle.dump(value, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(fh.name, entry)
+    except OSError as e:
+        logging.warning(f"Could not write template cache entry {entry}: {e}")
+    return value
+
+
+def clear_template_cache(cache_dir=None):
+    """Delete every cached template entry and return how many were removed."""
+    cache_dir = cache_dir or default_cache_dir()
+    removed = 0
+    if not os.path.isdir(cache_dir):
+        return removed
+    for name in os.listdir(cache_dir):
+        if name.endswith((".pickle", ".tmp")):
+            os.remove(os.path.join(cache_dir, name))
+            removed += 1
+    return removed
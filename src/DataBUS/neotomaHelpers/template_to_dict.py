@@ -1,15 +1,22 @@
 import os
 
 import yaml
-from yaml.loader import SafeLoader
 
+from .compiled_template import CompiledTemplate
+from .template_cache import YamlLoader, cached_build
 
-def template_to_dict(temp_file):
+
+def template_to_dict(temp_file, compiled=False, cache_dir=None):
     """Convert YAML or XLSX template file to Python dictionary.
 
     Reads and parses template files in YAML or XLSX format, converting Excel files
     to YAML format first if necessary. Supports .yml, .yaml, .xls, and .xlsx formats.
 
+    The parsed and compiled template is cached on disk, keyed by the SHA-256 of
+    the file contents, so an unchanged template is unpickled instead of parsed
+    again in later runs and in other worker processes. YAML is parsed with the
+    libyaml ``CSafeLoader`` when PyYAML was built with it.
+
     Examples:
         >>> template_to_dict('pollen_template.yml')  # doctest: +SKIP
         {'apiVersion': 'neotoma v2.0', 'metadata': [...], 'kind': 'datasets'}
@@ -18,10 +25,16 @@ def template_to_dict(temp_file):
 
     Args:
         temp_file (str): Path to a valid yml, yaml, xls, or xlsx template file.
+        compiled (bool): Return the ``CompiledTemplate`` index instead of the raw
+            dictionary. Defaults to False.
+        cache_dir (str | bool | None): Template cache directory. None uses
+            ``$DATABUS_CACHE_DIR`` or ``~/.cache/databus/templates``; False
+            disables the cache.
 
     Returns:
-        dict: Dictionary representation of the template file with 'apiVersion',
-              'headers', 'kind', and 'metadata' keys.
+        dict | CompiledTemplate: Dictionary representation of the template file with
+              'apiVersion', 'headers', 'kind', and 'metadata' keys, or its
+              ``CompiledTemplate`` when ``compiled`` is True.
 
     Raises:
         FileNotFoundError: If the specified template file does not exist.
@@ -33,10 +46,18 @@ def template_to_dict(temp_file):
         )
     file_name, file_extension = os.path.splitext(temp_file)
     if file_extension.lower() == ".yml" or file_extension.lower() == ".yaml":
-        with open(temp_file, encoding="UTF-8") as file:
-            data = yaml.load(file, Loader=SafeLoader)
-        return data
+        data = cached_build(temp_file, "yaml", lambda: _load_yaml(temp_file), cache_dir)
+        if isinstance(data, CompiledTemplate):
+            return data if compiled else data.source
+        return CompiledTemplate(data) if compiled else data
     else:
         raise ValueError(
             f"Unsupported file type: {file_extension}. Use `.yml` or `.yaml` templates."
         )
+
+
+def _load_yaml(temp_file):
+    """Parse a YAML template, compiling it when it holds a template dictionary."""
+    with open(temp_file, encoding="UTF-8") as file:
+        data = yaml.load(file, Loader=YamlLoader)
+    return CompiledTemplate(data) if isinstance(data, dict) else data
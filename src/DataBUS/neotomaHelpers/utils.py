@@ -3,12 +3,17 @@ import logging
 import re
 import warnings
 
+from . import vectorized
+from .column_table import ColumnTable
+from .compiled_template import CompiledTemplate
+
 
 def convert_value_by_type(value_meta, clean_value):
     """Convert a value to its specified type.
 
     Handles type conversions for: date, int, float, coordinates, string, bool/boolean.
-    Respects rowwise flag for bulk conversions.
+    Respects rowwise flag for bulk conversions. Large rowwise date/int/float/bool
+    columns are parsed by the NumPy backend when ``vectorized.use_vectorized()`` is on.
 
     Args:
         value_meta (dict): Metadata entry containing 'type' and 'rowwise' keys.
@@ -19,6 +24,8 @@ def convert_value_by_type(value_meta, clean_value):
     """
     type_spec = value_meta.get("type")
     is_rowwise = value_meta.get("rowwise")
+    if is_rowwise and vectorized.vectorized_enabled(type_spec, len(clean_value)):
+        return vectorized.convert_column(clean_value, type_spec).tolist()
     if type_spec == "date":
         return _convert_date(clean_value, is_rowwise)
     elif type_spec == "int":
@@ -100,7 +107,8 @@ def prepare_parameters(params, yml_dict, table):
 
     Args:
         params (list): Original list of parameter names.
-        yml_dict (dict): Dictionary containing 'metadata' key with param definitions.
+        yml_dict (dict | CompiledTemplate): Dictionary containing 'metadata' key with
+            param definitions, or its compiled form.
         table (str): Table name (with trailing dot if needed).
 
     Returns:
@@ -108,11 +116,14 @@ def prepare_parameters(params, yml_dict, table):
     """
     expanded_params = list(params)
     for param in params:
-        subfields = [
-            entry
-            for entry in yml_dict["metadata"]
-            if entry.get("neotoma", "").startswith(f"{table}{param}.")
-        ]
+        if isinstance(yml_dict, CompiledTemplate):
+            subfields = yml_dict.startswith(f"{table}{param}.")
+        else:
+            subfields = [
+                entry
+                for entry in yml_dict["metadata"]
+                if entry.get("neotoma", "").startswith(f"{table}{param}.")
+            ]
         if subfields:
             for entry in subfields:
                 param_name = entry["neotoma"].replace(f"{table}", "")
@@ -273,14 +284,19 @@ def retrieve_dict(yml_dict, sql_column):
         >>> retrieve_dict(yml, 'sites.siteid')
         [{'neotoma': 'sites.siteid', 'type': 'int'}]
 
+    When ``yml_dict`` is a ``CompiledTemplate`` the match is answered from its
+    word-boundary index instead of scanning the metadata.
+
     Args:
-        yml_dict (dict): The YAML template object imported by the user containing 'metadata' key.
+        yml_dict (dict | CompiledTemplate): The YAML template object imported by the user
+            containing 'metadata' key.
         sql_column (str): A character string indicating the SQL column to be matched.
 
     Returns:
         list: A list of all dictionaries associated with a particular Neotoma table/column.
     """
-
+    if isinstance(yml_dict, CompiledTemplate):
+        return yml_dict.retrieve(sql_column)
     try:
         assert isinstance(yml_dict, dict)
         assert yml_dict.get("metadata")
@@ -301,12 +317,19 @@ def clean_column(column, template, clean=True):
     """Extracts a single column from template data and optionally reduces it to unique
     values. Handles special cases where there are multiple non-empty values by raising
     an error, unless one value is empty/None.
+
+    ``template`` may be a list of row dicts or a ``ColumnTable``; the latter is
+    read column-wise without touching the rows.
     """
     if clean:
         value = _extract_unique_column_value(template, column)
         if isinstance(value, str) and value.strip() in ("NA", "", "None"):
             return None
         return value
+    elif isinstance(template, ColumnTable):
+        if not template.n_rows:
+            return None
+        return template.cleaned(column)
     else:
         values = [
             None if isinstance(v, str) and v.strip() in ("NA", "", "None") else v
@@ -319,15 +342,21 @@ def _extract_unique_column_value(template, column):
     """When multiple values exist, checks if they differ only by case. If one value is
     empty/None and another is not, returns the non-empty value.
     """
-    original_values = [
-        row[column] if isinstance(row[column], str) else row[column] for row in template
-    ]
-    unique_original = list(set(original_values))
-
-    lowercase_values = [
-        row[column].lower() if isinstance(row[column], str) else row[column] for row in template
-    ]
-    unique_lowercase = list(set(lowercase_values))
+    if isinstance(template, ColumnTable):
+        if not template.n_rows and column not in template.pinned:
+            return None
+        unique_original = list(template.unique(column))
+        unique_lowercase = template.unique_lower(column)
+    else:
+        original_values = [
+            row[column] if isinstance(row[column], str) else row[column] for row in template
+        ]
+        unique_original = list(set(original_values))
+
+        lowercase_values = [
+            row[column].lower() if isinstance(row[column], str) else row[column] for row in template
+        ]
+        unique_lowercase = list(set(lowercase_values))
 
     # All values are the same
     if len(unique_lowercase) == 1:
@@ -0,0 +1,236 @@
+import re
+import weakref
+
+# Statements that never write rows: transaction control and DDL.
+CONTROL = re.compile(
+    r"^\s*(SAVEPOINT|RELEASE|ROLLBACK|BEGIN|COMMIT|SET|DEALLOCATE|CREATE|DROP|ALTER|"
+    r"TRUNCATE|DISCARD|LOCK|ANALYZE|VACUUM)\b",
+    re.IGNORECASE,
+)
+# Statements that write rows: plain DML, data-modifying CTEs, and the
+# ``ts.insert...()`` / ``sqlHelpers`` insert functions.
+WRITE = re.compile(
+    r"\bINSERT\s+INTO\b|^\s*(UPDATE|DELETE)\b"
+    r"|^\s*SELECT\s+(?:\w+\.)?((?:insert|upsert|update)\w*)\s*\(",
+    re.IGNORECASE,
+)
+_RETURNS_ROWS = re.compile(r"\bRETURNING\b|^\s*(WITH|SELECT)\b", re.IGNORECASE)
+PREPARE = re.compile(r"^\s*PREPARE\s+(\w+)(?:\s*\([^)]*\))?\s+AS\s+(.*)$", re.I | re.DOTALL)
+_EXECUTE = re.compile(r"^\s*EXECUTE\s+(\w+)", re.IGNORECASE)
+_DOLLAR = re.compile(r"\$(\d+)")
+
+# Prepared statements seen, per connection: name -> text of a write answered
+# locally, or None for a statement that runs on the server. They outlive the
+# cursor that prepared them, as on the server.
+_PREPARED = weakref.WeakKeyDictionary()
+_SERVER_STATEMENT = "SELECT statement FROM pg_prepared_statements WHERE name = %s;"
+
+
+class PlaceholderCursor:
+    """Base of the cursors that answer writes with placeholder IDs instead of running them.
+
+    An ``INSERT`` (including ``WITH ... INSERT``), ``UPDATE``, ``DELETE`` or
+    call of an insert function is not sent anywhere. When it returns rows
+    (``RETURNING``, ``SELECT ts.insert...()``, a data-modifying CTE) it
+    returns one placeholder ID per row it would have written: the length of
+    its longest array parameter (``unnest`` bulk inserts), the rows of the
+    preceding ``COPY`` (``copy_expert``), or one. Placeholder IDs count down
+    from -1 for each cursor, so the same file gets the same IDs on every run.
+    A write prepared with ``PREPARE`` is recorded on the client and answered
+    the same way on ``EXECUTE``. Subclasses run the other statements
+    (``_run``), and decide whether the ``PREPARE`` of a write also reaches the
+    server (``_prepare``) and how to look up statements prepared before
+    (``_server_statement``).
+
+    Args:
+        connection: Connection the cursor belongs to.
+
+    Attributes:
+        connection: The connection.
+        description (tuple | None): Result columns of the last statement.
+        rowcount (int): Rows returned or written by the last statement.
+        skipped (int): Writes answered with placeholders.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = None
+        self.rowcount = -1
+        self.skipped = 0
+        self._rows = []
+        self._copied = 0
+        self._next_id = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def execute(self, query, params=None):
+        """Answer a write with placeholder IDs, or run the statement (``_run``)."""
+        self.description = None
+        self.rowcount = -1
+        self._rows = []
+        prepared = _PREPARED.setdefault(self.connection, {})
+        prepare = PREPARE.match(query)
+        if prepare:
+            name, text = prepare.groups()
+            prepared[name] = text if self._keeps(text) else None
+            if prepared[name] is not None:
+                self._prepare(query, params)
+                return
+        execute = _EXECUTE.match(query)
+        if execute:
+            name = execute.group(1)
+            if name not in prepared:
+                text = self._server_statement(name)
+                prepared[name] = text if text is not None and self._keeps(text) else None
+            if prepared[name] is not None:
+                query, params = _prepared_query(prepared[name], params)
+        write = None if CONTROL.match(query) else WRITE.search(query)
+        if write:
+            self._write(query, params, write.group(2))
+        else:
+            self._run(query, params)
+
+    def executemany(self, query, params_seq):
+        """Run ``query`` once per parameter set."""
+        for params in params_seq:
+            self.execute(query, params)
+
+    def copy_expert(self, sql, file):
+        """Count the rows of a ``COPY ... FROM STDIN``, for the insert that follows."""
+        self._copied = sum(1 for _ in file)
+
+    def fetchone(self):
+        """Return the next row, or None."""
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchmany(self, size=1):
+        """Return up to ``size`` rows."""
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def fetchall(self):
+        """Return the remaining rows."""
+        rows, self._rows = self._rows, []
+        return rows
+
+    def close(self):
+        """Drop the pending rows."""
+        self._rows = []
+
+    def placeholder_ids(self, n):
+        """Return ``n`` new placeholder IDs: -1, -2, ... over the cursor's life."""
+        ids = list(range(self._next_id, self._next_id - n, -1))
+        self._next_id -= n
+        return ids
+
+    def _keeps(self, text):
+        """Whether a ``PREPARE``d statement is kept on the client."""
+        return bool(WRITE.search(text)) and not CONTROL.match(text)
+
+    def _prepare(self, query, params):
+        """Handle the ``PREPARE`` of a write; it stays on the client by default."""
+
+    def _server_statement(self, name):
+        """Return the text of a statement prepared before this cursor saw it, or None."""
+        return None
+
+    def _run(self, query, params):
+        raise NotImplementedError
+
+    def _write(self, query, params, function):
+        """Answer a write with one placeholder ID per row it would write."""
+        values = params.values() if isinstance(params, dict) else params or ()
+        lengths = [len(v) for v in values if isinstance(v, list | tuple)]
+        n = max(lengths) if lengths else (self._copied or 1)
+        self._copied = 0
+        self.skipped += 1
+        if not _RETURNS_ROWS.search(query):
+            self.rowcount = n
+            return
+        self._result([(i,) for i in self.placeholder_ids(n)], [(function or "id",)])
+
+    def _result(self, rows, description):
+        self._rows = [tuple(row) for row in rows]
+        self.rowcount = len(self._rows)
+        self.description = tuple((d[0], None, None, None, None, None, None) for d in description)
+
+
+class ValidateOnlyCursor(PlaceholderCursor):
+    """Wraps a database cursor so that validation reads but never writes.
+
+    Validating a file used to run every insert (sites, collection units,
+    samples, every data value) and roll them back at the end, so validation
+    cost as much as an upload and held the locks and WAL of the whole file.
+    Through this cursor the lookups still run on the database, while the
+    inserts return placeholder IDs (see ``PlaceholderCursor``): the
+    validators run all their checks and hand realistic ``id_list`` and
+    ``id_dict`` values downstream, and nothing is written. ``run_file`` uses
+    it with ``validate_only=True``.
+
+    A step that reads back a row inserted by an earlier step does not find
+    it, since the row was never written.
+
+    Prepared statements are shared with the runs that do write on the same
+    connection (``PreparedStatements`` keys them by connection), so the
+    ``PREPARE`` of a write is sent to the server, which writes nothing, and
+    only its ``EXECUTE`` is answered locally. An ``EXECUTE`` of a statement
+    prepared by an earlier run is looked up in ``pg_prepared_statements``.
+
+    Examples:
+        >>> cur = ValidateOnlyCursor(conn.cursor())
+        >>> cur.execute("SELECT ts.insertsite(%(sitename)s, ...)", inputs)  # doctest: +SKIP
+        >>> cur.fetchone()  # doctest: +SKIP
+        (-1,)
+
+    Args:
+        cursor (psycopg2.cursor): Cursor the reads run on.
+
+    Attributes:
+        cursor (psycopg2.cursor): The wrapped cursor.
+    """
+
+    def __init__(self, cursor):
+        super().__init__(getattr(cursor, "connection", None) or cursor)
+        self.cursor = cursor
+        self._delegate = False
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def fetchone(self):
+        return self.cursor.fetchone() if self._delegate else super().fetchone()
+
+    def fetchmany(self, size=1):
+        return self.cursor.fetchmany(size) if self._delegate else super().fetchmany(size)
+
+    def fetchall(self):
+        return self.cursor.fetchall() if self._delegate else super().fetchall()
+
+    def execute(self, query, params=None):
+        self._delegate = False
+        super().execute(query, params)
+
+    def _prepare(self, query, params):
+        self._run(query, params)
+
+    def _server_statement(self, name):
+        self.cursor.execute(_SERVER_STATEMENT, (name,))
+        row = self.cursor.fetchone()
+        prepare = PREPARE.match(row[0]) if row else None
+        return prepare.group(2) if prepare else None
+
+    def _run(self, query, params):
+        self.cursor.execute(query, params)
+        self._delegate = True
+        self.description = self.cursor.description
+        self.rowcount = getattr(self.cursor, "rowcount", -1)
+
+
+def _prepared_query(text, values):
+    """Return the text of a prepared statement with psycopg2 placeholders."""
+    query = _DOLLAR.sub(lambda m: f"%(p{m.group(1)})s", text.replace("%", "%%"))
+    return query, {f"p{n}": value for n, value in enumerate(values or (), start=1)}
@@ -0,0 +1,288 @@
+import json
+import os
+import pickle
+import sqlite3
+import threading
+from datetime import datetime
+
+# File name of the store inside a validation-logs directory.
+STORE_NAME = "validation.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS validations (
+    filename TEXT NOT NULL,
+    file_hash TEXT NOT NULL,
+    template_hash TEXT,
+    status TEXT NOT NULL,
+    errors INTEGER NOT NULL,
+    strict_errors INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (filename, file_hash)
+);
+CREATE INDEX IF NOT EXISTS validations_latest ON validations (filename, updated_at);
+CREATE TABLE IF NOT EXISTS step_results (
+    filename TEXT NOT NULL,
+    step TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    valid INTEGER NOT NULL,
+    skipped INTEGER NOT NULL,
+    response BLOB,
+    records TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (filename, step)
+);
+"""
+
+_RECORD_Q = """
+INSERT INTO validations
+    (filename, file_hash, template_hash, status, errors, strict_errors, created_at, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (filename, file_hash) DO UPDATE SET
+    template_hash = excluded.template_hash,
+    status = excluded.status,
+    errors = excluded.errors,
+    strict_errors = excluded.strict_errors,
+    updated_at = excluded.updated_at
+"""
+
+_LATEST_Q = """
+SELECT filename, file_hash, template_hash, status, errors, strict_errors, created_at, updated_at
+FROM validations WHERE filename = ? ORDER BY updated_at DESC, rowid DESC LIMIT 1
+"""
+
+_STEP_RECORD_Q = """
+INSERT OR REPLACE INTO step_results
+    (filename, step, fingerprint, valid, skipped, response, records, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_STEP_RESULTS_Q = """
+SELECT step, fingerprint, valid, skipped, response, records, updated_at
+FROM step_results WHERE filename = ?
+"""
+
+_COLUMNS = (
+    "filename",
+    "file_hash",
+    "template_hash",
+    "status",
+    "errors",
+    "strict_errors",
+    "created_at",
+    "updated_at",
+)
+
+
+class ValidationStore:
+    """SQLite index of validation results, keyed by file name and content hash.
+
+    ``check_file`` and ``hash_file`` used to decide whether a file passed by
+    re-reading its ``.valid.log`` and matching every line. The store keeps one
+    row per (file name, content hash) with the run status, the number of
+    ``✗`` lines (and of ``✗`` plus ``Valid: FALSE`` lines, for strict checks),
+    the template hash and when the file was first and last validated, so
+    both helpers answer with one indexed lookup. Files are identified by their
+    base name, as in the log directories.
+
+    For incremental runs it also keeps the last result of each step of each
+    file (``record_steps``): the step's input fingerprint, its ``Response``
+    and its log records, so an unchanged step can be replayed instead of run
+    (see ``run_file``).
+
+    The database lives in the validation-logs directory (``STORE_NAME``). It
+    is opened lazily, once per process, so a store can be handed to worker
+    processes, and runs in WAL mode so those workers can record results
+    concurrently.
+
+    Examples:
+        >>> store = ValidationStore('data/logs/validation.sqlite3')
+        >>> store.record('lake.csv', 'd41d8c...', 'validated', errors=0)  # doctest: +SKIP
+        >>> store.latest('data/lake.csv')['status']  # doctest: +SKIP
+        'validated'
+
+    Args:
+        path (str): Path of the SQLite database; created when missing.
+
+    Attributes:
+        path (str): Path of the SQLite database.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"ValidationStore({self.path!r})"
+
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+    def record(self, filename, file_hash, status, errors, strict_errors=None, template_hash=None):
+        """Record the outcome of validating one version of a file.
+
+        Args:
+            filename (str): Path or name of the data file.
+            file_hash (str): Digest of the file's contents.
+            status (str): Run status, e.g. ``validated``, ``invalid`` or ``uploaded``.
+            errors (int): Number of ``✗`` lines in the log.
+            strict_errors (int, optional): ``errors`` plus the ``Valid: FALSE``
+                lines. Defaults to ``errors``.
+            template_hash (str, optional): Digest of the template used.
+        """
+        now = datetime.now().isoformat(timespec="microseconds")
+        strict_errors = errors if strict_errors is None else strict_errors
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    _RECORD_Q,
+                    (
+                        os.path.basename(filename),
+                        file_hash,
+                        template_hash,
+                        status,
+                        errors,
+                        strict_errors,
+                        now,
+                        now,
+                    ),
+                )
+
+    def latest(self, filename):
+        """Return the most recent record of ``filename`` as a dict, or None."""
+        with self._lock:
+            row = self._connect().execute(_LATEST_Q, (os.path.basename(filename),)).fetchone()
+        return dict(zip(_COLUMNS, row, strict=True)) if row is not None else None
+
+    def record_steps(self, filename, results):
+        """Replace the stored results of some steps of ``filename``.
+
+        Args:
+            filename (str): Path or name of the data file.
+            results (iterable[dict]): One dict per step with its ``step`` key,
+                ``fingerprint``, ``valid`` and ``skipped`` flags, ``response``
+                (``Response`` or None) and log ``records``. A response that
+                cannot be pickled is stored as None, which makes the step
+                run again next time.
+        """
+        now = datetime.now().isoformat(timespec="microseconds")
+        rows = [
+            (
+                os.path.basename(filename),
+                result["step"],
+                result["fingerprint"],
+                bool(result["valid"]),
+                bool(result["skipped"]),
+                _dumps(result["response"]),
+                json.dumps(result["records"], ensure_ascii=False, default=str),
+                now,
+            )
+            for result in results
+        ]
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(_STEP_RECORD_Q, rows)
+
+    def step_results(self, filename):
+        """Return the stored step results of ``filename``, keyed by step.
+
+        Returns:
+            dict: Step key → dict with ``fingerprint``, ``valid``, ``skipped``,
+            ``response`` (None when it could not be stored or loaded),
+            ``records`` and ``updated_at``.
+        """
+        with self._lock:
+            rows = (
+                self._connect().execute(_STEP_RESULTS_Q, (os.path.basename(filename),)).fetchall()
+            )
+        return {
+            step: {
+                "fingerprint": fingerprint,
+                "valid": bool(valid),
+                "skipped": bool(skipped),
+                "response": _loads(response),
+                "records": json.loads(records),
+                "updated_at": updated_at,
+            }
+            for step, fingerprint, valid, skipped, response, records, updated_at in rows
+        }
+
+    def forget_steps(self, filename):
+        """Delete the stored step results of ``filename``."""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "DELETE FROM step_results WHERE filename = ?", (os.path.basename(filename),)
+                )
+
+    def close(self):
+        """Close this process's connection to the database."""
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+
+def _dumps(response):
+    if response is None:
+        return None
+    try:
+        return pickle.dumps(response, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        return None
+
+
+def _loads(blob):
+    if blob is None:
+        return None
+    try:
+        return pickle.loads(blob)
+    except Exception:
+        # Written by an incompatible version of DataBUS; the step runs again.
+        return None
+
+
+_STORES = {}
+
+
+def get_validation_store(store, validation_files):
+    """Resolve the ``store`` argument of ``check_file`` and ``hash_file``.
+
+    Args:
+        store (ValidationStore | str | bool | None): A store, the path of one,
+            False for none, True for the store of ``validation_files``, or None
+            for that store only if it has already been created.
+        validation_files (str): Validation-logs directory.
+
+    Returns:
+        ValidationStore | None: The store to answer from, if any.
+    """
+    if store is False:
+        return None
+    if isinstance(store, ValidationStore):
+        return store
+    path = store if isinstance(store, str) else os.path.join(validation_files, STORE_NAME)
+    if store is None and not os.path.exists(path):
+        return None
+    key = os.path.abspath(path)
+    if key not in _STORES:
+        _STORES[key] = ValidationStore(path)
+    return _STORES[key]
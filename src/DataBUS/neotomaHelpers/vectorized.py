@@ -0,0 +1,154 @@
+import datetime
+import functools
+
+try:
+    import numpy as np
+except ImportError:  # numpy is an optional dependency (``pip install DataBUS[fast]``)
+    np = None
+
+MISSING_VALUES = (None, "NA", "", "None")
+VECTORIZED_TYPES = ("float", "int", "date", "bool", "boolean")
+
+_settings = {"enabled": False, "min_rows": 1000}
+
+
+class TypedColumn:
+    """A converted column held as a typed NumPy array plus a validity mask.
+
+    Attributes:
+        values (numpy.ndarray): ``float64``, ``int64``, ``datetime64[D]`` or
+            ``bool`` array. Cells that are not valid hold a filler value
+            (``nan``, ``0``, ``NaT`` or ``False``).
+        mask (numpy.ndarray): Boolean array, True where the cell held a value
+            (not None, ``NA``, empty or ``None``).
+        type_spec (str): Template type the column was converted to.
+
+    Examples:
+        >>> col = convert_column(["1.5", "NA", "2"], "float")  # doctest: +SKIP
+        >>> col.mask
+        array([ True, False,  True])
+        >>> col.tolist()
+        [1.5, None, 2.0]
+    """
+
+    def __init__(self, values, mask, type_spec):
+        self.values = values
+        self.mask = mask
+        self.type_spec = type_spec
+
+    def __len__(self):
+        return len(self.values)
+
+    def __repr__(self):
+        return (
+            f"TypedColumn(type={self.type_spec!r}, rows={len(self)}, valid={int(self.mask.sum())})"
+        )
+
+    def tolist(self):
+        """Return the column as Python values, with None for invalid cells.
+
+        Matches the output of ``convert_value_by_type`` for rowwise columns:
+        ``float``, ``int``, ``datetime.date`` and ``bool`` objects.
+        """
+        out = self.values.tolist()
+        for i in np.flatnonzero(~self.mask).tolist():
+            out[i] = None
+        return out
+
+
+def convert_column(values, type_spec):
+    """Parse a whole column into a ``TypedColumn``.
+
+    Missing cells (None, ``NA``, empty string, ``None``) are masked out instead
+    of being parsed. Dates are parsed once per distinct string, through a
+    process-wide cache, and then broadcast back to the rows.
+
+    Args:
+        values (list): Column values, usually the output of ``clean_column``.
+        type_spec (str): One of ``float``, ``int``, ``date``, ``bool`` or ``boolean``.
+
+    Returns:
+        TypedColumn: Typed values and validity mask.
+
+    Raises:
+        ModuleNotFoundError: If NumPy is not installed.
+        ValueError: If a non-missing cell cannot be parsed as ``type_spec``.
+    """
+    if np is None:
+        raise ModuleNotFoundError("The vectorized conversion backend requires numpy.")
+    if type_spec == "float":
+        # Fast path: NumPy parses numeric strings and maps None to nan in C.
+        try:
+            out = np.array(values, dtype=np.float64)
+            return TypedColumn(out, ~np.isnan(out), type_spec)
+        except (TypeError, ValueError):
+            pass
+    cells = np.empty(len(values), dtype=object)
+    cells[:] = values
+    mask = ~np.isin(cells, MISSING_VALUES)
+    present = cells[mask]
+    if type_spec == "float":
+        out = np.full(len(cells), np.nan)
+        out[mask] = present.astype(np.float64)
+    elif type_spec == "int":
+        out = np.zeros(len(cells), dtype=np.int64)
+        out[mask] = present.astype(np.int64)
+    elif type_spec == "date":
+        out = np.full(len(cells), np.datetime64("NaT"), dtype="datetime64[D]")
+        out[mask] = _convert_dates(present)
+    elif type_spec in ("bool", "boolean"):
+        out = np.zeros(len(cells), dtype=bool)
+        text = np.char.lower(np.char.strip(present.astype(str)))
+        out[mask] = np.isin(text, ("true", "1", "yes"))
+    else:
+        raise ValueError(f"Type '{type_spec}' has no vectorized converter.")
+    return TypedColumn(out, mask, type_spec)
+
+
+def _convert_dates(present):
+    """Convert an object array of date strings/objects to ``datetime64[D]``."""
+    if not len(present):
+        return np.array([], dtype="datetime64[D]")
+    is_text = np.frompyfunc(lambda v: isinstance(v, str), 1, 1)(present).astype(bool)
+    out = np.empty(len(present), dtype="datetime64[D]")
+    if is_text.any():
+        unique, inverse = np.unique(present[is_text].astype(str), return_inverse=True)
+        parsed = np.array([parse_date(s) for s in unique], dtype="datetime64[D]")
+        out[is_text] = parsed[inverse]
+    if not is_text.all():
+        out[~is_text] = [np.datetime64(v, "D") for v in present[~is_text]]
+    return out
+
+
+@functools.lru_cache(maxsize=65536)
+def parse_date(text):
+    """Parse a ``YYYY-MM-DD`` or ``YYYY/MM/DD`` string, caching repeated strings."""
+    return datetime.datetime.strptime(text.replace("/", "-"), "%Y-%m-%d").date()
+
+
+def use_vectorized(enabled=True, min_rows=1000):
+    """Turn the NumPy backend of ``convert_value_by_type`` on or off.
+
+    When enabled, rowwise ``float``, ``int``, ``date`` and ``bool`` columns of
+    at least ``min_rows`` values are converted by ``convert_column`` and
+    returned as lists, so callers see the same Python values as before.
+
+    Args:
+        enabled (bool): Whether to use the vectorized backend. Defaults to True.
+        min_rows (int): Smallest column converted with NumPy; shorter columns
+            stay on the per-value path. Defaults to 1000.
+
+    Raises:
+        ModuleNotFoundError: If enabling while NumPy is not installed.
+    """
+    if enabled and np is None:
+        raise ModuleNotFoundError("The vectorized conversion backend requires numpy.")
+    _settings["enabled"] = bool(enabled)
+    _settings["min_rows"] = min_rows
+
+
+def vectorized_enabled(type_spec, n_rows):
+    """Return True if a rowwise column of ``type_spec`` and ``n_rows`` goes to NumPy."""
+    return (
+        _settings["enabled"] and type_spec in VECTORIZED_TYPES and n_rows >= _settings["min_rows"]
+    )
@@ -0,0 +1,226 @@
+import threading
+
+# Controlled vocabularies resolved by the validators:
+# name -> (table, ID column, term column).
+VOCABULARIES = {
+    "agetypes": ("ndb.agetypes", "agetypeid", "agetype"),
+    "chroncontroltypes": ("ndb.chroncontroltypes", "chroncontroltypeid", "chroncontroltype"),
+    "collectiontypes": ("ndb.collectiontypes", "colltypeid", "colltype"),
+    "decayconstants": ("ndb.decayconstants", "decayconstantid", "decayconstant"),
+    "depenvttypes": ("ndb.depenvttypes", "depenvtid", "depenvt"),
+    "faciestypes": ("ndb.faciestypes", "faciesid", "facies"),
+    "geochrontypes": ("ndb.geochrontypes", "geochrontypeid", "geochrontype"),
+    "rocktypes": ("ndb.rocktypes", "rocktypeid", "rocktype"),
+    "uncertaintybases": ("ndb.uncertaintybases", "uncertaintybasisid", "uncertaintybasis"),
+    "variablecontexts": ("ndb.variablecontexts", "variablecontextid", "variablecontext"),
+    "variableelements": ("ndb.variableelements", "variableelementid", "variableelement"),
+    "variableunits": ("ndb.variableunits", "variableunitsid", "variableunits"),
+}
+
+
+class VocabularyCache:
+    """In-memory copy of Neotoma's small controlled-vocabulary tables.
+
+    Without the cache every validator resolves a term with its own
+    ``SELECT ... WHERE LOWER(term) = %s`` round trip. When enabled, the first
+    lookup in a vocabulary loads the whole table in one query, and later
+    lookups, from any validator and any file of the run, are answered from
+    memory. ``prefetch`` loads several vocabularies in a single query.
+
+    Terms are matched case-insensitively after stripping whitespace, as the
+    single-row queries do. The cache assumes one database per process; call
+    ``refresh`` after vocabulary tables change or when switching databases.
+
+    Examples:
+        >>> vocab = VocabularyCache()
+        >>> vocab.prefetch(cur)  # doctest: +SKIP
+        >>> vocab.lookup(cur, "agetypes", " Calendar years BP ")  # doctest: +SKIP
+        2
+        >>> vocab.stats()  # doctest: +SKIP
+        {'hits': 1, 'misses': 0, 'not_found': 0, 'loads': 1, 'queries': 0, ...}
+
+    Args:
+        enabled (bool): Serve lookups from memory. When False every lookup runs
+            a single-row query. Defaults to True.
+
+    Attributes:
+        enabled (bool): Whether lookups are served from memory.
+        hits (int): Lookups answered from an already loaded vocabulary.
+        misses (int): Lookups that had to load their vocabulary first.
+        not_found (int): Cached lookups for terms absent from the vocabulary.
+        loads (int): Queries issued to load vocabularies.
+        queries (int): Lookup queries issued while disabled.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._terms = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_found = 0
+        self.loads = 0
+        self.queries = 0
+
+    def lookup(self, cur, vocabulary, term):
+        """Return the ID of ``term`` in ``vocabulary``, or None if it does not exist.
+
+        Args:
+            cur (psycopg2.cursor): Database cursor, used when the vocabulary
+                is not loaded yet (or the cache is disabled).
+            vocabulary (str): Key of ``VOCABULARIES``, e.g. ``"agetypes"``.
+            term (str): Term to resolve, in any case.
+
+        Returns:
+            int | None: The vocabulary ID.
+
+        Raises:
+            KeyError: If ``vocabulary`` is not a known vocabulary.
+        """
+        table, id_column, term_column = VOCABULARIES[vocabulary]
+        key = str(term).lower().strip()
+        if not self.enabled:
+            self.queries += 1
+            cur.execute(
+                f"SELECT {id_column} FROM {table} WHERE LOWER({term_column}) = %(term)s;",
+                {"term": key},
+            )
+            row = cur.fetchone()
+            return row[0] if row else None
+        terms = self._terms.get(vocabulary)
+        if terms is None:
+            self.misses += 1
+            self.prefetch(cur, [vocabulary])
+            terms = self._terms[vocabulary]
+        else:
+            self.hits += 1
+        found = terms.get(key)
+        if found is None:
+            self.not_found += 1
+        return found
+
+    def lookup_many(self, cur, vocabulary, terms):
+        """Resolve several terms of ``vocabulary`` at once.
+
+        When the cache is disabled all terms are resolved with a single
+        ``= ANY(...)`` query instead of one query per term.
+
+        Args:
+            cur (psycopg2.cursor): Database cursor.
+            vocabulary (str): Key of ``VOCABULARIES``.
+            terms (iterable): Terms to resolve, in any case.
+
+        Returns:
+            dict: Lowercased, stripped term → ID, for the terms that exist.
+        """
+        table, id_column, term_column = VOCABULARIES[vocabulary]
+        keys = {str(term).lower().strip() for term in terms}
+        if not keys:
+            return {}
+        if self.enabled:
+            found = {key: self.lookup(cur, vocabulary, key) for key in keys}
+            return {key: vocab_id for key, vocab_id in found.items() if vocab_id is not None}
+        self.queries += 1
+        cur.execute(
+            f"SELECT LOWER({term_column}), {id_column} FROM {table} "
+            f"WHERE LOWER({term_column}) = ANY(%(terms)s);",
+            {"terms": sorted(keys)},
+        )
+        found = {}
+        for term, vocab_id in cur.fetchall() or []:
+            found.setdefault(term, vocab_id)
+        return found
+
+    def prefetch(self, cur, vocabularies=None):
+        """Load vocabularies that are not cached yet, all in one query.
+
+        Args:
+            cur (psycopg2.cursor): Database cursor.
+            vocabularies (iterable, optional): Keys of ``VOCABULARIES`` to load.
+                Defaults to all of them.
+        """
+        with self._lock:
+            wanted = [v for v in (vocabularies or VOCABULARIES) if v not in self._terms]
+            if not wanted:
+                return
+            query = " UNION ALL ".join(
+                f"SELECT '{v}', {VOCABULARIES[v][1]}, LOWER({VOCABULARIES[v][2]}) "
+                f"FROM {VOCABULARIES[v][0]}"
+                for v in wanted
+            )
+            cur.execute(query + ";")
+            self.loads += 1
+            loaded = {v: {} for v in wanted}
+            for vocabulary, vocab_id, term in cur.fetchall() or []:
+                if term is not None:
+                    loaded[vocabulary].setdefault(term, vocab_id)
+            self._terms.update(loaded)
+
+    def refresh(self, vocabulary=None):
+        """Drop cached vocabularies so the next lookup reloads them.
+
+        Args:
+            vocabulary (str, optional): Only drop this vocabulary. Defaults to all.
+        """
+        with self._lock:
+            if vocabulary is None:
+                self._terms.clear()
+            else:
+                self._terms.pop(vocabulary, None)
+
+    def stats(self):
+        """Return the lookup counters and the number of cached vocabularies and terms."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_found": self.not_found,
+            "loads": self.loads,
+            "queries": self.queries,
+            "vocabularies": len(self._terms),
+            "terms": sum(len(t) for t in self._terms.values()),
+        }
+
+
+_VOCABULARY = VocabularyCache(enabled=False)
+
+
+def get_vocabulary_cache():
+    """Return the process-wide ``VocabularyCache`` used by the validators."""
+    return _VOCABULARY
+
+
+def use_vocabulary_cache(enabled=True):
+    """Turn the process-wide vocabulary cache on or off.
+
+    Disabled by default, so every lookup queries the database. Turning it off
+    also drops the cached vocabularies.
+
+    Args:
+        enabled (bool): Whether validators resolve vocabulary from memory.
+            Defaults to True.
+
+    Returns:
+        VocabularyCache: The process-wide cache.
+    """
+    _VOCABULARY.enabled = bool(enabled)
+    if not enabled:
+        _VOCABULARY.refresh()
+    return _VOCABULARY
+
+
+def lookup_vocabulary(cur, vocabulary, term):
+    """Resolve ``term`` in ``vocabulary`` through the process-wide cache.
+
+    Returns:
+        int | None: The vocabulary ID, or None if the term does not exist.
+    """
+    return _VOCABULARY.lookup(cur, vocabulary, term)
+
+
+def lookup_vocabulary_many(cur, vocabulary, terms):
+    """Resolve several ``terms`` of ``vocabulary`` through the process-wide cache.
+
+    Returns:
+        dict: Lowercased, stripped term → ID, for the terms that exist.
+    """
+    return _VOCABULARY.lookup_many(cur, vocabulary, terms)
@@ -3,7 +3,7 @@ from DataBUS import AnalysisUnit, Response
 from DataBUS.AnalysisUnit import ANALYSIS_UNIT_PARAMS
 
 
-def valid_analysisunit(cur, yml_dict, csv_file, databus=None):
+def valid_analysisunit(cur, yml_dict, csv_file, databus=None, preallocate=False):
     """Validates analysis unit data and inserts into the database when databus is provided.
 
     Validates analysis unit parameters including depth, thickness, facies ID,
@@ -14,12 +14,23 @@ def valid_analysisunit(cur, yml_dict, csv_file, databus=None):
     integer, each AnalysisUnit is inserted into ``ndb.analysisunits`` and the
     resulting IDs are appended to ``response.id_list``.
 
+    When ``csv_file`` is a ``ChunkedReader`` the rows are validated and
+    inserted one block at a time, so memory does not grow with the file.
+
+    With ``preallocate`` set the rowwise analysis units of each block are
+    given IDs reserved from the sequence and written with one statement
+    (``insert_records``), or one ``ts.insertanalysisunit`` call each when the
+    sequence cannot be used.
+
     Args:
         cur (cursor): Database cursor for executing SQL queries.
         yml_dict (dict): Dictionary containing YAML configuration data.
-        csv_file (list): List of dictionaries representing CSV file data.
+        csv_file (list | ChunkedReader): List of dictionaries representing CSV
+            file data, or a block-wise reader over the data file.
         databus (dict | None): Prior validation results. When not None, uses
             ``databus["collunits"].id_int`` as the collectionunitid for inserts.
+        preallocate (bool): Insert the analysis units of a block set-based with
+            pre-allocated IDs. Defaults to False.
 
     Returns:
         Response: Response object containing validation messages, validity list,
@@ -31,90 +42,108 @@ def valid_analysisunit(cur, yml_dict, csv_file, databus=None):
         Response(valid=[True], message=[...], validAll=True, counter=1)
     """
     response = Response()
-    try:
-        inputs = nh.pull_params(ANALYSIS_UNIT_PARAMS, yml_dict, csv_file, "ndb.analysisunits")
-    except Exception as e:
-        response.valid.append(False)
-        response.message.append(
-            f"✗ AU elements in the CSV file are not properly inserted. "
-            f"Please verify the CSV file: {e}"
-        )
-        return response
-    if isinstance(inputs.get("depth"), list):
-        response.counter = 0
-        iterable_params = {k: v for k, v in inputs.items() if isinstance(v, list)}
-        static_params = {k: v for k, v in inputs.items() if not isinstance(v, list)}
-        for values in zip(*iterable_params.values(), strict=False):
-            try:
-                kwargs = dict(zip(iterable_params.keys(), values, strict=False))
-                kwargs.update(static_params)
-                if isinstance(kwargs.get("faciesid"), str):
-                    kwargs["faciesid"] = _resolve_faciesid(cur, kwargs["faciesid"], response)
-                if databus.get("collunits") is not None:
-                    kwargs["collectionunitid"] = databus["collunits"].id_int
-                else:
-                    kwargs["collectionunitid"] = 1  # placeholder
-                    response.valid.append(False)
-                    response.message.append(
-                        "✗ Collection Unit ID is required for Analysis Unit validation."
-                    )
-                au = AnalysisUnit(**kwargs)
-                response.valid.append(True)
+    blocks = nh.pull_params_blocks(ANALYSIS_UNIT_PARAMS, yml_dict, csv_file, "ndb.analysisunits")
+    while True:
+        try:
+            rows, inputs = next(blocks)
+        except StopIteration:
+            break
+        except Exception as e:
+            response.valid.append(False)
+            response.message.append(
+                f"✗ AU elements in the CSV file are not properly inserted. "
+                f"Please verify the CSV file: {e}"
+            )
+            return response
+        if isinstance(inputs.get("depth"), list):
+            _validate_rows(cur, inputs, databus, response, preallocate)
+        elif not rows.start and not _validate_single(cur, inputs, databus, response):
+            return response
+    if response.validAll:
+        response.message.append("✔ AnalysisUnit(s) can be created.")
+    return response
+
+
+def _validate_rows(cur, inputs, databus, response, preallocate=False):
+    """Create and insert one AnalysisUnit per row of a block of rowwise inputs."""
+    staged = []
+    iterable_params = {k: v for k, v in inputs.items() if isinstance(v, list)}
+    static_params = {k: v for k, v in inputs.items() if not isinstance(v, list)}
+    for values in zip(*iterable_params.values(), strict=False):
+        try:
+            kwargs = dict(zip(iterable_params.keys(), values, strict=False))
+            kwargs.update(static_params)
+            if isinstance(kwargs.get("faciesid"), str):
+                kwargs["faciesid"] = _resolve_faciesid(cur, kwargs["faciesid"], response)
+            if databus.get("collunits") is not None:
+                kwargs["collectionunitid"] = databus["collunits"].id_int
+            else:
+                kwargs["collectionunitid"] = 1  # placeholder
+                response.valid.append(False)
+                response.message.append(
+                    "✗ Collection Unit ID is required for Analysis Unit validation."
+                )
+            au = AnalysisUnit(**kwargs)
+            response.valid.append(True)
+            if preallocate:
+                staged.append(au)
+            else:
                 try:
                     auid = au.insert_to_db(cur)
                     response.id_list.append(auid)
                 except Exception as e:
                     response.valid.append(False)
                     response.message.append(f"✗ Could not insert AnalysisUnit: {e}")
-            except Exception as e:
-                response.valid.append(False)
-                response.message.append(f"✗ AnalysisUnit cannot be created: {e}")
-            response.counter += 1
-    else:
-        if isinstance(inputs.get("faciesid"), str):
-            inputs["faciesid"] = _resolve_faciesid(cur, inputs["faciesid"], response)
-        try:
-            inputs["collectionunitid"] = databus.get("collunits").id_int
         except Exception as e:
-            inputs["collectionunitid"] = 1  # placeholder
             response.valid.append(False)
-            response.message.append(
-                f"✗ Collection Unit ID is required for Analysis Unit validation: {e}."
-            )
+            response.message.append(f"✗ AnalysisUnit cannot be created: {e}")
+        response.counter += 1
+    if staged:
+        ids, errors = nh.insert_staged(cur, "analysisunits", staged)
+        response.id_list.extend(ids)
+        for e in errors:
+            response.valid.append(False)
+            response.add_message("✗ Could not insert AnalysisUnit: {e}", e=e)
+
+
+def _validate_single(cur, inputs, databus, response):
+    """Create and insert the single AnalysisUnit of a file without rowwise depths.
+
+    Returns False if the AnalysisUnit could not be created.
+    """
+    if isinstance(inputs.get("faciesid"), str):
+        inputs["faciesid"] = _resolve_faciesid(cur, inputs["faciesid"], response)
+    try:
+        inputs["collectionunitid"] = databus.get("collunits").id_int
+    except Exception as e:
+        inputs["collectionunitid"] = 1  # placeholder
+        response.valid.append(False)
+        response.message.append(
+            f"✗ Collection Unit ID is required for Analysis Unit validation: {e}."
+        )
+    try:
+        au = AnalysisUnit(**inputs)
+        response.valid.append(True)
+        response.counter = 1
         try:
-            au = AnalysisUnit(**inputs)
-            response.valid.append(True)
-            response.counter = 1
-            try:
-                auid = au.insert_to_db(cur)
-                response.id_list.append(auid)
-            except Exception as e:
-                response.valid.append(False)
-                response.message.append(f"✗ Could not insert AnalysisUnit: {e}")
+            auid = au.insert_to_db(cur)
+            response.id_list.append(auid)
         except Exception as e:
             response.valid.append(False)
-            response.message.append(f"✗ AnalysisUnit cannot be created: {e}")
-            return response
-    if response.validAll:
-        response.message.append("✔ AnalysisUnit(s) can be created.")
-    return response
+            response.message.append(f"✗ Could not insert AnalysisUnit: {e}")
+    except Exception as e:
+        response.valid.append(False)
+        response.message.append(f"✗ AnalysisUnit cannot be created: {e}")
+        return False
+    return True
 
 
 def _resolve_faciesid(cur, faciesid, response):
     """Look up a facies ID in the database and update the response."""
-    query = """SELECT faciesid
-               FROM ndb.faciestypes
-               WHERE LOWER(facies) = %(faciesid)s"""
-    cur.execute(query, {"faciesid": faciesid.lower().strip()})
-    result = cur.fetchone()
+    result = nh.lookup_vocabulary(cur, "faciestypes", faciesid)
     if result is not None:
-        if not any(
-            f"✔ Facies ID {result[0]} found in database." in msg for msg in response.message
-        ):
-            response.message.append(f"✔ Facies ID {result[0]} found in database.")
-        return result[0]
-    # if the message exists, dont add it again
-    if not any(f"✗ Facies ID {faciesid} not found in database." in msg for msg in response.message):
-        response.message.append(f"✗ Facies ID {faciesid} not found in database.")
+        response.add_message("✔ Facies ID {result} found in database.", result=result)
+        return result
+    response.add_message("✗ Facies ID {faciesid} not found in database.", faciesid=faciesid)
     response.valid.append(False)
     return None
@@ -3,7 +3,7 @@ from DataBUS import ChronControl, Response
 from DataBUS.ChronControl import CCONTROL_PARAMS
 
 
-def valid_chroncontrols(cur, yml_dict, csv_file, databus=None):
+def valid_chroncontrols(cur, yml_dict, csv_file, databus=None, preallocate=False):
     """Validates and inserts chronological control points for age models.
 
     Validates chronology control parameters including depth, age, thickness,
@@ -16,12 +16,18 @@ def valid_chroncontrols(cur, yml_dict, csv_file, databus=None):
       - analysisunitid values from databus['analysisunits'].id_list
     The resulting chroncontrol IDs are appended to response.id_list.
 
+    With ``preallocate`` set the control points are given IDs reserved from
+    the sequence and written with one statement (``insert_records``), or one
+    ``ts.insertchroncontrol`` call each when the sequence cannot be used.
+
     Args:
         cur (cursor): Database cursor for executing SQL queries.
         yml_dict (dict): Dictionary containing YAML configuration data.
         csv_file (list): List of dictionaries representing CSV file data.
         databus (dict | None): Prior validation results supplying chronology and
             analysis unit IDs.
+        preallocate (bool): Insert the control points set-based with
+            pre-allocated IDs. Defaults to False.
 
     Returns:
         Response: Response object containing validation messages, validity list,
@@ -54,13 +60,9 @@ def valid_chroncontrols(cur, yml_dict, csv_file, databus=None):
         )
         return response
 
-    agetype_query = """SELECT agetypeid FROM ndb.agetypes
-                   WHERE LOWER(agetype) = LOWER(%(agetype)s)"""
-    chroncontrol_q = """SELECT chroncontroltypeid FROM ndb.chroncontroltypes
-                        WHERE LOWER(chroncontroltype) = LOWER(%(chroncontroltype)s)"""
     par = {
-        "agetypeid": [agetype_query, "agetype"],
-        "chroncontroltypeid": [chroncontrol_q, "chroncontroltype"],
+        "agetypeid": "agetypes",
+        "chroncontroltypeid": "chroncontroltypes",
     }
 
     # Pull chronologyid – prefer real ID from databus
@@ -94,49 +96,50 @@ def valid_chroncontrols(cur, yml_dict, csv_file, databus=None):
         )
         inputs["analysisunitid"] = [i + 1 for i in range(len(inputs["age"]))]
 
+    staged = []
     for chron in chronos:
         for row in zip(*inputs.values(), strict=False):
             control = dict(zip(inputs.keys(), row, strict=False))
             control["chronologyid"] = chron
             # Resolve string lookup fields
-            for param, (query, key) in par.items():
+            for param, vocabulary in par.items():
                 if isinstance(control.get(param), str):
-                    cur.execute(query, {key: control[param].lower().strip()})
-                    result = cur.fetchone()
-                    if result:
-                        control[param] = result[0]
-                        if (
-                            f"✔ The provided {param} is correct: {result[0]}"
-                            not in response.message
-                        ):
-                            response.message.append(
-                                f"✔ The provided {param} is correct: {result[0]}"
-                            )
+                    result = nh.lookup_vocabulary(cur, vocabulary, control[param])
+                    if result is not None:
+                        control[param] = result
+                        response.add_message(
+                            "✔ The provided {param} is correct: {result}",
+                            param=param,
+                            result=result,
+                        )
                         response.valid.append(True)
                     else:
-                        if (
-                            f"✗ The provided {param} with value "
-                            f"{control[param]} does not exist in Neotoma DB."
-                            not in response.message
-                        ):
-                            response.message.append(
-                                f"✗ The provided {param} with value "
-                                f"{control[param]} does not exist in Neotoma DB."
-                            )
+                        response.add_message(
+                            "✗ The provided {param} with value {value} does not exist in Neotoma DB.",
+                            param=param,
+                            value=control[param],
+                        )
                         response.valid.append(False)
             try:
                 cc = ChronControl(**control)
-                if "✔  Chron controls can be created." not in response.message:
-                    response.message.append("✔  Chron controls can be created.")
+                response.add_message("✔  Chron controls can be created.")
                 response.valid.append(True)
+                if preallocate:
+                    try:
+                        cc.check_age_limits()
+                    except Exception as e:
+                        response.add_message("✗  ChronControl could not be inserted: {e}", e=e)
+                        response.valid.append(False)
+                        continue
+                    staged.append(cc)
+                    continue
                 try:
                     cc_id = cc.insert_to_db(cur)
                     response.id_list.append(cc_id)
                     response.message.append(f"✔  ChronControl inserted with ID {cc_id}.")
                     response.valid.append(True)
                 except Exception as e:
-                    if f"✗  ChronControl could not be inserted: {e}" not in response.message:
-                        response.message.append(f"✗  ChronControl could not be inserted: {e}")
+                    response.add_message("✗  ChronControl could not be inserted: {e}", e=e)
                     response.valid.append(False)
                     continue
             except Exception as e:
@@ -145,4 +148,13 @@ def valid_chroncontrols(cur, yml_dict, csv_file, databus=None):
                 )
                 response.valid.append(False)
                 continue
+    if staged:
+        ids, errors = nh.insert_staged(cur, "chroncontrols", staged)
+        for cc_id in ids:
+            response.id_list.append(cc_id)
+            response.message.append(f"✔  ChronControl inserted with ID {cc_id}.")
+            response.valid.append(True)
+        for e in errors:
+            response.add_message("✗  ChronControl could not be inserted: {e}", e=e)
+            response.valid.append(False)
     return response
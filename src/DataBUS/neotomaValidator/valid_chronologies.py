@@ -47,9 +47,6 @@ def valid_chronologies(cur, yml_dict, csv_file, databus=None):
         response.message.append("✔ File with multiple chronologies.")
         response.message.append(f"{list(inputs.keys())}")
 
-    agetype_query = """SELECT agetypeid FROM ndb.agetypes
-                       WHERE LOWER(agetype) = %(agetype)s"""
-
     try:
         cu_id = databus["collunits"].id_int
         collunitid = cu_id
@@ -68,11 +65,10 @@ def valid_chronologies(cur, yml_dict, csv_file, databus=None):
         if ch.get("chronologyname") is None:
             ch["chronologyname"] = chron_key
         if ch.get("agetypeid") is not None and isinstance(ch["agetypeid"], str):
-            cur.execute(agetype_query, {"agetype": ch["agetypeid"].lower().strip()})
-            result = cur.fetchone()
-            if result:
-                ch["agetypeid"] = result[0]
-                response.message.append(f"✔ The provided age type is correct: {result[0]}")
+            result = nh.lookup_vocabulary(cur, "agetypes", ch["agetypeid"])
+            if result is not None:
+                ch["agetypeid"] = result
+                response.message.append(f"✔ The provided age type is correct: {result}")
                 response.valid.append(True)
             else:
                 response.message.append("✗ The provided age type does not exist in Neotoma DB.")
@@ -48,21 +48,17 @@ def valid_collunit(cur, yml_dict, csv_file, databus=None):
         response.message.append(f"✗  CU parameters cannot be properly extracted. {e}\n")
         return response
     ids = {
-        "colltypeid": """SELECT colltypeid FROM ndb.collectiontypes
-                            WHERE LOWER(colltype) = %(colltype)s""",
-        "depenvtid": """SELECT depenvtid FROM ndb.depenvttypes
-                            WHERE LOWER(depenvt) = %(depenvt)s""",
-        "substrateid": """SELECT rocktypeid FROM ndb.rocktypes
-                            WHERE LOWER(rocktype) = %(substrate)s""",
+        "colltypeid": "collectiontypes",
+        "depenvtid": "depenvttypes",
+        "substrateid": "rocktypes",
     }
-    for key, query in ids.items():
+    for key, vocabulary in ids.items():
         if isinstance(inputs.get(key), (float, int)) or inputs.get(key) is None:
             continue
         elif isinstance(inputs.get(key), str):
-            cur.execute(query, {key[:-2]: inputs[key].lower().strip()})
-            result = cur.fetchone()
-            if result:
-                inputs[key] = result[0]
+            result = nh.lookup_vocabulary(cur, vocabulary, inputs[key])
+            if result is not None:
+                inputs[key] = result
             else:
                 response.valid.append(False)
                 response.message.append(
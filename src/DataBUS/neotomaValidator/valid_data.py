@@ -1,19 +1,58 @@
+import functools
+
 import DataBUS.neotomaHelpers as nh
 from DataBUS import Datum, Response, Variable
 
+# Variable fields resolved by name: taxa from ndb.taxa, the others from their
+# controlled vocabulary.
+VARIABLE_FIELDS = {
+    "taxonid": None,
+    "variableelementid": "variableelements",
+    "variableunitsid": "variableunits",
+    "variablecontextid": "variablecontexts",
+}
+TAXA_QUERY = """SELECT LOWER(taxonname), taxonid FROM ndb.taxa
+                WHERE LOWER(taxonname) = ANY(%(taxa)s);"""
+
 
-def valid_data(cur, yml_dict, csv_file, databus=None):
+def valid_data(cur, yml_dict, csv_file, databus=None, bulk=None, preallocate=False):
     """Validates paleontological data values against the Neotoma database.
 
     Validates data values and associated variables (taxon, units, element, context).
     Queries database for valid variable IDs, creates Variable and Datum objects
     with validated parameters. Supports both long and wide data format.
 
+    Taxa, units, elements and contexts are resolved up front with one
+    set-based query per field for the distinct terms of the file, and the
+    distinct variables with one query on ``ndb.variables``, so the number of
+    lookups grows with the number of distinct variables, not of data values.
+
+    When ``csv_file`` is a ``ChunkedReader`` the data are validated and inserted
+    one block of rows at a time; a taxon whose values are all empty within a
+    block is skipped for that block.
+
+    By default each datum is inserted with ``ts.insertdata``. With ``bulk`` set
+    the valid data of each block are written with one ``Datum.insert_many``
+    statement instead, and the returned dataids fill ``response.id_dict`` in
+    the same order. A block that fails is rolled back and inserted one datum
+    at a time, so the bad values are reported.
+
+    With ``preallocate`` set the dataids of each block are reserved from the
+    sequence and the block is written with one statement (``insert_records``).
+    When the sequence cannot be used the block falls back on
+    ``Datum.insert_many`` with ``bulk``, or on one ``ts.insertdata`` call per
+    datum; a block that fails is inserted one datum at a time.
+
     Args:
         cur (psycopg2.cursor): Database cursor for executing SQL queries.
         yml_dict (dict): Dictionary containing YAML configuration data.
-        csv_file (str): Path to CSV file containing data to validate.
-        wide (bool, optional): Flag for wide format data handling. Defaults to False.
+        csv_file (list[dict] | ChunkedReader): Row dicts from the data file, or
+            a block-wise reader over it.
+        databus (dict | None): Prior validation results supplying sample IDs.
+        bulk (str, optional): ``"insert"`` or ``"copy"`` to insert the data in
+            bulk (see ``Datum.insert_many``). Defaults to None, one insert per datum.
+        preallocate (bool): Insert the data of a block set-based with
+            pre-allocated IDs. Defaults to False.
 
     Returns:
         Response: Response object containing validation messages, validity list, and overall status.
@@ -22,39 +61,52 @@ def valid_data(cur, yml_dict, csv_file, databus=None):
         >>> valid_data(cursor, config_dict, "data.csv")
         Response(valid=[True], message=[...], validAll=True)
     """
-    var_query = """SELECT variableelementid FROM ndb.variableelements
-                    WHERE LOWER(variableelement) = %(variableelementid)s;"""
-    taxon_query = """SELECT * FROM ndb.taxa
-                        WHERE LOWER(taxonname) = %(taxonid)s;"""
-    units_query = """SELECT variableunitsid FROM ndb.variableunits
-                        WHERE LOWER(variableunits) = %(variableunitsid)s;"""
-    context_query = """SELECT variablecontextid FROM ndb.variablecontexts
-                        WHERE LOWER(variablecontext) = %(variablecontextid)s;"""
-
-    par = {
-        "taxonid": [taxon_query, "taxonid"],
-        "variableelementid": [var_query, "variableelementid"],
-        "variableunitsid": [units_query, "variableunitsid"],
-        "variablecontextid": [context_query, "variablecontextid"],
-    }
     response = Response()
-    try:
+    response.id_dict = {}
+    # Lookups shared by all blocks: (param, term) → ID or None, Variable.key →
+    # variableid or None, and the (param, term) pairs already reported found.
+    cache = {"terms": {}, "variables": {}, "reported": set()}
+    sampleids = None
+    blocks = _pull_blocks(yml_dict, csv_file)
+    while True:
+        try:
+            rows, inputs, inputs2 = next(blocks)
+        except StopIteration:
+            break
+        except Exception as e:
+            response.valid.append(False)
+            response.message.append(f"✗  Error pulling parameters: {e}")
+            return response
+        if not rows.start:
+            try:
+                sampleids = databus["samples"].id_list
+            except Exception as e:
+                response.valid.append(False)
+                response.message.append(f"✗ Sample IDs not available; using placeholder: {e}")
+        data = _block_data(inputs, inputs2, sampleids, rows, response)
+        _validate_rows(cur, data, cache, response, bulk, preallocate)
+    return response
+
+
+def _pull_blocks(yml_dict, csv_file):
+    """Yield ``(rows, data inputs, variable inputs)`` for each block of ``csv_file``."""
+    variable_params = ["taxonid", "variableunitsid", "variableelementid", "variablecontextid"]
+    if not isinstance(csv_file, nh.ChunkedReader):
         inputs = nh.pull_params(["value"], yml_dict, csv_file, "ndb.data")
-        inputs2 = nh.pull_params(
-            ["taxonid", "variableunitsid", "variableelementid", "variablecontextid"],
-            yml_dict,
-            csv_file,
-            "ndb.variables",
-        )
-    except Exception as e:
-        response.valid.append(False)
-        response.message.append(f"✗  Error pulling parameters: {e}")
-        return response
-    try:
-        sampleids = databus["samples"].id_list
-    except Exception as e:
-        response.valid.append(False)
-        response.message.append(f"✗ Sample IDs not available; using placeholder: {e}")
+        inputs2 = nh.pull_params(variable_params, yml_dict, csv_file, "ndb.variables")
+        yield slice(0, None), inputs, inputs2
+        return
+    blocks = zip(
+        nh.pull_params_blocks(["value"], yml_dict, csv_file, "ndb.data"),
+        nh.pull_params_blocks(variable_params, yml_dict, csv_file, "ndb.variables"),
+        strict=True,
+    )
+    for (rows, inputs), (_, inputs2) in blocks:
+        yield rows, inputs, inputs2
+
+
+def _block_data(inputs, inputs2, sampleids, rows, response):
+    """Combine the data and variable inputs of a block into row-aligned columns."""
     data = {}
     if inputs.get("value"):
         data = inputs2.copy()
@@ -74,14 +126,16 @@ def valid_data(cur, yml_dict, csv_file, databus=None):
             data[key]["taxonid"] = [real_taxon] * len(inputs[key]["value"])
             data[key]["value"] = inputs[key]["value"]
             if sampleids:
-                data[key]["sampleid"] = sampleids
+                data[key]["sampleid"] = sampleids[rows]
             else:
                 data[key]["sampleid"] = [
-                    i + 1 for i in range(len(inputs[key]["value"]))
+                    rows.start + i + 1 for i in range(len(inputs[key]["value"]))
                 ]  # placeholder
                 response.valid.append(False)
+        # pull_params already drops taxa without values; within a block of a
+        # ChunkedReader an empty taxon is kept so its rows stay aligned.
         for key in list(data.keys()):
-            if "value" not in data[key] or all(v is None for v in data[key]["value"]):
+            if "value" not in data[key]:
                 data.pop(key)
         combined_data = {}
         for key in data:
@@ -94,81 +148,136 @@ def valid_data(cur, yml_dict, csv_file, databus=None):
                 else:
                     combined_data[k].extend(v if isinstance(v, list) else [v] * length)
         data = combined_data
-    vals = {}
-    response.id_dict = {}
-    for datum in zip(*data.values(), strict=False):
-        datum = dict(zip(list(data.keys()), datum, strict=False))
+    return data
+
+
+def _validate_rows(cur, data, cache, response, bulk=None, preallocate=False):
+    """Resolve the variable of each row of a block and insert its datum."""
+    rows = [
+        dict(zip(data.keys(), datum, strict=False)) for datum in zip(*data.values(), strict=False)
+    ]
+    txnames = []
+    for datum in rows:
         entry_key = datum.pop("_entry_key", None)
-        txname = entry_key if entry_key else datum.get("taxonid")
-        if txname not in response.id_dict:
-            response.id_dict[txname] = []
-        for param, (query, key) in par.items():
+        txnames.append(entry_key if entry_key else datum.get("taxonid"))
+        for param in VARIABLE_FIELDS:
             if isinstance(datum.get(param), str) and datum[param].strip().lower() == "none":
                 datum[param] = None
-            if isinstance(datum.get(param), str):
-                name = datum[param]
-                if datum[param].lower().strip() in vals:
-                    datum[param] = vals[datum[param].lower().strip()]
-                else:
-                    cur.execute(query, {key: datum[param].lower().strip()})
-                    result = cur.fetchone()
-                    if result:
-                        vals[datum[param].lower().strip()] = result[0]
-                        datum[param] = result[0]
-                        if (
-                            f"✔ The provided {param} is correct: {name} - ID: ({result[0]})"
-                            not in response.message
-                        ):
-                            response.message.append(
-                                f"✔ The provided {param} is correct: {name} - ID: ({result[0]})"
-                            )
-                        response.valid.append(True)
-                    else:
-                        if (
-                            f"✗ The provided {param} with value {datum[param]} does not exist in Neotoma DB."
-                            not in response.message
-                        ):
-                            response.message.append(
-                                f"✗ The provided {param} with value {datum[param]} does not exist in Neotoma DB."
-                            )
-                        response.valid.append(False)
-        try:
-            var = Variable(**{k: v for k, v in datum.items() if k not in ("value", "sampleid")})
-            response.valid.append(True)
-        except Exception as e:
-            response.valid.append(False)
-            if (
-                f"✗  Variable cannot be created with provided parameters: {e}"
-                not in response.message
-            ):
-                response.message.append(
-                    f"✗  Variable cannot be created with provided parameters: {e}"
-                )
-            if "✗  Variable ID needed to create datum for taxon." not in response.message:
-                response.message.append("✗  Variable ID needed to create datum for taxon.")
-        try:
-            varid = var.get_id_from_db(cur)
-            varid = varid[0]
-            if f"✔ Variable ID retrieved from db: {varid}" not in response.message:
-                response.message.append(f"✔ Variable ID retrieved from db: {varid}")
-            response.valid.append(True)
-        except Exception as e:
+    _resolve_terms(cur, rows, cache["terms"])
+    variables = [_variable(datum, cache, response) for datum in rows]
+    pending = {v.key for v in variables if v is not None} - cache["variables"].keys()
+    if pending:
+        found = Variable.get_ids_from_db(
+            cur, [v for v in variables if v is not None and v.key in pending]
+        )
+        cache["variables"].update({key: found.get(key) for key in pending})
+    staged = []
+    for datum, var, txname in zip(rows, variables, txnames, strict=True):
+        if txname not in response.id_dict:
+            response.id_dict[txname] = []
+        if var is None:
+            continue
+        varid = cache["variables"].get(var.key)
+        if varid is None:
             response.valid.append(False)
-            if f"✗  Var ID cannot be retrieved from db: {e}" not in response.message:
-                response.message.append(f"✗  Var ID cannot be retrieved from db: {e}")
+            response.add_message("✗  Var ID cannot be retrieved from db: {var} not found.", var=var)
             continue
+        response.add_message("✔ Variable ID retrieved from db: {varid}", varid=varid)
+        response.valid.append(True)
         try:
             d = Datum(sampleid=datum.get("sampleid"), variableid=varid, value=datum.get("value"))
             response.valid.append(True)
+            if bulk or preallocate:
+                staged.append((txname, d))
+                continue
             try:
                 d_id = d.insert_to_db(cur)
                 response.id_dict[txname].append(d_id)
             except Exception as e:
                 response.valid.append(False)
-                if f"✗  Datum cannot be inserted: {e}" not in response.message:
-                    response.message.append(f"✗  Datum cannot be inserted: {e}")
+                response.add_message("✗  Datum cannot be inserted: {e}", e=e)
         except Exception as e:
             response.valid.append(False)
-            if f"✗  Datum cannot be created: {e}" not in response.message:
-                response.message.append(f"✗  Datum cannot be created: {e}")
+            response.add_message("✗  Datum cannot be created: {e}", e=e)
+    if staged:
+        _insert_bulk(cur, staged, bulk, response, preallocate)
     return response
+
+
+def _insert_bulk(cur, staged, method, response, preallocate=False):
+    """Insert the ``(taxon, Datum)`` pairs of a block with one statement."""
+    data = [d for _, d in staged]
+    if preallocate:
+        bulk = functools.partial(Datum.insert_many, cur, method=method) if method else None
+        ids = nh.insert_records(cur, "data", data, bulk=bulk)
+    else:
+        try:
+            ids = Datum.insert_many(cur, data, method=method)
+        except Exception as e:
+            # The block was rolled back; insert it row by row to report the bad data.
+            response.add_message("✗  Data cannot be inserted in bulk: {e}", e=e)
+            ids = nh.insert_each(cur, data)
+    for (txname, _), d_id in zip(staged, ids, strict=True):
+        if isinstance(d_id, Exception):
+            response.valid.append(False)
+            response.add_message("✗  Datum cannot be inserted: {e}", e=d_id)
+        else:
+            response.id_dict[txname].append(d_id)
+
+
+def _resolve_terms(cur, rows, terms):
+    """Look up the distinct, not yet resolved variable terms of a block, one query per field."""
+    for param, vocabulary in VARIABLE_FIELDS.items():
+        pending = {
+            datum[param].lower().strip() for datum in rows if isinstance(datum.get(param), str)
+        } - {term for (p, term) in terms if p == param}
+        if not pending:
+            continue
+        if vocabulary is None:
+            cur.execute(TAXA_QUERY, {"taxa": sorted(pending)})
+            found = {}
+            for name, taxonid in cur.fetchall() or []:
+                found.setdefault(name, taxonid)
+        else:
+            found = nh.lookup_vocabulary_many(cur, vocabulary, pending)
+        terms.update({(param, term): found.get(term) for term in pending})
+
+
+def _variable(datum, cache, response):
+    """Replace the variable terms of a row by their IDs and build its ``Variable``.
+
+    Returns None when the ``Variable`` cannot be created.
+    """
+    for param in VARIABLE_FIELDS:
+        if not isinstance(datum.get(param), str):
+            continue
+        name = datum[param]
+        key = (param, name.lower().strip())
+        result = cache["terms"].get(key)
+        if result is None:
+            response.add_message(
+                "✗ The provided {param} with value {name} does not exist in Neotoma DB.",
+                param=param,
+                name=name,
+            )
+            response.valid.append(False)
+            continue
+        datum[param] = result
+        if key not in cache["reported"]:
+            cache["reported"].add(key)
+            response.add_message(
+                "✔ The provided {param} is correct: {name} - ID: ({result})",
+                param=param,
+                name=name,
+                result=result,
+            )
+            response.valid.append(True)
+    try:
+        var = Variable(**{k: v for k, v in datum.items() if k in VARIABLE_FIELDS})
+        response.valid.append(True)
+        return var
+    except Exception as e:
+        response.valid.append(False)
+        response.add_message("✗  Variable cannot be created with provided parameters: {e}", e=e)
+        response.add_message("✗  Variable ID needed to create datum for taxon.")
+        return None
@@ -14,10 +14,15 @@ def valid_datauncertainty(cur, yml_dict, csv_file, databus=None):
     inserts each DataUncertainty record into ``ndb.datauncertainties`` via
     ``du.insert_to_db(cur)``.
 
+    When ``csv_file`` is a ``ChunkedReader`` the uncertainties are validated
+    one block of rows at a time; each block takes the data IDs of each taxon
+    that follow those used by the previous blocks.
+
     Args:
         cur (cursor): Database cursor for executing SQL queries.
         yml_dict (dict): Dictionary containing YAML configuration parameters.
-        csv_file (list[dict]): List of row dicts from the CSV file.
+        csv_file (list[dict] | ChunkedReader): List of row dicts from the CSV
+            file, or a block-wise reader over it.
         databus (dict | None): Prior validation results. When not None, uses
             ``databus["samples"].id_list`` for sample IDs during insert. Defaults to None.
 
@@ -29,81 +34,94 @@ def valid_datauncertainty(cur, yml_dict, csv_file, databus=None):
         Response(valid=[True], message=[...], validAll=True)
     """
     response = Response()
-    try:
-        inputs = nh.pull_params(DATAUNCERTAINTY_PARAMS, yml_dict, csv_file, "ndb.datauncertainties")
-        if all(v is None for v in inputs.values()):
-            response.message.append("? No Uncertainty Values to validate.")
-            response.valid.append(True)
+    data_ids = None
+    consumed = {}
+    vals = {}
+    blocks = nh.pull_params_blocks(
+        DATAUNCERTAINTY_PARAMS, yml_dict, csv_file, "ndb.datauncertainties"
+    )
+    while True:
+        try:
+            _, inputs = next(blocks)
+        except StopIteration:
+            break
+        except Exception as e:
+            response.message.append(
+                f"✗  Error pulling parameters for data uncertainty validation: {e}"
+            )
+            response.valid.append(False)
             return response
-    except Exception as e:
-        response.message.append(f"✗  Error pulling parameters for data uncertainty validation: {e}")
-        response.valid.append(False)
-        return response
+        if all(v is None for v in inputs.values()):
+            continue
+        if data_ids is None:
+            try:
+                data_ids = databus["data"].id_dict
+            except Exception as e:
+                response.valid.append(False)
+                response.message.append(f"✗ Data IDs not available; using placeholders: {e}")
+                data_ids = {}
+        _validate_block(cur, inputs, data_ids, consumed, vals, response)
+    if data_ids is None:
+        response.message.append("? No Uncertainty Values to validate.")
+        response.valid.append(True)
+    return response
 
-    basis_query = """SELECT uncertaintybasisid FROM ndb.uncertaintybases
-                     WHERE LOWER(uncertaintybasis) = %(uncertaintybasisid)s;"""
-    units_query = """SELECT variableunitsid FROM ndb.variableunits
-                     WHERE LOWER(variableunits) = %(uncertaintyunitid)s;"""
-    par = {
-        "uncertaintybasisid": [basis_query, "uncertaintybasisid"],
-        "uncertaintyunitid": [units_query, "uncertaintyunitid"],
-    }
 
-    try:
-        data_ids = databus["data"].id_dict
-    except Exception as e:
-        response.valid.append(False)
-        response.message.append(f"✗ Data IDs not available; using placeholders: {e}")
-        data_ids = {}
-    vals = {}
+def _validate_block(cur, inputs, data_ids, consumed, vals, response):
+    """Validate and insert the uncertainties of one block of rows.
 
+    ``consumed`` counts, per taxon, the data IDs used by earlier blocks, so
+    each block takes the IDs that follow them.
+    """
+    par = {
+        "uncertaintybasisid": "uncertaintybases",
+        "uncertaintyunitid": "variableunits",
+    }
     for taxon in inputs:
         if not data_ids.get(taxon):
-            response.message.append(
-                f"? No associated data IDs found for taxon '{taxon}'; skipping uncertainty validation for this taxon."
-            )
+            message = f"? No associated data IDs found for taxon '{taxon}'; skipping uncertainty validation for this taxon."
+            response.add_message(message)
             continue
-        else:
-            inputs[taxon]["dataid"] = data_ids[taxon]
         if inputs[taxon].get("uncertaintyvalue") is None:
-            response.message.append(
-                f"? No uncertainty values provided for taxon '{taxon}'; skipping uncertainty validation for this taxon."
-            )
+            message = f"? No uncertainty values provided for taxon '{taxon}'; skipping uncertainty validation for this taxon."
+            response.add_message(message)
             continue
-        inputs[taxon]["uncertaintybasisid"] = [inputs[taxon].get("uncertaintybasisid")] * len(
-            inputs[taxon].get("uncertaintyvalue")
-        )
+        start = consumed.get(taxon, 0)
+        consumed[taxon] = start + len(inputs[taxon]["uncertaintyvalue"])
+        inputs[taxon]["dataid"] = data_ids[taxon][start : consumed[taxon]]
+        # Broadcast per-taxon values (basis, units) to one per row.
+        n_rows = len(inputs[taxon]["uncertaintyvalue"])
+        for key, value in inputs[taxon].items():
+            if not isinstance(value, list):
+                inputs[taxon][key] = [value] * n_rows
         for datum in zip(*inputs.get(taxon).values(), strict=False):
             datum = dict(zip(list(inputs[taxon].keys()), datum, strict=False))
             if datum.get("uncertaintyvalue") is None:
                 continue
-            for param, (query, key) in par.items():
+            for param, vocabulary in par.items():
                 if isinstance(datum.get(param), str):
-                    if datum[param].lower().strip() in vals:
-                        datum[param] = vals[datum[param].lower().strip()]
+                    key = (param, datum[param].lower().strip())
+                    if key in vals:
+                        datum[param] = vals[key]
                     else:
-                        cur.execute(query, {key: datum[param].lower().strip()})
-                        result = cur.fetchone()
-                        if result:
+                        result = nh.lookup_vocabulary(cur, vocabulary, key[1])
+                        if result is not None:
                             name = datum[param]
-                            vals[datum[param].lower().strip()] = result[0]
-                            datum[param] = result[0]
-                            if (
-                                f"✔ The provided {param} is correct: {result[0]}"
-                                not in response.message
-                            ):
-                                response.message.append(
-                                    f"✔ The provided {param} ({name}) is correct: {result[0]}"
-                                )
+                            vals[key] = result
+                            datum[param] = result
+                            response.add_message(
+                                "✔ The provided {param} ({name}) is correct: {result}",
+                                param=param,
+                                name=name,
+                                result=result,
+                            )
                             response.valid.append(True)
                         else:
-                            if (
-                                f"✗ The provided {param} with value {datum[param]} does not exist in Neotoma DB."
-                                not in response.message
-                            ):
-                                response.message.append(
-                                    f"✗ The provided {param} with value {datum[param]} does not exist in Neotoma DB."
-                                )
+                            response.add_message(
+                                "✗ The provided {param} with value {value} does not exist in Neotoma DB.",
+                                param=param,
+                                value=datum[param],
+                            )
                             response.valid.append(False)
             try:
                 du = DataUncertainty(
@@ -114,24 +132,16 @@ def valid_datauncertainty(cur, yml_dict, csv_file, databus=None):
                     notes=datum.get("notes"),
                 )
                 response.valid.append(True)
-                if "✔  Datum Uncertainty can be created." not in response.message:
-                    response.message.append("✔  Datum Uncertainty can be created.")
+                response.add_message("✔  Datum Uncertainty can be created.")
                 try:
                     du.insert_to_db(cur)
                     response.valid.append(True)
-                    if (
-                        f"✔  Datum Uncertainty inserted into db for taxon '{taxon}'."
-                        not in response.message
-                    ):
-                        response.message.append(
-                            f"✔  Datum Uncertainty inserted into db for taxon '{taxon}'."
-                        )
+                    response.add_message(
+                        "✔  Datum Uncertainty inserted into db for taxon '{taxon}'.", taxon=taxon
+                    )
                 except Exception as e:
                     response.valid.append(False)
-                    if f"✗  Datum Uncertainty cannot be inserted: {e}" not in response.message:
-                        response.message.append(f"✗  Datum Uncertainty cannot be inserted: {e}")
+                    response.add_message("✗  Datum Uncertainty cannot be inserted: {e}", e=e)
             except Exception as e:
                 response.valid.append(False)
-                if f"✗  Datum Uncertainty cannot be created: {e}" not in response.message:
-                    response.message.append(f"✗  Datum Uncertainty cannot be created: {e}")
-    return response
+                response.add_message("✗  Datum Uncertainty cannot be created: {e}", e=e)
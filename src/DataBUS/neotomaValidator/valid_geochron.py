@@ -69,54 +69,44 @@ def valid_geochron(cur, yml_dict, csv_file, databus=None):
 
     inputs = {k: v for k, v in inputs.items() if v is not None}
 
-    geochron_query = """SELECT geochrontypeid FROM ndb.geochrontypes
-                    WHERE LOWER(geochrontype) = LOWER(%(geochrontype)s)"""
-    agetype_query = """SELECT agetypeid FROM ndb.agetypes
-                   WHERE LOWER(agetype) = LOWER(%(agetype)s)"""
     par = {
-        "agetypeid": [agetype_query, "agetype"],
-        "geochrontypeid": [geochron_query, "geochrontype"],
+        "agetypeid": "agetypes",
+        "geochrontypeid": "geochrontypes",
     }
 
     for row in zip(*inputs.values(), strict=False):
         geochron = dict(zip(inputs.keys(), row, strict=False))
-        for param, (query, key) in par.items():
+        for param, vocabulary in par.items():
             if geochron.get(param) and isinstance(geochron[param], str):
-                cur.execute(query, {key: geochron[param].lower().strip()})
-                result = cur.fetchone()
-                if result:
-                    geochron[param] = result[0]
-                    if f"✔ The provided {param} is correct: {result[0]}" not in response.message:
-                        response.message.append(f"✔ The provided {param} is correct: {result[0]}")
+                result = nh.lookup_vocabulary(cur, vocabulary, geochron[param])
+                if result is not None:
+                    geochron[param] = result
+                    response.add_message(
+                        "✔ The provided {param} is correct: {result}", param=param, result=result
+                    )
                     response.valid.append(True)
                 else:
-                    if (
-                        f"✗ The provided {param} with value {geochron[param]} does not exist in Neotoma DB."
-                        not in response.message
-                    ):
-                        response.message.append(
-                            f"✗ The provided {param} with value {geochron[param]} does not exist in Neotoma DB."
-                        )
+                    response.add_message(
+                        "✗ The provided {param} with value {value} does not exist in Neotoma DB.",
+                        param=param,
+                        value=geochron[param],
+                    )
                     response.valid.append(False)
         try:
             geo = Geochron(**geochron)
             response.valid.append(True)
-            if "✔ Geochronology created successfully." not in response.message:
-                response.message.append("✔ Geochronology created successfully.")
+            response.add_message("✔ Geochronology created successfully.")
             try:
                 geo_id = geo.insert_to_db(cur)
                 response.id_list.append(geo_id)
                 response.valid.append(True)
-                if f"✔ Geochron inserted with ID {geo_id}." not in response.message:
-                    response.message.append(f"✔ Geochron inserted with ID {geo_id}.")
+                response.add_message("✔ Geochron inserted with ID {geo_id}.", geo_id=geo_id)
             except Exception as e:
-                if f"✗  Geochron could not be inserted: {e}" not in response.message:
-                    response.message.append(f"✗  Geochron could not be inserted: {e}")
+                response.add_message("✗  Geochron could not be inserted: {e}", e=e)
                 response.valid.append(False)
                 response.id_list.append(None)
         except Exception as e:
-            if f"✗  Geochronology cannot be created: {e}" not in response.message:
-                response.message.append(f"✗  Geochronology cannot be created: {e}")
+            response.add_message("✗  Geochronology cannot be created: {e}", e=e)
             response.valid.append(False)
             response.id_list.append(None)
             continue
@@ -68,8 +68,7 @@ def valid_hiatus(cur, yml_dict, csv_file, databus=None):
                 analysisunitstart=values[0], analysisunitend=values[-1], notes=inputs.get("notes")
             )
             response.valid.append(True)
-            if "✔ Hiatus can be created." not in response.message:
-                response.message.append("✔ Hiatus can be created.")
+            response.add_message("✔ Hiatus can be created.")
             try:
                 h.insert_to_db(cur)
                 response.valid.append(True)
@@ -79,8 +78,7 @@ def valid_hiatus(cur, yml_dict, csv_file, databus=None):
                 response.message.append(f"✗ Could not insert hiatus: {e}")
         except Exception as e:
             response.valid.append(False)
-            if f"✗ Hiatus cannot be created: {e}" not in response.message:
-                response.message.append(f"✗ Hiatus cannot be created: {e}")
+            response.add_message("✗ Hiatus cannot be created: {e}", e=e)
     return response
 
 
@@ -64,16 +64,13 @@ def valid_pbmodel(cur, yml_dict, csv_file, databus):
             response.valid.append(True)
         except Exception as e:
             response.valid.append(False)
-            if f"✗  Lead model cannot be created: {e}" not in response.message:
-                response.message.append(f"✗  Lead model cannot be created: {e}")
-                continue
+            response.add_message("✗  Lead model cannot be created: {e}", e=e)
+            continue
         try:
             pb_model.insert_to_db(cur)
             response.valid.append(True)
-            if "✔  Lead model can be inserted." not in response.message:
-                response.message.append("✔  Lead model can be inserted.")
+            response.add_message("✔  Lead model can be inserted.")
         except Exception as e:
             response.valid.append(False)
-            if f"✗  Lead model cannot be inserted: {e}" not in response.message:
-                response.message.append(f"✗  Lead model cannot be inserted: {e}")
+            response.add_message("✗  Lead model cannot be inserted: {e}", e=e)
     return response
@@ -3,7 +3,7 @@ from DataBUS import Response, Sample
 from DataBUS.Sample import SAMPLE_PARAMS
 
 
-def valid_sample(cur, yml_dict, csv_file, databus):
+def valid_sample(cur, yml_dict, csv_file, databus, preallocate=False):
     """Validates sample data and inserts samples into the database.
 
     Validates sample parameters including taxon information, analysis dates, and
@@ -15,12 +15,23 @@ def valid_sample(cur, yml_dict, csv_file, databus):
     available, each Sample is inserted into ``ndb.samples`` and the resulting sample
     IDs are appended to ``response.id_list``.
 
+    When ``csv_file`` is a ``ChunkedReader`` the rows are validated and
+    inserted one block at a time, each block taking the analysis unit IDs of
+    its own rows.
+
+    With ``preallocate`` set the samples of each block are given IDs reserved
+    from the sequence and written with one statement (``insert_records``),
+    or one ``ts.insertsample`` call each when the sequence cannot be used.
+
     Args:
         cur (psycopg2.cursor): Database cursor for executing SQL queries.
         yml_dict (dict): Dictionary containing YAML configuration data.
-        csv_file (list[dict]): List of row dicts from the CSV file.
+        csv_file (list[dict] | ChunkedReader): List of row dicts from the CSV
+            file, or a block-wise reader over the data file.
         databus (dict): Prior validation results. Must contain
             ``databus["analysisunits"].id_list`` and ``databus["datasets"].id_int``.
+        preallocate (bool): Insert the samples of a block set-based with
+            pre-allocated IDs. Defaults to False.
 
     Returns:
         Response: Response object containing validation messages, validity list,
@@ -31,31 +42,54 @@ def valid_sample(cur, yml_dict, csv_file, databus):
         Response(valid=[True], message=[...], validAll=True, counter=5)
     """
     response = Response()
-    try:
-        inputs = nh.pull_params(SAMPLE_PARAMS, yml_dict, csv_file, "ndb.samples")
+    response.counter = 0
+    blocks = nh.pull_params_blocks(SAMPLE_PARAMS, yml_dict, csv_file, "ndb.samples")
+    while True:
         try:
-            inputs["analysisunitid"] = databus["analysisunits"].id_list
-            if not inputs["analysisunitid"]:
-                raise ValueError("Analysis unit id_list is empty")
-            response.valid.append(True)
-            inputs["datasetid"] = [databus["datasets"].id_int] * len(
-                databus["analysisunits"].id_list
-            )
+            rows, inputs = next(blocks)
+            if rows.start and not _has_analysis_units(databus, rows):
+                break
+            try:
+                inputs["analysisunitid"] = databus["analysisunits"].id_list[rows]
+                if not inputs["analysisunitid"]:
+                    raise ValueError("Analysis unit id_list is empty")
+                if not rows.start:
+                    response.valid.append(True)
+                inputs["datasetid"] = [databus["datasets"].id_int] * len(inputs["analysisunitid"])
+            except Exception as e:
+                if not rows.start:
+                    response.valid.append(False)
+                    response.message.append(
+                        f"✗ No analysis units found in databus. Cannot validate samples "
+                        f"without analysis unit IDs. Using placeholder values for "
+                        f"analysisunitid and datasetid: {e}."
+                    )
+                placeholders = list(range(1, databus["analysisunits"].counter + 1))[rows]
+                inputs["analysisunitid"] = placeholders
+                inputs["datasetid"] = list(placeholders)
+            inputs = {k: v for k, v in inputs.items() if v is not None}
+        except StopIteration:
+            break
         except Exception as e:
+            response.message.append(f"✗ Error pulling sample parameters: {e}")
             response.valid.append(False)
-            response.message.append(
-                f"✗ No analysis units found in databus. Cannot validate samples "
-                f"without analysis unit IDs. Using placeholder values for "
-                f"analysisunitid and datasetid: {e}."
-            )
-            inputs["analysisunitid"] = list(range(1, databus["analysisunits"].counter + 1))
-            inputs["datasetid"] = list(range(1, databus["analysisunits"].counter + 1))
-        inputs = {k: v for k, v in inputs.items() if v is not None}
-    except Exception as e:
-        response.message.append(f"✗ Error pulling sample parameters: {e}")
-        response.valid.append(False)
-        return response
-    response.counter = 0
+            return response
+        _validate_rows(cur, inputs, databus, response, preallocate)
+    return response
+
+
+def _has_analysis_units(databus, rows):
+    """Return True if analysis units (or placeholders) are left for the block ``rows``."""
+    analysisunits = databus.get("analysisunits")
+    if analysisunits is None:
+        return False
+    return bool((analysisunits.id_list or range(analysisunits.counter))[rows])
+
+
+def _validate_rows(cur, inputs, databus, response, preallocate=False):
+    """Create and insert one Sample per row of a block of inputs."""
+    insert = bool(databus.get("analysisunits") and databus["analysisunits"].id_list)
+    staged = []
     get_taxonid = """SELECT taxonid FROM ndb.taxa
                      WHERE LOWER(taxonname) %% %(taxonname)s;"""
     for row in zip(*inputs.values(), strict=False):
@@ -69,9 +103,10 @@ def valid_sample(cur, yml_dict, csv_file, databus):
         try:
             s = Sample(**sample)
             response.valid.append(True)
-            if "✔ Sample can be created." not in response.message:
-                response.message.append("✔ Sample can be created.")
-            if databus.get("analysisunits") and databus["analysisunits"].id_list:
+            response.add_message("✔ Sample can be created.")
+            if insert and preallocate:
+                staged.append(s)
+            elif insert:
                 try:
                     s_id = s.insert_to_db(cur)
                     response.id_list.append(s_id)
@@ -79,12 +114,15 @@ def valid_sample(cur, yml_dict, csv_file, databus):
                     response.valid.append(False)
                     response.message.append(f"✗  Cannot insert sample: {e}")
         except Exception as e:
-            if (
-                f"✗  Samples in AU ID {sample.get('analysisunitid')} is not correct: {e}"
-                not in response.message
-            ):
-                response.message.append(
-                    f"✗  Samples in AU ID {sample.get('analysisunitid')} is not correct: {e}"
-                )
+            response.add_message(
+                "✗  Samples in AU ID {auid} is not correct: {e}",
+                auid=sample.get("analysisunitid"),
+                e=e,
+            )
             response.valid.append(False)
-    return response
+    if staged:
+        ids, errors = nh.insert_staged(cur, "samples", staged)
+        response.id_list.extend(ids)
+        for e in errors:
+            response.valid.append(False)
+            response.add_message("✗  Cannot insert sample: {e}", e=e)
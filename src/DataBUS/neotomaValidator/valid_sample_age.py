@@ -3,7 +3,7 @@ from DataBUS import Response, SampleAge
 from DataBUS.SampleAge import SAMPLE_AGE_PARAMS
 
 
-def valid_sample_age(cur, yml_dict, csv_file, databus=None):
+def valid_sample_age(cur, yml_dict, csv_file, databus=None, preallocate=False):
     """Validates sample age data for paleontological samples.
 
     Validates sample age parameters including age values, uncertainty bounds, and
@@ -13,12 +13,18 @@ def valid_sample_age(cur, yml_dict, csv_file, databus=None):
     using the real chronology ID from databus['chronologies'] and real sample IDs
     from databus['samples'].id_list.
 
+    With ``preallocate`` set the sample ages are given IDs reserved from the
+    sequence and written with one statement (``insert_records``), or one
+    ``ts.insertsampleage`` call each when the sequence cannot be used.
+
     Args:
         cur (cursor): Database cursor for executing SQL queries.
         yml_dict (dict): Dictionary containing YAML configuration data.
         csv_file (list): List of dictionaries representing CSV file data.
         databus (dict | None): Prior validation results supplying chronologyid and
             sample IDs for insert.
+        preallocate (bool): Insert the sample ages set-based with pre-allocated
+            IDs. Defaults to False.
 
     Returns:
         Response: Response object containing validation messages, validity list, and overall status.
@@ -59,6 +65,7 @@ def valid_sample_age(cur, yml_dict, csv_file, databus=None):
         response.valid.append(False)
         response.message.append(" ✗ No samples found in databus")
         return response
+    staged = []
     for chron in inputs:
         sa = inputs[chron]
         sa["sampleid"] = sample_ids
@@ -86,20 +93,27 @@ def valid_sample_age(cur, yml_dict, csv_file, databus=None):
                 sa_age.pop("agemodel")
                 sa_obj = SampleAge(**sa_age)
                 response.valid.append(True)
-                if "✔ Sample Age is valid." not in response.message:
-                    response.message.append("✔ Sample Age is valid.")
+                response.add_message("✔ Sample Age is valid.")
+                if preallocate:
+                    staged.append(sa_obj)
+                    continue
                 try:
                     sa_obj.insert_to_db(cur)
                     response.valid.append(True)
-                    if "✔ Sample Age inserted." not in response.message:
-                        response.message.append("✔ Sample Age inserted.")
+                    response.add_message("✔ Sample Age inserted.")
                 except Exception as e:
                     response.valid.append(False)
-                    if f"✗ Sample Age could not be inserted. {e}" not in response.message:
-                        response.message.append(f"✗ Sample Age could not be inserted. {e}")
+                    response.add_message("✗ Sample Age could not be inserted. {e}", e=e)
             except Exception as e:
                 response.valid.append(False)
-                if f"✗ Samples ages cannot be created. {e}" not in response.message:
-                    response.message.append(f"✗ Samples ages cannot be created. {e}")
+                response.add_message("✗ Samples ages cannot be created. {e}", e=e)
                 continue
+    if staged:
+        ids, errors = nh.insert_staged(cur, "sampleages", staged)
+        for _ in ids:
+            response.valid.append(True)
+            response.add_message("✔ Sample Age inserted.")
+        for e in errors:
+            response.valid.append(False)
+            response.add_message("✗ Sample Age could not be inserted. {e}", e=e)
     return response
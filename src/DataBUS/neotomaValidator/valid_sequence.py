@@ -86,19 +86,16 @@ def valid_sequence(cur, yml_dict, csv_file, databus=None):
             response.valid.append(True)
         except Exception as e:
             response.valid.append(False)
-            if f"✗ Sequence cannot be created: {e}" not in response.message:
-                response.message.append(f"✗ Sequence cannot be created: {e}")
+            response.add_message("✗ Sequence cannot be created: {e}", e=e)
             continue
 
         try:
             sequenceid = seq.insert_to_db(cur)
             response.valid.append(True)
-            if f"✔ Sequence inserted for {entry_key}" not in response.message:
-                response.message.append(f"✔ Sequence inserted for {entry_key}")
+            response.add_message("✔ Sequence inserted for {entry_key}", entry_key=entry_key)
         except Exception as e:
             response.valid.append(False)
-            if f"✗ Sequence cannot be inserted: {e}" not in response.message:
-                response.message.append(f"✗ Sequence cannot be inserted: {e}")
+            response.add_message("✗ Sequence cannot be inserted: {e}", e=e)
             continue
 
         for dataid in dataid_list:
@@ -108,8 +105,7 @@ def valid_sequence(cur, yml_dict, csv_file, databus=None):
                 response.valid.append(True)
             except Exception as e:
                 response.valid.append(False)
-                if f"✗ SequenceData cannot be inserted: {e}" not in response.message:
-                    response.message.append(f"✗ SequenceData cannot be inserted: {e}")
+                response.add_message("✗ SequenceData cannot be inserted: {e}", e=e)
 
         if model_name is None:
             response.id_dict[entry_key] = {"sequenceid": sequenceid, "modelid": None}
@@ -129,8 +125,7 @@ def valid_sequence(cur, yml_dict, csv_file, databus=None):
                 continue
         except Exception as e:
             response.valid.append(False)
-            if f"✗ Error retrieving taxonid: {e}" not in response.message:
-                response.message.append(f"✗ Error retrieving taxonid: {e}")
+            response.add_message("✗ Error retrieving taxonid: {e}", e=e)
             response.id_dict[entry_key] = {"sequenceid": sequenceid, "modelid": None}
             continue
 
@@ -143,20 +138,17 @@ def valid_sequence(cur, yml_dict, csv_file, databus=None):
             response.valid.append(True)
         except Exception as e:
             response.valid.append(False)
-            if f"✗ AeDNAModel cannot be created: {e}" not in response.message:
-                response.message.append(f"✗ AeDNAModel cannot be created: {e}")
+            response.add_message("✗ AeDNAModel cannot be created: {e}", e=e)
             response.id_dict[entry_key] = {"sequenceid": sequenceid, "modelid": None}
             continue
 
         try:
             modelid = aedna.insert_to_db(cur)
             response.valid.append(True)
-            if f"✔ AeDNAModel inserted for {entry_key}" not in response.message:
-                response.message.append(f"✔ AeDNAModel inserted for {entry_key}")
+            response.add_message("✔ AeDNAModel inserted for {entry_key}", entry_key=entry_key)
         except Exception as e:
             response.valid.append(False)
-            if f"✗ AeDNAModel cannot be inserted: {e}" not in response.message:
-                response.message.append(f"✗ AeDNAModel cannot be inserted: {e}")
+            response.add_message("✗ AeDNAModel cannot be inserted: {e}", e=e)
             response.id_dict[entry_key] = {"sequenceid": sequenceid, "modelid": None}
             continue
 
@@ -171,8 +163,7 @@ def valid_sequence(cur, yml_dict, csv_file, databus=None):
                 response.valid.append(True)
             except Exception as e:
                 response.valid.append(False)
-                if f"✗ Error updating superseded models: {e}" not in response.message:
-                    response.message.append(f"✗ Error updating superseded models: {e}")
+                response.add_message("✗ Error updating superseded models: {e}", e=e)
 
         response.id_dict[entry_key] = {"sequenceid": sequenceid, "modelid": modelid}
 
@@ -59,8 +59,6 @@ def valid_uth_series(cur, yml_dict, csv_file, databus=None):
         response.valid.append(False)
         response.message.append(f"✗ U-Th series parameters cannot be properly extracted: {e}.")
         return response
-    decay_query = """SELECT decayconstantid FROM ndb.decayconstants
-                     WHERE LOWER(decayconstant) = %(decayconstant)s;"""
     for row in zip(*inputs.values(), strict=False):
         uth = dict(zip(inputs.keys(), row, strict=False))
         if (
@@ -70,34 +68,26 @@ def valid_uth_series(cur, yml_dict, csv_file, databus=None):
             uth["decayconstantid"] = None
         if isinstance(uth.get("decayconstantid"), str):
             n = uth.get("decayconstantid")
-            cur.execute(decay_query, {"decayconstant": uth.get("decayconstantid").lower().strip()})
-            uth["decayconstantid"] = cur.fetchone()
-            if uth["decayconstantid"]:
-                uth["decayconstantid"] = uth["decayconstantid"][0]
+            uth["decayconstantid"] = nh.lookup_vocabulary(cur, "decayconstants", n)
+            if uth["decayconstantid"] is not None:
                 response.valid.append(True)
-                if f"✔ Decay constant {n} found in database." not in response.message:
-                    response.message.append(f"✔ Decay constant {n} found in database.")
+                response.add_message("✔ Decay constant {n} found in database.", n=n)
             else:
                 response.valid.append(False)
-                if f"✗ Decay constant {n} not found in database." not in response.message:
-                    response.message.append(f"✗ Decay constant {n} not found in database.")
+                response.add_message("✗ Decay constant {n} not found in database.", n=n)
         try:
             uth_obj = UThSeries(**uth)
             response.valid.append(True)
-            if "✔ UThSeries can be created." not in response.message:
-                response.message.append("✔ UThSeries can be created.")
+            response.add_message("✔ UThSeries can be created.")
             try:
                 uth_obj.insert_to_db(cur)
-                if "✔ UThSeries inserted." not in response.message:
-                    response.message.append("✔ UThSeries inserted.")
+                response.add_message("✔ UThSeries inserted.")
                 response.valid.append(True)
             except Exception as e:
                 response.valid.append(False)
-                if f"✗ UThSeries could not be inserted: {e}" not in response.message:
-                    response.message.append(f"✗ UThSeries could not be inserted: {e}")
+                response.add_message("✗ UThSeries could not be inserted: {e}", e=e)
         except Exception as e:
             response.valid.append(False)
-            if f"✗ UThSeries cannot be created: {e}" not in response.message:
-                response.message.append(f"✗ UThSeries cannot be created: {e}")
+            response.add_message("✗ UThSeries cannot be created: {e}", e=e)
             continue
     return response
@@ -0,0 +1,17 @@
+"""DataBUS uploadRunner package.
+
+Runs the validation/upload pipeline over data files, one transaction per file,
+sequentially or across a pool of worker processes, ordering each file's steps
+by the ``databus`` keys they declare.
+
+Attributes:
+    __version__ (str): Version of the uploadRunner module.
+"""
+
+__version__ = "2.0.0"
+
+from .bundle import LookupMemo, ValidationBundle
+from .incremental import IncrementalPlan, step_fingerprints
+from .scheduler import StepGraph
+from .steps import STEPS, Step
+from .upload_runner import FileResult, prepare_session, read_data_file, run_file, run_files
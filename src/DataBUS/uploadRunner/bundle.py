@@ -0,0 +1,267 @@
+import contextlib
+import gzip
+import os
+import pickle
+import re
+import tempfile
+from datetime import datetime
+
+import DataBUS
+from DataBUS.neotomaHelpers.validate_only import WRITE
+
+# Bump when the content of a bundle changes; older bundles are then ignored.
+BUNDLE_VERSION = 1
+
+# Appended to the data file name to name its bundle.
+BUNDLE_SUFFIX = ".bundle"
+
+# Reference tables the pipeline reads but never writes, whose lookups can be
+# replayed in the upload run. Listed one by one: a table a step inserts into
+# (sites, collection units, variables, projects, grants, ...) could gain the
+# row a memoised lookup did not find.
+REFERENCE_TABLES = frozenset(
+    {
+        "taxa",
+        "contacts",
+        "publications",
+        "geopoliticalunits",
+        "datasettypes",
+        "constituentdatabases",
+        "externaldatabases",
+        "taxagrouptypes",
+        "leadmodelbasis",
+        "keywords",
+        "entitycovertypes",
+        "landusetypes",
+        "relativeages",
+        "speleothemdriptypes",
+        "speleothementitystatuses",
+        "speleothemtypes",
+        "vegetationcovertypes",
+        "agetypes",
+        "chroncontroltypes",
+        "collectiontypes",
+        "decayconstants",
+        "depenvttypes",
+        "faciestypes",
+        "geochrontypes",
+        "rocktypes",
+        "uncertaintybases",
+        "variablecontexts",
+        "variableelements",
+        "variableunits",
+    }
+)
+
+_SELECT = re.compile(r"^\s*SELECT\b", re.IGNORECASE)
+_TABLE = re.compile(r"\bndb\.(\w+)", re.IGNORECASE)
+
+
+class ValidationBundle:
+    """What a validation run worked out about a file, for its upload run.
+
+    Uploading used to redo all of the validation run's work: parse the data
+    file, convert its columns and run every lookup again. After a file
+    passes validation, ``run_file(..., bundle=True)`` saves a bundle next to
+    it (``<filename>.bundle``) with:
+
+    * the parsed file (``ColumnTable``/``SheetTables``) and its cleaned,
+      type-converted columns (the ``ExtractionCache`` columns);
+    * the results of the lookups on reference tables (vocabularies, taxa,
+      contacts, publications, ... see ``REFERENCE_TABLES``), which resolve
+      the IDs the inserts reference;
+    * the file's content hash, the template hash and the DataBUS version.
+
+    The upload run checks that the hashes and versions still match
+    (``stale``), then takes the file and its converted columns from the
+    bundle and answers those lookups from it (``LookupMemo``). Inserts
+    always run against the database. Reference rows added to Neotoma between
+    the two runs are not seen; validate again after such changes.
+
+    Bundles are pickles: only load bundles written by your own runs.
+
+    Examples:
+        >>> bundle = ValidationBundle.load('data/lake.csv')  # doctest: +SKIP
+        >>> bundle.stale(file_hash, template_hash)  # doctest: +SKIP
+        >>> len(bundle.lookups)  # doctest: +SKIP
+        42
+
+    Args:
+        file_hash (str): Digest of the data file validated.
+        template_hash (str | None): Digest of the template used.
+        table (ColumnTable | SheetTables): The parsed data file.
+        columns (dict, optional): Converted columns (``ExtractionCache.columns``).
+        lookups (dict, optional): Recorded lookups (``LookupMemo.lookups``).
+
+    Attributes:
+        version (int): ``BUNDLE_VERSION`` of the code that wrote the bundle.
+        databus_version (str): DataBUS version that wrote the bundle.
+        created_at (str): When the bundle was written.
+    """
+
+    def __init__(self, file_hash, template_hash, table, columns=None, lookups=None):
+        self.version = BUNDLE_VERSION
+        self.databus_version = DataBUS.__version__
+        self.created_at = datetime.now().isoformat(timespec="seconds")
+        self.file_hash = file_hash
+        self.template_hash = template_hash
+        self.table = table
+        self.columns = columns or {}
+        self.lookups = lookups or {}
+
+    def __repr__(self):
+        return (
+            f"ValidationBundle({self.file_hash[:8]!r}, created_at={self.created_at!r}, "
+            f"lookups={len(self.lookups)})"
+        )
+
+    @staticmethod
+    def path(filename):
+        """Return where the bundle of ``filename`` is stored."""
+        return filename + BUNDLE_SUFFIX
+
+    def save(self, filename):
+        """Write the bundle of ``filename``, replacing any earlier one atomically."""
+        path = self.path(filename)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as fh:
+                pickle.dump(self, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    @classmethod
+    def load(cls, filename):
+        """Return the bundle of ``filename``, or None if it is missing or unreadable."""
+        try:
+            with gzip.open(cls.path(filename), "rb") as fh:
+                bundle = pickle.load(fh)
+        except Exception:
+            return None
+        return bundle if isinstance(bundle, cls) else None
+
+    @classmethod
+    def discard(cls, filename):
+        """Delete the bundle of ``filename``, if any."""
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(cls.path(filename))
+
+    def stale(self, file_hash, template_hash):
+        """Return why the bundle cannot be used for this run, or None if it can.
+
+        Args:
+            file_hash (str): Digest of the data file now.
+            template_hash (str | None): Digest of the template now.
+
+        Returns:
+            str | None: The reason, e.g. ``"the file changed"``.
+        """
+        if getattr(self, "version", None) != BUNDLE_VERSION:
+            return "it was written by an incompatible version of DataBUS"
+        if self.databus_version != DataBUS.__version__:
+            return f"it was written by DataBUS {self.databus_version}"
+        if self.file_hash != file_hash:
+            return "the file changed since it was validated"
+        if self.template_hash != template_hash:
+            return "the template changed since the file was validated"
+        return None
+
+
+class LookupMemo:
+    """Cursor wrapper that records, or answers, lookups on the reference tables.
+
+    A plain ``SELECT`` that only reads ``REFERENCE_TABLES`` is looked up by
+    its text and parameters in ``lookups``. A hit is answered without a
+    round trip; a miss runs on the wrapped cursor and, with ``record`` set,
+    its rows are kept. Everything else, including prepared statements and
+    every write, goes to the wrapped cursor.
+
+    Examples:
+        >>> memo = LookupMemo(conn.cursor())  # doctest: +SKIP
+        >>> nv.valid_contact(memo, yml_dict, csv_file)  # doctest: +SKIP
+        >>> bundle.lookups = memo.lookups  # doctest: +SKIP
+
+    Args:
+        cursor (psycopg2.cursor): Cursor the other statements run on.
+        lookups (dict, optional): Recorded lookups to answer from.
+        record (bool): Keep the rows of lookups that miss. Defaults to True.
+
+    Attributes:
+        cursor (psycopg2.cursor): The wrapped cursor.
+        lookups (dict): (query, parameters) → (column names, rows).
+        hits (int): Lookups answered from ``lookups``.
+    """
+
+    def __init__(self, cursor, lookups=None, record=True):
+        self.cursor = cursor
+        self.lookups = {} if lookups is None else lookups
+        self.record = record
+        self.hits = 0
+        self._rows = None
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def execute(self, query, params=None):
+        """Answer a recorded lookup, or run ``query`` on the wrapped cursor."""
+        self._rows = None
+        key = lookup_key(query, params)
+        if key is not None and key in self.lookups:
+            self.hits += 1
+            names, rows = self.lookups[key]
+            self._answer(names, rows)
+            return
+        self.cursor.execute(query, params)
+        if key is not None and self.record:
+            names = tuple(d[0] for d in self.cursor.description or ())
+            rows = [tuple(row) for row in self.cursor.fetchall() or []]
+            self.lookups[key] = (names, rows)
+            self._answer(names, rows)
+
+    def fetchone(self):
+        if self._rows is None:
+            return self.cursor.fetchone()
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchmany(self, size=1):
+        if self._rows is None:
+            return self.cursor.fetchmany(size)
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def fetchall(self):
+        if self._rows is None:
+            return self.cursor.fetchall()
+        rows, self._rows = self._rows, []
+        return rows
+
+    @property
+    def description(self):
+        if self._rows is None:
+            return self.cursor.description
+        return self._description
+
+    @property
+    def rowcount(self):
+        if self._rows is None:
+            return self.cursor.rowcount
+        return self._rowcount
+
+    def _answer(self, names, rows):
+        self._rows = list(rows)
+        self._rowcount = len(rows)
+        self._description = tuple((n, None, None, None, None, None, None) for n in names)
+
+
+def lookup_key(query, params):
+    """Return the ``LookupMemo`` key of a reference-table lookup, or None for other statements."""
+    if not _SELECT.match(query) or WRITE.search(query):
+        return None
+    tables = {t.lower() for t in _TABLE.findall(query)}
+    if not tables or not tables <= REFERENCE_TABLES:
+        return None
+    if isinstance(params, dict):
+        return (query, repr(sorted(params.items())))
+    return (query, repr(list(params or ())))
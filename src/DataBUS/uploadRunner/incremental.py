@@ -0,0 +1,208 @@
+import hashlib
+import json
+
+import DataBUS
+import DataBUS.neotomaHelpers as nh
+
+# Bump to invalidate every stored step result, e.g. when the fingerprint
+# itself changes.
+FINGERPRINT_VERSION = 1
+
+# Template entry fields naming an input column.
+_COLUMN_FIELDS = ("column", "unitcolumn")
+
+
+def step_fingerprints(graph, yml_dict, csv_file, options=None, source=None):
+    """Fingerprint the inputs of every step of a pipeline for one data file.
+
+    A step's fingerprint covers what can change its result:
+
+    * the step itself: name, key, validator, arguments and the run options it
+      takes, plus the DataBUS version;
+    * the template entries of its ``tables`` (the whole template when the step
+      does not declare them), when it takes ``yml_dict``;
+    * the values of the input columns those entries map, when it takes
+      ``csv_file``;
+    * the fingerprints of the steps it reads from (``needs`` and ``after``);
+    * the ``source`` validated against, for runs on an offline snapshot.
+
+    Upstream steps contribute their fingerprints rather than their outputs:
+    their ``databus`` entries hold IDs drawn from sequences, which differ on
+    every run. A change anywhere upstream therefore changes the fingerprint of
+    every step downstream of it.
+
+    Examples:
+        >>> prints = step_fingerprints(StepGraph(STEPS), yml_dict, csv_file)  # doctest: +SKIP
+        >>> prints['publications']  # doctest: +SKIP
+        '5be1c0...'
+
+    Args:
+        graph (StepGraph): The pipeline.
+        yml_dict (dict | CompiledTemplate): Parsed template.
+        csv_file (ColumnTable | SheetTables | list): Parsed data file.
+        options (dict, optional): Run options of the run.
+        source (str, optional): Identifies what the run validates against
+            when it is not the database, e.g. an offline snapshot.
+
+    Returns:
+        dict | None: Step key → hex fingerprint, or None for a
+        ``ChunkedReader``, whose columns are not held in memory.
+    """
+    if isinstance(csv_file, nh.ChunkedReader):
+        return None
+    template = (
+        yml_dict if isinstance(yml_dict, nh.CompiledTemplate) else nh.CompiledTemplate(yml_dict)
+    )
+    columns = _ColumnDigests(csv_file)
+    options = options or {}
+    fingerprints = {}
+    for step in graph.order:
+        digest = hashlib.blake2b(digest_size=16)
+        _update(
+            digest,
+            [
+                FINGERPRINT_VERSION,
+                DataBUS.__version__,
+                step.name,
+                step.key,
+                f"{step.validator.__module__}.{step.validator.__qualname__}",
+                step.args,
+                {option: options.get(option) for option in step.options},
+            ],
+        )
+        if source is not None:
+            _update(digest, ["source", source])
+        if "yml_dict" in step.args:
+            if step.tables is None:
+                entries = template.metadata
+            else:
+                entries = [e for table in step.tables for e in template.startswith(table + ".")]
+            for entry in entries:
+                _update(digest, entry)
+                if "csv_file" in step.args:
+                    for field in _COLUMN_FIELDS:
+                        if entry.get(field):
+                            _update(digest, columns.get(entry.get("sheet"), entry[field]))
+        if "csv_file" in step.args and step.tables is None:
+            _update(digest, columns.everything())
+        for key in step.needs + step.after:
+            if key in fingerprints:
+                _update(digest, [key, fingerprints[key]])
+        fingerprints[step.key] = digest.hexdigest()
+    return fingerprints
+
+
+class IncrementalPlan:
+    """Which steps of a file can reuse the result of the previous run.
+
+    A step is reused when its fingerprint matches the one stored with its last
+    result (``ValidationStore.record_steps``). Every other step runs, and so do
+    the steps it reads from: the validation transaction is rolled back after
+    each run, so the rows a reused step inserted are not in the database, and
+    a step that runs needs its upstream rows to reference. Fixing a
+    publication column thus re-runs sites, collection units, datasets and
+    publications, and replays everything else.
+
+    Reused results assume the Neotoma reference data (taxa, contacts,
+    vocabularies) did not change since the last run. When a step that runs
+    gives a different outcome than last time although its inputs did not
+    change, the results reused downstream of it are stale: ``stale`` tells
+    ``run_file`` to run the file again without reuse.
+
+    Args:
+        graph (StepGraph): The pipeline.
+        fingerprints (dict): Step key → fingerprint (``step_fingerprints``).
+        prior (dict): Stored results (``ValidationStore.step_results``).
+
+    Attributes:
+        fingerprints (dict): Step key → fingerprint of this run.
+        prior (dict): Stored result of each step from the previous run.
+        reuse (dict): Step key → stored result, for the steps to replay.
+    """
+
+    def __init__(self, graph, fingerprints, prior):
+        self.graph = graph
+        self.fingerprints = fingerprints
+        self.prior = prior
+        changed = {key for key in fingerprints if not self._unchanged(key)}
+        run = set(changed)
+        for key in changed:
+            run |= graph.ancestors(key)
+        self.reuse = {key: prior[key] for key in fingerprints if key not in run}
+
+    def __repr__(self):
+        run = len(self.fingerprints) - len(self.reuse)
+        return f"IncrementalPlan(reuse={len(self.reuse)}, run={run})"
+
+    def stale(self, key, valid):
+        """True if step ``key`` ran with unchanged inputs but a different outcome.
+
+        Args:
+            key (str): Step that just ran.
+            valid (bool): Its ``validAll``.
+
+        Returns:
+            bool: Whether a step reused downstream of it may be wrong.
+        """
+        if not self._unchanged(key) or self.prior[key]["valid"] == valid:
+            return False
+        return bool(self.graph.descendants(key) & self.reuse.keys())
+
+    def _unchanged(self, key):
+        record = self.prior.get(key)
+        return (
+            record is not None
+            and record["fingerprint"] == self.fingerprints[key]
+            and (record["skipped"] or record["response"] is not None)
+        )
+
+
+class _ColumnDigests:
+    """Per-run memo of column digests, so columns read by several steps are hashed once."""
+
+    def __init__(self, csv_file):
+        self.csv_file = csv_file
+        self._digests = {}
+
+    def get(self, sheet, name):
+        key = (sheet, name)
+        if key not in self._digests:
+            self._digests[key] = self._digest(sheet, name)
+        return self._digests[key]
+
+    def everything(self):
+        """Digest of every column of the file."""
+        if isinstance(self.csv_file, dict):
+            return [
+                [sheet, name, self.get(sheet, name)]
+                for sheet, table in self.csv_file.items()
+                for name in _headers(table)
+            ]
+        return [[name, self.get(None, name)] for name in _headers(self.csv_file)]
+
+    def _digest(self, sheet, name):
+        table = self.csv_file
+        if isinstance(table, dict):
+            table = table.get(sheet)
+        if isinstance(table, nh.ColumnTable):
+            return table.digest(name) if name in table.header_index else None
+        if isinstance(table, list):
+            digest = hashlib.blake2b(digest_size=16)
+            for row in table:
+                digest.update(repr(row.get(name)).encode())
+                digest.update(b"\x1f")
+            return digest.hexdigest()
+        return None
+
+
+def _headers(table):
+    if isinstance(table, nh.ColumnTable):
+        return list(table.header_index)
+    if isinstance(table, list):
+        return list(dict.fromkeys(key for row in table for key in row))
+    return []
+
+
+def _update(digest, value):
+    digest.update(json.dumps(value, sort_keys=True, default=str).encode())
+    digest.update(b"\x1e")
@@ -0,0 +1,129 @@
+import heapq
+
+
+class StepGraph:
+    """Dependency graph of a pipeline, built from the steps' declarations.
+
+    Each ``Step`` produces the ``databus`` entry ``key`` and declares the
+    entries it reads: ``needs`` (required, the step cannot do anything useful
+    without them) and ``after`` (optional, read when present). The graph orders
+    the steps so every step runs after the steps it reads from, keeping the
+    declared order wherever the dependencies leave a choice, and tells which
+    steps are doomed because a step they need did not pass.
+
+    Examples:
+        >>> graph = StepGraph(STEPS)
+        >>> [step.key for step in graph.order][-3:]  # doctest: +SKIP
+        ['sample_age', 'data', 'publications']
+        >>> graph.blocked(graph["data"], {"samples": False})  # doctest: +SKIP
+        ['samples']
+
+    Args:
+        steps (iterable): ``Step`` objects.
+
+    Raises:
+        ValueError: If two steps produce the same key, a step needs a key no
+            step produces, or the declarations form a cycle.
+
+    Attributes:
+        steps (tuple): The steps, in declared order.
+        order (tuple): The steps in execution order.
+    """
+
+    def __init__(self, steps):
+        self.steps = tuple(steps)
+        self._by_key = {}
+        for step in self.steps:
+            if step.key in self._by_key:
+                raise ValueError(f"Two steps produce the databus key {step.key!r}.")
+            self._by_key[step.key] = step
+        for step in self.steps:
+            missing = [key for key in step.needs if key not in self._by_key]
+            if missing:
+                raise ValueError(
+                    f"Step {step.name!r} needs {', '.join(missing)}, which no step produces."
+                )
+        self._upstream = {
+            step.key: [key for key in step.needs + step.after if key in self._by_key]
+            for step in self.steps
+        }
+        self._downstream = {key: [] for key in self._upstream}
+        for key, upstream in self._upstream.items():
+            for parent in upstream:
+                self._downstream[parent].append(key)
+        self.order = self._sort()
+
+    def __getitem__(self, key):
+        return self._by_key[key]
+
+    def __len__(self):
+        return len(self.steps)
+
+    def waves(self):
+        """Group the steps into waves of mutually independent steps.
+
+        Every step of a wave only reads from steps of earlier waves.
+
+        Returns:
+            list[tuple]: The waves, in execution order.
+        """
+        level = {}
+        for step in self.order:
+            level[step.key] = 1 + max((level[key] for key in self._upstream[step.key]), default=-1)
+        waves = [[] for _ in range(max(level.values(), default=-1) + 1)]
+        for step in self.order:
+            waves[level[step.key]].append(step)
+        return [tuple(wave) for wave in waves]
+
+    def blocked(self, step, valid):
+        """Return the required keys of ``step`` that did not pass.
+
+        Args:
+            step (Step): Step about to run.
+            valid (dict): ``databus`` key → ``validAll`` of the steps run (or
+                skipped, as False) so far.
+
+        Returns:
+            list[str]: Failed or skipped ``needs`` of the step; empty when it
+            can run.
+        """
+        return [key for key in step.needs if not valid.get(key, False)]
+
+    def ancestors(self, key):
+        """Return the keys of every step ``key`` reads from, directly or not."""
+        return _closure(key, self._upstream)
+
+    def descendants(self, key):
+        """Return the keys of every step reading from ``key``, directly or not."""
+        return _closure(key, self._downstream)
+
+    def _sort(self):
+        """Topological sort that falls back on the declared order between ready steps."""
+        position = {step.key: i for i, step in enumerate(self.steps)}
+        pending = {key: len(upstream) for key, upstream in self._upstream.items()}
+        ready = [position[key] for key, count in pending.items() if count == 0]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            step = self.steps[heapq.heappop(ready)]
+            order.append(step)
+            for child in self._downstream[step.key]:
+                pending[child] -= 1
+                if pending[child] == 0:
+                    heapq.heappush(ready, position[child])
+        if len(order) < len(self.steps):
+            cycle = sorted(key for key, count in pending.items() if count > 0)
+            raise ValueError(f"The step dependencies form a cycle between: {', '.join(cycle)}.")
+        return tuple(order)
+
+
+def _closure(key, edges):
+    """Return the keys reachable from ``key`` along ``edges``, ``key`` excluded."""
+    seen = set()
+    stack = list(edges[key])
+    while stack:
+        current = stack.pop()
+        if current not in seen:
+            seen.add(current)
+            stack.extend(edges[current])
+    return seen
@@ -0,0 +1,221 @@
+import DataBUS.neotomaValidator as nv
+from DataBUS.Contact import CONTACT_TABLES
+
+
+class Step:
+    """One validation step of the upload pipeline.
+
+    Steps call a ``neotomaValidator`` function with the database cursor and the
+    subset of the file context it takes, and store the returned ``Response``
+    in ``databus`` under ``key`` for the steps that follow.
+
+    Examples:
+        >>> step = Step("sites", "sites", "Sites", nv.valid_site, args=("yml_dict", "csv_file"))
+        >>> step.run(cur, {"yml_dict": yml_dict, "csv_file": csv_file, "databus": {}})  # doctest: +SKIP
+        <DataBUS.Response.Response object at ...>
+
+    Args:
+        name (str): Step name, also used for its savepoint.
+        key (str): ``databus`` key the result is stored under.
+        title (str): Section header written to the log.
+        validator (callable): ``neotomaValidator`` function run by the step.
+        args (tuple): Context entries passed to the validator as keyword
+            arguments, besides ``cur``. Defaults to yml_dict, csv_file and databus.
+        options (tuple): Run options passed to the validator when set, e.g.
+            ``("bulk", "preallocate")`` for ``valid_data``.
+        log (bool): Whether the result is written to the log. Defaults to True.
+        needs (tuple): ``databus`` keys the step requires. It is skipped when
+            one of the steps producing them failed or was skipped.
+        after (tuple): ``databus`` keys the step reads when present; it runs
+            after the steps producing them whatever their outcome.
+        tables (tuple, optional): Neotoma tables (``ndb.sites``) whose template
+            entries the validator reads. Only those entries and the columns
+            they map are part of the step's fingerprint (see
+            ``step_fingerprints``). None means the whole template and file.
+    """
+
+    def __init__(
+        self,
+        name,
+        key,
+        title,
+        validator,
+        args=("yml_dict", "csv_file", "databus"),
+        options=(),
+        log=True,
+        needs=(),
+        after=(),
+        tables=None,
+    ):
+        self.name = name
+        self.key = key
+        self.title = title
+        self.validator = validator
+        self.args = tuple(args)
+        self.options = tuple(options)
+        self.log = log
+        self.needs = tuple(needs)
+        self.after = tuple(after)
+        self.tables = tuple(tables) if tables is not None else None
+
+    def __repr__(self):
+        return f"Step({self.name!r}, validator={self.validator.__name__})"
+
+    def run(self, cur, context, options=None):
+        """Run the validator for one file.
+
+        Args:
+            cur (psycopg2.cursor): Database cursor.
+            context (dict): ``yml_dict``, ``csv_file`` and ``databus`` of the file.
+            options (dict, optional): Run options; those named in ``self.options``
+                and not None are passed on.
+
+        Returns:
+            Response: The validator's result.
+        """
+        kwargs = {arg: context[arg] for arg in self.args}
+        for option in self.options:
+            if (options or {}).get(option) is not None:
+                kwargs[option] = options[option]
+        return self.validator(cur=cur, **kwargs)
+
+
+# The pipeline of databus_example.py. Steps run in this order unless their
+# ``needs``/``after`` require otherwise (see ``StepGraph``).
+STEPS = (
+    Step(
+        "sites",
+        "sites",
+        "Sites",
+        nv.valid_site,
+        args=("yml_dict", "csv_file"),
+        tables=("ndb.sites",),
+    ),
+    Step(
+        "gpus",
+        "gpuid",
+        "GPUs",
+        nv.valid_geopolitical_units,
+        needs=("sites",),
+        tables=("ndb.sitegeopolitical",),
+    ),
+    Step(
+        "collunits",
+        "collunits",
+        "CUs",
+        nv.valid_collunit,
+        needs=("sites",),
+        tables=("ndb.collectionunits",),
+    ),
+    Step(
+        "analysisunits",
+        "analysisunits",
+        "Analysis Units",
+        nv.valid_analysisunit,
+        options=("preallocate",),
+        needs=("collunits",),
+        tables=("ndb.analysisunits",),
+    ),
+    Step(
+        "datasets",
+        "datasets",
+        "Datasets",
+        nv.valid_dataset,
+        needs=("collunits",),
+        tables=("ndb.datasets", "ndb.datasettypes"),
+    ),
+    Step(
+        "geodataset",
+        "geodataset",
+        "Geochron Datasets",
+        nv.valid_geochron_dataset,
+        needs=("collunits",),
+        tables=(),
+    ),
+    Step(
+        "chronologies",
+        "chronologies",
+        "Chronologies",
+        nv.valid_chronologies,
+        needs=("collunits",),
+        tables=("ndb.chronologies",),
+    ),
+    Step(
+        "chron_controls",
+        "chron_controls",
+        "Chron Controls",
+        nv.valid_chroncontrols,
+        options=("preallocate",),
+        needs=("analysisunits", "chronologies"),
+        tables=("ndb.chroncontrols",),
+    ),
+    Step(
+        "geochron",
+        "geochron",
+        "Geochron",
+        nv.valid_geochron,
+        needs=("samples",),
+        tables=("ndb.geochronology",),
+    ),
+    Step(
+        "geochroncontrol",
+        "geochroncontrol",
+        "Geochron Control",
+        nv.valid_geochroncontrol,
+        args=("databus",),
+        log=False,
+        needs=("chron_controls", "geochron"),
+    ),
+    Step(
+        "contacts",
+        "contacts",
+        "Contacts",
+        nv.valid_contact,
+        after=("collunits", "datasets", "samples"),
+        tables=tuple(CONTACT_TABLES),
+    ),
+    Step(
+        "database",
+        "database",
+        "Database",
+        nv.valid_dataset_database,
+        args=("yml_dict", "databus"),
+        needs=("datasets",),
+        tables=("ndb.datasetdatabases",),
+    ),
+    Step(
+        "samples",
+        "samples",
+        "Samples",
+        nv.valid_sample,
+        options=("preallocate",),
+        needs=("analysisunits", "datasets"),
+        tables=("ndb.samples",),
+    ),
+    Step(
+        "sample_age",
+        "sample_age",
+        "Sample Ages",
+        nv.valid_sample_age,
+        options=("preallocate",),
+        needs=("chronologies", "samples"),
+        tables=("ndb.sampleages",),
+    ),
+    Step(
+        "data",
+        "data",
+        "Data",
+        nv.valid_data,
+        options=("bulk", "preallocate"),
+        needs=("samples",),
+        tables=("ndb.data", "ndb.variables"),
+    ),
+    Step(
+        "publications",
+        "publications",
+        "Publications",
+        nv.valid_publication,
+        needs=("datasets",),
+        tables=("ndb.publications",),
+    ),
+)
@@ -0,0 +1,666 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import psycopg2
+import psycopg2.pool
+from tqdm import tqdm
+
+import DataBUS.neotomaHelpers as nh
+import DataBUS.neotomaValidator as nv
+from DataBUS.neotomaHelpers.logging_dict import logging_response
+from DataBUS.neotomaHelpers.template_cache import file_digest
+
+from .bundle import LookupMemo, ValidationBundle
+from .incremental import IncrementalPlan, step_fingerprints
+from .scheduler import StepGraph
+from .steps import STEPS
+
+
+class FileResult:
+    """Outcome of running the pipeline on one data file.
+
+    Only plain values are kept, so results are cheap to send back from worker
+    processes.
+
+    Attributes:
+        filename (str): Path of the data file.
+        logfile (list[str]): Log lines, as written to ``<filename>.valid.log``;
+            empty when the log was streamed to disk (``LogSink``).
+        valid (dict): ``databus`` key → ``validAll`` of each step; False for
+            skipped steps.
+        skipped (list[str]): Keys of the steps skipped because a step they
+            need did not pass.
+        reused (list[str]): Keys of the steps whose result was replayed from
+            the previous run (incremental runs).
+        status (str): ``uploaded``, ``validated`` (valid, rolled back),
+            ``invalid`` or ``error``.
+        query_stats (QueryStats | None): Queries sent for the file, by step,
+            when it ran on an ``InstrumentedConnection``.
+    """
+
+    def __init__(
+        self, filename, logfile=None, valid=None, status="error", skipped=None, reused=None
+    ):
+        self.filename = filename
+        self.logfile = logfile if logfile is not None else []
+        self.valid = valid if valid is not None else {}
+        self.status = status
+        self.skipped = skipped if skipped is not None else []
+        self.reused = reused if reused is not None else []
+        self.query_stats = None
+
+    def __repr__(self):
+        return f"FileResult({os.path.basename(self.filename)!r}, status={self.status!r})"
+
+    @property
+    def validAll(self):
+        """True if the file passed every step."""
+        return self.status in ("uploaded", "validated")
+
+    def write_log(self):
+        """Write the log lines to ``<filename>.valid.log``."""
+        with open(self.filename + ".valid.log", "w", encoding="utf-8") as writer:
+            for line in self.logfile:
+                writer.write(line)
+                writer.write("\n")
+
+
+def prepare_session(conn):
+    """Set up a connection for a run: SQL helpers, prepared statements, vocabularies.
+
+    Args:
+        conn (psycopg2.connection): Database connection. Its current
+            transaction is committed.
+    """
+    nh.install_sql_functions(conn)
+    nh.use_prepared_statements()
+    nh.use_vocabulary_cache().prefetch(conn.cursor())
+    conn.rollback()
+
+
+def read_data_file(filename, chunk_size=None):
+    """Parse a CSV/XLSX data file, or open a ``ChunkedReader`` on it."""
+    if chunk_size:
+        return nh.ChunkedReader(filename, chunk_size=chunk_size)
+    if filename.endswith(".xlsx"):
+        return nh.read_xlsx(filename, columnar=True)
+    return nh.read_csv(filename, columnar=True)
+
+
+def run_file(
+    conn,
+    filename,
+    yml_dict,
+    upload=False,
+    steps=STEPS,
+    options=None,
+    chunk_size=None,
+    validation_files="data/logs/",
+    progress=False,
+    skip_failed=True,
+    log=None,
+    store=None,
+    template_hash=None,
+    incremental=False,
+    validate_only=False,
+    bundle=False,
+):
+    """Run the validation steps on one data file in its own transaction.
+
+    Steps run in dependency order (``StepGraph``), each inside a savepoint
+    (``safe_step``), so a failing step is logged and the steps that do not
+    need it still run. Steps that need a failed step are skipped and count as
+    failed. The transaction is committed only when ``upload`` is set and every
+    step and the prior-validation check passed; otherwise it is rolled back.
+
+    With ``incremental`` set, validation runs reuse the results of the
+    previous run of the file: each step's inputs are fingerprinted
+    (``step_fingerprints``) and a step whose fingerprint did not change since
+    its stored result is replayed, log included, instead of run. The steps
+    that changed run, together with the steps they read from (see
+    ``IncrementalPlan``). Uploads always run every step.
+
+    With ``validate_only`` set, the steps run on a ``ValidateOnlyCursor``:
+    lookups still query the database, but inserts are not sent and return
+    placeholder IDs (-1, -2, ... for each file), so validating costs the
+    lookups only. On an ``OfflineConnection`` the file is validated against a
+    snapshot of the lookup tables, with placeholder IDs in the same way.
+
+    On an ``InstrumentedConnection`` every query is timed and counted under
+    the step that sent it; the per-step summary (``QueryStats.report``) is
+    logged and kept in ``FileResult.query_stats``.
+
+    With ``bundle`` set, a file that passes validation leaves a
+    ``ValidationBundle`` next to it, and its upload starts from that bundle
+    when the file and template did not change since: the parsed file,
+    converted columns and reference-table lookups are not computed again.
+
+    Examples:
+        >>> result = run_file(conn, 'data/lake.csv', yml_dict)  # doctest: +SKIP
+        >>> result.status, result.valid['sites']  # doctest: +SKIP
+        ('validated', True)
+
+    Args:
+        conn (psycopg2.connection | OfflineConnection | InstrumentedConnection):
+            Database connection, or an offline snapshot to validate against.
+        filename (str): Path to the .csv or .xlsx data file.
+        yml_dict (dict | CompiledTemplate): Parsed template.
+        upload (bool): Commit the file when it is fully valid. Defaults to False.
+        steps (iterable | StepGraph): ``Step`` objects to run. Defaults to ``STEPS``.
+        options (dict, optional): Run options forwarded to the steps that take
+            them, e.g. ``{"bulk": "copy"}``, or ``{"preallocate": True}`` to
+            insert analysis units, samples, data, chron controls and sample
+            ages set-based with IDs reserved from their sequences
+            (``IdAllocator``).
+        chunk_size (int, optional): Read the file in blocks of this many rows.
+        validation_files (str): Directory of prior validation logs (``check_file``).
+        progress (bool): Show a per-step progress bar. Defaults to False.
+        skip_failed (bool): Skip steps whose ``needs`` failed. When False every
+            step runs, with whatever its upstream steps left in ``databus``.
+            Defaults to True.
+        log (LogSink, optional): Sink the log is streamed to as the steps run.
+            Defaults to one that only keeps the lines in ``FileResult.logfile``.
+        store (ValidationStore, optional): Store the prior-validation checks
+            answer from and the outcome is recorded in. By default the checks
+            use the store of ``validation_files`` when there is one, and
+            nothing is recorded.
+        template_hash (str, optional): Digest of the template, recorded in ``store``.
+        incremental (bool): Replay unchanged steps from, and record each
+            step's result in, ``store``. Defaults to False.
+        validate_only (bool): Answer inserts with placeholder IDs instead of
+            running them and rolling them back. Defaults to False.
+        bundle (bool): Save a ``ValidationBundle`` after a successful
+            validation, and upload from it. Defaults to False.
+
+    Returns:
+        FileResult: Log lines and per-step validity of the file.
+
+    Raises:
+        ValueError: If ``upload`` is set on an ``OfflineConnection`` or with
+            ``validate_only``.
+    """
+    stats = None
+    if isinstance(conn, nh.InstrumentedConnection):
+        stats = conn.query_stats = nh.QueryStats()
+    offline = isinstance(conn.wrapped if stats else conn, nh.OfflineConnection)
+    if upload and offline:
+        raise ValueError("Files cannot be uploaded from an offline snapshot.")
+    if upload and validate_only:
+        raise ValueError("Files cannot be uploaded with validate_only.")
+    if log is None:
+        log = nh.LogSink(keep=True)
+    graph = steps if isinstance(steps, StepGraph) else StepGraph(steps)
+    conn.rollback()
+    cur = conn.cursor()
+    if validate_only and not offline:
+        cur = nh.ValidateOnlyCursor(cur)
+    result = FileResult(filename, log.lines)
+    result.query_stats = stats
+    logfile = log
+    databus = {}
+    valid = result.valid
+
+    hashcheck = nh.hash_file(filename, store=store)
+    filecheck = nh.check_file(filename, validation_files=validation_files, store=store)
+    file_hash = hashcheck["hash"]
+
+    logfile.extend(hashcheck["message"] + filecheck["message"])
+    logfile.append(f"\nNew Upload started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    bundle = bundle and not offline and not chunk_size
+    loaded = None
+    if bundle and upload:
+        loaded = ValidationBundle.load(filename)
+        reason = "there is none" if loaded is None else loaded.stale(file_hash, template_hash)
+        if reason is None:
+            logfile.append(f"✔  Uploading from the validation bundle of {loaded.created_at}.")
+        else:
+            logfile.append(f"?  Not using a validation bundle: {reason}.")
+            loaded = None
+    if loaded is not None:
+        csv_file = loaded.table
+        nh.get_extraction_cache(csv_file).preload(loaded.columns)
+    else:
+        csv_file = read_data_file(filename, chunk_size)
+    if bundle and (loaded is not None or not upload):
+        cur = LookupMemo(cur, loaded.lookups if loaded else None, record=not upload)
+    if offline:
+        logfile.append(
+            f"?  Validating offline against the snapshot {conn.path} exported at "
+            f"{conn.created_at}; new records get placeholder IDs."
+        )
+    elif validate_only:
+        logfile.append("?  Validating without writing; new records get placeholder IDs.")
+
+    if hashcheck["pass"] is False and filecheck["pass"] is False:
+        logfile.append("File must be properly validated before it can be uploaded.")
+        hashcheck = False
+    else:
+        hashcheck = True
+
+    plan = None
+    if incremental and store is not None and not upload:
+        source = None
+        if offline:
+            source = f"{conn.path}@{conn.created_at}"
+        elif validate_only:
+            source = "validate-only"
+        fingerprints = step_fingerprints(graph, yml_dict, csv_file, options, source)
+        if fingerprints is not None:
+            plan = IncrementalPlan(graph, fingerprints, store.step_results(filename))
+
+    context = {"yml_dict": yml_dict, "csv_file": csv_file, "databus": databus}
+    try:
+        counts = (logfile.errors, logfile.invalid)
+        ran = _run_steps(
+            graph, cur, conn, context, options, logfile, result, skip_failed, plan, progress
+        )
+        if ran is None:
+            # A replayed result went stale: validate the file from scratch.
+            conn.rollback()
+            logfile.append(
+                "↺  A step no longer gives the result of the previous run; running every step again."
+            )
+            logfile.errors, logfile.invalid = counts
+            databus.clear()
+            valid.clear()
+            result.skipped.clear()
+            result.reused.clear()
+            plan = IncrementalPlan(graph, plan.fingerprints, {})
+            ran = _run_steps(
+                graph, cur, conn, context, options, logfile, result, skip_failed, plan, progress
+            )
+
+        cache = nh.get_extraction_cache(csv_file, create=False)
+        if cache is not None:
+            logfile.append(f"Extraction cache: {cache.stats()}")
+        logfile.append(f"Vocabulary cache: {nh.get_vocabulary_cache().stats()}")
+        logfile.append(f"Prepared statements: {nh.get_prepared_statements().stats()}")
+        writes = cur.cursor if isinstance(cur, LookupMemo) else cur
+        if isinstance(writes, nh.PlaceholderCursor):
+            logfile.append(f"Writes answered with placeholder IDs: {writes.skipped}")
+        if isinstance(cur, LookupMemo):
+            logfile.append(f"Bundled lookups: {len(cur.lookups)}, answered: {cur.hits}")
+
+        all_true = all(valid.values()) and hashcheck
+        if upload:
+            if all_true:
+                # Finalize the upload and insert into the datasetsubmissions table.
+                databus["finalize"] = nv.insert_final(cur, databus=databus)
+                conn.commit()
+                result.status = "uploaded"
+                logfile.append("Data has been successfully uploaded to the database.")
+                if bundle:
+                    ValidationBundle.discard(filename)
+            else:
+                conn.rollback()
+                result.status = "invalid"
+                logfile.append(
+                    "Data must be fully validated before it can be uploaded to the database."
+                )
+        else:
+            conn.rollback()
+            if all_true:
+                result.status = "validated"
+                logfile.append("Data has been fully validated and is ready for upload.")
+                if bundle:
+                    _save_bundle(filename, file_hash, template_hash, csv_file, cur, logfile)
+            else:
+                result.status = "invalid"
+                if bundle:
+                    ValidationBundle.discard(filename)
+                logfile.append(
+                    "Data has not passed validation. Please review the log messages for details."
+                )
+    except Exception as e:
+        conn.rollback()
+        result.status = "error"
+        logfile.append(f"An error occurred during validation: {str(e)}")
+    allocator = nh.get_id_allocator()
+    allocator.settle(committed=result.status == "uploaded")
+    if (options or {}).get("preallocate"):
+        logfile.append(f"ID allocation: {allocator.stats()}")
+    if stats is not None:
+        logfile.extend(stats.report())
+    if store is not None and incremental:
+        if upload:
+            # The database now holds the file: earlier results no longer apply.
+            store.forget_steps(filename)
+        elif plan is not None and result.status != "error":
+            store.record_steps(filename, ran)
+    if store is not None:
+        store.record(
+            filename,
+            file_hash,
+            result.status,
+            errors=log.errors,
+            strict_errors=log.errors + log.invalid,
+            template_hash=template_hash,
+        )
+    return result
+
+
+def _save_bundle(filename, file_hash, template_hash, csv_file, cur, log):
+    """Save what the validation run of a file worked out, for its upload."""
+    cache = nh.get_extraction_cache(csv_file, create=False)
+    try:
+        ValidationBundle(
+            file_hash,
+            template_hash,
+            csv_file,
+            columns=cache.columns() if cache is not None else None,
+            lookups=cur.lookups,
+        ).save(filename)
+    except Exception as e:
+        log.append(f"?  The validation bundle could not be saved: {e}")
+        return
+    log.append(f"Validation bundle saved to {ValidationBundle.path(filename)}.")
+
+
+def _run_steps(graph, cur, conn, context, options, log, result, skip_failed, plan, progress):
+    """Run or replay the steps of one file in dependency order.
+
+    Returns:
+        list[dict] | None: With a ``plan``, the results of the steps that ran
+        or were skipped, for ``ValidationStore.record_steps``. None when the
+        plan turned out to be stale and the file must be run again without it.
+    """
+    databus = context["databus"]
+    valid = result.valid
+    ran = []
+    step_bar = tqdm(
+        total=len(graph),
+        desc=os.path.basename(result.filename),
+        leave=False,
+        unit="step",
+        disable=not progress,
+    )
+    for step in graph.order:
+        log.start_step(step.name, step.title)
+        blocked = graph.blocked(step, valid) if skip_failed else []
+        prior = plan.reuse.get(step.key) if plan is not None else None
+        raised = []
+        if blocked:
+            valid[step.key] = False
+            result.skipped.append(step.key)
+            log.append(f"✗  Skipped: requires {', '.join(blocked)}, which did not pass.")
+            response = None
+        elif prior is not None and not prior["skipped"]:
+            log.append(f"↺  Unchanged since {prior['updated_at'][:19]}; result reused.")
+            log.replay(prior["records"])
+            databus[step.key] = prior["response"]
+            valid[step.key] = prior["valid"]
+            result.reused.append(step.key)
+            log.end_step()
+            step_bar.update(1)
+            continue
+        else:
+            response = nh.safe_step(
+                step.name,
+                lambda step=step, raised=raised: _run_step(step, cur, context, options, raised),
+                log,
+                conn,
+            )
+            databus[step.key] = response
+            valid[step.key] = response.validAll
+            if step.log:
+                logging_response(response, log)
+            if plan is not None and plan.stale(step.key, response.validAll):
+                step_bar.close()
+                log.end_step()
+                return None
+        if plan is not None:
+            ran.append(
+                {
+                    "step": step.key,
+                    "fingerprint": plan.fingerprints[step.key],
+                    "valid": valid[step.key],
+                    "skipped": response is None,
+                    # A step that raised may have hit a transient error: run it next time.
+                    "response": None if raised else response,
+                    "records": list(log.step_records),
+                }
+            )
+        log.end_step()
+        step_bar.update(1)
+    step_bar.close()
+    return ran
+
+
+def _run_step(step, cur, context, options, raised):
+    """Run ``step``, noting in ``raised`` whether it raised."""
+    try:
+        return step.run(cur, context, options)
+    except Exception:
+        raised.append(step.key)
+        raise
+
+
+def run_files(
+    filenames,
+    connection,
+    template,
+    jobs=1,
+    upload=False,
+    steps=STEPS,
+    options=None,
+    chunk_size=None,
+    validation_files="data/logs/",
+    write_logs=True,
+    progress=True,
+    skip_failed=True,
+    store=None,
+    incremental=False,
+    snapshot=None,
+    validate_only=False,
+    bundle=False,
+    profile=False,
+):
+    """Run the pipeline over many data files, optionally in parallel.
+
+    Files are independent: each runs in its own transaction (see
+    ``run_file``). With ``jobs`` > 1 they are spread over a pool of worker
+    processes, each holding one pooled connection for all the files it
+    processes, so parsing and validation use several cores and database
+    round trips of different files overlap. Results come back in the order of
+    ``filenames`` whatever order workers finish in.
+
+    Each file's log is streamed to disk by the process running it while the
+    steps run (``LogSink``): ``<filename>.valid.log`` and the structured
+    ``<filename>.valid.jsonl``, so results do not carry the log lines and a
+    file that crashes the run still leaves the log of its completed steps.
+
+    With ``snapshot`` set, files are validated without a database, against a
+    local copy of the lookup tables written by ``export_snapshot`` (see
+    ``OfflineConnection``).
+
+    With ``profile`` set, the connections are wrapped in
+    ``InstrumentedConnection``: each file's log ends with its queries by
+    step, and the totals of the run are written to ``query_stats.json`` in
+    ``validation_files`` (``QueryStats.merged`` of the results).
+
+    Examples:
+        >>> results = run_files(filenames, connection, 'template.yml', jobs=8)  # doctest: +SKIP
+        >>> sum(r.validAll for r in results), len(results)  # doctest: +SKIP
+        (1987, 2000)
+
+    Args:
+        filenames (list[str]): Data files to process.
+        connection (dict | None): Keyword arguments for ``psycopg2.connect``.
+            Unused with ``snapshot``.
+        template (str): Path to the YAML/XLSX template.
+        jobs (int): Number of worker processes. Defaults to 1, which runs
+            every file in this process on a single connection.
+        upload (bool): Commit fully valid files. Defaults to False.
+        steps (iterable | StepGraph): ``Step`` objects to run. Defaults to ``STEPS``. With
+            ``jobs`` > 1 on platforms without ``fork`` they must be picklable.
+        options (dict, optional): Run options for the steps, e.g. ``{"bulk": "copy"}``.
+        chunk_size (int, optional): Read files in blocks of this many rows.
+        validation_files (str): Directory of prior validation logs.
+        write_logs (bool): Stream ``<filename>.valid.log`` and ``<filename>.valid.jsonl``
+            for each file. When False the lines are kept in ``FileResult.logfile``
+            instead. Defaults to True.
+        progress (bool): Show a progress bar over files. Defaults to True.
+        skip_failed (bool): Skip steps whose ``needs`` failed (see ``run_file``).
+            Defaults to True.
+        store (ValidationStore | str | bool | None): Where the outcome of each
+            file is recorded and prior validations are looked up. None uses
+            the store of ``validation_files`` (``ValidationStore``), created
+            when missing; False records nothing.
+        incremental (bool): Only run the steps whose inputs changed since the
+            previous validation of each file, replaying the others from
+            ``store`` (see ``run_file``). Defaults to False.
+        snapshot (str, optional): Offline snapshot to validate against
+            instead of the database.
+        validate_only (bool): Validate without running the inserts (see
+            ``run_file``). Defaults to False.
+        bundle (bool): Leave a ``ValidationBundle`` next to each file that
+            passes validation, and upload files from their bundle when it is
+            still current (see ``run_file``). Defaults to False.
+        profile (bool): Time and count the queries of every step (see
+            ``run_file``). Defaults to False.
+
+    Returns:
+        list[FileResult]: One result per file, in input order.
+
+    Raises:
+        ValueError: If ``jobs`` is not positive, or ``upload`` is set with
+            ``snapshot`` or ``validate_only``.
+    """
+    if jobs < 1:
+        raise ValueError("jobs must be a positive integer.")
+    if upload and snapshot is not None:
+        raise ValueError("Files cannot be uploaded from an offline snapshot.")
+    if upload and validate_only:
+        raise ValueError("Files cannot be uploaded with validate_only.")
+    settings = {
+        "upload": upload,
+        "steps": steps if isinstance(steps, StepGraph) else StepGraph(steps),
+        "options": options,
+        "chunk_size": chunk_size,
+        "validation_files": validation_files,
+        "skip_failed": skip_failed,
+        "write_logs": write_logs,
+        "store": nh.get_validation_store(True if store is None else store, validation_files),
+        "template_hash": file_digest(template) if template else None,
+        "incremental": incremental,
+        "validate_only": validate_only,
+        "bundle": bundle,
+        "profile": profile,
+    }
+    # Hash the files up front on a thread pool; the per-file checks then read
+    # the digests from the FileHasher cache.
+    nh.get_file_hasher().digest_many(f for f in filenames if os.path.isfile(f))
+    results = []
+    if jobs == 1:
+        conn = _connect(connection, snapshot)
+        try:
+            prepare_session(conn)
+            yml_dict = nh.template_to_dict(temp_file=template, compiled=True)
+            for filename in tqdm(filenames, desc="Files", unit="file", disable=not progress):
+                result = _run_safely(conn, filename, yml_dict, dict(settings, progress=progress))
+                results.append(result)
+        finally:
+            conn.close()
+        return _write_run_stats(results, settings)
+
+    # fork keeps workers from re-importing the calling script, and lets them
+    # inherit the steps without pickling.
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(connection, template, settings, snapshot),
+    ) as executor:
+        for result in tqdm(
+            executor.map(_run_in_worker, filenames),
+            total=len(filenames),
+            desc="Files",
+            unit="file",
+            disable=not progress,
+        ):
+            results.append(result)
+    return _write_run_stats(results, settings)
+
+
+def _write_run_stats(results, settings):
+    """Write the query stats of a profiled run to ``query_stats.json``."""
+    if settings["profile"] and settings["write_logs"]:
+        os.makedirs(settings["validation_files"], exist_ok=True)
+        stats = nh.QueryStats.merged(r.query_stats for r in results)
+        stats.write(os.path.join(settings["validation_files"], "query_stats.json"))
+    return results
+
+
+def _connect(connection, snapshot=None):
+    """Open the connection of a run: to the database, or to an offline snapshot."""
+    if snapshot is not None:
+        return nh.OfflineConnection(snapshot)
+    return psycopg2.connect(**connection, connect_timeout=5)
+
+
+class _SnapshotPool:
+    """Stands in for the connection pool of a worker validating offline."""
+
+    def __init__(self, snapshot):
+        self.conn = nh.OfflineConnection(snapshot)
+
+    def getconn(self):
+        return self.conn
+
+    def putconn(self, conn, close=False):
+        pass
+
+
+# Per-process state of a worker: its connection pool, template and settings.
+_WORKER = {}
+
+
+def _init_worker(connection, template, settings, snapshot=None):
+    if snapshot is not None:
+        pool = _SnapshotPool(snapshot)
+    else:
+        pool = psycopg2.pool.SimpleConnectionPool(1, 1, **connection, connect_timeout=5)
+    conn = pool.getconn()
+    prepare_session(conn)
+    pool.putconn(conn)
+    _WORKER.update(
+        pool=pool,
+        yml_dict=nh.template_to_dict(temp_file=template, compiled=True),
+        settings=settings,
+    )
+
+
+def _run_in_worker(filename):
+    pool = _WORKER["pool"]
+    conn = pool.getconn()
+    if conn.closed:
+        # Replace a connection the server dropped since the previous file.
+        pool.putconn(conn, close=True)
+        conn = pool.getconn()
+        prepare_session(conn)
+    try:
+        return _run_safely(conn, filename, _WORKER["yml_dict"], _WORKER["settings"])
+    finally:
+        pool.putconn(conn)
+
+
+def _run_safely(conn, filename, yml_dict, settings):
+    """Run one file, turning errors outside the steps (e.g. unreadable files) into a result."""
+    settings = dict(settings)
+    if settings.pop("profile", False) and not isinstance(conn, nh.InstrumentedConnection):
+        conn = nh.InstrumentedConnection(conn)
+    if settings.pop("write_logs", False):
+        log = nh.LogSink(filename + ".valid.log", filename + ".valid.jsonl")
+    else:
+        log = nh.LogSink(keep=True)
+    with log:
+        try:
+            return run_file(conn, filename, yml_dict, log=log, **settings)
+        except Exception as e:
+            log.append(f"An error occurred during validation: {str(e)}")
+            return FileResult(filename, log.lines)
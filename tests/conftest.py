@@ -67,6 +67,31 @@ class MockCursor:
         return self.mock_fetchall
 
 
+class AbortingCursor(MockCursor):
+    """A MockCursor that aborts its transaction like PostgreSQL.
+
+    A statement for which ``fails(query, params)`` is true raises, and every
+    statement after it raises too until a ``ROLLBACK`` runs.
+    """
+
+    def __init__(self, fails):
+        super().__init__()
+        self.fails = fails
+        self.aborted = False
+
+    def execute(self, query, params=None):
+        if self.aborted and not query.lstrip().upper().startswith("ROLLBACK"):
+            raise RuntimeError("current transaction is aborted")
+        self.aborted = False
+        super().execute(query, params)
+        if self.fails(query, params):
+            self.aborted = True
+            raise ValueError("null value in column")
+
+    def copy_expert(self, sql, file):
+        self.execute(sql)
+
+
 class MockConnection:
     """Minimal psycopg2-connection substitute."""
 
@@ -85,6 +110,19 @@ class MockConnection:
 
 
 # ── fixtures ──────────────────────────────────────────────────────────────────
+@pytest.fixture(scope="session", autouse=True)
+def template_cache_dir(tmp_path_factory):
+    """Point the on-disk template cache at a temporary directory."""
+    path = str(tmp_path_factory.mktemp("template_cache"))
+    previous = os.environ.get("DATABUS_CACHE_DIR")
+    os.environ["DATABUS_CACHE_DIR"] = path
+    yield path
+    if previous is None:
+        del os.environ["DATABUS_CACHE_DIR"]
+    else:
+        os.environ["DATABUS_CACHE_DIR"] = previous
+
+
 @pytest.fixture(scope="session")
 def real_connection():
     """Attempt to open a real DB connection from PGDB_TANK env var.
@@ -79,6 +79,46 @@ class TestDatum:
         d = Datum(sampleid=1, variableid=2, value=3.0)
         assert d.insert_to_db(mock_cur) == 77
 
+    def test_insert_many_returns_ids_in_order(self, mock_cur):
+        mock_cur.mock_fetchall = [(7,), (8,), (9,)]
+        data = [Datum(sampleid=1, variableid=2, value=v) for v in (0.5, None, 3.0)]
+        assert Datum.insert_many(mock_cur, data) == [7, 8, 9]
+        assert [d.datumid for d in data] == [7, 8, 9]
+        query, params = mock_cur._execute_calls[-2]
+        assert "INSERT INTO ndb.data" in query
+        assert mock_cur._execute_calls[-1][0] == "RELEASE SAVEPOINT databus_ids"
+        assert params["value"] == [0.5, None, 3.0]
+
+    def test_insert_many_copy_writes_tsv(self, mock_cur):
+        copied = []
+        mock_cur.copy_expert = lambda sql, buffer: copied.append(buffer.read())
+        mock_cur.mock_fetchall = [(7,), (8,)]
+        data = [Datum(sampleid=1, variableid=2, value=0.5), Datum(sampleid=1, variableid=3)]
+        assert Datum.insert_many(mock_cur, data, method="copy") == [7, 8]
+        assert copied == ["1\t1\t2\t0.5\n2\t1\t3\t\\N\n"]
+
+    def test_insert_many_failure_is_rolled_back(self):
+        from tests.conftest import AbortingCursor
+
+        cur = AbortingCursor(lambda q, p: "INSERT INTO ndb.data" in q)
+        with pytest.raises(ValueError):
+            Datum.insert_many(cur, [Datum(sampleid=1, variableid=2, value=0.5)])
+        assert cur._execute_calls[-1][0] == "ROLLBACK TO SAVEPOINT databus_ids"
+        assert not cur.aborted
+
+    def test_insert_many_empty(self, mock_cur):
+        assert Datum.insert_many(mock_cur, []) == []
+        assert mock_cur._execute_calls == []
+
+    def test_insert_many_unknown_method_raises(self, mock_cur):
+        with pytest.raises(ValueError):
+            Datum.insert_many(mock_cur, [Datum(sampleid=1)], method="upsert")
+
+    def test_insert_many_id_count_mismatch_raises(self, mock_cur):
+        mock_cur.mock_fetchall = [(7,)]
+        with pytest.raises(ValueError):
+            Datum.insert_many(mock_cur, [Datum(sampleid=1), Datum(sampleid=2)])
+
 
 # ── SampleAge ─────────────────────────────────────────────────────────────────
 class TestSampleAge:
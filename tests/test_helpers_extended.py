@@ -212,3 +212,1363 @@ class TestCheckFile:
         result = check_file("nonstrict.csv", strict=False, validation_files=str(log_dir) + "/")
         assert result["match"] == 0
         assert result["pass"] is True
+
+
+# ── CompiledTemplate ──────────────────────────────────────────────────────────
+class TestCompiledTemplate:
+    TEMPLATES = [
+        "test_sisal_template.yml",
+        "test_210pb_template.yml",
+        "test_node_template.yml",
+        "test_eanode_template.yml",
+    ]
+
+    def _queries(self, yml):
+        queries = set()
+        for entry in yml["metadata"]:
+            parts = str(entry.get("neotoma", "")).strip().split(".")
+            for i in range(len(parts)):
+                for j in range(i + 1, len(parts) + 1):
+                    queries.add(".".join(parts[i:j]))
+        return sorted(q for q in queries if q)
+
+    @pytest.mark.parametrize("template", TEMPLATES)
+    def test_retrieve_matches_regex_scan(self, template):
+        from tests.conftest import toy_yml
+
+        yml = nh.template_to_dict(toy_yml(template))
+        compiled = nh.CompiledTemplate(yml)
+        for query in self._queries(yml):
+            if not query[0].isalnum() or not query[-1].isalnum():
+                continue
+            assert nh.retrieve_dict(compiled, query) == nh.retrieve_dict(yml, query), query
+
+    @pytest.mark.parametrize("template", TEMPLATES)
+    def test_pull_params_matches_raw_dict(self, template):
+        from DataBUS.AnalysisUnit import ANALYSIS_UNIT_PARAMS
+        from DataBUS.Site import SITE_PARAMS
+        from tests.conftest import toy_csv, toy_yml
+
+        yml = nh.template_to_dict(toy_yml(template))
+        data_file = template.replace("_template.yml", ".csv").replace("210pb", "210Pb")
+        csv_file = read_csv(toy_csv(data_file))
+        compiled = nh.CompiledTemplate(yml)
+        for params, table in [
+            (SITE_PARAMS, "ndb.sites"),
+            (ANALYSIS_UNIT_PARAMS, "ndb.analysisunits"),
+            (["value"], "ndb.data"),
+        ]:
+            assert nh.pull_params(params, compiled, csv_file, table) == nh.pull_params(
+                params, yml, csv_file, table
+            )
+
+    def test_behaves_like_dict(self):
+        yml = {"kind": "test", "metadata": [{"neotoma": "ndb.sites.sitename"}]}
+        compiled = nh.CompiledTemplate(yml)
+        assert compiled["metadata"] is yml["metadata"]
+        assert compiled.get("kind") == "test"
+        assert dict(compiled) == yml
+
+    def test_word_boundaries(self):
+        yml = {
+            "metadata": [
+                {"neotoma": "ndb.sampleages.age"},
+                {"neotoma": "ndb.sampleages.ageolder"},
+                {"neotoma": "ndb.sites.geog.latitude"},
+            ]
+        }
+        compiled = nh.CompiledTemplate(yml)
+        assert compiled.retrieve("ndb.sampleages.age") == [yml["metadata"][0]]
+        assert compiled.retrieve("sites.geog") == [yml["metadata"][2]]
+        assert compiled.startswith("ndb.sites.geog.") == [yml["metadata"][2]]
+        assert compiled.lookup("ndb.sampleages.ageolder") == [yml["metadata"][1]]
+
+    def test_pull_required_accepts_compiled(self):
+        yml = {
+            "metadata": [
+                {"neotoma": "ndb.sites.sitename", "required": True, "overwrite": True},
+            ]
+        }
+        compiled = nh.CompiledTemplate(yml)
+        assert pull_required(["sitename"], compiled, "ndb.sites") == {"sitename": True}
+        assert pull_overwrite(["sitename"], compiled, "ndb.sites") == {"sitename": True}
+
+
+# ── template cache ────────────────────────────────────────────────────────────
+class TestTemplateCache:
+    YML = "apiVersion: neotoma v2.0\nmetadata:\n- column: Site\n  neotoma: ndb.sites.sitename\n"
+
+    def test_second_load_is_read_from_cache(self, tmp_path, monkeypatch):
+        import importlib
+
+        ttd = importlib.import_module("DataBUS.neotomaHelpers.template_to_dict")
+
+        f = tmp_path / "template.yml"
+        f.write_text(self.YML)
+        cache = tmp_path / "cache"
+        first = nh.template_to_dict(str(f), cache_dir=str(cache))
+        assert len(list(cache.glob("yaml-*.pickle"))) == 1
+
+        def fail(*args, **kwargs):
+            raise AssertionError("template parsed again")
+
+        monkeypatch.setattr(ttd.yaml, "load", fail)
+        assert nh.template_to_dict(str(f), cache_dir=str(cache)) == first
+        compiled = nh.template_to_dict(str(f), compiled=True, cache_dir=str(cache))
+        assert isinstance(compiled, nh.CompiledTemplate)
+        assert compiled.retrieve("ndb.sites.sitename") == first["metadata"]
+
+    def test_changed_file_is_parsed_again(self, tmp_path):
+        f = tmp_path / "template.yml"
+        cache = tmp_path / "cache"
+        f.write_text(self.YML)
+        nh.template_to_dict(str(f), cache_dir=str(cache))
+        f.write_text(self.YML.replace("Site", "SiteName"))
+        result = nh.template_to_dict(str(f), cache_dir=str(cache))
+        assert result["metadata"][0]["column"] == "SiteName"
+        assert len(list(cache.glob("yaml-*.pickle"))) == 2
+
+    def test_corrupt_entry_is_rebuilt(self, tmp_path):
+        f = tmp_path / "template.yml"
+        cache = tmp_path / "cache"
+        f.write_text(self.YML)
+        expected = nh.template_to_dict(str(f), cache_dir=str(cache))
+        (entry,) = cache.glob("yaml-*.pickle")
+        entry.write_bytes(b"not a pickle")
+        assert nh.template_to_dict(str(f), cache_dir=str(cache)) == expected
+
+    def test_cache_disabled(self, tmp_path):
+        from DataBUS.neotomaHelpers.template_cache import clear_template_cache
+
+        f = tmp_path / "template.yml"
+        f.write_text(self.YML)
+        nh.template_to_dict(str(f), cache_dir=False)
+        assert clear_template_cache(str(tmp_path / "missing")) == 0
+
+    def test_excel_to_yaml_reuses_conversion(self, tmp_path, monkeypatch):
+        openpyxl = pytest.importorskip("openpyxl")
+        from DataBUS.neotomaHelpers import excel_to_yaml as ety
+
+        fields = [
+            "column",
+            "neotoma",
+            "unitcolumn",
+            "uncertaintycolumn",
+            "uncertaintybasis",
+            "uncertaintyunitcolumn",
+            "vocab",
+            "formatorrange",
+            "constant",
+            "taxonname",
+            "taxonid",
+            "notes",
+            "type",
+        ]
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = "Data Mapping"
+        ws.append(fields)
+        ws.append(["Depth", "ndb.analysisunits.depth"] + [None] * 10 + ["float"])
+        meta = wb.create_sheet("Metadata")
+        meta.append(["column", "neotoma"])
+        meta.append(["Site", "ndb.sites.sitename"])
+        xlsx = str(tmp_path / "template.xlsx")
+        wb.save(xlsx)
+        cache = str(tmp_path / "cache")
+
+        ety.excel_to_yaml(xlsx, str(tmp_path / "first"), cache_dir=cache)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("workbook read again")
+
+        monkeypatch.setattr(ety.openpyxl, "load_workbook", fail)
+        ety.excel_to_yaml(xlsx, str(tmp_path / "second"), cache_dir=cache)
+        first = (tmp_path / "first.yml").read_text()
+        assert first == (tmp_path / "second.yml").read_text()
+        assert "ndb.analysisunits.depth" in first
+
+
+# ── ColumnTable ───────────────────────────────────────────────────────────────
+class TestColumnTable:
+    def test_read_csv_columnar_matches_rows(self, tmp_path):
+        f = tmp_path / "test.csv"
+        f.write_text("col1,col2\na,1\nb,2\n")
+        table = read_csv(str(f), columnar=True)
+        assert isinstance(table, nh.ColumnTable)
+        assert table.n_rows == 2
+        assert table.column("col2") == ["1", "2"]
+        assert list(table) == read_csv(str(f))
+        assert table[-1] == {"col1": "b", "col2": "2"}
+
+    def test_short_rows_raise_key_error(self):
+        table = nh.ColumnTable.from_rows(["a", "b"], [["1", "2"], ["3"]])
+        assert table[1] == {"a": "3"}
+        assert table.column("a") == ["1", "3"]
+        with pytest.raises(KeyError):
+            table.column("b")
+
+    def test_unique_sets_are_cached(self):
+        table = nh.ColumnTable.from_rows(["taxon"], [["Quercus"], ["quercus"], ["Pinus"]])
+        assert table.unique("taxon") == {"Quercus", "quercus", "Pinus"}
+        assert table.unique_lower("taxon") == {"quercus", "pinus"}
+        assert table.unique("taxon") is table.unique("taxon")
+
+    def test_digest_changes_with_values_and_missing_cells(self):
+        table = nh.ColumnTable.from_rows(["a", "b"], [["1", "2"], ["3", ""]])
+        same = nh.ColumnTable.from_rows(["b", "a"], [["2", "1"], ["", "3"]])
+        short = nh.ColumnTable.from_rows(["a", "b"], [["1", "2"], ["3"]])
+        assert table.digest("a") == same.digest("a") != table.digest("b")
+        assert table.digest("b") != short.digest("b")
+        with pytest.raises(KeyError):
+            table.digest("c")
+
+    def test_clean_column_matches_row_dicts(self):
+        from DataBUS.neotomaHelpers.utils import clean_column
+
+        rows = [{"site": "Lake X", "v": "NA"}, {"site": "", "v": "2"}]
+        table = nh.ColumnTable.from_records(rows)
+        assert clean_column("site", table) == clean_column("site", rows) == "Lake X"
+        assert clean_column("v", table, clean=False) == clean_column("v", rows, clean=False)
+        with pytest.raises(KeyError):
+            clean_column("missing", table)
+
+    @pytest.mark.parametrize(
+        "data_file, template",
+        [
+            ("test_sisal.csv", "test_sisal_template.yml"),
+            ("test_eanode.csv", "test_eanode_template.yml"),
+        ],
+    )
+    def test_pull_params_matches_row_dicts(self, data_file, template):
+        from DataBUS.Sample import SAMPLE_PARAMS
+        from DataBUS.Site import SITE_PARAMS
+        from tests.conftest import toy_csv, toy_yml
+
+        yml = nh.template_to_dict(toy_yml(template))
+        rows = read_csv(toy_csv(data_file))
+        table = read_csv(toy_csv(data_file), columnar=True)
+        for params, tbl in [(SITE_PARAMS, "ndb.sites"), (SAMPLE_PARAMS, "ndb.samples")]:
+            assert nh.pull_params(params, yml, table, tbl) == nh.pull_params(params, yml, rows, tbl)
+
+    def test_read_xlsx_columnar(self, tmp_path):
+        import openpyxl
+
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = "Samples"
+        ws.append(["depth", "count"])
+        ws.append(["2.5", "10"])
+        ws.append([None, None])
+        ws.append(["5.0", "20"])
+        path = str(tmp_path / "test.xlsx")
+        wb.save(path)
+
+        result = nh.read_xlsx(path, columnar=True)
+        assert result["Samples"].column("depth") == ["2.5", "5.0"]
+        assert list(result["Samples"]) == nh.read_xlsx(path)["Samples"]
+
+
+# ── ExtractionCache ───────────────────────────────────────────────────────────
+class TestExtractionCache:
+    def _pair(self):
+        from tests.conftest import toy_csv, toy_yml
+
+        yml = nh.template_to_dict(toy_yml("test_sisal_template.yml"))
+        return yml, read_csv(toy_csv("test_sisal.csv"), columnar=True)
+
+    def test_second_call_is_a_hit(self):
+        from DataBUS.Site import SITE_PARAMS
+
+        yml, table = self._pair()
+        first = nh.pull_params(SITE_PARAMS, yml, table, "ndb.sites")
+        second = nh.pull_params(SITE_PARAMS, yml, table, "ndb.sites")
+        stats = nh.get_extraction_cache(table).stats()
+        assert first == second
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_results_are_independent_copies(self):
+        from DataBUS.Sample import SAMPLE_PARAMS
+
+        yml, table = self._pair()
+        first = nh.pull_params(SAMPLE_PARAMS, yml, table, "ndb.samples")
+        first["injected"] = True
+        for value in first.values():
+            if isinstance(value, list):
+                value.append("injected")
+        second = nh.pull_params(SAMPLE_PARAMS, yml, table, "ndb.samples")
+        assert "injected" not in second
+        assert all("injected" not in v for v in second.values() if isinstance(v, list))
+
+    def test_columns_shared_across_tables(self):
+        yml = {
+            "metadata": [
+                {"neotoma": "ndb.a.depth", "column": "d", "rowwise": True, "type": "float"},
+                {"neotoma": "ndb.b.depth", "column": "d", "rowwise": True, "type": "float"},
+            ]
+        }
+        table = nh.ColumnTable.from_rows(["d"], [["1.5"], ["2.5"]])
+        assert nh.pull_params(["depth"], yml, table, "ndb.a") == {"depth": [1.5, 2.5]}
+        assert nh.pull_params(["depth"], yml, table, "ndb.b") == {"depth": [1.5, 2.5]}
+        stats = nh.get_extraction_cache(table).stats()
+        assert stats["column_misses"] == 1
+        assert stats["column_hits"] == 1
+
+    def test_invalidate(self):
+        from DataBUS.Site import SITE_PARAMS
+
+        yml, table = self._pair()
+        nh.pull_params(SITE_PARAMS, yml, table, "ndb.sites")
+        nh.invalidate_extraction_cache(table, "ndb.sites")
+        assert nh.get_extraction_cache(table).stats()["entries"] == 0
+        nh.pull_params(SITE_PARAMS, yml, table, "ndb.sites")
+        assert nh.get_extraction_cache(table).stats()["misses"] == 2
+
+    def test_row_lists_are_not_cached(self):
+        assert nh.get_extraction_cache([{"a": "1"}]) is None
+
+    @pytest.mark.parametrize(
+        "data_file, template",
+        [
+            ("test_sisal.csv", "test_sisal_template.yml"),
+            ("test_210Pb.csv", "test_210pb_template.yml"),
+            ("test_node.csv", "test_node_template.yml"),
+            ("test_eanode.csv", "test_eanode_template.yml"),
+        ],
+    )
+    def test_validator_chain_matches_uncached(self, mock_cur, data_file, template):
+        from DataBUS.Contact import CONTACT_PARAMS, CONTACT_TABLES
+        from DataBUS.DataUncertainty import DATAUNCERTAINTY_PARAMS
+        from tests.conftest import toy_csv, toy_yml
+
+        yml = nh.CompiledTemplate(nh.template_to_dict(toy_yml(template)))
+        rows = read_csv(toy_csv(data_file))
+        table = read_csv(toy_csv(data_file), columnar=True)
+        calls = [(CONTACT_PARAMS, t) for t in CONTACT_TABLES] + [
+            (["value"], "ndb.data"),
+            (["taxonid", "variableunitsid"], "ndb.variables"),
+            (DATAUNCERTAINTY_PARAMS, "ndb.datauncertainties"),
+        ]
+        for _ in range(2):
+            for params, tbl in calls:
+                assert nh.pull_params(params, yml, table, tbl) == nh.pull_params(
+                    params, yml, rows, tbl
+                )
+        assert nh.get_extraction_cache(table).stats()["hits"] == len(calls)
+
+
+# ── ExtractionPlan ────────────────────────────────────────────────────────────
+TOY_PAIRS = [
+    ("test_sisal.csv", "test_sisal_template.yml"),
+    ("test_210Pb.csv", "test_210pb_template.yml"),
+    ("test_node.csv", "test_node_template.yml"),
+    ("test_eanode.csv", "test_eanode_template.yml"),
+]
+
+
+class TestExtractionPlan:
+    YML = {
+        "metadata": [
+            {"column": "Site", "neotoma": "ndb.sites.sitename", "rowwise": False},
+            {"column": "Notes", "neotoma": "ndb.sites.notes", "rowwise": False},
+            {"column": "Pinus", "neotoma": "ndb.data.value", "taxonname": "Pinus", "rowwise": True},
+            {"column": "Analyst", "neotoma": "ndb.contacts.contactname", "rowwise": False},
+            {"column": "Age", "neotoma": "ndb.sampleages.age", "rowwise": True, "type": "float"},
+        ]
+    }
+
+    def test_plan_records_actions_in_order(self):
+        plan = nh.compile_plan(["sitename", "notes", "siteid"], self.YML, "ndb.sites.")
+        assert [(s.param, s.column, s.action) for s in plan.steps] == [
+            ("sitename", "Site", "value"),
+            ("notes", "Notes", "note"),
+            ("siteid", None, "absent"),
+        ]
+        assert plan.columns == ((None, "Site"), (None, "Notes"))
+        assert nh.compile_plan(["value"], self.YML, "ndb.data.").steps[0].action == "taxon"
+        assert nh.compile_plan(["age"], self.YML, "ndb.sampleages.").steps[0].action == "chronology"
+
+    def test_plan_is_built_once_per_compiled_template(self, monkeypatch):
+        from DataBUS.neotomaHelpers import extraction_plan
+
+        template = nh.CompiledTemplate(self.YML)
+        built = []
+        original = extraction_plan._build_plan
+        monkeypatch.setattr(
+            extraction_plan,
+            "_build_plan",
+            lambda *args: built.append(args[2]) or original(*args),
+        )
+        for site in ("Lake A", "Lake B", "Lake C"):
+            rows = [{"Site": site, "Notes": None, "Pinus": "3", "Analyst": "Doe, J.", "Age": "10"}]
+            assert (
+                nh.pull_params(["sitename", "siteid"], template, rows, "ndb.sites")["sitename"]
+                == site
+            )
+        assert built == ["ndb.sites."]
+        assert list(template.plans) == [("ndb.sites.", ("sitename", "siteid"))]
+
+    @pytest.mark.parametrize("csv_name,template", TOY_PAIRS)
+    def test_execute_matches_pull_params_on_raw_template(self, csv_name, template):
+        from tests.conftest import toy_csv, toy_yml
+
+        yml = nh.template_to_dict(toy_yml(template))
+        compiled = nh.CompiledTemplate(yml)
+        rows = read_csv(toy_csv(csv_name))
+        tables = {".".join(m["neotoma"].split(".")[:2]) + "." for m in yml["metadata"]}
+        for table in sorted(t for t in tables if t.count(".") == 2):
+            params = sorted(
+                {m["neotoma"][len(table) :].split(".")[0] for m in compiled.startswith(table)}
+            )
+            try:
+                expected = nh.pull_params(params, yml, rows, table)
+            except ValueError:
+                continue
+            assert nh.compile_plan(params, compiled, table).execute(rows) == expected
+
+
+# ── VocabularyCache ───────────────────────────────────────────────────────────
+class TestVocabularyCache:
+    TERMS = [
+        ("agetypes", 1, "calendar years bp"),
+        ("agetypes", 2, "calibrated radiocarbon years bp"),
+        ("geochrontypes", 7, "carbon-14"),
+    ]
+
+    @pytest.fixture
+    def vocab_cur(self):
+        from tests.conftest import MockCursor
+
+        class VocabCursor(MockCursor):
+            def fetchall(self):
+                # Only return the vocabularies named in the UNION ALL query.
+                return [row for row in self.mock_fetchall if f"'{row[0]}'" in self.last_query]
+
+        cur = VocabCursor()
+        cur.mock_fetchall = self.TERMS
+        return cur
+
+    @pytest.fixture
+    def process_cache(self):
+        yield nh.use_vocabulary_cache()
+        nh.use_vocabulary_cache(False)
+
+    def test_disabled_queries_each_lookup(self, mock_cur):
+        vocab = nh.VocabularyCache(enabled=False)
+        mock_cur.mock_fetchone = (3,)
+        assert vocab.lookup(mock_cur, "agetypes", " Calendar Years BP ") == 3
+        assert vocab.lookup(mock_cur, "agetypes", " Calendar Years BP ") == 3
+        assert [params for _, params in mock_cur._execute_calls] == [
+            {"term": "calendar years bp"}
+        ] * 2
+        mock_cur.mock_fetchone = None
+        assert vocab.lookup(mock_cur, "agetypes", "unknown") is None
+
+    def test_first_lookup_loads_the_table(self, vocab_cur):
+        vocab = nh.VocabularyCache()
+        assert vocab.lookup(vocab_cur, "agetypes", "Calibrated radiocarbon years BP ") == 2
+        assert vocab.lookup(vocab_cur, "agetypes", "CALENDAR YEARS BP") == 1
+        assert vocab.lookup(vocab_cur, "agetypes", "varve years") is None
+        assert len(vocab_cur._execute_calls) == 1
+        assert "ndb.agetypes" in vocab_cur.last_query
+        assert vocab.stats() == {
+            "hits": 2,
+            "misses": 1,
+            "not_found": 1,
+            "loads": 1,
+            "queries": 0,
+            "vocabularies": 1,
+            "terms": 2,
+        }
+
+    def test_prefetch_loads_all_vocabularies_in_one_query(self, vocab_cur):
+        vocab = nh.VocabularyCache()
+        vocab.prefetch(vocab_cur)
+        assert len(vocab_cur._execute_calls) == 1
+        assert vocab_cur.last_query.count("UNION ALL") == len(nh.vocabulary_cache.VOCABULARIES) - 1
+        assert vocab.lookup(vocab_cur, "geochrontypes", "Carbon-14") == 7
+        assert vocab.lookup(vocab_cur, "faciestypes", "peat") is None
+        vocab.prefetch(vocab_cur)
+        assert len(vocab_cur._execute_calls) == 1
+
+    def test_refresh_reloads(self, vocab_cur):
+        vocab = nh.VocabularyCache()
+        vocab.lookup(vocab_cur, "agetypes", "calendar years bp")
+        vocab_cur.mock_fetchall = [("agetypes", 9, "calendar years bp")]
+        assert vocab.lookup(vocab_cur, "agetypes", "calendar years bp") == 1
+        vocab.refresh("agetypes")
+        assert vocab.lookup(vocab_cur, "agetypes", "calendar years bp") == 9
+        assert vocab.loads == 2
+
+    def test_validators_share_the_process_cache(self, vocab_cur, process_cache, sisal_pair):
+        import DataBUS.neotomaValidator as nv
+
+        csv_file, yml_dict = sisal_pair
+        for _ in range(2):
+            result = nv.valid_chronologies(vocab_cur, yml_dict, csv_file, {})
+            assert "✔ The provided age type is correct: 2" in result.message
+        agetype_queries = [q for q, _ in vocab_cur._execute_calls if "ndb.agetypes" in q]
+        assert len(agetype_queries) == 1
+        assert process_cache.stats()["misses"] == 1
+
+
+# ── FunctionRegistry ──────────────────────────────────────────────────────────
+class TestFunctionRegistry:
+    @pytest.fixture
+    def conn(self):
+        from tests.conftest import MockConnection, MockCursor
+
+        class Connection(MockConnection):
+            commits = 0
+
+            def commit(self):
+                self.commits += 1
+
+        cur = MockCursor()
+        conn = Connection(cur)
+        cur.connection = conn
+        return conn
+
+    def _installed(self, registry, *names):
+        return [(name, registry.function(name).version) for name in names]
+
+    @pytest.mark.parametrize("name", sorted(nh.sql_functions.SQL_FUNCTIONS))
+    def test_scripts_define_their_function(self, name):
+        function = nh.FunctionRegistry().function(name)
+        assert f"FUNCTION {name}(" in function.definition
+        assert len(function.version) == 32
+
+    def test_missing_function_is_created_and_checked_again(self, conn):
+        registry = nh.FunctionRegistry()
+        cur = conn.cursor()
+        registry.require(cur, "insert_hiatus")
+        registry.require(cur, "insert_hiatus")
+        queries = [q for q, _ in cur._execute_calls]
+        assert len(queries) == 4
+        assert "pg_proc" in queries[0] and "pg_proc" in queries[2]
+        assert queries[1] == queries[3] == registry.function("insert_hiatus").definition
+        assert registry.stats() == {"hits": 0, "checks": 2, "installs": 2}
+
+    def test_installed_function_is_checked_once(self, conn):
+        registry = nh.FunctionRegistry()
+        cur = conn.cursor()
+        cur.mock_fetchall = self._installed(registry, "insert_hiatus")
+        for _ in range(3):
+            registry.require(cur, "insert_hiatus")
+        assert len(cur._execute_calls) == 1
+        assert registry.stats() == {"hits": 2, "checks": 1, "installs": 0}
+
+    def test_outdated_function_is_replaced(self, conn):
+        registry = nh.FunctionRegistry()
+        cur = conn.cursor()
+        cur.mock_fetchall = [("insert_hiatus", "0" * 32)]
+        registry.require(cur, "insert_hiatus")
+        assert cur.last_query == registry.function("insert_hiatus").definition
+
+    def test_install_commits_and_skips_later_checks(self, conn):
+        registry = nh.FunctionRegistry()
+        cur = conn.cursor()
+        cur.mock_fetchall = self._installed(registry, "insert_hiatus")
+        created = registry.install(conn, ["insert_hiatus", "insert_speleothem"])
+        assert created == ["insert_speleothem"]
+        assert conn.commits == 1
+        calls = len(cur._execute_calls)
+        registry.require(cur, "insert_speleothem")
+        registry.require(cur, "insert_hiatus")
+        assert len(cur._execute_calls) == calls
+        registry.reset(conn)
+        registry.require(cur, "insert_hiatus")
+        assert len(cur._execute_calls) == calls + 1
+
+    def test_models_call_the_installed_function(self, conn):
+        from DataBUS import Hiatus
+
+        cur = conn.cursor()
+        nh.install_sql_functions(conn, ["insert_hiatus"])
+        cur._execute_calls.clear()
+        cur.mock_fetchone = (5,)
+        try:
+            assert Hiatus(analysisunitstart=1, analysisunitend=2).insert_to_db(cur) == 5
+        finally:
+            nh.get_function_registry().reset(conn)
+        assert len(cur._execute_calls) == 1
+        assert "SELECT insert_hiatus(" in cur.last_query
+
+
+# ── PreparedStatements ────────────────────────────────────────────────────────
+class TestPreparedStatements:
+    QUERY = "SELECT ts.insertdata(_sampleid := %(sampleid)s, _value := %(value)s)"
+
+    def test_statement_placeholders(self):
+        statement = nh.prepared_statements.Statement(
+            "SELECT f(%(a)s, %(b)s, %(a)s) WHERE x LIKE 'a%%';", "f"
+        )
+        assert statement.text == "SELECT f($1, $2, $1) WHERE x LIKE 'a%'"
+        assert statement.values({"b": 2, "a": 1}) == [1, 2]
+        positional = nh.prepared_statements.Statement("SELECT f(%s, %s)", "f")
+        assert positional.text == "SELECT f($1, $2)"
+        with pytest.raises(ValueError):
+            nh.prepared_statements.Statement("SELECT f(%s, %(a)s)", "f")
+
+    def test_disabled_runs_the_query(self, mock_cur):
+        statements = nh.PreparedStatements(enabled=False)
+        statements.execute(mock_cur, self.QUERY, {"sampleid": 1, "value": 2.5})
+        assert mock_cur._execute_calls == [(self.QUERY, {"sampleid": 1, "value": 2.5})]
+        assert statements.stats() == {"ts.insertdata": {"calls": 1, "prepares": 0}}
+
+    def test_prepares_once_per_value_types(self, mock_cur):
+        statements = nh.PreparedStatements()
+        statements.execute(mock_cur, self.QUERY, {"sampleid": 1, "value": 2.5})
+        statements.execute(mock_cur, self.QUERY, {"sampleid": 2, "value": 3.5})
+        statements.execute(mock_cur, self.QUERY, {"sampleid": 3, "value": None})
+        queries = [q for q, _ in mock_cur._execute_calls]
+        assert queries == [
+            "PREPARE databus_0_1 (integer, numeric) AS "
+            "SELECT ts.insertdata(_sampleid := $1, _value := $2)",
+            "EXECUTE databus_0_1 (%s, %s)",
+            "EXECUTE databus_0_1 (%s, %s)",
+            "PREPARE databus_0_2 (integer, unknown) AS "
+            "SELECT ts.insertdata(_sampleid := $1, _value := $2)",
+            "EXECUTE databus_0_2 (%s, %s)",
+        ]
+        assert mock_cur.last_params == [3, None]
+        assert statements.stats() == {"ts.insertdata": {"calls": 3, "prepares": 2}}
+
+    def test_new_session_prepares_again(self, mock_cur):
+        class Info:
+            backend_pid = 100
+
+        mock_cur.info = Info()
+        statements = nh.PreparedStatements()
+        statements.execute(mock_cur, self.QUERY, {"sampleid": 1, "value": 1})
+        mock_cur.info.backend_pid = 101
+        statements.execute(mock_cur, self.QUERY, {"sampleid": 1, "value": 1})
+        assert sum(q.startswith("PREPARE") for q, _ in mock_cur._execute_calls) == 2
+
+    def test_missing_statement_is_prepared_again_under_a_new_name(self, mock_cur):
+        class MissingStatement(Exception):
+            pgcode = "26000"
+
+        statements = nh.PreparedStatements()
+        statements.execute(mock_cur, self.QUERY, {"sampleid": 1, "value": 1})
+        execute = mock_cur.execute
+
+        def fail(query, params=None):
+            execute(query, params)
+            raise MissingStatement("prepared statement does not exist")
+
+        mock_cur.execute = fail
+        with pytest.raises(MissingStatement):
+            statements.execute(mock_cur, self.QUERY, {"sampleid": 1, "value": 1})
+        mock_cur.execute = execute
+        statements.execute(mock_cur, self.QUERY, {"sampleid": 1, "value": 1})
+        assert mock_cur._execute_calls[-2][0].startswith("PREPARE databus_1_1 ")
+        assert mock_cur.last_query == "EXECUTE databus_1_1 (%s, %s)"
+
+    def test_models_use_the_process_registry(self, mock_cur):
+        from DataBUS import Datum
+
+        statements = nh.use_prepared_statements()
+        statements.reset_stats()
+        mock_cur.mock_fetchone = (9,)
+        try:
+            for value in (1.5, 2.5):
+                assert Datum(sampleid=1, variableid=2, value=value).insert_to_db(mock_cur) == 9
+        finally:
+            nh.use_prepared_statements(False)
+        assert [q.split()[0] for q, _ in mock_cur._execute_calls] == [
+            "PREPARE",
+            "EXECUTE",
+            "EXECUTE",
+        ]
+        assert statements.stats() == {"ts.insertdata": {"calls": 2, "prepares": 1}}
+
+
+# ── ChunkedReader ─────────────────────────────────────────────────────────────
+class TestChunkedReader:
+    def test_iter_csv_chunks_block_sizes(self, tmp_path):
+        f = tmp_path / "test.csv"
+        f.write_text("a,b\n" + "".join(f"{i},x\n" for i in range(5)))
+        blocks = list(nh.iter_csv_chunks(str(f), chunk_size=2))
+        assert [b.n_rows for b in blocks] == [2, 2, 1]
+        assert sum((b.rows() for b in blocks), []) == read_csv(str(f))
+
+    def test_header_only_csv_yields_one_empty_block(self, tmp_path):
+        f = tmp_path / "test.csv"
+        f.write_text("a,b\n")
+        reader = nh.ChunkedReader(str(f), chunk_size=2)
+        assert [(rows, block.headers) for rows, block in reader.chunks()] == [
+            (slice(0, 0), ["a", "b"])
+        ]
+        assert reader.n_rows == 0
+
+    def test_iter_xlsx_chunks_lockstep(self, tmp_path):
+        openpyxl = pytest.importorskip("openpyxl")
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = "Samples"
+        ws.append(["depth"])
+        for i in range(5):
+            ws.append([i])
+        site = wb.create_sheet("Site")
+        site.append(["name"])
+        site.append(["Lake X"])
+        path = str(tmp_path / "test.xlsx")
+        wb.save(path)
+        blocks = list(nh.iter_xlsx_chunks(path, chunk_size=2))
+        assert [(b["Samples"].n_rows, b["Site"].n_rows) for b in blocks] == [(2, 1), (2, 0), (1, 0)]
+        reader = nh.ChunkedReader(path, chunk_size=2)
+        assert [rows for rows, _ in reader.chunks()] == [slice(0, 2), slice(2, 4), slice(4, 5)]
+
+    def test_non_rowwise_conflict_across_blocks_raises(self, tmp_path):
+        f = tmp_path / "test.csv"
+        f.write_text("site,depth\nLake X,1\nLake X,2\nLake Y,3\n")
+        yml = {
+            "metadata": [
+                {"column": "site", "neotoma": "ndb.sites.sitename", "rowwise": False},
+                {"column": "depth", "neotoma": "ndb.analysisunits.depth", "rowwise": True},
+            ]
+        }
+        reader = nh.ChunkedReader(str(f), chunk_size=2)
+        with pytest.raises(ValueError):
+            list(nh.pull_params_blocks(["sitename"], yml, reader, "ndb.sites"))
+        with pytest.raises(ValueError):
+            nh.pull_params(["sitename"], yml, reader, "ndb.sites")
+
+    @pytest.mark.parametrize("data_file, template", TOY_PAIRS)
+    def test_pull_params_matches_whole_file(self, data_file, template):
+        from DataBUS.AnalysisUnit import ANALYSIS_UNIT_PARAMS
+        from DataBUS.Site import SITE_PARAMS
+        from tests.conftest import toy_csv, toy_yml
+
+        yml = nh.CompiledTemplate(nh.template_to_dict(toy_yml(template)))
+        rows = read_csv(toy_csv(data_file))
+        reader = nh.ChunkedReader(toy_csv(data_file), chunk_size=7)
+        for params, table in [
+            (SITE_PARAMS, "ndb.sites"),
+            (ANALYSIS_UNIT_PARAMS, "ndb.analysisunits"),
+        ]:
+            expected = nh.pull_params(params, yml, rows, table)
+            assert nh.pull_params(params, yml, reader, table) == expected
+            merged = {}
+            for block_rows, inputs in nh.pull_params_blocks(params, yml, reader, table):
+                for key, value in inputs.items():
+                    if isinstance(expected.get(key), list):
+                        n_rows = block_rows.stop - block_rows.start
+                        merged.setdefault(key, []).extend(value or [None] * n_rows)
+                    else:
+                        merged[key] = value
+            assert merged == expected
+
+    @pytest.mark.parametrize("data_file, template", TOY_PAIRS)
+    @pytest.mark.parametrize("chunk_size", [1, 7])
+    def test_rowwise_validators_match_whole_file(self, data_file, template, chunk_size):
+        from unittest.mock import MagicMock
+
+        import DataBUS.neotomaValidator as nv
+        from tests.conftest import MockCursor, toy_csv, toy_yml
+
+        class CountingCursor(MockCursor):
+            def fetchone(self):
+                return (len(self._execute_calls),)
+
+        def run(csv_file):
+            cur = CountingCursor()
+            databus = {"collunits": MagicMock(id_int=1), "datasets": MagicMock(id_int=2)}
+            summary = []
+            for name, validator in [
+                ("analysisunits", nv.valid_analysisunit),
+                ("samples", nv.valid_sample),
+                ("data", nv.valid_data),
+                ("datauncertainty", nv.valid_datauncertainty),
+            ]:
+                databus[name] = validator(cur, yml, csv_file, databus)
+                summary.append(
+                    (
+                        (databus[name].valid.passed, databus[name].valid.failed),
+                        databus[name].counter,
+                        len(databus[name].id_list),
+                        {k: len(v) for k, v in databus[name].id_dict.items()},
+                    )
+                )
+            return summary, len(cur._execute_calls)
+
+        yml = nh.CompiledTemplate(nh.template_to_dict(toy_yml(template)))
+        expected, _ = run(read_csv(toy_csv(data_file)))
+        # valid_data resolves the new terms of each block in one query, so
+        # the number of queries depends on the block size.
+        assert run(nh.ChunkedReader(toy_csv(data_file), chunk_size=chunk_size))[0] == expected
+
+
+# ── vectorized conversion ─────────────────────────────────────────────────────
+class TestVectorizedConversion:
+    @pytest.fixture(autouse=True)
+    def _numpy(self):
+        pytest.importorskip("numpy")
+        yield
+        from DataBUS.neotomaHelpers import vectorized
+
+        vectorized.use_vectorized(False)
+
+    def test_float_column_mask(self):
+        from DataBUS.neotomaHelpers.vectorized import convert_column
+
+        col = convert_column(["1.5", None, "NA", "2"], "float")
+        assert col.mask.tolist() == [True, False, False, True]
+        assert col.tolist() == [1.5, None, None, 2.0]
+
+    def test_date_column_matches_python(self):
+        import datetime
+
+        from DataBUS.neotomaHelpers.vectorized import convert_column
+
+        col = convert_column(["2020/01/02", "2020-01-02", None, "1999-12-31"], "date")
+        assert col.tolist() == [
+            datetime.date(2020, 1, 2),
+            datetime.date(2020, 1, 2),
+            None,
+            datetime.date(1999, 12, 31),
+        ]
+
+    def test_int_and_bool_columns(self):
+        from DataBUS.neotomaHelpers.vectorized import convert_column
+
+        assert convert_column(["3", None, 4], "int").tolist() == [3, None, 4]
+        assert convert_column(["True", " yes", "0", None], "bool").tolist() == [
+            True,
+            True,
+            False,
+            None,
+        ]
+
+    def test_bad_value_raises(self):
+        from DataBUS.neotomaHelpers.vectorized import convert_column
+
+        with pytest.raises(ValueError):
+            convert_column(["1.5", "abc"], "float")
+
+    @pytest.mark.parametrize(
+        "type_spec, values",
+        [
+            ("float", ["1.25", None, "3"]),
+            ("int", ["1", "2", None]),
+            ("date", ["2001/02/03", "2001-02-04"]),
+            ("bool", ["true", "False", "1"]),
+        ],
+    )
+    def test_convert_value_by_type_backend_matches(self, type_spec, values):
+        from DataBUS.neotomaHelpers import vectorized
+        from DataBUS.neotomaHelpers.utils import convert_value_by_type
+
+        meta = {"type": type_spec, "rowwise": True}
+        expected = convert_value_by_type(meta, values)
+        vectorized.use_vectorized(True, min_rows=0)
+        assert convert_value_by_type(meta, values) == expected
+
+
+# ── LogSink ───────────────────────────────────────────────────────────────────
+class TestLogSink:
+    def _response(self):
+        from DataBUS import Response
+
+        response = Response()
+        response.valid.extend([True, False])
+        for _ in range(3):
+            response.add_message("✗  Datum cannot be created: {e}", e="bad")
+        return response
+
+    def test_streams_records_and_renders_the_valid_log(self, tmp_path):
+        import json
+
+        from DataBUS.neotomaHelpers.logging_dict import logging_response
+
+        text, jsonl = str(tmp_path / "a.csv.valid.log"), str(tmp_path / "a.csv.valid.jsonl")
+        response = self._response()
+        with nh.LogSink(text, jsonl) as log:
+            log.append("abc123")
+            log.start_step("data", "Data")
+            logging_response(response, log)
+            log.end_step()
+            with open(text, encoding="utf-8") as f:
+                partial = f.read()
+            log.append("? Nothing else to check.")
+        assert partial == f"abc123\n=== Data ===\n{response}\n"
+        with open(text, encoding="utf-8") as f:
+            assert f.read() == partial + "? Nothing else to check.\n"
+        with open(jsonl, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        assert [(r["kind"], r["step"], r["level"]) for r in records] == [
+            ("line", None, "info"),
+            ("step", "data", "info"),
+            ("response", "data", "error"),
+            ("line", None, "warning"),
+        ]
+        assert records[2]["counts"] == {"passed": 1, "failed": 1}
+        assert records[2]["messages"] == [["✗  Datum cannot be created: bad", 3]]
+        assert records[2]["elapsed"] >= 0
+        assert nh.render_valid_log(jsonl) == ["abc123", "=== Data ===", str(response)] + [
+            "? Nothing else to check."
+        ]
+
+    def test_files_are_opened_on_first_record(self, tmp_path):
+        text = tmp_path / "a.csv.valid.log"
+        text.write_text("previous run\n")
+        log = nh.LogSink(str(text))
+        assert text.read_text() == "previous run\n"
+        log.append("new run")
+        log.close()
+        assert text.read_text() == "new run\n"
+
+    def test_keep_collects_rendered_lines_without_files(self):
+        log = nh.LogSink(keep=True)
+        log.extend(["one", "✔ two"])
+        assert log.lines == ["one", "✔ two"]
+
+
+# ── ValidationStore ───────────────────────────────────────────────────────────
+class TestValidationStore:
+    def _data(self, tmp_path, content="a,b\n1,2\n"):
+        path = tmp_path / "lake.csv"
+        path.write_text(content)
+        return str(path)
+
+    def test_latest_record_per_file(self, tmp_path):
+        store = nh.ValidationStore(str(tmp_path / "logs" / "validation.sqlite3"))
+        assert store.latest("lake.csv") is None
+        store.record("data/lake.csv", "h1", "invalid", errors=2, strict_errors=3)
+        store.record("other/lake.csv", "h2", "validated", errors=0, template_hash="t")
+        latest = store.latest("lake.csv")
+        assert (latest["file_hash"], latest["status"], latest["template_hash"]) == (
+            "h2",
+            "validated",
+            "t",
+        )
+        store.record("lake.csv", "h1", "validated", errors=0)
+        assert store.latest("lake.csv")["file_hash"] == "h1"
+
+    def test_check_file_answers_from_the_store(self, tmp_path):
+        logs = str(tmp_path) + "/"
+        (tmp_path / "lake.csv.valid.log").write_text("✗ stale error\n")
+        store = nh.get_validation_store(True, logs)
+        store.record("lake.csv", "h", "invalid", errors=0, strict_errors=1)
+        assert check_file("lake.csv", validation_files=logs)["pass"] is True
+        strict = check_file("lake.csv", strict=True, validation_files=logs)
+        assert (strict["pass"], strict["match"]) == (False, 1)
+        assert check_file("lake.csv", validation_files=logs, store=False)["pass"] is False
+
+    def test_hash_file_compares_with_latest_validation(self, tmp_path):
+        logs = str(tmp_path) + "/"
+        filename = self._data(tmp_path)
+        store = nh.get_validation_store(True, logs)
+        digest = nh.hash_file(filename, validation_files=logs)["hash"]
+        store.record(filename, digest, "invalid", errors=1)
+        result = nh.hash_file(filename, validation_files=logs)
+        assert result["pass"] is False
+        assert "Hashes match, file hasn't been corrected." in result["message"]
+        store.record(filename, digest, "validated", errors=0)
+        assert nh.hash_file(filename, validation_files=logs)["pass"] is True
+        self._data(tmp_path, "a,b\n1,3\n")
+        result = nh.hash_file(filename, validation_files=logs)
+        assert result["pass"] is False
+        assert result["message"][-1].startswith("File has changed")
+
+    def test_step_results_round_trip(self, tmp_path):
+        from DataBUS import Response
+
+        store = nh.ValidationStore(str(tmp_path / "validation.sqlite3"))
+        response = Response()
+        response.valid.append(True)
+        response.message.append("✔ ok")
+        records = [{"kind": "line", "level": "ok", "message": "✔ ok"}]
+        store.record_steps(
+            "data/lake.csv",
+            [
+                {
+                    "step": "sites",
+                    "fingerprint": "f1",
+                    "valid": True,
+                    "skipped": False,
+                    "response": response,
+                    "records": records,
+                },
+                {
+                    "step": "data",
+                    "fingerprint": "f2",
+                    "valid": False,
+                    "skipped": True,
+                    "response": None,
+                    "records": [],
+                },
+            ],
+        )
+        results = store.step_results("lake.csv")
+        assert results["sites"]["response"].message == ["✔ ok"]
+        assert results["sites"]["records"] == records
+        assert (results["data"]["skipped"], results["data"]["response"]) == (True, None)
+        store.forget_steps("lake.csv")
+        assert store.step_results("lake.csv") == {}
+
+    def test_no_store_is_created_by_lookups(self, tmp_path):
+        logs = str(tmp_path) + "/"
+        assert nh.get_validation_store(None, logs) is None
+        check_file("lake.csv", validation_files=logs)
+        assert not os.path.exists(tmp_path / "validation.sqlite3")
+
+
+# ── FileHasher ────────────────────────────────────────────────────────────────
+class TestFileHasher:
+    def _file(self, tmp_path, name, content, age=10):
+        path = tmp_path / name
+        path.write_bytes(content)
+        # Age the file past the window in which digests are not persisted.
+        stamp = os.stat(path).st_mtime - age
+        os.utime(path, (stamp, stamp))
+        return str(path)
+
+    def test_chunked_digest_matches_hashlib(self, tmp_path):
+        import hashlib
+
+        content = os.urandom(3000)
+        path = self._file(tmp_path, "a.csv", content)
+        assert (
+            nh.hash_stream(path, "blake2b", chunk_size=256) == hashlib.blake2b(content).hexdigest()
+        )
+        assert nh.hash_stream(path) == hashlib.md5(content).hexdigest()
+
+    def test_unchanged_files_are_served_from_the_persistent_cache(self, tmp_path):
+        cache = str(tmp_path / "hashes.sqlite3")
+        path = self._file(tmp_path, "a.csv", b"a,b\n1,2\n")
+        first = nh.FileHasher("blake2b", cache_path=cache)
+        digest = first.digest(path)
+        second = nh.FileHasher("blake2b", cache_path=cache)
+        assert second.digest(path) == digest
+        assert second.stats() == {"hits": 1, "misses": 0}
+        self._file(tmp_path, "a.csv", b"a,b\n1,3\n", age=5)
+        assert second.digest(path) != digest
+        assert second.stats() == {"hits": 1, "misses": 1}
+
+    def test_recently_modified_files_are_not_persisted(self, tmp_path):
+        cache = str(tmp_path / "hashes.sqlite3")
+        path = self._file(tmp_path, "a.csv", b"x", age=0)
+        nh.FileHasher(cache_path=cache).digest(path)
+        hasher = nh.FileHasher(cache_path=cache)
+        hasher.digest(path)
+        assert hasher.stats() == {"hits": 0, "misses": 1}
+        hasher.digest(path)
+        assert hasher.stats() == {"hits": 1, "misses": 1}
+
+    def test_hash_directory_hashes_data_files_concurrently(self, tmp_path):
+        for i in range(5):
+            self._file(tmp_path, f"{i}.csv", f"row,{i}\n".encode())
+        self._file(tmp_path, "notes.txt", b"skip me")
+        digests = nh.hash_directory(str(tmp_path), algorithm="sha256", workers=3)
+        assert list(digests) == sorted(digests)
+        assert len(digests) == 5
+        assert all(d == nh.hash_stream(p, "sha256") for p, d in digests.items())
+
+    def test_unknown_algorithm(self):
+        with pytest.raises(ValueError):
+            nh.FileHasher("no-such-hash")
+
+
+# ── offline snapshot ──────────────────────────────────────────────────────────
+class TestOffline:
+    TABLES = {
+        "taxa": (None, ("LOWER(taxonname)",)),
+        "variables": (None, ("taxonid",)),
+        "sites": (None, ("siteid",)),
+    }
+
+    def _snapshot(self, tmp_path):
+        import sqlite3
+
+        source = sqlite3.connect(":memory:")
+        source.execute("ATTACH DATABASE ? AS ndb", (str(tmp_path / "source.db"),))
+        source.executescript(
+            """
+            CREATE TABLE ndb.taxa (taxonid INTEGER, taxonname TEXT);
+            INSERT INTO ndb.taxa VALUES (1, 'Pinus'), (2, 'Ärla'), (3, 'Picea glauca');
+            CREATE TABLE ndb.variables (variableid INTEGER, taxonid INTEGER,
+                variableunitsid INTEGER, variableelementid INTEGER, variablecontextid INTEGER);
+            INSERT INTO ndb.variables VALUES (10, 1, 5, NULL, NULL), (11, 3, 5, 7, NULL);
+            CREATE TABLE ndb.sites (siteid INTEGER, sitename TEXT, latitudenorth REAL,
+                longitudeeast REAL, latitudesouth REAL, longitudewest REAL);
+            INSERT INTO ndb.sites VALUES (1, 'Lake', 45, -70, 44, -71), (2, 'Bog', 10, 10, 10, 10);
+            """
+        )
+        path = str(tmp_path / "neotoma.sqlite3")
+        assert nh.export_snapshot(source, path, self.TABLES) == {
+            "taxa": 3,
+            "variables": 2,
+            "sites": 2,
+        }
+        return path
+
+    def test_export_records_what_was_exported(self, tmp_path):
+        info = nh.snapshot_info(self._snapshot(tmp_path))
+        assert info["tables"] == {"taxa": 3, "variables": 2, "sites": 2}
+        assert info["created_at"] and info["databus_version"]
+
+    def test_lookups_are_translated(self, tmp_path):
+        cur = nh.OfflineConnection(self._snapshot(tmp_path)).cursor()
+        cur.execute("SELECT taxonid FROM ndb.taxa WHERE LOWER(taxonname) = %(n)s;", {"n": "ärla"})
+        assert cur.fetchall() == [(2,)]
+        cur.execute(
+            "SELECT taxonid FROM ndb.taxa WHERE LOWER(taxonname) = ANY(%(n)s) ORDER BY taxonid;",
+            {"n": ["pinus", "picea glauca"]},
+        )
+        assert cur.fetchall() == [(1,), (3,)]
+        cur.execute("SELECT * FROM ndb.taxa WHERE LOWER(taxonname) %% %(n)s;", {"n": "picea glaca"})
+        assert [row[0] for row in cur.fetchall()] == [3]
+        assert [d[0] for d in cur.description] == ["taxonid", "taxonname"]
+        cur.execute("SELECT taxonname FROM ndb.taxa WHERE taxonid = %s", ["1"])
+        assert cur.fetchone() == ("Pinus",)
+
+    def test_models_run_their_queries_offline(self, tmp_path):
+        from DataBUS import Geog, Site, Variable
+
+        cur = nh.OfflineConnection(self._snapshot(tmp_path)).cursor()
+        variables = [
+            Variable(taxonid=1, variableunitsid=5),
+            Variable(taxonid=3, variableunitsid=5, variableelementid=7),
+            Variable(taxonid=3, variableunitsid=5),
+        ]
+        assert Variable.get_ids_from_db(cur, variables) == {
+            (1, 5, None, None): 10,
+            (3, 5, 7, None): 11,
+        }
+        close = Site(sitename="Lake", geog=Geog([44.5, -70.5])).find_close_sites(cur)
+        assert [(row[0], row[-1]) for row in close] == [(1, 0.0)]
+        assert [d[0] for d in cur.description][-1] == "dist"
+
+    def test_inserts_get_placeholder_ids(self, tmp_path):
+        from DataBUS.Datum import Datum
+
+        conn = nh.OfflineConnection(self._snapshot(tmp_path))
+        cur = conn.cursor()
+        cur.execute("SELECT ts.insertsite(%(sitename)s);", {"sitename": "Lake"})
+        assert cur.fetchone() == (-1,)
+        data = [Datum(sampleid=1, variableid=10, value=v) for v in (1.0, 2.0)]
+        assert Datum.insert_many(cur, data, method="insert") == [-2, -3]
+        assert Datum.insert_many(cur, data, method="copy") == [-4, -5]
+        cur.execute("INSERT INTO ndb.taxa (taxonname) VALUES (%s);", ["Abies"])
+        assert cur.fetchall() == []
+        cur.execute("PREPARE databus_1 (integer) AS SELECT ts.insertdata($1, $2)")
+        cur.execute("EXECUTE databus_1 (%s, %s)", [1, 2])
+        assert cur.fetchall() == [(-6,)]
+        cur.execute("SELECT COUNT(*) FROM ndb.taxa")
+        assert cur.fetchone() == (3,)
+
+    def test_missing_table_is_named(self, tmp_path):
+        path = self._snapshot(tmp_path)
+        cur = nh.OfflineConnection(path).cursor()
+        cur.execute("SAVEPOINT sp")
+        cur.execute("SELECT proname FROM pg_proc WHERE proname = ANY(%(n)s)", {"n": ["x"]})
+        assert cur.fetchall() == []
+        with pytest.raises(nh.OfflineError, match="ndb.grants is not in the offline snapshot"):
+            cur.execute("SELECT * FROM ndb.grants WHERE grantid = %s", [1])
+        with pytest.raises(FileNotFoundError):
+            nh.OfflineConnection(str(tmp_path / "missing.sqlite3"))
+
+
+class TestValidateOnlyCursor:
+    def test_reads_run_and_writes_get_placeholders(self, mock_cur):
+        from DataBUS.Datum import Datum
+
+        mock_cur.mock_fetchone = (7,)
+        cur = nh.ValidateOnlyCursor(mock_cur)
+        cur.execute("SELECT taxonid FROM ndb.taxa WHERE LOWER(taxonname) = %(n)s;", {"n": "x"})
+        assert cur.fetchone() == (7,)
+        cur.execute("SELECT ts.insertsite(%(sitename)s);", {"sitename": "Lake"})
+        assert cur.fetchone() == (-1,)
+        assert [d[0] for d in cur.description] == ["insertsite"]
+        data = [Datum(sampleid=-1, variableid=10, value=v) for v in (1.0, 2.0, 3.0)]
+        assert Datum.insert_many(cur, data, method="copy") == [-2, -3, -4]
+        cur.execute("UPDATE ndb.aednamodels SET model = %s", ["m"])
+        assert cur.rowcount == 1 and cur.skipped == 3
+        sent = [q for q, _ in mock_cur._execute_calls]
+        assert len(sent) == 2 and "ndb.taxa" in sent[0] and "CREATE TEMPORARY" in sent[1]
+
+    def test_prepared_writes_stay_on_the_client(self, mock_cur):
+        statements = nh.PreparedStatements()
+        query = "SELECT ts.insertsample(%(analysisunitid)s, %(samplename)s);"
+        for n in (1, 2):
+            cur = nh.ValidateOnlyCursor(mock_cur)
+            statements.execute(cur, query, {"analysisunitid": -1, "samplename": "a"})
+            assert cur.fetchall() == [(-1,)]
+            statements.execute(cur, "SELECT 1 FROM ndb.taxa WHERE taxonid = %s", [n])
+        assert [q.split()[0] for q, _ in mock_cur._execute_calls] == [
+            "PREPARE",
+            "PREPARE",
+            "EXECUTE",
+            "EXECUTE",
+        ]
+
+    def test_prepared_writes_are_shared_with_normal_runs(self, mock_cur):
+        statements = nh.PreparedStatements()
+        query = "SELECT ts.insertsample(%(analysisunitid)s, %(samplename)s);"
+        params = {"analysisunitid": 3, "samplename": "a"}
+        statements.execute(nh.ValidateOnlyCursor(mock_cur), query, params)
+        statements.execute(mock_cur, query, params)
+        sent = [q for q, _ in mock_cur._execute_calls]
+        assert sent[0].startswith("PREPARE databus_0_1 ") and "ts.insertsample" in sent[0]
+        assert sent[1:] == ["EXECUTE databus_0_1 (%s, %s)"]
+
+    def test_statements_prepared_by_normal_runs_are_not_run(self, mock_cur):
+        statements = nh.PreparedStatements()
+        query = "SELECT ts.insertsample(%(analysisunitid)s, %(samplename)s);"
+        params = {"analysisunitid": 3, "samplename": "a"}
+        statements.execute(mock_cur, query, params)
+        mock_cur.mock_fetchone = (mock_cur._execute_calls[0][0],)
+        cur = nh.ValidateOnlyCursor(mock_cur)
+        statements.execute(cur, query, params)
+        assert cur.fetchall() == [(-1,)] and cur.skipped == 1
+        assert "pg_prepared_statements" in mock_cur.last_query
+
+
+class TestIdAllocator:
+    def test_reserves_ids_and_inserts_set_based(self, mock_cur):
+        from DataBUS.Sample import Sample
+
+        mock_cur.mock_fetchall = [(11,), (12,)]
+        allocator = nh.IdAllocator()
+        samples = [Sample(analysisunitid=3, datasetid=4, samplename=n) for n in ("a", "b")]
+        assert allocator.insert_many(mock_cur, "samples", samples) == [11, 12]
+        assert [s.sampleid for s in samples] == [11, 12]
+        queries = [q for q, _ in mock_cur._execute_calls]
+        assert "generate_series" in queries[1] and queries[2] == "RELEASE SAVEPOINT databus_ids"
+        assert queries[3] == "SAVEPOINT databus_ids"
+        assert queries[4].startswith("INSERT INTO ndb.samples (sampleid, analysisunitid")
+        assert queries[5] == "RELEASE SAVEPOINT databus_ids"
+        assert mock_cur._execute_calls[4][1]["samplename"] == ["a", "b"]
+        allocator.settle(committed=False)
+        assert allocator.stats()["samples"] == {
+            "reserved": 2,
+            "committed": 0,
+            "gaps": 2,
+            "fallbacks": 0,
+        }
+
+    def test_columns_exist_in_neotoma(self):
+        import csv
+
+        from DataBUS.neotomaHelpers.id_allocator import ALLOCATED_TABLES, insert_query
+
+        path = os.path.join(os.path.dirname(__file__), "..", "docs", "assets", "tablecolumns.csv")
+        with open(path, newline="", encoding="utf-8") as fh:
+            known = {(r["table_name"], r["column_name"]) for r in csv.DictReader(fh)}
+        for table in ALLOCATED_TABLES:
+            columns = insert_query(table).split("(", 1)[1].split(")", 1)[0].split(", ")
+            assert {c for c in columns if (table, c) not in known} == set(), table
+
+    def test_reads_model_attributes_for_renamed_columns(self, mock_cur):
+        from DataBUS.Sample import Sample
+
+        mock_cur.mock_fetchall = [(11,)]
+        sample = Sample(analysisunitid=3, datasetid=4, prepmethod="sieved")
+        nh.IdAllocator().insert_many(mock_cur, "samples", [sample])
+        query, params = mock_cur._execute_calls[4]
+        assert "preparationmethod" in query and params["preparationmethod"] == ["sieved"]
+
+    def test_falls_back_when_the_sequence_cannot_be_used(self, mock_cur, monkeypatch):
+        from DataBUS.SampleAge import SampleAge
+
+        allocator = nh.IdAllocator()
+        monkeypatch.setattr("DataBUS.neotomaHelpers.id_allocator._ALLOCATOR", allocator)
+        mock_cur.mock_fetchall = [(None,)]
+        mock_cur.mock_fetchone = (5,)
+        ages = [SampleAge(sampleid=1, chronologyid=2, age=100)]
+        assert nh.insert_records(mock_cur, "sampleages", ages) == [5]
+        assert "ROLLBACK TO SAVEPOINT databus_ids" in [q for q, _ in mock_cur._execute_calls]
+        assert "ts.insertsampleage" in mock_cur._execute_calls[-2][0]
+        assert allocator.unavailable == {"sampleages"}
+        assert allocator.stats()["sampleages"]["fallbacks"] == 1
+
+    def test_failed_block_is_rolled_back_and_inserted_row_by_row(self, monkeypatch):
+        from DataBUS.SampleAge import SampleAge
+        from tests.conftest import AbortingCursor
+
+        allocator = nh.IdAllocator()
+        monkeypatch.setattr("DataBUS.neotomaHelpers.id_allocator._ALLOCATOR", allocator)
+        cur = AbortingCursor(
+            lambda q, p: (
+                q.startswith("INSERT INTO ndb.sampleages")
+                or (p and "_sampleid" in q and p.get("sampleid") == 2)
+            )
+        )
+        cur.mock_fetchall = [(21,), (22,), (23,)]
+        cur.mock_fetchone = (5,)
+        ages = [SampleAge(sampleid=s, chronologyid=2, age=100) for s in (1, 2, 3)]
+        results = nh.insert_records(cur, "sampleages", ages)
+        assert results[0] == results[2] == 5 and isinstance(results[1], ValueError)
+        queries = [q for q, _ in cur._execute_calls]
+        assert queries[3:5] == ["SAVEPOINT databus_ids", queries[4]]
+        assert queries[5] == "ROLLBACK TO SAVEPOINT databus_ids"
+        assert queries.count("ROLLBACK TO SAVEPOINT databus_ids") == 2
+        assert queries.count("RELEASE SAVEPOINT databus_ids") == 3
+        assert not cur.aborted
+        assert allocator.stats()["sampleages"] == {
+            "reserved": 3,
+            "committed": 0,
+            "gaps": 3,
+            "fallbacks": 3,
+        }
+
+    def test_insert_staged_splits_ids_and_errors(self, monkeypatch):
+        error = ValueError("bad row")
+        monkeypatch.setattr(
+            "DataBUS.neotomaHelpers.id_allocator.insert_records", lambda *a: [7, error, 9]
+        )
+        assert nh.insert_staged(None, "samples", [1, 2, 3]) == ([7, 9], [error])
+
+    def test_placeholder_cursors_get_placeholder_ids(self, mock_cur):
+        from DataBUS.Datum import Datum
+
+        cur = nh.ValidateOnlyCursor(mock_cur)
+        data = [Datum(sampleid=-1, variableid=10, value=v) for v in (1.0, 2.0)]
+        assert nh.IdAllocator().insert_many(cur, "data", data) == [-1, -2]
+        assert data[1].datumid == -2 and cur.skipped == 1
+        assert mock_cur._execute_calls == []
+
+
+class TestQueryStats:
+    def test_fingerprint_normalizes_literals(self):
+        a = nh.fingerprint("SELECT * FROM ndb.taxa\n WHERE taxonid IN (1, 2) AND name = 'x';")
+        b = nh.fingerprint("SELECT * FROM ndb.taxa WHERE taxonid IN (7,8,9) AND name = 'it''s'")
+        assert a == b == "SELECT * FROM ndb.taxa WHERE taxonid IN (?...) AND name = ?"
+        assert nh.fingerprint("EXECUTE databus_0_12 (%s)") == "EXECUTE databus_? (?)"
+
+    def test_safe_step_attributes_queries_to_the_step(self, mock_cur):
+        from tests.conftest import MockConnection
+
+        conn = nh.InstrumentedConnection(MockConnection(mock_cur))
+        cur = conn.cursor()
+        mock_cur.mock_fetchall = [(1,), (2,)]
+
+        def step():
+            cur.execute("SELECT taxonid FROM ndb.taxa WHERE taxonname = %(n)s", {"n": "a"})
+            return cur.fetchall()
+
+        nh.safe_step("taxa", step, [], conn)
+        cur.execute("SELECT 1")
+        stats = conn.query_stats
+        assert stats.steps["taxa"]["queries"] == 3 and stats.steps["taxa"]["rows"] == 2
+        assert stats.steps["(file)"]["queries"] == 1
+        key = ("taxa", "SELECT taxonid FROM ndb.taxa WHERE taxonname = ?")
+        assert stats.statements[key] == {
+            "calls": 1,
+            "seconds": stats.statements[key]["seconds"],
+            "rows": 2,
+        }
+
+    def test_percentiles_and_merge(self):
+        stats = nh.QueryStats()
+        with stats.step("data"):
+            for seconds in [0.001] * 90 + [0.1] * 10:
+                stats.record("SELECT ts.insertdata(%s)", seconds)
+        total = nh.QueryStats.merged([stats, None, stats])
+        (data,) = total.summary()
+        assert data["queries"] == 200
+        assert 0.001 <= data["p50"] < 0.0012 and 0.1 <= data["p99"] < 0.12
+        assert total.top(1)[0]["calls"] == 200
+        assert total.report()[0].startswith("Queries: 200 in ")
@@ -2,7 +2,7 @@
 
 import pytest
 
-from DataBUS import Response
+from DataBUS import Response, Validity
 
 
 def test_response_init():
@@ -40,3 +40,84 @@ def test_response_str_shows_false():
     r.message.append("Something failed")
     text = str(r)
     assert "FALSE" in text or "False" in text
+
+
+def test_add_message_counts_repeats_instead_of_appending():
+    r = Response()
+    for _ in range(3):
+        r.add_message("✔ Sample Age is valid.")
+    assert r.add_message("✗  Datum cannot be created: {e}", e="bad value") is True
+    assert r.message == ["✔ Sample Age is valid.", "✗  Datum cannot be created: bad value"]
+    assert r.message_count("✔ Sample Age is valid.") == 3
+    assert r.message_count("never reported") == 0
+
+
+def test_add_message_sees_messages_appended_directly():
+    r = Response()
+    r.message.append("✔ Sites found.")
+    assert r.add_message("✔ Sites found.") is False
+    assert r.message == ["✔ Sites found."]
+    r.message = ["✔ Other."]
+    assert r.add_message("✔ Sites found.") is True
+    assert r.message_count("✔ Sites found.") == 1
+
+
+def test_add_message_leaves_braces_in_values_alone():
+    r = Response()
+    r.add_message("✗  Datum cannot be inserted: {e}", e="{'value': None}")
+    assert r.message == ["✗  Datum cannot be inserted: {'value': None}"]
+
+
+@pytest.mark.parametrize("repeats, expected", [(1, "✔ Sample Age is valid.\n"), (4, "(×4)")])
+def test_str_shows_repeat_counts(repeats, expected):
+    r = Response()
+    r.valid.append(True)
+    for _ in range(repeats):
+        r.add_message("✔ Sample Age is valid.")
+    r.add_message("✔ Done.")
+    text = str(r) + "\n"
+    assert expected in text
+    assert text.count("✔ Sample Age is valid.") == 1
+
+
+def test_validity_counts_and_keeps_first_failures():
+    valid = Validity(max_failures=2)
+    valid.extend([True, False, True, False, False])
+    assert (valid.passed, valid.failed, valid.failures) == (2, 3, [1, 3])
+    assert len(valid) == 5
+    assert True in valid and False in valid
+    assert not valid.all()
+    assert not valid.exact
+    with pytest.raises(ValueError):
+        list(valid)
+
+
+def test_validity_rebuilds_values_when_exact():
+    values = [True, False, True, True, False]
+    valid = Validity(values)
+    assert valid.exact
+    assert list(valid) == values
+    assert valid == values
+    assert valid == Validity(values)
+    assert valid != [True] * 5
+
+
+def test_response_valid_stays_compact(monkeypatch):
+    r = Response()
+    for _ in range(10000):
+        r.valid.append(True)
+    r.valid.append(False)
+    assert r.validAll is False
+    assert r.valid.failures == [10000]
+    assert r.valid._values is None
+    monkeypatch.setattr(Response, "detailed", True)
+    r = Response()
+    r.valid.extend([True, False])
+    assert r.valid._values == [True, False]
+
+
+def test_assigning_a_list_to_valid_converts_it():
+    r = Response()
+    r.valid = [True, False]
+    assert isinstance(r.valid, Validity)
+    assert r.valid.failures == [1]
@@ -0,0 +1,591 @@
+"""Tests for the uploadRunner pipeline (no DB required)."""
+
+import os
+
+import pytest
+
+import DataBUS.neotomaHelpers as nh
+import DataBUS.uploadRunner as nr
+from DataBUS import Response
+from DataBUS.uploadRunner import upload_runner
+from tests.conftest import MockConnection, MockCursor
+
+
+# ── Helpers ───────────────────────────────────────────────────────────────────
+class RunnerConnection(MockConnection):
+    def __init__(self):
+        super().__init__(MockCursor())
+        self.commits = 0
+        self.rollbacks = 0
+        self.closed = False
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class SinglePool:
+    """Stands in for the per-worker psycopg2 connection pool."""
+
+    def __init__(self):
+        self.conn = RunnerConnection()
+
+    def getconn(self):
+        return self.conn
+
+    def putconn(self, conn, close=False):
+        pass
+
+
+def _response(valid, message):
+    response = Response()
+    response.valid.append(valid)
+    response.message.append(message)
+    return response
+
+
+def count_rows(cur, csv_file, databus):
+    return _response(True, f"rows: {csv_file.n_rows}")
+
+
+def check_upstream(cur, databus, bulk=None):
+    return _response("rows" in databus, f"upstream: {sorted(databus)}; bulk: {bulk}")
+
+
+def fail_on_b(cur, csv_file):
+    if csv_file.column("Site")[0] == "b":
+        raise RuntimeError("boom")
+    return _response(True, "site ok")
+
+
+STEPS = (
+    nr.Step("rows", "rows", "Rows", count_rows, args=("csv_file", "databus")),
+    nr.Step(
+        "upstream", "upstream", "Upstream", check_upstream, args=("databus",), options=("bulk",)
+    ),
+)
+
+
+def _ok(cur):
+    return _response(True, "ok")
+
+
+def _fail(cur):
+    return _response(False, "✗ bad")
+
+
+def _dag_step(key, validator=_ok, **kwargs):
+    return nr.Step(key, key, key.title(), validator, args=(), **kwargs)
+
+
+CALLS = []
+SITE_OK = [True]
+
+
+def _read_column(table):
+    def validator(cur, yml_dict, csv_file, databus):
+        CALLS.append(table)
+        entry = next(e for e in yml_dict["metadata"] if e["neotoma"].startswith(table))
+        valid = SITE_OK[0] if table == "ndb.sites" else True
+        return _response(valid, f"{table}: {csv_file.column(entry['column'])}")
+
+    return validator
+
+
+TEMPLATE = {
+    "metadata": [
+        {"neotoma": "ndb.sites.sitename", "column": "Site"},
+        {"neotoma": "ndb.data.value", "column": "Value"},
+        {"neotoma": "ndb.publications.doi", "column": "Doi"},
+    ]
+}
+
+INCREMENTAL_STEPS = (
+    nr.Step("sites", "sites", "Sites", _read_column("ndb.sites"), tables=("ndb.sites",)),
+    nr.Step(
+        "data",
+        "data",
+        "Data",
+        _read_column("ndb.data"),
+        needs=("sites",),
+        tables=("ndb.data",),
+    ),
+    nr.Step(
+        "publications",
+        "publications",
+        "Publications",
+        _read_column("ndb.publications"),
+        needs=("sites",),
+        tables=("ndb.publications",),
+    ),
+)
+
+
+def _write_csv(tmp_path, name, site, rows=2):
+    path = tmp_path / name
+    path.write_text("Site,Value\n" + "".join(f"{site},{i}\n" for i in range(rows)))
+    return str(path)
+
+
+def _prior_log(tmp_path, filename):
+    logs = tmp_path / "logs"
+    logs.mkdir(exist_ok=True)
+    (logs / (os.path.basename(filename) + ".valid.log")).write_text("all good\n")
+    return str(logs) + "/"
+
+
+def _init_fake_worker(connection, template, settings, snapshot=None):
+    upload_runner._WORKER.update(pool=SinglePool(), yml_dict={}, settings=settings)
+
+
+# ── Step ──────────────────────────────────────────────────────────────────────
+class TestStep:
+    def test_passes_only_declared_arguments_and_set_options(self):
+        context = {"yml_dict": {}, "csv_file": None, "databus": {"rows": 1}}
+        step = STEPS[1]
+        assert "bulk: None" in step.run(MockCursor(), context).message[0]
+        assert "bulk: copy" in step.run(MockCursor(), context, {"bulk": "copy"}).message[0]
+
+    def test_default_pipeline_order(self):
+        assert [s.key for s in nr.STEPS][:3] == ["sites", "gpuid", "collunits"]
+        assert nr.STEPS[-1].key == "publications"
+        assert len({s.name for s in nr.STEPS}) == len(nr.STEPS) == 16
+
+
+# ── StepGraph ─────────────────────────────────────────────────────────────────
+class TestStepGraph:
+    def test_orders_steps_after_what_they_read(self):
+        graph = nr.StepGraph(nr.STEPS)
+        keys = [step.key for step in graph.order]
+        assert keys.index("samples") < keys.index("geochron") < keys.index("geochroncontrol")
+        assert keys.index("samples") < keys.index("contacts")
+        for step in graph.order:
+            for key in step.needs + step.after:
+                assert keys.index(key) < keys.index(step.key)
+
+    def test_keeps_declared_order_between_independent_steps(self):
+        steps = [_dag_step("b"), _dag_step("a", needs=("c",)), _dag_step("c"), _dag_step("d")]
+        graph = nr.StepGraph(steps)
+        assert [step.key for step in graph.order] == ["b", "c", "a", "d"]
+        assert [[step.key for step in wave] for wave in graph.waves()] == [["b", "c", "d"], ["a"]]
+
+    def test_blocked_lists_failed_needs_only(self):
+        graph = nr.StepGraph(nr.STEPS)
+        valid = {"analysisunits": True, "datasets": False, "collunits": False}
+        assert graph.blocked(graph["samples"], valid) == ["datasets"]
+        assert graph.blocked(graph["contacts"], valid) == []
+
+    @pytest.mark.parametrize(
+        "steps, match",
+        [
+            ([_dag_step("a"), _dag_step("a")], "Two steps"),
+            ([_dag_step("a", needs=("z",))], "no step produces"),
+            ([_dag_step("a", needs=("b",)), _dag_step("b", after=("a",))], "cycle"),
+        ],
+    )
+    def test_rejects_invalid_declarations(self, steps, match):
+        with pytest.raises(ValueError, match=match):
+            nr.StepGraph(steps)
+
+    def test_ancestors_and_descendants(self):
+        graph = nr.StepGraph(nr.STEPS)
+        assert graph.ancestors("publications") == {"datasets", "collunits", "sites"}
+        assert graph.descendants("samples") == {
+            "geochron",
+            "geochroncontrol",
+            "contacts",
+            "sample_age",
+            "data",
+        }
+
+
+# ── run_file ──────────────────────────────────────────────────────────────────
+class TestRunFile:
+    def test_runs_steps_in_order_and_rolls_back(self, tmp_path):
+        filename = _write_csv(tmp_path, "a.csv", "a", rows=3)
+        conn = RunnerConnection()
+        result = nr.run_file(
+            conn,
+            filename,
+            {},
+            steps=STEPS,
+            options={"bulk": "insert"},
+            validation_files=_prior_log(tmp_path, filename),
+        )
+        assert result.status == "validated"
+        assert result.valid == {"rows": True, "upstream": True}
+        log = "\n".join(result.logfile)
+        assert log.index("=== Rows ===") < log.index("rows: 3") < log.index("=== Upstream ===")
+        assert "bulk: insert" in log
+        assert conn.commits == 0
+
+    def test_upload_commits_valid_file(self, tmp_path, monkeypatch):
+        filename = _write_csv(tmp_path, "a.csv", "a")
+        monkeypatch.setattr(upload_runner.nv, "insert_final", lambda cur, databus: Response())
+        conn = RunnerConnection()
+        result = nr.run_file(
+            conn,
+            filename,
+            {},
+            upload=True,
+            steps=STEPS,
+            validation_files=_prior_log(tmp_path, filename),
+        )
+        assert result.status == "uploaded"
+        assert conn.commits == 1
+
+    def test_failing_step_is_logged_and_file_not_committed(self, tmp_path, monkeypatch):
+        filename = _write_csv(tmp_path, "b.csv", "b")
+        monkeypatch.setattr(upload_runner.nv, "insert_final", lambda cur, databus: Response())
+        steps = (nr.Step("site", "site", "Site", fail_on_b, args=("csv_file",)),) + STEPS
+        conn = RunnerConnection()
+        result = nr.run_file(
+            conn,
+            filename,
+            {},
+            upload=True,
+            steps=steps,
+            validation_files=_prior_log(tmp_path, filename),
+        )
+        assert result.status == "invalid"
+        assert result.valid["site"] is False
+        assert any("[site] Unexpected error (rolled back): boom" in m for m in result.logfile)
+        assert conn.commits == 0
+
+    def test_prior_errors_block_the_upload(self, tmp_path, monkeypatch):
+        filename = _write_csv(tmp_path, "a.csv", "a")
+        monkeypatch.setattr(
+            upload_runner.nh,
+            "hash_file",
+            lambda f, store: {"pass": False, "hash": "x", "message": []},
+        )
+        validation_files = _prior_log(tmp_path, filename)
+        with open(validation_files + "a.csv.valid.log", "w", encoding="utf-8") as f:
+            f.write("✗ bad site\n")
+        conn = RunnerConnection()
+        result = nr.run_file(
+            conn, filename, {}, upload=True, steps=STEPS, validation_files=validation_files
+        )
+        assert result.status == "invalid"
+        assert "File must be properly validated before it can be uploaded." in result.logfile
+        assert conn.commits == 0
+
+    def test_outcome_is_recorded_in_the_store(self, tmp_path):
+        filename = _write_csv(tmp_path, "a.csv", "a")
+        steps = (nr.Step("site", "site", "Site", fail_on_b, args=("csv_file",)),)
+        store = nh.ValidationStore(str(tmp_path / "validation.sqlite3"))
+        result = nr.run_file(
+            RunnerConnection(),
+            filename,
+            {},
+            steps=steps,
+            validation_files=str(tmp_path) + "/",
+            store=store,
+            template_hash="t1",
+        )
+        record = store.latest(filename)
+        assert (record["status"], record["errors"], record["template_hash"]) == (
+            result.status,
+            0,
+            "t1",
+        )
+        assert record["file_hash"] == nh.hash_file(filename, store=False)["hash"]
+
+        bad = _write_csv(tmp_path, "b.csv", "b")
+        nr.run_file(RunnerConnection(), bad, {}, steps=steps, store=store)
+        assert store.latest(bad)["errors"] > 0
+        upload = nr.run_file(RunnerConnection(), bad, {}, upload=True, steps=steps, store=store)
+        assert "File must be properly validated before it can be uploaded." in upload.logfile
+
+    def test_skips_steps_whose_needs_failed(self, tmp_path):
+        filename = _write_csv(tmp_path, "a.csv", "a")
+        steps = (
+            _dag_step("sites", _fail),
+            _dag_step("collunits", needs=("sites",)),
+            _dag_step("samples", needs=("collunits",)),
+            _dag_step("contacts", after=("collunits",)),
+        )
+        result = nr.run_file(
+            RunnerConnection(),
+            filename,
+            {},
+            steps=steps,
+            validation_files=_prior_log(tmp_path, filename),
+        )
+        assert result.status == "invalid"
+        assert result.skipped == ["collunits", "samples"]
+        assert result.valid == {
+            "sites": False,
+            "collunits": False,
+            "samples": False,
+            "contacts": True,
+        }
+        assert "✗  Skipped: requires collunits, which did not pass." in result.logfile
+
+    def test_skip_failed_false_runs_every_step(self, tmp_path):
+        filename = _write_csv(tmp_path, "a.csv", "a")
+        steps = (_dag_step("sites", _fail), _dag_step("collunits", needs=("sites",)))
+        result = nr.run_file(
+            RunnerConnection(),
+            filename,
+            {},
+            steps=steps,
+            validation_files=_prior_log(tmp_path, filename),
+            skip_failed=False,
+        )
+        assert result.skipped == []
+        assert result.valid == {"sites": False, "collunits": True}
+
+    def test_validate_only_answers_inserts_with_placeholders(self, tmp_path):
+        def insert_site(cur, csv_file):
+            cur.execute("SELECT ts.insertsite(%(sitename)s);", {"sitename": "a"})
+            return _response(True, f"site {cur.fetchone()[0]}")
+
+        steps = (nr.Step("sites", "sites", "Sites", insert_site, args=("csv_file",)),) + STEPS
+        filename = _write_csv(tmp_path, "a.csv", "a")
+        conn = RunnerConnection()
+        for _ in range(2):
+            result = nr.run_file(
+                conn, filename, {}, steps=steps, validate_only=True, validation_files=str(tmp_path)
+            )
+            log = "\n".join(result.logfile)
+            assert result.status == "validated"
+            assert "site -1" in log and "upstream: ['rows', 'sites']" in log
+            assert "Writes answered with placeholder IDs: 1" in log
+        assert not any("insert" in q for q, _ in conn._cursor._execute_calls)
+        with pytest.raises(ValueError):
+            nr.run_file(conn, filename, {}, upload=True, steps=steps, validate_only=True)
+
+    def test_upload_starts_from_the_validation_bundle(self, tmp_path, monkeypatch):
+        def find_taxon(cur, csv_file):
+            cur.execute("SELECT taxonid FROM ndb.taxa WHERE taxonname = %(name)s;", {"name": "x"})
+            return _response(True, f"taxon {cur.fetchone()[0]}, rows {csv_file.n_rows}")
+
+        monkeypatch.setattr(upload_runner.nv, "insert_final", lambda cur, databus: Response())
+        steps = (nr.Step("taxa", "taxa", "Taxa", find_taxon, args=("csv_file",)),)
+        filename = _write_csv(tmp_path, "a.csv", "a", rows=3)
+        logs = _prior_log(tmp_path, filename)
+        conn = RunnerConnection()
+        conn._cursor.mock_fetchall = [(7,)]
+        result = nr.run_file(conn, filename, {}, steps=steps, validation_files=logs, bundle=True)
+        assert result.status == "validated"
+        assert os.path.exists(nr.ValidationBundle.path(filename))
+        assert len(nr.ValidationBundle.load(filename).lookups) == 1
+
+        conn._cursor._execute_calls.clear()
+        conn._cursor.mock_fetchall = []
+        result = nr.run_file(
+            conn, filename, {}, upload=True, steps=steps, validation_files=logs, bundle=True
+        )
+        log = "\n".join(result.logfile)
+        assert result.status == "uploaded"
+        assert "Uploading from the validation bundle" in log and "taxon 7, rows 3" in log
+        assert not any("ndb.taxa" in q for q, _ in conn._cursor._execute_calls)
+        assert not os.path.exists(nr.ValidationBundle.path(filename))
+
+    def test_lookups_of_written_tables_are_not_memoised(self):
+        import re
+
+        from DataBUS.uploadRunner.bundle import REFERENCE_TABLES, lookup_key
+
+        src = os.path.join(os.path.dirname(__file__), "..", "src", "DataBUS")
+        written = set()
+        for root, _, files in os.walk(src):
+            for name in files:
+                if name.endswith(".py"):
+                    with open(os.path.join(root, name), encoding="utf-8") as fh:
+                        written.update(re.findall(r"INSERT INTO ndb\.(\w+)", fh.read()))
+        assert {"projects", "grants"} <= written
+        # Written through ts.insertsite(), ts.insertcollectionunit(), ...
+        written |= {"sites", "collectionunits", "variables", "datasets", "samples", "data"}
+        assert not REFERENCE_TABLES & written
+        query = "SELECT projectid FROM ndb.projects WHERE projectname = %(name)s;"
+        assert lookup_key(query, {"name": "x"}) is None
+        assert lookup_key("SELECT taxonid FROM ndb.taxa WHERE taxonid = %s;", [1]) is not None
+
+    def test_changed_file_does_not_use_its_bundle(self, tmp_path):
+        filename = _write_csv(tmp_path, "a.csv", "a")
+        nr.run_file(RunnerConnection(), filename, {}, steps=STEPS, bundle=True)
+        bundle = nr.ValidationBundle.load(filename)
+        assert bundle.stale(nh.hash_file(filename)["hash"], None) is None
+        _write_csv(tmp_path, "a.csv", "a", rows=4)
+        result = nr.run_file(
+            RunnerConnection(), filename, {}, upload=True, steps=STEPS, bundle=True
+        )
+        log = "\n".join(result.logfile)
+        assert "Not using a validation bundle: the file changed since it was validated" in log
+        assert "rows: 4" in log
+
+    def test_validates_offline_against_a_snapshot(self, tmp_path):
+        import sqlite3
+
+        source = sqlite3.connect(":memory:")
+        source.execute("ATTACH DATABASE ? AS ndb", (str(tmp_path / "source.db"),))
+        source.executescript(
+            "CREATE TABLE ndb.taxa (taxonid INTEGER, taxonname TEXT);"
+            "INSERT INTO ndb.taxa VALUES (1, 'Pinus');"
+        )
+        snapshot = str(tmp_path / "neotoma.sqlite3")
+        nh.export_snapshot(source, snapshot, {"taxa": (None, ())})
+
+        def insert_site(cur, csv_file):
+            cur.execute(
+                "SELECT taxonid FROM ndb.taxa WHERE LOWER(taxonname) = %(name)s;", {"name": "pinus"}
+            )
+            taxonid = cur.fetchone()[0]
+            cur.execute("SELECT ts.insertsite(%(sitename)s);", {"sitename": "a"})
+            return _response(True, f"taxon {taxonid}, site {cur.fetchone()[0]}")
+
+        filename = _write_csv(tmp_path, "a.csv", "a")
+        steps = (nr.Step("sites", "sites", "Sites", insert_site, args=("csv_file",)),)
+        conn = nh.OfflineConnection(snapshot)
+        result = nr.run_file(conn, filename, {}, steps=steps, validation_files=str(tmp_path))
+        log = "\n".join(result.logfile)
+        assert result.status == "validated"
+        assert "Validating offline against the snapshot" in log and "taxon 1, site -1" in log
+        with pytest.raises(ValueError):
+            nr.run_file(conn, filename, {}, upload=True, steps=steps)
+        with pytest.raises(ValueError):
+            nr.run_files([filename], None, None, upload=True, snapshot=snapshot)
+
+
+# ── incremental runs ──────────────────────────────────────────────────────────
+class TestIncrementalRun:
+    def _run(self, filename, store, **kwargs):
+        return nr.run_file(
+            RunnerConnection(),
+            filename,
+            TEMPLATE,
+            steps=INCREMENTAL_STEPS,
+            store=store,
+            incremental=True,
+            **kwargs,
+        )
+
+    def _write(self, tmp_path, doi="10.1/a"):
+        path = tmp_path / "a.csv"
+        path.write_text(f"Site,Value,Doi\nlake,1,{doi}\nlake,2,{doi}\n")
+        return str(path)
+
+    @pytest.fixture(autouse=True)
+    def _reset(self):
+        CALLS.clear()
+        SITE_OK[0] = True
+
+    def test_reruns_changed_steps_and_what_they_read_from(self, tmp_path):
+        store = nh.ValidationStore(str(tmp_path / "validation.sqlite3"))
+        filename = self._write(tmp_path)
+        first = self._run(filename, store)
+        assert first.reused == [] and CALLS == ["ndb.sites", "ndb.data", "ndb.publications"]
+
+        CALLS.clear()
+        again = self._run(filename, store)
+        assert CALLS == []
+        assert again.reused == ["sites", "data", "publications"]
+        assert again.valid == first.valid and again.status == "validated"
+        assert "ndb.publications: ['10.1/a', '10.1/a']" in "\n".join(again.logfile)
+
+        filename = self._write(tmp_path, doi="10.1/b")
+        fixed = self._run(filename, store)
+        assert CALLS == ["ndb.sites", "ndb.publications"]
+        assert fixed.reused == ["data"]
+        assert "ndb.publications: ['10.1/b', '10.1/b']" in "\n".join(fixed.logfile)
+
+    def test_stale_result_runs_every_step(self, tmp_path):
+        store = nh.ValidationStore(str(tmp_path / "validation.sqlite3"))
+        self._run(self._write(tmp_path), store)
+        SITE_OK[0] = False
+        CALLS.clear()
+        result = self._run(self._write(tmp_path, doi="10.1/b"), store)
+        assert result.reused == [] and result.skipped == ["data", "publications"]
+        assert result.status == "invalid"
+        assert CALLS == ["ndb.sites", "ndb.sites"]
+        assert any("running every step again" in line for line in result.logfile)
+
+    def test_uploads_run_every_step_and_forget_results(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(upload_runner.nv, "insert_final", lambda cur, databus: Response())
+        store = nh.ValidationStore(str(tmp_path / "validation.sqlite3"))
+        filename = self._write(tmp_path)
+        self._run(filename, store)
+        CALLS.clear()
+        result = self._run(filename, store, upload=True)
+        assert result.status == "uploaded" and result.reused == [] and len(CALLS) == 3
+        assert store.step_results(filename) == {}
+
+
+# ── run_files ─────────────────────────────────────────────────────────────────
+class TestRunFilesParallel:
+    def test_results_and_logs_in_input_order(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(upload_runner, "_init_worker", _init_fake_worker)
+        filenames = [_write_csv(tmp_path, f"{i}.csv", "b" if i == 2 else "a") for i in range(6)]
+        validation_files = str(tmp_path) + "/logs/"
+        for filename in filenames:
+            _prior_log(tmp_path, filename)
+        steps = (nr.Step("site", "site", "Site", fail_on_b, args=("csv_file",)),) + STEPS
+        results = nr.run_files(
+            filenames,
+            connection={},
+            template=None,
+            jobs=3,
+            steps=steps,
+            validation_files=validation_files,
+            progress=False,
+        )
+        assert [r.filename for r in results] == filenames
+        assert [r.status for r in results] == ["validated"] * 2 + ["invalid"] + ["validated"] * 3
+        for result in results:
+            assert result.logfile == []
+            with open(result.filename + ".valid.log", encoding="utf-8") as f:
+                log = f.read()
+            assert "=== Rows ===" in log
+            rendered = nh.render_valid_log(result.filename + ".valid.jsonl")
+            assert log == "".join(line + "\n" for line in rendered)
+        with open(filenames[2] + ".valid.log", encoding="utf-8") as f:
+            assert "Unexpected error (rolled back): boom" in f.read()
+
+    def test_unreadable_file_does_not_stop_the_run(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(upload_runner, "_init_worker", _init_fake_worker)
+        filenames = [_write_csv(tmp_path, "a.csv", "a"), str(tmp_path / "missing.csv")]
+        results = nr.run_files(
+            filenames,
+            {},
+            None,
+            jobs=2,
+            steps=STEPS,
+            validation_files=str(tmp_path) + "/",
+            write_logs=False,
+            progress=False,
+        )
+        assert results[1].status == "error"
+        assert "An error occurred during validation" in results[1].logfile[0]
+
+    def test_profile_counts_queries_by_step(self, tmp_path, monkeypatch):
+        import json
+
+        monkeypatch.setattr(upload_runner, "_init_worker", _init_fake_worker)
+        filenames = [_write_csv(tmp_path, f"{i}.csv", "a") for i in range(2)]
+        validation_files = str(tmp_path) + "/logs/"
+        results = nr.run_files(
+            filenames,
+            {},
+            None,
+            jobs=2,
+            steps=STEPS,
+            validation_files=validation_files,
+            progress=False,
+            profile=True,
+        )
+        for result in results:
+            # safe_step's SAVEPOINT and RELEASE of each step.
+            assert result.query_stats.steps["rows"]["queries"] == 2
+            with open(result.filename + ".valid.log", encoding="utf-8") as f:
+                assert "Queries: " in f.read()
+        with open(validation_files + "query_stats.json", encoding="utf-8") as f:
+            totals = {s["step"]: s["queries"] for s in json.load(f)["steps"]}
+        assert totals["rows"] == totals["upstream"] == 4
+
+    def test_jobs_must_be_positive(self):
+        with pytest.raises(ValueError):
+            nr.run_files([], {}, None, jobs=0)
@@ -4,6 +4,7 @@ from unittest.mock import MagicMock
 
 import pytest
 
+import DataBUS.neotomaHelpers as nh
 import DataBUS.neotomaValidator as nv
 from DataBUS import Response
 
@@ -135,3 +136,209 @@ class TestValidDataMock:
         databus = {"samples": MagicMock(id_list=list(range(1, n + 1)))}
         result = nv.valid_data(cur=mock_cur, yml_dict=yml_dict, csv_file=csv_file, databus=databus)
         assert isinstance(result, Response)
+
+
+class BatchCursor:
+    """Cursor answering the set-based lookups of valid_data from small tables."""
+
+    TAXA = {"quercus": 11, "pinus": 12}
+    UNITS = {"nisp": 3}
+
+    def __init__(self):
+        self._execute_calls = []
+
+    def execute(self, query, params=None):
+        self._execute_calls.append((query, params))
+
+    def fetchone(self):
+        return (len(self._execute_calls),)
+
+    def fetchall(self):
+        query, params = self._execute_calls[-1]
+        if "INSERT INTO ndb.data" in query:
+            return [(1000 + i,) for i in range(len(params["sampleid"]))]
+        if "ndb.taxa" in query:
+            return [(t, self.TAXA[t]) for t in params["taxa"] if t in self.TAXA]
+        if "ndb.variableunits" in query:
+            return [(t, self.UNITS[t]) for t in params["terms"] if t in self.UNITS]
+        if "ndb.variables" in query:
+            keys = zip(
+                params["taxonid"],
+                params["variableunitsid"],
+                params["variableelementid"],
+                params["variablecontextid"],
+                strict=True,
+            )
+            return [(*key, 100 + key[0]) for key in keys]
+        return []
+
+    def lookups(self):
+        return [q for q, _ in self._execute_calls if "ndb.data " not in q and "insertdata" not in q]
+
+    def inserts(self):
+        return [
+            q for q, _ in self._execute_calls if "insertdata" in q or "INSERT INTO ndb.data" in q
+        ]
+
+
+class TestValidDataBatchedLookups:
+    def test_lookups_do_not_grow_with_rows(self):
+        cur = BatchCursor()
+        csv_file = _make_csv(range(60), taxon="Quercus", units="NISP")
+        databus = {"samples": MagicMock(id_list=list(range(1, 61)))}
+        result = nv.valid_data(
+            cur=cur, yml_dict=_make_long_yml(), csv_file=csv_file, databus=databus
+        )
+        assert result.validAll
+        assert len(cur.lookups()) == 3
+        assert len(result.id_dict["Quercus"]) == 60
+        assert "✔ Variable ID retrieved from db: 111" in result.message
+
+    def test_wide_format_resolves_each_taxon_once(self):
+        cur = BatchCursor()
+        yml_dict = {
+            "metadata": [
+                {
+                    "neotoma": "ndb.data.value",
+                    "column": taxon,
+                    "taxonname": taxon,
+                    "rowwise": True,
+                    "type": "float",
+                }
+                for taxon in ("Quercus", "Pinus")
+            ]
+            + [
+                {
+                    "neotoma": "ndb.variables.variableunitsid",
+                    "column": "Units",
+                    "taxonname": taxon,
+                    "rowwise": True,
+                }
+                for taxon in ("Quercus", "Pinus")
+            ]
+        }
+        csv_file = [{"Quercus": str(i), "Pinus": str(2 * i), "Units": "NISP"} for i in range(1, 41)]
+        databus = {"samples": MagicMock(id_list=list(range(1, 41)))}
+        result = nv.valid_data(cur=cur, yml_dict=yml_dict, csv_file=csv_file, databus=databus)
+        assert result.validAll
+        assert len(cur.lookups()) == 3
+        assert {k: len(v) for k, v in result.id_dict.items()} == {"Quercus": 40, "Pinus": 40}
+
+    def test_unknown_taxon_skips_variable_lookup(self):
+        cur = BatchCursor()
+        csv_file = _make_csv([1, 2, 3], taxon="Fagus", units="NISP")
+        databus = {"samples": MagicMock(id_list=[1, 2, 3])}
+        result = nv.valid_data(
+            cur=cur, yml_dict=_make_long_yml(taxon="Fagus"), csv_file=csv_file, databus=databus
+        )
+        assert not result.validAll
+        assert "✗ The provided taxonid with value Fagus does not exist in Neotoma DB." in (
+            result.message
+        )
+        assert not any("ndb.variables" in q for q in cur.lookups())
+
+
+class AbortingBatchCursor(BatchCursor):
+    """BatchCursor that fails the inserts of one value and aborts like PostgreSQL."""
+
+    def __init__(self, bad_value):
+        super().__init__()
+        self.bad_value = bad_value
+        self.aborted = False
+
+    def execute(self, query, params=None):
+        if self.aborted and not query.startswith("ROLLBACK"):
+            raise RuntimeError("current transaction is aborted")
+        self.aborted = False
+        super().execute(query, params)
+        value = params.get("value") if isinstance(params, dict) else None
+        if ("INSERT INTO ndb.data" in query and self.bad_value in value) or (
+            "insertdata" in query and value == self.bad_value
+        ):
+            self.aborted = True
+            raise ValueError("violates check constraint data_value_check")
+
+
+class TestValidDataBulkInsert:
+    def test_bulk_insert_one_statement_per_file(self):
+        cur = BatchCursor()
+        csv_file = _make_csv(range(60), taxon="Quercus", units="NISP")
+        databus = {"samples": MagicMock(id_list=list(range(1, 61)))}
+        result = nv.valid_data(
+            cur=cur,
+            yml_dict=_make_long_yml(),
+            csv_file=csv_file,
+            databus=databus,
+            bulk="insert",
+        )
+        assert result.validAll
+        assert len(cur.inserts()) == 1
+        assert result.id_dict["Quercus"] == list(range(1000, 1060))
+
+    def test_bulk_matches_per_row_validity(self):
+        csv_file = _make_csv([1, 2, 3], taxon="Quercus", units="NISP")
+        databus = {"samples": MagicMock(id_list=[1, 2, 3])}
+        per_row = nv.valid_data(
+            cur=BatchCursor(), yml_dict=_make_long_yml(), csv_file=csv_file, databus=databus
+        )
+        bulk = nv.valid_data(
+            cur=BatchCursor(),
+            yml_dict=_make_long_yml(),
+            csv_file=csv_file,
+            databus=databus,
+            bulk="insert",
+        )
+        assert bulk.valid == per_row.valid
+        assert bulk.message == per_row.message
+
+    def test_bulk_failure_reports_the_bad_rows(self):
+        cur = AbortingBatchCursor(bad_value=2.0)
+        csv_file = _make_csv([1, 2, 3], taxon="Quercus", units="NISP")
+        databus = {"samples": MagicMock(id_list=[1, 2, 3])}
+        result = nv.valid_data(
+            cur=cur,
+            yml_dict=_make_long_yml(),
+            csv_file=csv_file,
+            databus=databus,
+            bulk="insert",
+        )
+        assert not result.validAll
+        assert any(m.startswith("✗  Data cannot be inserted in bulk") for m in result.message)
+        assert any(m.startswith("✗  Datum cannot be inserted") for m in result.message)
+        assert len(result.id_dict["Quercus"]) == 2
+        assert not cur.aborted
+
+    def test_preallocated_bulk_block_is_retried_row_by_row(self, monkeypatch):
+        monkeypatch.setattr("DataBUS.neotomaHelpers.id_allocator._ALLOCATOR", nh.IdAllocator())
+        cur = AbortingBatchCursor(bad_value=2.0)
+        fetchall = cur.fetchall
+        cur.fetchall = lambda: (
+            [(500 + i,) for i in range(cur._execute_calls[-1][1]["n"])]
+            if "generate_series" in cur._execute_calls[-1][0]
+            else fetchall()
+        )
+        result = nv.valid_data(
+            cur=cur,
+            yml_dict=_make_long_yml(),
+            csv_file=_make_csv([1, 2, 3], taxon="Quercus", units="NISP"),
+            databus={"samples": MagicMock(id_list=[1, 2, 3])},
+            bulk="insert",
+            preallocate=True,
+        )
+        assert any(q.startswith("INSERT INTO ndb.data (dataid") for q in cur.inserts())
+        assert not result.validAll and len(result.id_dict["Quercus"]) == 2
+        assert any(m.startswith("✗  Datum cannot be inserted") for m in result.message)
+
+    def test_preallocate_uses_bulk_method_without_a_sequence(self, monkeypatch):
+        monkeypatch.setattr("DataBUS.neotomaHelpers.id_allocator._ALLOCATOR", nh.IdAllocator())
+        cur = BatchCursor()
+        result = nv.valid_data(
+            cur=cur,
+            yml_dict=_make_long_yml(),
+            csv_file=_make_csv([1, 2, 3], taxon="Quercus", units="NISP"),
+            databus={"samples": MagicMock(id_list=[1, 2, 3])},
+            bulk="insert",
+            preallocate=True,
+        )
+        assert result.validAll and result.id_dict["Quercus"] == [1000, 1001, 1002]
+        assert len(cur.inserts()) == 1 and "staged" in cur.inserts()[0]
@@ -84,3 +84,22 @@ class TestValidSampleMock:
             cur=mock_cur, yml_dict=yml_dict, csv_file=csv_file, databus=databus
         )
         assert isinstance(result.id_list, list)
+
+    def test_preallocate_inserts_block_with_one_statement(self, mock_cur, pb210_pair, monkeypatch):
+        import DataBUS.neotomaHelpers as nh
+
+        monkeypatch.setattr("DataBUS.neotomaHelpers.id_allocator._ALLOCATOR", nh.IdAllocator())
+        csv_file, yml_dict = pb210_pair
+        n = len(csv_file)
+        mock_cur.mock_fetchall = [(1000 + i,) for i in range(n)]
+        databus = {
+            "analysisunits": MagicMock(id_list=list(range(1, n + 1))),
+            "datasets": MagicMock(id_int=1),
+        }
+        result = nv.valid_sample(
+            cur=mock_cur, yml_dict=yml_dict, csv_file=csv_file, databus=databus, preallocate=True
+        )
+        assert result.id_list == [1000 + i for i in range(n)]
+        inserts = [q for q, _ in mock_cur._execute_calls if "ndb.samples" in q]
+        assert len(inserts) == 1 and "unnest" in inserts[0]
+        assert not any("ts.insertsample" in q for q, _ in mock_cur._execute_calls)